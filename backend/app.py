@@ -3,7 +3,12 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import recommendation_engine as engine
 import transcript_parser
+import result_cache
+import catalog_state
+import program_pool
 import traceback
+import sqlite_store
+from course_store import plain_courses
 
 # Try to import database layer (Supabase)
 try:
@@ -16,45 +21,179 @@ except ImportError:
 app = Flask(__name__)
 CORS(app)
 
+# Scoring mode: 'bounded' (default) skips the expensive evaluation of programs
+# that cannot reach the top results, 'standard' scores every program, and
+# 'vectorized' scores all programs in one NumPy batch. All modes return the
+# same results, and details are only built for the returned page.
+RECOMMENDER_MODE = os.getenv('RECOMMENDER_MODE', 'bounded').lower()
+MAX_RECOMMENDATIONS = 15
+
 # Configuration for Uploads
 UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Cached /recommend responses, invalidated whenever the catalog is reloaded
+RESULT_CACHE = result_cache.ResultCache.from_env()
+
+# Most students one /recommend/batch request may contain
+RECOMMEND_BATCH_MAX = int(os.getenv('RECOMMEND_BATCH_MAX', '500'))
+
+# Worker processes that rank the programs of large /recommend requests and
+# compute the students of /recommend/batch in parallel (PROGRAM_POOL_WORKERS,
+# default one per CPU, 0 = off), forked with the current catalog
+PROGRAM_POOL = program_pool.ProgramPool.from_env()
+
+# The catalog every endpoint serves. Requests read CATALOG.current() once and
+# use that state throughout; reloads build a new state in the background and
+# swap it in (see catalog_state.py)
+CATALOG = catalog_state.CatalogHolder()
+DATA_SOURCE = None
+# Storage backend module the catalog was loaded from (database or
+# sqlite_store; None for the JSON files). Both offer the same interface.
+STORE = None
+
+# Seconds between checks of the JSON data files for changes (0 disables the watcher)
+CATALOG_WATCH_INTERVAL = float(os.getenv('CATALOG_WATCH_INTERVAL', '0'))
+# Seconds between delta syncs from Supabase or the SQLite file (0 disables background syncing)
+CATALOG_SYNC_INTERVAL = float(os.getenv('CATALOG_SYNC_INTERVAL', '0'))
+# Token required by the /admin endpoints; without one they only answer local requests
+ADMIN_TOKEN = os.getenv('CATALOG_ADMIN_TOKEN')
+
+# Publish the vectorized score matrix as a shared segment in this namespace
+# (catalog_segment.py); serve.py sets it to the master's pid
+CATALOG_SEGMENT_NAMESPACE = os.getenv('CATALOG_SEGMENT_NAMESPACE') or None
+
+def _build_catalog(data, source, previous=None, patch=None):
+    return catalog_state.build_state(*data, source=source, vectorized=RECOMMENDER_MODE == 'vectorized',
+                                     previous=previous, patch=patch, segment_namespace=CATALOG_SEGMENT_NAMESPACE)
+
+def _reload_catalog():
+    """Load the catalog again from the current data source and build a new state."""
+    if STORE is not None:
+        return _build_catalog(STORE.reload_cache(), DATA_SOURCE)
+    return _build_catalog(engine.load_data(), 'json')
+
 print("⏳ Starting Server...")
 try:
-    # Try to load from Supabase first, fallback to JSON files
-    if USE_DATABASE:
+    # A local SQLite catalog (CATALOG_SQLITE_DB) replaces Supabase for offline
+    # machines; otherwise try Supabase first, fallback to JSON files
+    if sqlite_store.SQLITE_CONFIGURED:
+        try:
+            CATALOG.publish(_build_catalog(sqlite_store.load_all_data(), 'sqlite'))
+            DATA_SOURCE, STORE = 'sqlite', sqlite_store
+            print(f"✓ Using SQLite catalog {sqlite_store.DB_FILE}")
+        except Exception as sqlite_error:
+            print(f"⚠️  SQLite catalog not available: {sqlite_error}")
+            print("⚠️  Falling back to JSON files...")
+            CATALOG.publish(_build_catalog(engine.load_data(), 'json'))
+            DATA_SOURCE = 'json'
+            print("✓ Using JSON files")
+    elif USE_DATABASE:
         try:
-            PROGRAMS, COURSES, EQUIV_MAP, PREREQ_CONFIG = database.load_all_data()
+            CATALOG.publish(_build_catalog(database.load_all_data(), 'database'))
+            DATA_SOURCE, STORE = 'database', database
             print("✓ Using Supabase database")
         except Exception as db_error:
             print(f"⚠️  Supabase not configured: {db_error}")
             print("⚠️  Falling back to JSON files...")
-            PROGRAMS, COURSES, EQUIV_MAP, PREREQ_CONFIG = engine.load_data()
+            CATALOG.publish(_build_catalog(engine.load_data(), 'json'))
+            DATA_SOURCE = 'json'
             print("✓ Using JSON files")
     else:
-        PROGRAMS, COURSES, EQUIV_MAP, PREREQ_CONFIG = engine.load_data()
+        CATALOG.publish(_build_catalog(engine.load_data(), 'json'))
+        DATA_SOURCE = 'json'
         print("✓ Using JSON files")
     
-    MAJOR_LIST = sorted([p['id'] for p in PROGRAMS if p['type'] == 'Majors'])
-    print(f"✅ Server Ready! Loaded {len(MAJOR_LIST)} majors.")
+    print(f"✅ Server Ready! Loaded {len(CATALOG.current().major_list)} majors.")
+    if PROGRAM_POOL.enabled:
+        # Fork now, before any serving or watcher thread; reloads send their
+        # state to the running workers instead of forking again
+        CATALOG.listeners.append(PROGRAM_POOL.load)
+        if PROGRAM_POOL.start(CATALOG.current()):
+            print(f"✓ Program pool: {PROGRAM_POOL.workers} workers for requests above {PROGRAM_POOL.threshold:.0f} program evaluations")
 except Exception as e:
     print(f"❌ CRITICAL ERROR: {e}")
     traceback.print_exc()
-    PROGRAMS, COURSES, EQUIV_MAP, PREREQ_CONFIG, MAJOR_LIST = [], {}, {}, {}, []
+
+# Courses object of the store's cache whose state is being built in the background
+_syncing_courses = None
+
+def _publish_store_cache():
+    """
+    Serve data reloaded or synced in the storage backend (database.py or
+    sqlite_store.py) without a restart. The new state is built in the
+    background (after a delta sync, by patching the current state); until it
+    is published requests keep using the current one.
+    """
+    global _syncing_courses
+    if STORE is None or not STORE.is_cache_loaded():
+        return False
+    data = STORE.get_cached_data()
+    if data[1] is CATALOG.current().courses or data[1] is _syncing_courses:
+        return False
+    _syncing_courses = data[1]
+    patch = STORE.cached_patch(data[1])
+    source = DATA_SOURCE
+
+    def build():
+        current = CATALOG.current()
+        if patch is not None and patch.base is current.courses:
+            return _build_catalog(data, source, previous=current, patch=patch)
+        return _build_catalog(data, source)
+
+    return CATALOG.reload_async(build)
+
+def start_catalog_watcher():
+    """
+    Start the background thread that keeps the catalog current (file
+    watcher for JSON data, delta sync poller for a storage backend), if
+    one is configured. serve.py calls this again in every forked worker,
+    since threads do not survive a fork.
+
+    Returns:
+        catalog_state.CatalogPoller: The running watcher, or None
+    """
+    if DATA_SOURCE == 'json' and CATALOG_WATCH_INTERVAL > 0:
+        print(f"👀 Watching data files every {CATALOG_WATCH_INTERVAL:g}s")
+        return catalog_state.CatalogWatcher(
+            engine.catalog_data_files(), lambda: CATALOG.reload_async(_reload_catalog), CATALOG_WATCH_INTERVAL
+        ).start()
+    if STORE is not None and CATALOG_SYNC_INTERVAL > 0:
+        # Stale-while-revalidate: requests keep being served from the current
+        # catalog while changed rows are fetched and patched in the background
+        print(f"👀 Syncing changed {DATA_SOURCE} rows every {CATALOG_SYNC_INTERVAL:g}s")
+        return catalog_state.CatalogPoller(
+            STORE.sync_cache, _publish_store_cache, CATALOG_SYNC_INTERVAL
+        ).start()
+    return None
+
+CATALOG_WATCHER = start_catalog_watcher()
+
+@app.before_request
+def _sync_catalog():
+    _publish_store_cache()
 
 @app.route('/majors', methods=['GET'])
 def get_majors():
-    return jsonify(MAJOR_LIST)
+    return jsonify(list(CATALOG.current().major_list))
+
+# (data_version, serialized /courses body): the payload only changes with the catalog
+_COURSES_BODY = (None, None)
 
 @app.route('/courses', methods=['GET'])
 def get_courses():
     """Return all course data for prerequisite tree visualization."""
-    return jsonify({
-        "status": "success",
-        "courses": COURSES
-    })
+    global _COURSES_BODY
+    catalog = CATALOG.current()
+    data_version, body = _COURSES_BODY
+    if body is None or data_version != catalog.data_version:
+        body = jsonify({
+            "status": "success",
+            "courses": plain_courses(catalog.courses)
+        }).get_data()
+        _COURSES_BODY = (catalog.data_version, body)
+    return app.response_class(body, mimetype=app.json.mimetype)
 
 @app.route('/upload_transcript', methods=['POST'])
 def upload_transcript():
@@ -83,54 +222,295 @@ def upload_transcript():
             
         return jsonify({"status": "success", "courses": courses})
 
+def _read_request(data, catalog):
+    """
+    Canonical fingerprint of a /recommend or /recommend/explain body and the
+    student profile built from it. Computing from the canonical history and
+    major makes a cached response identical to a freshly computed one; the
+    GenEd needs keep the request's order (see result_cache.order_gen_ed_matches).
+    """
+    fingerprint = result_cache.recommendation_fingerprint(
+        data.get('history', []), data.get('major', ''),
+        data.get('gen_ed_needs', []), data.get('interest_filter', 'Minor')
+    )
+    history, major, _, _ = fingerprint
+    baselines = catalog.baselines
+    major_courses = baselines.major_courses(major) if baselines is not None else engine.get_prescribed_major_courses(major, catalog.programs)
+    # GenEd needs keep the request's order, which is the order of the triple dips' matches
+    return fingerprint, engine.StudentProfile(history, major_courses, data.get('gen_ed_needs', []))
+
+def _recommend(data, catalog, use_cache=True):
+    """
+    The /recommend response for one request body, served from the result
+    cache when possible.
+
+    Args:
+        data (dict): Request body (history, major, gen_ed_needs, interest_filter)
+        catalog (catalog_state.CatalogState): Catalog to score against
+        use_cache (bool): False computes the response without reading or
+            filling the result cache (in program pool workers)
+
+    Returns:
+        dict: Response body
+    """
+    fingerprint, profile = _read_request(data, catalog)
+    if not use_cache:
+        return _compute_recommendation(fingerprint, profile, catalog)
+
+    cached = RESULT_CACHE.get(fingerprint, catalog.data_version)
+    if cached is not None:
+        return result_cache.order_gen_ed_matches(cached, profile.gen_ed_needs)
+    response = _compute_recommendation(fingerprint, profile, catalog)
+    RESULT_CACHE.put(fingerprint, response, catalog.data_version)
+    return response
+
+def _compute_recommendation(fingerprint, profile, catalog):
+    """The /recommend response for a request read by _read_request()."""
+    programs, courses, equiv_map, prereq_config = catalog.programs, catalog.courses, catalog.equivalency_map, catalog.prereq_config
+    baselines = catalog.baselines
+    interest_filter = fingerprint[3]
+
+    print(f"🔎 Analyzing {len(profile.user_history)} completed + {len(profile.major_courses)} major courses.")
+
+    # Prerequisite costs depend only on the history, so share them across programs
+    cost_evaluator = engine.make_cost_evaluator(profile.combined_history, courses, equiv_map, prereq_config)
+
+    # Phase 1: rank candidate programs on numeric keys
+    from_baseline = None
+    candidates = [i for i, prog in enumerate(programs) if interest_filter in prog['type'].lower()]
+    if catalog.score_matrix is not None:
+        gaps, overlaps, optimizations = catalog.score_matrix.score(
+            profile.combined_history, profile.user_history, profile.major_courses, profile.gen_ed_needs,
+            equiv_map, prereq_config, cost_evaluator
+        )
+        keys = [engine.ranking_key(gaps[i], overlaps[i], optimizations[i]) for i in candidates]
+        top = engine.select_top_programs(keys, MAX_RECOMMENDATIONS)
+    elif RECOMMENDER_MODE == 'standard':
+        keys = [
+            engine.ranking_key(*engine.score_program(programs[i], profile, courses, equiv_map, prereq_config, cost_evaluator))
+            for i in candidates
+        ]
+        top = engine.select_top_programs(keys, MAX_RECOMMENDATIONS)
+    else:
+        # Programs the transcript cannot affect are scored from the major's baseline
+        if baselines is not None:
+            baseline = baselines.baseline(fingerprint[1])
+            from_baseline = baselines.scores(candidates, profile, baseline)
+        pending = len(candidates) - len(from_baseline or ())
+        if PROGRAM_POOL.should_use(pending, profile) and PROGRAM_POOL.holds(catalog):
+            # Large request: shard the programs across the worker processes
+            top = PROGRAM_POOL.rank(catalog, candidates, MAX_RECOMMENDATIONS, profile, exact_scores=from_baseline)
+        else:
+            top = engine.rank_programs(
+                [programs[i] for i in candidates], MAX_RECOMMENDATIONS, profile,
+                courses, equiv_map, prereq_config, cost_evaluator, exact_scores=from_baseline
+            )
+
+    # Phase 2: details only for the programs that are returned
+    results = []
+    for j in top:
+        if from_baseline is not None and j in from_baseline:
+            results.append(baselines.explain(candidates[j], profile, baseline))
+        else:
+            results.append(engine.explain_program(programs[candidates[j]], profile, courses, equiv_map, prereq_config, cost_evaluator))
+
+    return {
+        "status": "success",
+        "count": len(candidates),
+        "recommendations": results
+    }
+
 @app.route('/recommend', methods=['POST'])
 def get_recommendations():
     try:
         data = request.json
         if not data: return jsonify({"error": "No data"}), 400
 
-        user_history = [engine.normalize_code(c) for c in data.get('history', [])]
-        user_major = data.get('major', '')
-        user_gen_ed_needs = data.get('gen_ed_needs', [])
-        interest_filter = data.get('interest_filter', 'Minor')
+        # One catalog state for the whole request, even if a reload publishes a new one
+        return jsonify(_recommend(data, CATALOG.current()))
 
-        major_courses = engine.get_prescribed_major_courses(user_major, PROGRAMS)
-        combined_history = list(set(user_history + major_courses))
-        
-        print(f"🔎 Analyzing {len(user_history)} completed + {len(major_courses)} major courses.")
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
-        results = []
-        for prog in PROGRAMS:
-            if interest_filter.lower() not in prog['type'].lower(): continue
-            
-            gap, missing = engine.calculate_program_gap(prog, combined_history, COURSES, major_courses, EQUIV_MAP, PREREQ_CONFIG)
-            triple_dips = engine.find_triple_dips(prog, user_gen_ed_needs, COURSES, user_history)
-            overlap_count, overlap_courses = engine.calculate_overlap_count(prog, user_history, major_courses)
-            
-            results.append({
-                "id": prog['id'],
-                "program_name": prog['id'],
-                "program_type": prog['type'],
-                "program_url": prog.get('url', '#'),
-                "gap_credits": gap,
-                "missing_courses": missing,
-                "optimizations": triple_dips,
-                "optimization_count": len(triple_dips),
-                "overlap_count": overlap_count,
-                "overlap_courses": overlap_courses
-            })
-
-        results.sort(key=lambda x: (x['gap_credits'], -x['overlap_count'], -x['optimization_count']))
+def _recommend_one(catalog, data):
+    """
+    One student of a batch: the /recommend response, or an error entry
+    instead of an exception. Runs in the program pool's workers, so it
+    leaves the result cache to the caller.
+    """
+    try:
+        if not isinstance(data, dict) or not data:
+            raise ValueError("Each student must be a non-empty object")
+        return _recommend(data, catalog, use_cache=False)
+    except Exception as e:
+        traceback.print_exc()
+        return {"status": "error", "error": str(e)}
+
+@app.route('/recommend/batch', methods=['POST'])
+def get_batch_recommendations():
+    """
+    Recommendations for a whole cohort in one request.
+
+    The body is {"students": [<a /recommend body>, ...]}. Every student is
+    scored against the same catalog state, students with identical requests
+    are computed once, and the results come back in input order. Students
+    missing from the result cache are computed by the program pool's worker
+    processes (in this process when the pool is off). A student whose
+    request fails gets an error entry instead of failing the batch.
+    """
+    try:
+        data = request.json
+        students = data.get('students') if isinstance(data, dict) else None
+        if not isinstance(students, list) or not students:
+            return jsonify({"error": "Expected a non-empty \"students\" list"}), 400
+        if len(students) > RECOMMEND_BATCH_MAX:
+            return jsonify({"error": f"At most {RECOMMEND_BATCH_MAX} students per batch"}), 413
+
+        catalog = CATALOG.current()
+        # Identical requests (same canonical fingerprint) share one computation
+        groups = {}
+        for index, student in enumerate(students):
+            try:
+                key = _read_request(student, catalog)[0] if isinstance(student, dict) and student else index
+            except Exception:
+                key = index
+            groups.setdefault(key, []).append(index)
+
+        responses = {}
+        for key, indexes in groups.items():
+            if isinstance(key, tuple):
+                cached = RESULT_CACHE.get(key, catalog.data_version)
+                if cached is not None:
+                    responses[key] = result_cache.order_gen_ed_matches(cached, students[indexes[0]].get('gen_ed_needs', []))
+        pending = [key for key in groups if key not in responses]
+        computed = PROGRAM_POOL.map(catalog, _recommend_one, [students[groups[key][0]] for key in pending])
+        for key, response in zip(pending, computed):
+            responses[key] = response
+            if isinstance(key, tuple) and response['status'] == 'success':
+                RESULT_CACHE.put(key, response, catalog.data_version)
+
+        results = [None] * len(students)
+        for key, indexes in groups.items():
+            response = responses[key]
+            for index in indexes:
+                if index != indexes[0] and response['status'] == 'success':
+                    # Same fingerprint, but the GenEd needs may be listed in another order
+                    response = result_cache.order_gen_ed_matches(response, students[index].get('gen_ed_needs', []))
+                results[index] = dict(response, index=index)
+                if isinstance(students[index], dict) and 'id' in students[index]:
+                    results[index]['id'] = students[index]['id']
+
+        failed = sum(1 for result in results if result['status'] != 'success')
+        return jsonify({
+            "status": "success" if not failed else "partial",
+            "count": len(results),
+            "failed": failed,
+            "results": results
+        })
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/recommend/explain/<path:program_id>', methods=['POST'])
+def explain_recommendation(program_id):
+    """
+    Detailed breakdown for one program, with the same request body as /recommend.
+
+    Program ids are shared between program types (e.g. a Minor and a Major), so
+    an optional "program_type" narrows the match; every match is returned.
+    """
+    try:
+        data = request.json
+        if not data: return jsonify({"error": "No data"}), 400
+
+        catalog = CATALOG.current()
+        programs, courses, equiv_map, prereq_config = catalog.programs, catalog.courses, catalog.equivalency_map, catalog.prereq_config
+
+        program_type = data.get('program_type', '')
+        matches = [
+            prog for prog in programs
+            if prog['id'] == program_id and program_type.lower() in prog['type'].lower()
+        ]
+        if not matches:
+            return jsonify({"error": f"Program not found: {program_id}"}), 404
+
+        _, profile = _read_request(data, catalog)
+        cost_evaluator = engine.make_cost_evaluator(profile.combined_history, courses, equiv_map, prereq_config)
+        results = [
+            engine.explain_program(prog, profile, courses, equiv_map, prereq_config, cost_evaluator)
+            for prog in matches
+        ]
 
         return jsonify({
             "status": "success",
             "count": len(results),
-            "recommendations": results[:15]
+            "programs": results
         })
 
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+def _admin_allowed():
+    """Requests to /admin endpoints need the admin token, or come from this host when none is set."""
+    if ADMIN_TOKEN:
+        return request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_catalog():
+    """
+    Reload the catalog from its data source in the background. Requests keep
+    being served from the current catalog until the new one is swapped in.
+    Pass ?wait=1 to respond only after the reload has finished, and ?delta=1
+    to apply only the database (or SQLite) rows changed since the last load or sync.
+    """
+    if not _admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if DATA_SOURCE is None:
+        return jsonify({"error": "No data source loaded"}), 503
+
+    if STORE is not None and request.args.get('delta') in ('1', 'true'):
+        try:
+            STORE.sync_cache()
+        except Exception as e:
+            return jsonify({"error": f"Delta sync failed: {e}"}), 502
+        started = _publish_store_cache()
+    else:
+        started = CATALOG.reload_async(_reload_catalog)
+    if request.args.get('wait') in ('1', 'true'):
+        CATALOG.wait()
+    return jsonify({
+        "status": "success",
+        "started": started,
+        "catalog": CATALOG.status()
+    }), 202
+
+@app.route('/admin/catalog', methods=['GET'])
+def get_catalog_status():
+    """Generation, data version and reload counters of the served catalog."""
+    if not _admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    status = {
+        "status": "success",
+        "catalog": CATALOG.status()
+    }
+    if STORE is not None:
+        status["sync"] = STORE.sync_status()
+    if PROGRAM_POOL.enabled:
+        status["program_pool"] = PROGRAM_POOL.status()
+    return jsonify(status)
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss counters of the /recommend result cache."""
+    return jsonify({
+        "status": "success",
+        "result_cache": RESULT_CACHE.stats()
+    })
+
 if __name__ == '__main__':
+    # Development server; use serve.py in production
     app.run(debug=True, port=5001)
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""
+Catalog Rows
+Row format of the catalog tables shared by the storage backends.
+
+create_schema.sql defines four tables (programs, courses,
+course_equivalencies, prerequisite_config). database.py (Supabase) and
+sqlite_store.py (local SQLite file) both store the catalog in those tables;
+this module converts between their rows and the dicts the engine and the JSON
+files use, and applies changed rows to a cached catalog (the delta sync both
+backends share).
+"""
+
+import threading
+from datetime import datetime
+
+import recommendation_engine as engine
+
+# Row key of every table, by cache name
+TABLE_KEYS = {
+    'programs': 'id',
+    'courses': 'course_code_normalized',
+    'equivalencies': 'course_code',
+    'config': 'id',
+}
+
+# Long course text the engine does not read while scoring
+COURSE_TEXT_COLUMNS = ('description', 'prerequisites_list', 'source_program')
+
+# Used when there is no hierarchy_rules row
+DEFAULT_PREREQ_CONFIG = {
+    "hierarchy_rules": {
+        "enabled": True,
+        "same_department_higher_level": True,
+        "minimum_level_difference": 0
+    }
+}
+
+
+def program_from_row(row):
+    return {'id': row['id'], 'type': row['type'], 'url': row['url'], 'rules': row['rules']}
+
+
+def course_from_row(row):
+    """Course dict in the JSON files' format; text columns are included when the row has them."""
+    course = {
+        'courseCode': row['course_code'],
+        'title': row['title'],
+        'credits': row['credits'],
+        'prerequisites_raw': row['prerequisites_raw'],
+        'genEdAttributes': row['gen_ed_attributes'],
+        'culturalAttributes': row['cultural_attributes'],
+        'interDomain': row['inter_domain'],
+    }
+    # Compiled prerequisite tree; rows from before the column existed
+    # leave it out and the engine compiles prerequisites_raw at load
+    if 'prerequisites_ast' in row:
+        course['prerequisites_ast'] = row['prerequisites_ast']
+    for column in COURSE_TEXT_COLUMNS:
+        if column in row:
+            course[column] = row[column]
+    return course
+
+
+def equivalency_from_row(row):
+    return {
+        'equivalents': row['equivalents'],
+        'reason': row['reason'],
+        'auto_generated': row['auto_generated'],
+        'type': row['type']
+    }
+
+
+def program_to_row(program):
+    return {
+        "id": program['id'],
+        "type": program['type'],
+        "url": program.get('url'),
+        "rules": program.get('rules', []),
+    }
+
+
+def course_to_row(code, course):
+    """Row of a course from the JSON files (or a course_from_row() dict)."""
+    credits = course.get('credits', 3)
+    try:
+        credits = float(credits)
+    except (TypeError, ValueError):
+        pass
+    return {
+        "course_code_normalized": engine.normalize_code(code),
+        "course_code": course.get('courseCode', ''),
+        "title": course.get('title', ''),
+        "credits": credits,
+        "description": course.get('description', ''),
+        "prerequisites_list": course.get('prerequisites_list', []),
+        "prerequisites_raw": course.get('prerequisites_raw', ''),
+        "prerequisites_ast": engine.course_prerequisite_ast(course),
+        "gen_ed_attributes": course.get('genEdAttributes', []),
+        "cultural_attributes": course.get('culturalAttributes', []),
+        "inter_domain": course.get('interDomain', False),
+        "source_program": course.get('source_program', ''),
+    }
+
+
+def equivalency_to_row(code, entry):
+    return {
+        "course_code": code,
+        "equivalents": entry.get('equivalents', []),
+        "reason": entry.get('reason', ''),
+        "auto_generated": entry.get('auto_generated', False),
+        "type": entry.get('type', ''),
+    }
+
+
+def timestamp(value):
+    """updated_at value (ISO 8601 text) -> aware datetime (None if missing)."""
+    return datetime.fromisoformat(value) if value else None
+
+
+def row_versions(name, rows):
+    """Row key -> updated_at of loaded rows of table `name`."""
+    key = TABLE_KEYS[name]
+    return {row[key]: timestamp(row.get('updated_at')) for row in rows}
+
+
+def watermark(versions):
+    """Latest updated_at among a table's row versions (None for an empty table)."""
+    stamps = [stamp for stamp in versions.values() if stamp is not None]
+    return max(stamps) if stamps else None
+
+
+def new_rows(name, known, rows):
+    """
+    Rows of `rows` not yet applied (a new key, or a different updated_at).
+    `known` (row key -> updated_at) is updated with them.
+    """
+    key = TABLE_KEYS[name]
+    changed = []
+    for row in rows:
+        stamp = timestamp(row.get('updated_at'))
+        if row[key] in known and known[row[key]] == stamp:
+            continue
+        known[row[key]] = stamp
+        changed.append(row)
+    return changed
+
+
+class LazyCourseColumns:
+    """
+    Course columns left out of a backend's startup load (see
+    course_store.compact_courses). The first read of any of them fetches the
+    columns of every course at once (`_fetch`, implemented by each backend)
+    and keeps them.
+
+    Args:
+        fields: Column names (same as the course dict keys)
+    """
+
+    def __init__(self, fields=COURSE_TEXT_COLUMNS):
+        self.fields = tuple(fields)
+        self._values = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._values is not None
+
+    def value(self, code, field):
+        values = self._values
+        if values is None:
+            values = self._load()
+        return values.get(code, {}).get(field)
+
+    def _fetch(self):
+        """Rows with course_code_normalized and every field, for all courses."""
+        raise NotImplementedError
+
+    def _load(self):
+        with self._lock:
+            if self._values is None:
+                print(f"📥 Loading course {', '.join(self.fields)} on first use...")
+                self._values = {
+                    engine.normalize_code(row['course_code_normalized']): {field: row.get(field) for field in self.fields}
+                    for row in self._fetch()
+                }
+            return self._values
+
+    def __getstate__(self):
+        # A pickled catalog carries the values, not the connection
+        return {'fields': self.fields, 'values': self._load()}
+
+    def __setstate__(self, state):
+        self.fields = state['fields']
+        self._values = state['values']
+        self._lock = threading.Lock()
+
+
+def apply_changes(cache, changed, removed, versions, load_satisfiers=engine.load_satisfier_index):
+    """
+    Patch changed and deleted rows into a cached catalog.
+
+    The cache is not modified; the compiled catalog is patched into a copy
+    (engine.patch_catalog), so only what depends on the changed rows is rebuilt.
+
+    Args:
+        cache: Backend cache dict (programs, courses, equivalencies, prereq_config)
+        changed: table name -> changed or added rows
+        removed: table name -> keys of deleted rows
+        versions: table name -> {row key: updated_at} after the change
+        load_satisfiers: (equivalency_map, prereq_config) -> SatisfierIndex or
+                         None, called when equivalencies or the config changed
+
+    Returns:
+        tuple: (new cache dict, engine.CatalogPatch)
+    """
+    equivalencies_changed = bool(changed['equivalencies'] or removed['equivalencies']
+                                 or changed['config'] or removed['config'])
+    equiv_dict = cache['equivalencies']
+    if changed['equivalencies'] or removed['equivalencies']:
+        equiv_dict = {code: entry for code, entry in equiv_dict.items() if code not in removed['equivalencies']}
+        for row in changed['equivalencies']:
+            equiv_dict[row['course_code']] = equivalency_from_row(row)
+    prereq_config = cache['prereq_config']
+    if changed['config']:
+        prereq_config = changed['config'][-1]['config_value']
+    elif removed['config'] and not versions['config']:
+        prereq_config = DEFAULT_PREREQ_CONFIG
+    satisfier_index = load_satisfiers(equiv_dict, prereq_config) if equivalencies_changed else None
+
+    # A removed spelling whose canonical code still has a row is not a removed course
+    remaining = {engine.normalize_code(code) for code in versions['courses']}
+    programs, courses_dict, patch = engine.patch_catalog(
+        cache['programs'], cache['courses'],
+        programs=[program_from_row(row) for row in changed['programs']],
+        removed_programs=removed['programs'],
+        courses={row['course_code_normalized']: course_from_row(row) for row in changed['courses']},
+        removed_courses=[code for code in removed['courses'] if engine.normalize_code(code) not in remaining],
+        satisfier_index=satisfier_index,
+        equivalencies_changed=equivalencies_changed,
+    )
+    new_cache = dict(cache, programs=programs, courses=courses_dict, equivalencies=equiv_dict,
+                     prereq_config=prereq_config, versions=versions, patch=patch)
+    return new_cache, patch
@@ -0,0 +1,258 @@
+"""
+Catalog Segment
+Hot numeric catalog data in one memory-mapped file shared by every process.
+
+Forked workers start out sharing the master's catalog, but Python objects
+get unshared page by page as reference counts are written. Numeric arrays
+have no per-element objects. When they live in a read-only mapping of one
+file on a RAM filesystem (/dev/shm), every worker and every process-pool
+helper reads the same physical pages, whatever it touches. A worker's memory
+for this data stays flat however many workers run.
+
+publish() writes the arrays of the vectorized ProgramScoreMatrix, the only
+catalog data requests read as NumPy arrays; in other modes there is no
+segment. attach() maps the file and array() returns zero-copy, read-only
+NumPy views into it. The prerequisite graph, course records, plans and
+baselines stay Python objects (the cost evaluator walks them per request,
+and array lookups would be slower than its dict lookups); forked workers
+share them with the master until a reload.
+Segments are content addressed: the file name ends in the digest of
+its contents. Workers that build the same catalog map one file, and a hot
+reload that changes the catalog publishes a new segment generation next to
+the old one. Processes still serving the old state keep their mapping after
+its name is unlinked.
+
+File layout (little-endian):
+    0            header, HEADER_SIZE (64) bytes, struct "<8sIIQ32s":
+                   magic         b"CATSEG1\\n"
+                   version       uint32 LAYOUT_VERSION
+                   index_size    uint32 bytes of the JSON index
+                   data_offset   uint64 offset of the first array (multiple of 64)
+                   digest        32 bytes, sha256 of the index and the arrays
+    64           index: UTF-8 JSON {"meta": {...}, "arrays": {name: [dtype, shape, order, offset]}}
+    data_offset  arrays, each starting on a 64-byte boundary (offsets from the file start)
+
+Arrays:
+    codes, code_offsets     UTF-8 normalized course codes of the matrix
+                            columns, in column order, and their byte
+                            offsets (code_count + 1)
+    matrix_<attribute>      the ProgramScoreMatrix.shared_arrays()
+
+Needs numpy; catalogs are served from process memory without it.
+"""
+
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+MAGIC = b"CATSEG1\n"
+LAYOUT_VERSION = 2
+HEADER = struct.Struct("<8sIIQ32s")
+HEADER_SIZE = 64
+ALIGNMENT = 64
+
+SEGMENT_PREFIX = "psu-catalog-"
+# RAM-backed where available; elsewhere the page cache still shares the pages
+SEGMENT_DIR = os.getenv('CATALOG_SEGMENT_DIR') or ('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir())
+
+
+class SegmentError(Exception):
+    """The file is not a catalog segment of this layout, or does not match its digest."""
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def catalog_arrays(score_matrix):
+    """
+    The arrays of a segment for a vectorized score matrix.
+
+    Args:
+        score_matrix: vectorized_scoring.ProgramScoreMatrix
+
+    Returns:
+        tuple: ({name: numpy array}, meta dict)
+    """
+    encoded = [code.encode('utf-8') for code in score_matrix.column_codes()]
+    arrays = {
+        'codes': np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        'code_offsets': np.cumsum([0] + [len(code) for code in encoded], dtype=np.int64),
+    }
+    for name, array in score_matrix.shared_arrays().items():
+        arrays[f'matrix_{name}'] = array
+    meta = {'code_count': len(encoded), 'program_count': score_matrix.program_count}
+    return arrays, meta
+
+
+def encode(arrays, meta):
+    """
+    The bytes of a segment file holding `arrays`.
+
+    Returns:
+        tuple: (bytes, sha256 hex digest)
+    """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        order = 'F' if array.ndim > 1 and array.flags.f_contiguous and not array.flags.c_contiguous else 'C'
+        layout[name] = [array.dtype.str, list(array.shape), order, offset]
+        offset = _align(offset + array.nbytes)
+    # Offsets in the index are absolute, so they depend on the index size:
+    # widen the estimate until the index fits in front of the data
+    data_offset = _align(HEADER_SIZE + 256)
+    while True:
+        index = json.dumps({"meta": meta, "arrays": {name: entry[:3] + [entry[3] + data_offset]
+                                                     for name, entry in layout.items()}},
+                           sort_keys=True).encode('utf-8')
+        if HEADER_SIZE + len(index) <= data_offset:
+            break
+        data_offset = _align(HEADER_SIZE + len(index))
+
+    body = bytearray(data_offset + offset)
+    body[HEADER_SIZE:HEADER_SIZE + len(index)] = index
+    for name, array in arrays.items():
+        dtype, _, order, relative = layout[name]
+        start = data_offset + relative
+        body[start:start + array.nbytes] = array.tobytes(order=order)
+    digest = hashlib.sha256(memoryview(body)[HEADER_SIZE:]).digest()
+    body[:HEADER.size] = HEADER.pack(MAGIC, LAYOUT_VERSION, len(index), data_offset, digest)
+    return bytes(body), digest.hex()
+
+
+class CatalogSegment:
+    """
+    A read-only mapping of a segment file.
+
+    Args:
+        path: Segment file
+        digest: Expected sha256 hex digest (checked against the header)
+    """
+
+    def __init__(self, path, digest=None):
+        try:
+            with open(path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise SegmentError(f"cannot map {path}: {e}")
+        if len(self._map) < HEADER_SIZE:
+            raise SegmentError(f"{path} is not a catalog segment")
+        magic, version, index_size, self.data_offset, raw_digest = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            raise SegmentError(f"{path} is not a catalog segment of layout {LAYOUT_VERSION}")
+        if digest is not None and raw_digest.hex() != digest:
+            raise SegmentError(f"{path} does not match digest {digest}")
+        index = json.loads(self._map[HEADER_SIZE:HEADER_SIZE + index_size])
+        self.path = path
+        self.digest = raw_digest.hex()
+        self.meta = index['meta']
+        self._layout = index['arrays']
+        self._arrays = {}
+        self._codes = None
+
+    @classmethod
+    def attach(cls, path, digest=None):
+        """Map an existing segment file."""
+        return cls(path, digest)
+
+    def __len__(self):
+        return len(self._map)
+
+    def __contains__(self, name):
+        return name in self._layout
+
+    def __getstate__(self):
+        # Helpers started without fork map the same file again
+        return {"path": self.path, "digest": self.digest}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["digest"])
+
+    def array(self, name):
+        """Zero-copy, read-only NumPy view of an array."""
+        array = self._arrays.get(name)
+        if array is None:
+            dtype, shape, order, offset = self._layout[name]
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape, dtype=np.int64))
+            array = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+            array = array.reshape(shape, order=order)
+            self._arrays[name] = array
+        return array
+
+    def codes(self):
+        """Course code of every matrix column, by column index."""
+        if self._codes is None:
+            blob = self.array('codes').tobytes()
+            offsets = self.array('code_offsets').tolist()
+            self._codes = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return self._codes
+
+    def unlink(self):
+        """Remove the file name; existing mappings (also in other processes) stay valid."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def status(self):
+        return {"path": self.path, "digest": self.digest, "bytes": len(self), "arrays": len(self._layout)}
+
+
+def segment_path(digest, namespace='', directory=None):
+    return os.path.join(directory or SEGMENT_DIR, f"{SEGMENT_PREFIX}{namespace}-{digest[:24]}")
+
+
+def publish(score_matrix, namespace='', directory=None):
+    """
+    Write the segment of a score matrix, or map the identical one another
+    process already wrote.
+
+    The file is written under a temporary name and renamed into place, so a
+    segment is either absent or complete.
+
+    Args:
+        score_matrix: ProgramScoreMatrix
+        namespace: Groups the segments of one server (serve.py uses the master pid)
+        directory: Where segment files live (default SEGMENT_DIR)
+
+    Returns:
+        CatalogSegment
+    """
+    if not NUMPY_AVAILABLE:
+        raise ImportError("numpy is required for the shared catalog segment (pip install numpy)")
+    data, digest = encode(*catalog_arrays(score_matrix))
+    path = segment_path(digest, namespace, directory)
+    if not os.path.exists(path):
+        with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(path), prefix='.catseg.', delete=False) as f:
+            tmp_path = f.name
+            try:
+                f.write(data)
+            except OSError:
+                os.unlink(tmp_path)
+                raise
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    return CatalogSegment.attach(path, digest)
+
+
+def remove_namespace(namespace, directory=None):
+    """Unlink every segment file of a namespace (e.g. when the server stops)."""
+    removed = 0
+    for path in glob.glob(os.path.join(directory or SEGMENT_DIR, f"{SEGMENT_PREFIX}{glob.escape(namespace)}-*")):
+        try:
+            os.unlink(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
@@ -0,0 +1,357 @@
+"""
+Catalog State
+Immutable catalog snapshots published through one atomic reference.
+
+Everything a request reads (programs, courses, equivalencies, prerequisite
+config and every index derived from them) lives in one CatalogState. A
+request takes the current state once, at its start, and reads only from it.
+
+Reloads follow read-copy-update: a complete new CatalogState is built in a
+background thread while requests keep being served from the old one, then
+published by replacing a single reference. In-flight requests finish on the
+state they started with, no request ever sees a half-loaded catalog, and none
+pays for the rebuild. A failed rebuild leaves the old state in place.
+
+Reloads are triggered by the admin endpoint (POST /admin/reload), by a
+CatalogWatcher polling the data files for changes, or by a CatalogPoller
+running delta syncs against the database. A delta sync patches the current
+state instead of rebuilding it: build_state() takes over every per-major
+baseline the patch cannot have changed.
+
+With a segment namespace, build_state() also publishes the arrays of the
+vectorized score matrix as a shared catalog segment (see catalog_segment.py). Publishing a
+state retires the previous state's segment file.
+"""
+
+import os
+import threading
+import time
+
+import catalog_segment
+import major_baselines
+import vectorized_scoring
+
+
+class CatalogState:
+    """
+    One loaded catalog and its derived indexes. Never modified once built;
+    a reload publishes a new instance instead.
+
+    Attributes:
+        programs: Programs with compiled evaluation plans
+        courses: CourseCatalog (normalized code -> course)
+        equivalency_map: Course equivalencies
+        prereq_config: Prerequisite configuration
+        major_list: Sorted ids of all majors
+        baselines: MajorBaselineTable for the bounded scoring mode
+        score_matrix: ProgramScoreMatrix in vectorized mode, else None
+        segment: CatalogSegment holding the score matrix arrays, or None
+        source: Where the data came from ('json' or 'database')
+        data_version: Catalog data version (result cache entries are tied to it)
+        loaded_at: time.time() when the state was built
+        build_seconds: Time spent building the derived indexes
+    """
+
+    __slots__ = ('programs', 'courses', 'equivalency_map', 'prereq_config', 'major_list',
+                 'baselines', 'score_matrix', 'segment', 'source', 'data_version', 'loaded_at', 'build_seconds')
+
+    def __init__(self, programs, courses, equivalency_map, prereq_config, source,
+                 baselines=None, score_matrix=None, build_seconds=0.0, segment=None):
+        fields = {
+            'programs': programs,
+            'courses': courses,
+            'equivalency_map': equivalency_map,
+            'prereq_config': prereq_config,
+            'major_list': tuple(sorted(p['id'] for p in programs if p['type'] == 'Majors')),
+            'baselines': baselines,
+            'score_matrix': score_matrix,
+            'segment': segment,
+            'source': source,
+            'data_version': getattr(courses, 'data_version', 0),
+            'loaded_at': time.time(),
+            'build_seconds': build_seconds,
+        }
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CatalogState is immutable; publish a new state instead")
+
+    def __reduce__(self):
+        # Pickled for the program pool's workers (see program_pool.ProgramPool.load)
+        return _restore_state, (tuple(getattr(self, name) for name in self.__slots__),)
+
+    @classmethod
+    def empty(cls):
+        """State served when no catalog could be loaded."""
+        return cls([], {}, {}, {}, source=None)
+
+
+def _restore_state(values):
+    state = CatalogState.__new__(CatalogState)
+    for name, value in zip(CatalogState.__slots__, values):
+        object.__setattr__(state, name, value)
+    return state
+
+
+def build_state(programs, courses, equivalency_map, prereq_config, source, vectorized=False,
+                previous=None, patch=None, segment_namespace=None):
+    """
+    Build a CatalogState and every index derived from a loaded catalog.
+
+    Args:
+        programs, courses, equivalency_map, prereq_config: Loaded catalog
+            (engine.load_data() / database.load_all_data())
+        source: 'json' or 'database'
+        vectorized: Also build the NumPy ProgramScoreMatrix
+        previous: Current CatalogState, when `courses` was patched from its catalog
+        patch: engine.CatalogPatch describing that patch; baselines of programs
+               it does not affect are taken over from `previous`
+        segment_namespace: Publish the score matrix arrays as a shared catalog
+                           segment in this namespace (None: keep them private)
+
+    Returns:
+        CatalogState
+    """
+    started = time.perf_counter()
+
+    # Every program evaluated once per major; requests only apply the transcript delta
+    if previous is not None and patch is not None and patch.base is previous.courses and previous.baselines is not None:
+        baselines = major_baselines.MajorBaselineTable(programs, courses, equivalency_map, prereq_config,
+                                                       previous=previous.baselines, affected=patch.affected)
+        print(f"✓ Patched baselines for {len(baselines)} majors in {baselines.build_seconds:.2f}s "
+              f"({baselines.reused_evaluations} program evaluations reused)")
+    else:
+        baselines = major_baselines.MajorBaselineTable(programs, courses, equivalency_map, prereq_config)
+        print(f"✓ Precomputed baselines for {len(baselines)} majors in {baselines.build_seconds:.2f}s")
+
+    score_matrix = None
+    if vectorized:
+        try:
+            score_matrix = vectorized_scoring.ProgramScoreMatrix(programs, courses)
+            print(f"✓ Vectorized scoring enabled ({len(score_matrix.course_ids)} courses x {score_matrix.program_count} programs)")
+        except ImportError as e:
+            print(f"⚠️  {e}. Using bounded scoring.")
+
+    segment = None
+    if segment_namespace is not None and score_matrix is not None:
+        try:
+            segment = catalog_segment.publish(score_matrix, segment_namespace)
+            score_matrix.share(segment)
+            print(f"✓ Catalog segment {os.path.basename(segment.path)} ({len(segment) / 2 ** 20:.1f} MB)")
+        except (ImportError, OSError, ValueError, catalog_segment.SegmentError) as e:
+            print(f"⚠️  Shared catalog segment not available ({e}), keeping the arrays in process memory")
+
+    return CatalogState(programs, courses, equivalency_map, prereq_config, source,
+                        baselines, score_matrix, time.perf_counter() - started, segment)
+
+
+class CatalogHolder:
+    """
+    The single reference through which the current CatalogState is published.
+
+    Reading `current()` is one attribute load, so requests never lock.
+    Rebuilds are serialized; reload requests that arrive while a rebuild runs
+    are coalesced into one more rebuild after it.
+
+    Args:
+        state: Initial CatalogState (defaults to an empty one)
+    """
+
+    def __init__(self, state=None):
+        self._state = state if state is not None else CatalogState.empty()
+        self._build_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._pending = None
+        self.generation = 0
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload_seconds = None
+        # Called with every published state, on the publishing thread
+        self.listeners = []
+
+    def current(self):
+        """The published CatalogState."""
+        return self._state
+
+    def publish(self, state):
+        """
+        Swap in a fully built state. The previous state's segment file is
+        unlinked (requests still reading it keep their mapping) unless the new
+        state maps the same one. Then every listener is called with the new
+        state.
+        """
+        previous, self._state = self._state, state
+        self.generation += 1
+        if previous.segment is not None and (state.segment is None or state.segment.path != previous.segment.path):
+            previous.segment.unlink()
+        for listener in list(self.listeners):
+            try:
+                listener(state)
+            except Exception as e:
+                print(f"⚠️  Catalog listener {getattr(listener, '__qualname__', listener)} failed: {e}")
+
+    def reload(self, build):
+        """
+        Build a new state with `build()` and publish it. The old state stays
+        published while building and when the build fails.
+
+        Returns:
+            CatalogState: The new state, or None if the build failed
+        """
+        with self._build_lock:
+            started = time.perf_counter()
+            try:
+                state = build()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"❌ Catalog reload failed, still serving the previous catalog: {self.last_error}")
+                return None
+            self.publish(state)
+            self.reloads += 1
+            self.last_error = None
+            self.last_reload_seconds = time.perf_counter() - started
+            print(f"🔄 Catalog reloaded (generation {self.generation}) in {self.last_reload_seconds:.2f}s")
+            return state
+
+    def reload_async(self, build):
+        """
+        Rebuild in a background thread.
+
+        Returns:
+            bool: True if a new rebuild was started, False if one is already
+                  running (it will be followed by one more rebuild)
+        """
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._pending = build
+                return False
+            self._thread = threading.Thread(target=self._reload_loop, args=(build,),
+                                            name='catalog-reload', daemon=True)
+            self._thread.start()
+            return True
+
+    def _reload_loop(self, build):
+        while build is not None:
+            self.reload(build)
+            with self._thread_lock:
+                build, self._pending = self._pending, None
+                if build is None:
+                    self._thread = None
+
+    def wait(self, timeout=None):
+        """Block until the running background rebuild (if any) has finished."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            thread = self._thread
+            if thread is None:
+                return True
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            thread.join(remaining)
+            if thread.is_alive():
+                return False
+
+    @property
+    def reloading(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def status(self):
+        """Counters and metadata of the published state, for the admin endpoint."""
+        state = self._state
+        return {
+            "generation": self.generation,
+            "data_version": state.data_version,
+            "source": state.source,
+            "programs": len(state.programs),
+            "courses": len(state.courses),
+            "loaded_at": state.loaded_at,
+            "segment": state.segment.status() if state.segment is not None else None,
+            "reloading": self.reloading,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_reload_seconds": self.last_reload_seconds,
+        }
+
+
+class CatalogPoller:
+    """
+    Calls `poll()` every `interval` seconds in a background thread, and
+    `on_change()` whenever it returns a true value.
+
+    Args:
+        poll: Callable checking for changes (e.g. database.sync_cache)
+        on_change: Callback without arguments (e.g. starts a background reload)
+        interval: Seconds between polls
+    """
+
+    def __init__(self, poll, on_change, interval=5.0):
+        self.poll = poll
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Poll once; returns True (after calling on_change) if something changed."""
+        if not self.poll():
+            return False
+        self.on_change()
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='catalog-poller', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️  Catalog poller error: {e}")
+
+
+class CatalogWatcher(CatalogPoller):
+    """
+    Polls files for changes (modification time and size) and calls
+    `on_change` once per detected change.
+
+    Args:
+        paths: Files to watch
+        on_change: Callback without arguments (e.g. starts a background reload)
+        interval: Seconds between polls
+    """
+
+    def __init__(self, paths, on_change, interval=5.0):
+        super().__init__(self._files_changed, on_change, interval)
+        self.paths = list(paths)
+        self._signature = self._stat()
+
+    def _stat(self):
+        signature = {}
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                signature[path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                signature[path] = None
+        return signature
+
+    def _files_changed(self):
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        changed = [os.path.basename(p) for p in self.paths if signature[p] != self._signature.get(p)]
+        self._signature = signature
+        print(f"👀 Catalog files changed ({', '.join(changed)}), reloading in the background")
+        return True
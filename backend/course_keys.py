@@ -0,0 +1,196 @@
+"""
+Canonical Course Keys
+One integer per course code, so "ENGL 15", "ENGL 015", "engl15" and
+"ENGL\\xa015" are the same course everywhere.
+
+Catalog sources disagree on spelling: the World Campus master zero-pads
+lower-division numbers ("SOC030"), the supplementary GenEd file and the
+equivalency map do not ("SOC30", "ENGL15"), and transcripts use either.
+Plain space stripping left those as different dict keys, so prerequisite,
+equivalency and overlap lookups silently missed.
+
+Key layout (fits a signed 64-bit integer):
+    bits 29..62  department, at most 7 letters
+    bits 15..28  course number (0 .. 16383)
+    bits  0..14  suffix, at most 3 letters ("W", "N", "H", ...)
+Letters are base-27 digits (A=1 .. Z=26) left-aligned with zero padding, so
+"ENGL" < "ENGLX" < "EOP" holds for the packed values too.
+
+Departments are packed directly instead of through an interning table, so a
+key means the same course in every process and in every pickled catalog.
+
+Codes that do not follow DEPT + number + letters ("ECON-102") have no key;
+their canonical code is the upper-cased code without spaces. split_code()
+still reads the department and number at the start of such codes.
+
+The canonical code string ("ENGL15": no spaces, no leading zeros) is what the
+engine's dicts and sets are keyed on. It is derived from the key, interned,
+and cached per spelling, so normalizing a code is one cache lookup and no
+regex runs while serving requests.
+"""
+
+import sys
+from functools import lru_cache
+
+DEPT_SHIFT = 29
+NUMBER_SHIFT = 15
+NUMBER_MASK = (1 << (DEPT_SHIFT - NUMBER_SHIFT)) - 1
+SUFFIX_MASK = (1 << NUMBER_SHIFT) - 1
+
+MAX_DEPT_LETTERS = 7
+MAX_SUFFIX_LETTERS = 3
+
+_CACHE_SIZE = 65536
+
+
+def _pack_letters(letters, width):
+    """Base-27 digits, left-aligned to `width` so keys sort like the strings."""
+    value = 0
+    for ch in letters:
+        value = value * 27 + (ord(ch) - 64)
+    return value * 27 ** (width - len(letters))
+
+
+def _unpack_letters(value, width):
+    letters = []
+    for _ in range(width):
+        value, digit = divmod(value, 27)
+        if digit:
+            letters.append(chr(digit + 64))
+    return ''.join(reversed(letters))
+
+
+def _strip(code):
+    return code.replace(" ", "").replace("\xa0", "").upper()
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def course_key(code):
+    """
+    Integer key of a course code.
+
+    Args:
+        code: Course code in any spelling ("ENGL 015", "engl15")
+
+    Returns:
+        int, or None for empty codes and codes without DEPT + number
+    """
+    if not code:
+        return None
+    clean = _strip(code)
+    length = len(clean)
+    i = 0
+    while i < length and 'A' <= clean[i] <= 'Z':
+        i += 1
+    dept_end = i
+    while i < length and '0' <= clean[i] <= '9':
+        i += 1
+    number_end = i
+    while i < length and 'A' <= clean[i] <= 'Z':
+        i += 1
+    if (i != length or not 0 < dept_end <= MAX_DEPT_LETTERS or number_end == dept_end
+            or length - number_end > MAX_SUFFIX_LETTERS):
+        return None
+    number = int(clean[dept_end:number_end])
+    if number > NUMBER_MASK:
+        return None
+    return ((_pack_letters(clean[:dept_end], MAX_DEPT_LETTERS) << DEPT_SHIFT) | (number << NUMBER_SHIFT)
+            | _pack_letters(clean[number_end:], MAX_SUFFIX_LETTERS))
+
+
+def department_key_range(department, number_min=0, number_max=NUMBER_MASK):
+    """
+    Smallest and largest key of a department's courses numbered
+    `number_min`..`number_max` (any suffix), for range scans over stored keys.
+
+    Returns:
+        tuple: (low, high) inclusive, or None for an invalid department or range
+    """
+    dept = _strip(department or "")
+    if not 0 < len(dept) <= MAX_DEPT_LETTERS or not all('A' <= ch <= 'Z' for ch in dept):
+        return None
+    number_min = max(number_min, 0)
+    number_max = min(number_max, NUMBER_MASK)
+    if number_min > number_max:
+        return None
+    base = _pack_letters(dept, MAX_DEPT_LETTERS) << DEPT_SHIFT
+    return base | (number_min << NUMBER_SHIFT), base | (number_max << NUMBER_SHIFT) | SUFFIX_MASK
+
+
+def key_department(key):
+    """Department letters of a key ("ENGL")."""
+    return _department_name(key >> DEPT_SHIFT)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _department_name(dept_bits):
+    return sys.intern(_unpack_letters(dept_bits, MAX_DEPT_LETTERS))
+
+
+def key_number(key):
+    """Course number of a key (15 for "ENGL 015")."""
+    return (key >> NUMBER_SHIFT) & NUMBER_MASK
+
+
+def key_suffix(key):
+    """Suffix letters of a key ("D" for "ENGL 202D", "" without suffix)."""
+    return _unpack_letters(key & SUFFIX_MASK, MAX_SUFFIX_LETTERS)
+
+
+def key_code(key):
+    """Canonical code of a key ("ENGL15")."""
+    return f"{key_department(key)}{key_number(key)}{key_suffix(key)}"
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def canonical_code(code):
+    """
+    Canonical spelling of a course code, interned.
+
+    Args:
+        code: Course code in any spelling
+
+    Returns:
+        str: "ENGL15" for "ENGL 015"; the stripped, upper-cased code when it
+             has no key; "" for empty codes
+    """
+    if not code:
+        return ""
+    key = course_key(code)
+    return sys.intern(key_code(key) if key is not None else _strip(code))
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def split_code(code):
+    """
+    (department, number) of a course code.
+
+    Codes without a key still split on their leading letters and digits
+    ("BBH 440(U.S.;IL)" -> ("BBH", 440)), so department and level rules
+    treat them like the course they name.
+
+    Returns:
+        tuple: (department, number), or (None, 0) when the code does not
+               start with letters followed by digits
+    """
+    key = course_key(code)
+    if key is not None:
+        return key_department(key), key_number(key)
+    clean = _strip(code or "")
+    dept_end = 0
+    while dept_end < len(clean) and 'A' <= clean[dept_end] <= 'Z':
+        dept_end += 1
+    number_end = dept_end
+    while number_end < len(clean) and '0' <= clean[number_end] <= '9':
+        number_end += 1
+    if dept_end == 0 or number_end == dept_end:
+        return None, 0
+    return sys.intern(clean[:dept_end]), int(clean[dept_end:number_end])
+
+
+def display_code(code):
+    """Catalog display spelling of a course code ("ENGL 15", "MATH 140A")."""
+    key = course_key(code)
+    if key is None:
+        return code
+    return f"{key_department(key)} {key_number(key)}{key_suffix(key)}"
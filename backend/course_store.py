@@ -0,0 +1,370 @@
+"""
+Compact Course Store
+Slotted course records with hot fields in memory and cold text in a side file.
+
+The engine only reads a handful of course fields while serving requests: the
+display code, credits and GenEd/cultural attributes (prerequisite structure
+is read once, into the compact trees of the PrerequisiteGraph). Titles,
+descriptions, prerequisite text and trees, URLs and the raw credit strings
+are needed only when a course is shown to the user or a catalog is compiled.
+
+CourseRecord keeps the hot fields in __slots__ (attributes as bitmasks over a
+catalog-wide attribute table, credits parsed once) and stores everything else
+as one JSON blob per course inside a single shared buffer. When the catalog
+snapshot is written the buffer is saved next to it and memory-mapped, so cold
+text is paged in on demand and shared by every worker on the host.
+
+CourseRecord is a read-only Mapping with the same keys and values as the
+original course dict, so existing callers keep using course['title'],
+course.get('genEdAttributes', []) etc.
+
+A catalog can also leave some fields out of the load entirely and fetch them
+on first use (database.py does this for course descriptions): the table's
+`lazy` source provides them, see compact_courses().
+
+Side file layout:
+    b"CCOLD1\\n" | sha256 hex digest of the blob (64 bytes) | b"\\n" | blob
+where blob is the concatenation of the UTF-8 JSON objects of all records.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sys
+import tempfile
+from collections.abc import Mapping
+from functools import lru_cache
+
+COLD_MAGIC = b"CCOLD1\n"
+COLD_HEADER_SIZE = len(COLD_MAGIC) + 64 + 1
+
+# Fields kept in memory; everything else goes to the cold blob
+HOT_FIELDS = ('courseCode', 'genEdAttributes', 'culturalAttributes', 'interDomain')
+
+# Decoded blobs kept per store, so reading several cold fields of a course
+# decodes its blob once
+COLD_CACHE_SIZE = int(os.getenv('COURSE_COLD_CACHE_SIZE', '256'))
+
+
+class ColdStoreError(Exception):
+    """The side file does not hold the blob a record table was built with."""
+
+
+class ColdStore:
+    """
+    Cold course text: one buffer holding every record's JSON blob.
+
+    The buffer is a bytes object until attach() maps it from a side file.
+    Pickling a file-backed store only records the path and digest.
+
+    The most recently read blobs stay decoded (COLD_CACHE_SIZE of them); the
+    dicts returned by read() are shared and must not be modified.
+    """
+
+    def __init__(self, buffer, digest):
+        self._buffer = buffer
+        self.digest = digest
+        self.path = None
+        self.read = lru_cache(maxsize=COLD_CACHE_SIZE)(self._decode)
+
+    @classmethod
+    def build(cls, blobs):
+        """Concatenate encoded blobs; returns (store, [(offset, length), ...])."""
+        spans = []
+        offset = 0
+        for blob in blobs:
+            spans.append((offset, len(blob)))
+            offset += len(blob)
+        buffer = b"".join(blobs)
+        return cls(buffer, hashlib.sha256(buffer).hexdigest()), spans
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def _decode(self, offset, length):
+        return json.loads(bytes(self._buffer[offset:offset + length]))
+
+    def save(self, path):
+        """Write the side file atomically (temp file + rename)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('wb', dir=directory, prefix='.cold.', delete=False) as f:
+            tmp_path = f.name
+            try:
+                f.write(COLD_MAGIC + self.digest.encode('ascii') + b"\n")
+                f.write(self._buffer)
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError:
+                os.unlink(tmp_path)
+                raise
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+    def attach(self, path):
+        """Serve the blob from a memory map of `path` instead of process memory."""
+        if not len(self._buffer):
+            self.path = path
+            return
+        self._buffer = _map_side_file(path, self.digest)
+        self.path = path
+
+    def __getstate__(self):
+        if self.path is not None:
+            return {"path": self.path, "digest": self.digest}
+        return {"buffer": bytes(self._buffer), "digest": self.digest}
+
+    def __setstate__(self, state):
+        self.digest = state["digest"]
+        self.path = state.get("path")
+        self.read = lru_cache(maxsize=COLD_CACHE_SIZE)(self._decode)
+        if self.path is None:
+            self._buffer = state["buffer"]
+        elif state["digest"] == hashlib.sha256(b"").hexdigest():
+            self._buffer = b""
+        else:
+            self._buffer = _map_side_file(self.path, self.digest)
+
+
+def _map_side_file(path, digest):
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise ColdStoreError(f"cannot map {path}: {e}")
+    if mapped[:COLD_HEADER_SIZE] != COLD_MAGIC + digest.encode('ascii') + b"\n":
+        mapped.close()
+        raise ColdStoreError(f"{path} does not match this catalog")
+    # A view past the header keeps offsets relative to the blob
+    return memoryview(mapped)[COLD_HEADER_SIZE:]
+
+
+class CourseTable:
+    """
+    Shared state of all records of one catalog: attribute name tables, interned
+    key orders and the cold store.
+    """
+
+    def __init__(self):
+        self.gened_names = []
+        self.cultural_names = []
+        self._gened_bits = {}
+        self._cultural_bits = {}
+        self._gened_tuples = {}
+        self._cultural_tuples = {}
+        self._key_orders = {}
+        self.cold = None
+        # Optional source of fields that were not loaded with the catalog:
+        # an object with `fields` (tuple of keys) and `value(code, key)`
+        self.lazy = None
+
+    def _mask(self, names, table, bits):
+        mask = 0
+        for name in names:
+            bit = bits.get(name)
+            if bit is None:
+                bit = bits[name] = 1 << len(table)
+                table.append(name)
+            mask |= bit
+        return mask
+
+    def gened_mask(self, names):
+        """Bitmask of GenEd attribute names (extends the table with unseen names)."""
+        return self._mask(names, self.gened_names, self._gened_bits)
+
+    def cultural_mask(self, names):
+        return self._mask(names, self.cultural_names, self._cultural_bits)
+
+    @staticmethod
+    def _names(mask, table, cache):
+        names = cache.get(mask)
+        if names is None:
+            names = cache[mask] = tuple(name for i, name in enumerate(table) if mask >> i & 1)
+        return names
+
+    def gened_names_of(self, mask):
+        """GenEd attribute names of a mask, in table order (one shared tuple per mask)."""
+        return self._names(mask, self.gened_names, self._gened_tuples)
+
+    def cultural_names_of(self, mask):
+        return self._names(mask, self.cultural_names, self._cultural_tuples)
+
+    def key_order(self, keys):
+        keys = tuple(keys)
+        return self._key_orders.setdefault(keys, keys)
+
+    def derive(self):
+        """
+        New table for records added to a catalog after it was built. Attribute
+        bits keep their positions; records of this table are unaffected by it.
+        """
+        table = CourseTable()
+        table.gened_names = list(self.gened_names)
+        table.cultural_names = list(self.cultural_names)
+        table._gened_bits = dict(self._gened_bits)
+        table._cultural_bits = dict(self._cultural_bits)
+        return table
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_gened_tuples'] = {}
+        state['_cultural_tuples'] = {}
+        return state
+
+
+def _parse_credits(value):
+    """(min, max) credits of a catalog credit value like 3, "1.5" or "1-3"; None if unparseable."""
+    try:
+        parts = str(value).split('-')
+        low = float(parts[0])
+    except (TypeError, ValueError):
+        return None, None
+    try:
+        high = float(parts[1]) if len(parts) > 1 else low
+    except ValueError:
+        high = low
+    return low, high
+
+
+class CourseRecord(Mapping):
+    """
+    Read-only course with hot fields in slots and cold fields in the table's
+    ColdStore. Behaves like the course dict it was built from.
+
+    Attributes:
+        code: normalized course code (interned)
+        course_code: display code, e.g. "ECON 102"
+        credits: minimum credits parsed from the catalog value, None if unparseable
+        credits_max: maximum credits of a range ("1-3" -> 3.0)
+        gened_mask / cultural_mask: attribute bitmasks over the CourseTable
+        inter_domain: whether the course is inter-domain
+    """
+
+    __slots__ = ('code', 'course_code', 'credits', 'credits_max', 'gened_mask', 'cultural_mask',
+                 'inter_domain', '_keys', '_table', '_offset', '_length')
+
+    def __init__(self, code, course, table, span):
+        keys = tuple(course)
+        if table.lazy is not None:
+            keys += tuple(key for key in table.lazy.fields if key not in course)
+        self.code = sys.intern(code)
+        self.course_code = course.get('courseCode')
+        self.credits, self.credits_max = _parse_credits(course['credits']) if 'credits' in course else (None, None)
+        self.gened_mask = table.gened_mask(course.get('genEdAttributes') or ())
+        self.cultural_mask = table.cultural_mask(course.get('culturalAttributes') or ())
+        self.inter_domain = course.get('interDomain', False)
+        self._keys = table.key_order(keys)
+        self._table = table
+        self._offset, self._length = span
+
+    def _hot(self, key):
+        if key == 'courseCode':
+            return self.course_code
+        if key == 'genEdAttributes':
+            return list(self._table.gened_names_of(self.gened_mask))
+        if key == 'culturalAttributes':
+            return list(self._table.cultural_names_of(self.cultural_mask))
+        return self.inter_domain
+
+    def cold_fields(self):
+        """Every cold field of the course, read from the side file (shared, do not modify)."""
+        return self._table.cold.read(self._offset, self._length)
+
+    def _value(self, key):
+        if key in HOT_FIELDS:
+            return self._hot(key)
+        lazy = self._table.lazy
+        if lazy is not None and key in lazy.fields:
+            return lazy.value(self.code, key)
+        return self.cold_fields()[key]
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return self._value(key)
+
+    def get(self, key, default=None):
+        if key not in self._keys:
+            return default
+        return self._value(key)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def to_dict(self):
+        """Plain dict copy of the course (hot and cold fields, original key order)."""
+        cold = self.cold_fields()
+        return {key: cold[key] if key in cold else self._value(key) for key in self._keys}
+
+    def __repr__(self):
+        return f"CourseRecord({self.to_dict()!r})"
+
+
+def _cold_store(courses):
+    """ColdStore of the cold fields of course dicts, and each course's span in it."""
+    blobs = []
+    for course in courses:
+        cold = {key: value for key, value in course.items() if key not in HOT_FIELDS}
+        blobs.append(json.dumps(cold, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return ColdStore.build(blobs)
+
+
+def compact_courses(courses_db, lazy=None):
+    """
+    Replace every course dict of `courses_db` with a CourseRecord, in place.
+
+    Args:
+        courses_db: Courses database
+        lazy: Optional source of fields missing from the course dicts (with
+              `fields` and `value(code, key)`); every record gets those keys
+              and reads them from the source when accessed
+
+    Returns:
+        CourseTable shared by the records (its cold store holds the cold text)
+    """
+    table = CourseTable()
+    table.lazy = lazy
+    table.cold, spans = _cold_store(courses_db.values())
+    for (code, course), span in zip(list(courses_db.items()), spans):
+        courses_db[code] = CourseRecord(code, course, table, span)
+    return table
+
+
+def patch_courses(courses_db, courses, table=None):
+    """
+    Store changed courses as CourseRecords of a new table derived from
+    `table`, in place. Other records of `courses_db` are left untouched (they
+    keep their own table and cold store), so a copy of a compacted catalog can
+    be patched while the original is still being read.
+
+    The changed course dicts must be complete: the new table has no lazy source.
+
+    Args:
+        courses_db: Courses database to update
+        courses: normalized code -> course dict
+        table: CourseTable the catalog was compacted with (None: a fresh one)
+
+    Returns:
+        CourseTable of the new records
+    """
+    table = table.derive() if table is not None else CourseTable()
+    table.cold, spans = _cold_store(courses.values())
+    for (code, course), span in zip(courses.items(), spans):
+        courses_db[code] = CourseRecord(code, course, table, span)
+    return table
+
+
+def plain_courses(courses_db):
+    """
+    Plain dict copy of every course (for JSON responses); dict values are passed through.
+
+    Decodes every cold blob: build it once per catalog, not once per request.
+    """
+    return {code: course.to_dict() if isinstance(course, CourseRecord) else course
+            for code, course in courses_db.items()}
@@ -8,9 +8,16 @@ for data management and updates.
 """
 
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
+import catalog_rows
+import recommendation_engine as engine
+
 # Load environment variables
 env_path = Path(__file__).parent / '.env'
 load_dotenv(env_path)
@@ -39,21 +46,209 @@ if SUPABASE_CONFIGURED:
         print(f"⚠️  Warning: Could not connect to Supabase: {e}")
         SUPABASE_CONFIGURED = False
 
-# In-memory cache (loaded at startup)
+# Rows per request (Supabase's PostgREST returns at most 1000 rows per response)
+PAGE_SIZE = int(os.getenv('SUPABASE_PAGE_SIZE', '1000'))
+# Concurrent requests while loading
+LOAD_WORKERS = int(os.getenv('SUPABASE_LOAD_WORKERS', '4'))
+# Seconds before each table's watermark that a delta sync reads again:
+# updated_at is set when a row is written, not when its transaction commits,
+# so a slow transaction can commit rows older than the watermark
+SYNC_OVERLAP = float(os.getenv('SUPABASE_SYNC_OVERLAP', '5'))
+
+# In-memory cache (loaded at startup). Replaced as a whole once a load or sync
+# has finished, never filled in place, so readers see either the old or the new data
 _cache = {
     "programs": None,
     "courses": None,
     "equivalencies": None,
-    "prereq_config": None
+    "prereq_config": None,
+    # table -> {row key: updated_at} of the loaded rows (the delta sync watermarks)
+    "versions": None,
+    # engine.CatalogPatch that turned the previous cache into this one (None after a full load)
+    "patch": None,
+    "client": None,
+}
+_sync_lock = threading.Lock()
+_sync_stats = {"syncs": 0, "changed_rows": 0, "full_reloads": 0, "last_sync": None, "last_sync_seconds": None}
+
+
+class TableQuery:
+    """
+    One table to load.
+
+    Args:
+        table: Table name
+        columns: Columns to select (never '*': only what the engine reads)
+        order: Unique column giving pages a stable order
+        optional: Columns that older databases may not have yet; they are
+                  dropped from the projection if the server rejects them
+        filters: column -> value equality filters
+    """
+
+    def __init__(self, table, columns, order, optional=(), filters=None, since=None):
+        self.table = table
+        self.columns = tuple(columns)
+        self.order = order
+        self.optional = tuple(optional)
+        self.filters = dict(filters or {})
+        self.since = since
+
+    def without_optional(self):
+        return TableQuery(self.table, self.columns, self.order, filters=self.filters, since=self.since)
+
+    def changed_since(self, since, extra_columns=()):
+        """The same query restricted to rows with updated_at > `since` (None: every row)."""
+        return TableQuery(self.table, self.columns + tuple(extra_columns), self.order, self.optional,
+                          self.filters, since)
+
+    def keys_only(self):
+        """Query for the key column of every row (to find deleted rows)."""
+        return TableQuery(self.table, (self.order,), self.order, filters=self.filters)
+
+    def request(self, client, count=None):
+        builder = client.table(self.table).select(','.join(self.columns + self.optional), count=count)
+        for column, value in self.filters.items():
+            builder = builder.eq(column, value)
+        if self.since is not None:
+            builder = builder.gt('updated_at', self.since.isoformat())
+        return builder.order(self.order)
+
+
+# Columns the engine reads, plus updated_at for delta syncs; created_at and
+# long course text are not loaded. The order column is each table's key.
+PROGRAMS_QUERY = TableQuery('programs', ('id', 'type', 'url', 'rules', 'updated_at'), 'id')
+COURSES_QUERY = TableQuery(
+    'courses',
+    ('course_code_normalized', 'course_code', 'title', 'credits', 'prerequisites_raw',
+     'gen_ed_attributes', 'cultural_attributes', 'inter_domain', 'updated_at'),
+    'course_code_normalized',
+    optional=('prerequisites_ast',),
+)
+EQUIVALENCIES_QUERY = TableQuery('course_equivalencies', ('course_code', 'equivalents', 'reason', 'auto_generated', 'type', 'updated_at'), 'course_code')
+CONFIG_QUERY = TableQuery('prerequisite_config', ('id', 'config_value', 'updated_at'), 'id', filters={'config_name': 'hierarchy_rules'})
+
+TABLE_QUERIES = {
+    'programs': PROGRAMS_QUERY,
+    'courses': COURSES_QUERY,
+    'equivalencies': EQUIVALENCIES_QUERY,
+    'config': CONFIG_QUERY,
 }
 
+# Course columns fetched on first use instead of at startup (see LazyCourseColumns)
+LAZY_COURSE_COLUMNS = catalog_rows.COURSE_TEXT_COLUMNS
+
+
+def _is_missing_column(error):
+    return getattr(error, 'code', None) == '42703' or 'does not exist' in str(error)
+
+
+def _first_page(client, query, page_size):
+    """First page of a table and its exact row count (None if the server does not report it)."""
+    try:
+        response = query.request(client, count='exact').range(0, page_size - 1).execute()
+    except Exception as e:
+        if not query.optional or not _is_missing_column(e):
+            raise
+        print(f"   ⚠️  {query.table}: optional columns {', '.join(query.optional)} not found, loading without them")
+        query = query.without_optional()
+        response = query.request(client, count='exact').range(0, page_size - 1).execute()
+    return query, response.data, response.count
+
+
+def _fetch_page(client, query, offset, page_size):
+    return query.request(client).range(offset, offset + page_size - 1).execute().data
+
+
+def fetch_tables(client, queries, page_size=None, workers=None):
+    """
+    Load several tables completely, concurrently and page by page.
+
+    PostgREST silently caps every response at its max-rows setting, so each
+    table is read in pages of `page_size` rows. The first page of every table
+    is requested together with an exact row count; the remaining pages are
+    then fetched in parallel. The step between pages is the size of the first
+    page, so a server cap below `page_size` cannot skip rows, and a table
+    whose row count does not match the rows received raises an error instead
+    of returning a truncated catalog.
+
+    Args:
+        client: Supabase client
+        queries: name -> TableQuery
+        page_size: Rows per request (default SUPABASE_PAGE_SIZE)
+        workers: Concurrent requests (default SUPABASE_LOAD_WORKERS)
+
+    Returns:
+        dict: name -> list of row dicts
+    """
+    page_size = page_size or PAGE_SIZE
+    with ThreadPoolExecutor(max_workers=workers or LOAD_WORKERS) as pool:
+        firsts = {name: pool.submit(_first_page, client, query, page_size) for name, query in queries.items()}
+        pending = {}
+        for name, future in firsts.items():
+            query, rows, total = future.result()
+            step = len(rows)
+            if total is None or step == 0:
+                pending[name] = (query, rows, total, None)
+                continue
+            rest = [pool.submit(_fetch_page, client, query, offset, step) for offset in range(step, total, step)]
+            pending[name] = (query, rows, total, rest)
+
+        tables = {}
+        for name, (query, rows, total, rest) in pending.items():
+            rows = list(rows)
+            if rest is None:
+                # No row count from the server: read on until a page comes back empty
+                step = len(rows)
+                while step:
+                    page = _fetch_page(client, query, len(rows), step)
+                    if not page:
+                        break
+                    rows.extend(page)
+            else:
+                for future in rest:
+                    rows.extend(future.result())
+            if total is not None and len(rows) != total:
+                raise Exception(f"{query.table}: expected {total} rows, received {len(rows)}")
+            tables[name] = rows
+    return tables
+
+
+class LazyCourseColumns(catalog_rows.LazyCourseColumns):
+    """
+    Course columns that are not part of the startup load (descriptions and
+    other display text the engine never reads while scoring). The first time
+    any course reads one of them, the columns are fetched for every course
+    in one paginated load and kept.
+
+    Args:
+        client: Supabase client
+        fields: Column names (same as the course dict keys)
+    """
+
+    def __init__(self, client, fields=LAZY_COURSE_COLUMNS):
+        super().__init__(fields)
+        self._client = client
+
+    def _fetch(self):
+        query = TableQuery('courses', ('course_code_normalized',) + self.fields, 'course_code_normalized')
+        return fetch_tables(self._client, {'courses': query})['courses']
 
-def load_all_data():
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._client = None
+
+
+def load_all_data(client=None):
     """
     Load all data from Supabase into memory at startup.
     
     This maintains current performance while using a database backend.
     Data is loaded once and cached in memory for fast access during runtime.
+    All tables are fetched concurrently and page by page (see fetch_tables);
+    only the columns the engine reads are loaded up front.
+    
+    Args:
+        client: Supabase client (default: the one configured from backend/.env)
     
     Returns:
         tuple: (programs_list, courses_dict, equivalencies_dict, prereq_config_dict)
@@ -61,97 +256,75 @@ def load_all_data():
     Raises:
         Exception: If Supabase is not configured or connection fails
     """
-    if not SUPABASE_CONFIGURED:
-        raise Exception(
-            "Supabase not configured. Please:\n"
-            "1. Create a Supabase project at https://supabase.com\n"
-            "2. Execute backend/scripts/create_schema.sql in Supabase SQL Editor\n"
-            "3. Run backend/scripts/migrate_to_supabase.py to import data\n"
-            "4. Update backend/.env with your Supabase credentials"
-        )
+    global _cache
+    if client is None:
+        if not SUPABASE_CONFIGURED:
+            raise Exception(
+                "Supabase not configured. Please:\n"
+                "1. Create a Supabase project at https://supabase.com\n"
+                "2. Execute backend/scripts/create_schema.sql in Supabase SQL Editor\n"
+                "3. Run backend/scripts/migrate_to_supabase.py to import data\n"
+                "4. Update backend/.env with your Supabase credentials"
+            )
+        client = supabase
     
     print("📥 Loading data from Supabase...")
     
     try:
-        # Load programs
-        print("   → Loading programs...")
-        programs_response = supabase.table('programs').select('*').execute()
-        programs = programs_response.data
-        _cache['programs'] = programs
-        print(f"   ✓ Loaded {len(programs)} programs")
+        print(f"   → Fetching programs, courses, equivalencies and config ({LOAD_WORKERS} concurrent requests, {PAGE_SIZE} rows per page)...")
+        tables = fetch_tables(client, TABLE_QUERIES)
         
-        # Load courses (convert to dict with normalized code as key)
-        print("   → Loading courses...")
-        courses_response = supabase.table('courses').select('*').execute()
-        courses_data = courses_response.data
+        programs = [catalog_rows.program_from_row(p) for p in tables['programs']]
+        print(f"   ✓ Loaded {len(programs)} programs")
         
         # Convert to dict format matching original JSON structure
         courses_dict = {}
-        for c in courses_data:
-            courses_dict[c['course_code_normalized']] = {
-                'courseCode': c['course_code'],
-                'title': c['title'],
-                'credits': c['credits'],
-                'description': c['description'],
-                'prerequisites_list': c['prerequisites_list'],
-                'prerequisites_raw': c['prerequisites_raw'],
-                'genEdAttributes': c['gen_ed_attributes'],
-                'culturalAttributes': c['cultural_attributes'],
-                'interDomain': c['inter_domain'],
-                'source_program': c['source_program']
-            }
-        
-        _cache['courses'] = courses_dict
-        print(f"   ✓ Loaded {len(courses_dict)} courses")
+        for c in tables['courses']:
+            courses_dict[c['course_code_normalized']] = catalog_rows.course_from_row(c)
         
-        # Load equivalencies (convert to dict)
-        print("   → Loading course equivalencies...")
-        equiv_response = supabase.table('course_equivalencies').select('*').execute()
-        equiv_data = equiv_response.data
+        print(f"   ✓ Loaded {len(courses_dict)} courses ({', '.join(LAZY_COURSE_COLUMNS)} on first use)")
+        padded = sum(1 for code in courses_dict if engine.normalize_code(code) != code)
+        if padded:
+            # Writes and syncs use canonical keys and would not find these rows
+            print(f"   ⚠️  {padded} course keys are not canonical (e.g. SOC030 for SOC30); "
+                  f"run migrate_to_supabase.py --canonicalize-keys")
         
         equiv_dict = {}
-        for e in equiv_data:
-            equiv_dict[e['course_code']] = {
-                'equivalents': e['equivalents'],
-                'reason': e['reason'],
-                'auto_generated': e['auto_generated'],
-                'type': e['type']
-            }
+        for e in tables['equivalencies']:
+            equiv_dict[e['course_code']] = catalog_rows.equivalency_from_row(e)
         
-        _cache['equivalencies'] = equiv_dict
         print(f"   ✓ Loaded {len(equiv_dict)} equivalency mappings")
         
-        # Load prerequisite config
-        print("   → Loading prerequisite configuration...")
-        config_response = supabase.table('prerequisite_config') \
-            .select('config_value') \
-            .eq('config_name', 'hierarchy_rules') \
-            .execute()
-        
-        if config_response.data and len(config_response.data) > 0:
-            prereq_config = config_response.data[0]['config_value']
+        if tables['config']:
+            prereq_config = tables['config'][0]['config_value']
         else:
-            # Default config if not found in database
-            prereq_config = {
-                "hierarchy_rules": {
-                    "enabled": True,
-                    "same_department_higher_level": True,
-                    "minimum_level_difference": 0
-                }
-            }
+            prereq_config = catalog_rows.DEFAULT_PREREQ_CONFIG
             print("   ⚠️  Using default prerequisite config (not found in database)")
         
-        _cache['prereq_config'] = prereq_config
         print("   ✓ Loaded prerequisite configuration")
         
+        # Compile per-program evaluation plans and the prerequisite graph once,
+        # so requests never re-parse rules or prerequisite text
+        # The satisfier index is a build artifact shipped with the data files
+        satisfier_index = engine.load_satisfier_index(equiv_dict, prereq_config)
+        programs, courses_dict = engine.compile_catalog(
+            programs, courses_dict, satisfier_index, lazy_columns=LazyCourseColumns(client)
+        )
+        print("   ✓ Compiled program evaluation plans")
+        
         print(f"✅ Database load complete: {len(programs)} programs, {len(courses_dict)} courses")
         
-        return (
-            _cache['programs'],
-            _cache['courses'],
-            _cache['equivalencies'],
-            _cache['prereq_config']
-        )
+        # Publish the fully loaded data in one assignment
+        _cache = {
+            "programs": programs,
+            "courses": courses_dict,
+            "equivalencies": equiv_dict,
+            "prereq_config": prereq_config,
+            "versions": {name: catalog_rows.row_versions(name, rows) for name, rows in tables.items()},
+            "patch": None,
+            "client": client,
+        }
+        return programs, courses_dict, equiv_dict, prereq_config
     
     except Exception as e:
         print(f"❌ Error loading data from Supabase: {e}")
@@ -172,14 +345,15 @@ def get_cached_data():
     Returns:
         tuple: (programs_list, courses_dict, equivalencies_dict, prereq_config_dict)
     """
-    if _cache['programs'] is None:
+    cache = _cache
+    if cache['programs'] is None:
         return load_all_data()
     
     return (
-        _cache['programs'],
-        _cache['courses'],
-        _cache['equivalencies'],
-        _cache['prereq_config']
+        cache['programs'],
+        cache['courses'],
+        cache['equivalencies'],
+        cache['prereq_config']
     )
 
 
@@ -188,18 +362,126 @@ def reload_cache():
     Force reload of all data from database.
     
     Useful for development when data changes without restarting the server.
+    The previous data stays cached and served until the new load completes.
     
     Returns:
         tuple: (programs_list, courses_dict, equivalencies_dict, prereq_config_dict)
     """
     print("🔄 Reloading data from database...")
-    _cache['programs'] = None
-    _cache['courses'] = None
-    _cache['equivalencies'] = None
-    _cache['prereq_config'] = None
     return load_all_data()
 
 
+def _count_rows(client, query):
+    """Exact row count of a table (one request for a single key)."""
+    return query.keys_only().request(client, count='exact').range(0, 0).execute().count
+
+
+def sync_cache(client=None, load_if_empty=True):
+    """
+    Apply the rows changed in Supabase since the last load or sync to the
+    cached catalog, instead of reloading every table.
+
+    Every loaded row's updated_at is kept (the schema's triggers maintain it);
+    a sync asks each table only for rows with updated_at past the table's
+    watermark (minus SUPABASE_SYNC_OVERLAP seconds; rows already applied are
+    skipped) and for its row count, which reveals deleted rows. The changes
+    are patched into a copy of the compiled catalog (engine.patch_catalog), so
+    only the courses, plans and indexes that depend on them are rebuilt, and
+    the result replaces the cache in one assignment like a full load.
+
+    Rows whose keys show up in a table without a newer updated_at (written
+    with an old timestamp) are fetched and patched in like changed rows.
+    Falls back to load_all_data() only when nothing is cached yet.
+
+    Args:
+        client: Supabase client (default: the one the cache was loaded with)
+        load_if_empty: Load the catalog when nothing is cached yet; False
+            leaves an empty cache empty (the next load reads every row anyway)
+
+    Returns:
+        engine.CatalogPatch: What changed, or None if nothing did (or the
+            cache was loaded for the first time instead)
+    """
+    global _cache
+    with _sync_lock:
+        cache = _cache
+        if cache['programs'] is None or cache['versions'] is None:
+            if load_if_empty:
+                load_all_data(client)
+                _sync_stats['full_reloads'] += 1
+            return None
+        client = client or cache['client']
+        started = time.perf_counter()
+        versions = cache['versions']
+
+        overlap = timedelta(seconds=SYNC_OVERLAP)
+        queries = {}
+        # Changed courses are rebuilt complete, with their lazy text
+        extra_columns = {'courses': LAZY_COURSE_COLUMNS}
+        for name, query in TABLE_QUERIES.items():
+            since = catalog_rows.watermark(versions[name])
+            queries[name] = query.changed_since(since - overlap if since else None, extra_columns.get(name, ()))
+
+        with ThreadPoolExecutor(max_workers=len(TABLE_QUERIES)) as pool:
+            counts = {name: pool.submit(_count_rows, client, query) for name, query in TABLE_QUERIES.items()}
+            delta = fetch_tables(client, queries)
+            counts = {name: future.result() for name, future in counts.items()}
+
+        new_versions = {}
+        changed = {}
+        removed = {}
+        for name, query in TABLE_QUERIES.items():
+            known = dict(versions[name])
+            changed[name] = catalog_rows.new_rows(name, known, delta[name])
+            removed[name] = set()
+            if counts[name] is not None and counts[name] != len(known):
+                # Rows were deleted (or inserted with an old updated_at): compare keys
+                keys = {row[query.order] for row in fetch_tables(client, {name: query.keys_only()})[name]}
+                unexplained = keys - set(known)
+                if unexplained:
+                    print(f"🔄 {query.table}: {len(unexplained)} rows appeared without a newer updated_at, fetching them")
+                    rows = fetch_tables(client, {name: query.changed_since(None, extra_columns.get(name, ()))})[name]
+                    changed[name] += catalog_rows.new_rows(name, known, [r for r in rows if r[query.order] in unexplained])
+                removed[name] = set(known) - keys
+                for key in removed[name]:
+                    del known[key]
+            new_versions[name] = known
+
+        changed_rows = sum(len(rows) + len(removed[name]) for name, rows in changed.items())
+        _sync_stats['syncs'] += 1
+        _sync_stats['last_sync'] = time.time()
+        if not changed_rows:
+            _sync_stats['last_sync_seconds'] = time.perf_counter() - started
+            return None
+
+        _cache, patch = catalog_rows.apply_changes(cache, changed, removed, new_versions)
+        _sync_stats['changed_rows'] += changed_rows
+        _sync_stats['last_sync_seconds'] = time.perf_counter() - started
+        summary = ', '.join(f"{len(rows)} changed / {len(removed[name])} removed {name}"
+                            for name, rows in changed.items() if rows or removed[name])
+        print(f"🔄 Synced {summary} in {_sync_stats['last_sync_seconds']:.2f}s")
+        return patch
+
+
+def cached_patch(courses_db):
+    """
+    The engine.CatalogPatch that produced `courses_db` in the last sync, or
+    None if it came from a full load or is no longer the cached catalog.
+    """
+    cache = _cache
+    return cache['patch'] if cache['courses'] is courses_db else None
+
+
+def sync_status():
+    """Delta sync counters and per-table watermarks (for the admin endpoint)."""
+    versions = _cache['versions'] or {}
+    watermarks = {}
+    for name, table_versions in versions.items():
+        latest = catalog_rows.watermark(table_versions)
+        watermarks[name] = latest.isoformat() if latest else None
+    return dict(_sync_stats, watermarks=watermarks)
+
+
 def is_cache_loaded():
     """
     Check if cache is currently loaded.
@@ -210,54 +492,148 @@ def is_cache_loaded():
     return _cache['programs'] is not None
 
 
-# Optional: Functions for updating data (for future enhancements)
+# Functions for updating data
+
+def _update_client(client=None):
+    if client is not None:
+        return client
+    if _cache['client'] is not None:
+        return _cache['client']
+    return supabase if SUPABASE_CONFIGURED else None
 
-def update_program(program_id, updated_data):
+
+def _update_rows(client, table, key_column, updates):
     """
-    Update a program in the database and refresh cache.
-    
+    Apply partial updates to many rows in one transaction (the update_rows
+    function of create_schema.sql). Databases created before the function
+    existed are updated one request per row instead.
+
     Args:
-        program_id (str): Program ID
-        updated_data (dict): Updated program data
-    
+        client: Supabase client
+        table: 'programs' or 'courses'
+        key_column: The table's primary key
+        updates: key -> {column: new value}
+    """
+    payload = [{"key": key, "values": values} for key, values in updates.items()]
+    try:
+        client.rpc('update_rows', {"target": table, "key_column": key_column, "updates": payload}).execute()
+    except Exception as e:
+        # PGRST202: no such function in the schema cache
+        if getattr(e, 'code', None) != 'PGRST202':
+            raise
+        print("   ⚠️  update_rows() not found (re-run create_schema.sql), updating row by row")
+        for key, values in updates.items():
+            client.table(table).update(values).eq(key_column, key).execute()
+
+
+def update_programs(updates, client=None):
+    """
+    Update many programs in one transaction and apply the changes to the
+    cache with a single delta sync (see sync_cache): only the changed plans
+    and what depends on them are rebuilt, never the whole catalog. Without a
+    cached catalog there is nothing to refresh.
+
+    Args:
+        updates (dict): Program ID -> updated program data (columns)
+        client: Supabase client (default: the one the cache was loaded with)
+
     Returns:
         bool: True if successful, False otherwise
     """
-    if not SUPABASE_CONFIGURED:
+    client = _update_client(client)
+    if client is None:
         return False
-    
+
     try:
-        supabase.table('programs').update(updated_data).eq('id', program_id).execute()
-        reload_cache()
+        _update_rows(client, 'programs', 'id', updates)
+        sync_cache(client, load_if_empty=False)
         return True
     except Exception as e:
-        print(f"Error updating program: {e}")
+        print(f"Error updating programs: {e}")
         return False
 
 
-def update_course(course_code, updated_data):
+def update_courses(updates, client=None):
     """
-    Update a course in the database and refresh cache.
-    
+    Update many courses in one transaction and apply the changes to the
+    cache with a single delta sync (see sync_cache): only the changed
+    courses, the plans that list them and the indexes over them are rebuilt,
+    never the whole catalog. Without a cached catalog there is nothing to
+    refresh.
+
+    A new prerequisites_raw without a prerequisites_ast recompiles the AST,
+    so the stored prerequisite edges follow the text.
+
     Args:
-        course_code (str): Normalized course code
-        updated_data (dict): Updated course data
-    
+        updates (dict): Course code (any spelling) -> updated course data (columns)
+        client: Supabase client (default: the one the cache was loaded with)
+
     Returns:
         bool: True if successful, False otherwise
     """
-    if not SUPABASE_CONFIGURED:
+    client = _update_client(client)
+    if client is None:
         return False
-    
+
+    by_code = {}
+    compiled = set()
+    for code, updated_data in updates.items():
+        norm_code = engine.normalize_code(code)
+        values = by_code.setdefault(norm_code, {})
+        values.update(updated_data)
+        if 'prerequisites_raw' in updated_data and 'prerequisites_ast' not in updated_data:
+            values['prerequisites_ast'] = engine.course_prerequisite_ast(
+                {'courseCode': norm_code, 'prerequisites_raw': updated_data['prerequisites_raw']})
+            compiled.add(norm_code)
     try:
-        supabase.table('courses').update(updated_data).eq('course_code_normalized', course_code).execute()
-        reload_cache()
+        try:
+            _update_rows(client, 'courses', 'course_code_normalized', by_code)
+        except Exception as e:
+            if not compiled or not _is_missing_column(e):
+                raise
+            # Databases without the column compile the text when they load
+            for norm_code in compiled:
+                del by_code[norm_code]['prerequisites_ast']
+            _update_rows(client, 'courses', 'course_code_normalized', by_code)
+        sync_cache(client, load_if_empty=False)
         return True
     except Exception as e:
-        print(f"Error updating course: {e}")
+        print(f"Error updating courses: {e}")
         return False
 
 
+def update_program(program_id, updated_data, client=None):
+    """
+    Update a program in the database and apply the change to the cache
+    (see update_programs).
+    
+    Args:
+        program_id (str): Program ID
+        updated_data (dict): Updated program data
+        client: Supabase client (default: the one the cache was loaded with)
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return update_programs({program_id: updated_data}, client)
+
+
+def update_course(course_code, updated_data, client=None):
+    """
+    Update a course in the database and apply the change to the cache
+    (see update_courses).
+    
+    Args:
+        course_code (str): Normalized course code
+        updated_data (dict): Updated course data
+        client: Supabase client (default: the one the cache was loaded with)
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return update_courses({course_code: updated_data}, client)
+
+
 # Module-level initialization message
 if SUPABASE_CONFIGURED:
     print("✓ Database module initialized (Supabase connected)")
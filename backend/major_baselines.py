@@ -0,0 +1,177 @@
+"""
+Per-Major Baseline Table
+Precomputed evaluation of every program for each major, built once per catalog.
+
+Every student in a major starts from the same prescribed major courses, so the
+gap, missing courses and overlap of each program given only those courses is
+the same for all of them. This table computes that baseline at startup for
+every major (plus an empty baseline for students without a matching major).
+
+A request then applies the student's transcript as a delta: only programs
+the transcript can affect are evaluated again, every other program reuses its
+baseline. Affected programs are looked up in the catalog's inverted
+course -> program index (engine.ProgramIndex). A program is affected when a
+transcript course
+
+    - is one of the program's listed courses (any rule, secondary pools, groups),
+    - falls in one of its dynamic_subset primary pools (department + level), or
+    - is outside the major and the program has group_option rules, whose
+      prerequisite costs depend on the whole history.
+
+Triple dips from the program's own GenEd courses depend only on the request's
+GenEd needs and are recomputed per request; pool courses from the transcript
+make the program affected, so those are never taken from the baseline.
+"""
+
+import time
+
+import recommendation_engine as engine
+
+
+class MajorBaseline:
+    """
+    Evaluation of every program for a student with only the major's courses.
+
+    Args:
+        major_courses: Normalized codes prescribed by the major
+        evaluations: (gap, missing_courses, overlap_courses) per program,
+                     aligned with the table's program list
+    """
+
+    def __init__(self, major_courses, evaluations):
+        self.major_courses = major_courses
+        self.major_set = frozenset(major_courses)
+        self.evaluations = evaluations
+
+
+def _unique_ids(programs_db):
+    ids = [program['id'] for program in programs_db]
+    return len(ids) == len(set(ids))
+
+
+class MajorBaselineTable:
+    """
+    Baselines for every major of a loaded catalog.
+
+    Args:
+        programs_db: List of compiled program dicts
+        courses_db: Courses database
+        equivalency_map: Dictionary of course equivalencies
+        prereq_config: Configuration dict with hierarchy rules
+        previous: Table of the catalog this one was patched from
+        affected: ids of the programs to evaluate again (engine.CatalogPatch.affected);
+                  with `previous`, every other program keeps its previous evaluation
+    """
+
+    def __init__(self, programs_db, courses_db, equivalency_map=None, prereq_config=None,
+                 previous=None, affected=None):
+        start = time.perf_counter()
+        self.programs = programs_db
+        self.courses_db = courses_db
+        self.equivalency_map = equivalency_map
+        self.prereq_config = prereq_config
+        self.plans = [engine.get_program_plan(p, courses_db) for p in programs_db]
+        self.index = getattr(courses_db, 'program_index', None) or engine.ProgramIndex(programs_db, courses_db)
+
+        # Major name (lower case) -> prescribed courses; the first program with a
+        # given name wins, like get_prescribed_major_courses()
+        self._major_courses = {}
+        for program in programs_db:
+            if program['type'] == 'Majors':
+                key = program['id'].lower()
+                if key not in self._major_courses:
+                    self._major_courses[key] = engine.get_prescribed_major_courses(program['id'], programs_db)
+
+        # Evaluations are reused by program id, so ids must be unique (they are
+        # in the database, not in the JSON files)
+        reuse = previous is not None and affected is not None
+        if reuse:
+            reuse = _unique_ids(programs_db) and _unique_ids(previous.programs)
+        self.reused_evaluations = 0
+
+        self._empty = self._build([], previous._empty if reuse else None, previous, affected)
+        self._baselines = {}
+        for key, courses in self._major_courses.items():
+            old = previous._baselines.get(key) if reuse else None
+            if old is not None and old.major_courses != courses:
+                old = None
+            self._baselines[key] = self._build(courses, old, previous, affected)
+        self.build_seconds = time.perf_counter() - start
+
+    def _build(self, major_courses, previous=None, previous_table=None, affected=None):
+        """Baseline for `major_courses`, reusing `previous` evaluations of programs not in `affected`."""
+        reusable = {}
+        if previous is not None:
+            for program, evaluation in zip(previous_table.programs, previous.evaluations):
+                if program['id'] not in affected:
+                    reusable[program['id']] = evaluation
+
+        profile = engine.StudentProfile([], major_courses)
+        evaluator = None
+        evaluations = []
+        for program in self.programs:
+            evaluation = reusable.get(program['id'])
+            if evaluation is not None:
+                self.reused_evaluations += 1
+                evaluations.append(evaluation)
+                continue
+            if evaluator is None:
+                evaluator = engine.make_cost_evaluator(profile.combined_history, self.courses_db, self.equivalency_map, self.prereq_config)
+            gap, missing, _, overlap_courses = engine.evaluate_program(
+                program, profile, self.courses_db, self.equivalency_map, self.prereq_config, evaluator
+            )
+            evaluations.append((gap, missing, overlap_courses))
+        return MajorBaseline(major_courses, evaluations)
+
+    def __len__(self):
+        return len(self._baselines)
+
+    def major_courses(self, major_name):
+        """Prescribed courses of a major (same result as get_prescribed_major_courses)."""
+        return list(self._major_courses.get((major_name or '').lower(), []))
+
+    def baseline(self, major_name):
+        """Baseline for a major name, or the empty baseline when there is no such major."""
+        return self._baselines.get((major_name or '').lower(), self._empty)
+
+    def affected(self, profile, baseline):
+        """Positions of the programs the student's transcript can change relative to `baseline`."""
+        transcript = profile.user_history
+        if not transcript:
+            return set()
+        affected = self.index.programs_touched(transcript)
+        if self.index.group_programs and any(norm_code not in baseline.major_set for norm_code in transcript):
+            affected |= self.index.group_programs
+        return affected
+
+    def is_affected(self, index, profile, baseline):
+        """Whether the student's transcript can change program `index` relative to its baseline."""
+        return index in self.affected(profile, baseline)
+
+    def scores(self, indexes, profile, baseline):
+        """
+        Exact ranking scores for the programs the transcript does not affect.
+
+        Args:
+            indexes: Program indexes to consider (e.g. the request's candidates)
+            profile: StudentProfile for the request
+            baseline: MajorBaseline of the student's major
+
+        Returns:
+            dict: {position in `indexes`: (gap, overlap, optimizations)}
+        """
+        affected = self.affected(profile, baseline)
+        scores = {}
+        for position, index in enumerate(indexes):
+            if index in affected:
+                continue
+            gap, _, overlap_courses = baseline.evaluations[index]
+            optimizations = len(engine.gened_triple_dips(self.plans[index], profile.gen_ed_needs))
+            scores[position] = (gap, len(overlap_courses), optimizations)
+        return scores
+
+    def explain(self, index, profile, baseline):
+        """The /recommend entry for an unaffected program, built from its baseline."""
+        gap, missing, overlap_courses = baseline.evaluations[index]
+        triple_dips = engine.gened_triple_dips(self.plans[index], profile.gen_ed_needs)
+        return engine.program_summary(self.programs[index], gap, list(missing), triple_dips, list(overlap_courses))
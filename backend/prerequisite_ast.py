@@ -0,0 +1,260 @@
+"""
+Prerequisite AST Compiler
+Turns catalog prerequisite text into a boolean AND/OR tree.
+
+Runs when the data is built (scripts/generate_optimized_data.py) and stores
+the result next to `prerequisites_raw` as `prerequisites_ast`, so the engine
+never parses prerequisite text while serving requests.
+
+AST format (JSON-serializable):
+    {"course": "ECON102"}                         a single course
+    {"course": "MATH250", "concurrent": true}     may also be taken concurrently
+    {"and": [node, ...]}                          every child is required
+    {"or": [node, ...]}                           any one child is enough
+    None                                          no course prerequisites
+
+Parsing rules:
+    - "Recommended Preparation" / "Recommended Corequisites" (also spelled
+      "Recommend preparation") and everything after them is dropped, as are
+      grade clauses ("C or better ...")
+    - "Note ..." clauses are dropped up to the next clause keyword, and so
+      are credit exclusions ("Students may only earn credit in either ...")
+    - parentheses group, "or" binds tighter than "and" (as in
+      "A or B and C" = "(A or B) and C"), sentence breaks (";", ".") and
+      plain juxtaposition act as "and"
+    - comma lists take the connective that closes them ("A, B, or C")
+    - "Concurrent", "Prerequisite or concurrent" and "Enforced Concurrent at
+      Enrollment:" mark the courses that follow them, up to the next sentence
+      break, as concurrent
+    - text that names no course (standing, approval, GenEd notes) is ignored
+    - a course never requires itself: leaves naming the compiled course are
+      dropped
+"""
+
+import re
+
+from course_keys import canonical_code
+
+AST_FORMAT = 1
+
+COURSE_PATTERN = r"(?<![A-Z])([A-Z]{2,5})\s*(\d{1,4}[A-Z]?)"
+
+_RECOMMENDED = re.compile(r"Recommend(?:ed)?\s+(?:Preparation|Corequisites?)", re.IGNORECASE)
+# "Note" runs to the next clause ("Note ... standing. Prerequisite MATH 21")
+_NOTE = re.compile(
+    r"\bNote\b.*?(?=\bPrerequisites?\b|\bEnforced\b|\bConcurrent|\b[A-D][+-]?\s+or\s+better\b|$)",
+    re.DOTALL,
+)
+_CREDIT_EXCLUSION = re.compile(
+    r"(?:A\s+student|Students?)\s+may\s+(?:not|only)\s+(?:receive|earn)\s+credit[^.;]*",
+    re.IGNORECASE,
+)
+_GRADE_CLAUSE = re.compile(r"\b[A-D][+-]?\s+or\s+better\b|A student enrolled in this course must receive a grade of")
+_CONCURRENT = re.compile(
+    r"Enforced\s+Concurrent\s+at\s+Enrollment:?|Prerequisites?\s+or\s+concurrent|Concurrent(?:ly)?",
+    re.IGNORECASE,
+)
+# Upper-case connective glued to a department ("ORENGL 137H"); departments
+# have at most five letters, so longer runs cannot be a single code
+_GLUED_CONNECTIVE = re.compile(r"\b(OR|AND)([A-Z]{2,5})(?=\s*\d)")
+_CONCURRENT_MARKER = "\x00"
+_TOKEN = re.compile(COURSE_PATTERN + r"|(\x00)|([()])|([;.])|(,)|((?i:and|or|prerequisites?))")
+
+
+def _tokenize(text):
+    """
+    Split cleaned prerequisite text into tokens: ('course', code, concurrent),
+    ('and',), ('or',), (',',), ('(',), (')',) and ('break',) for sentence
+    breaks and new "Prerequisite" clauses.
+    """
+    tokens = []
+    concurrent = False
+    for match in _TOKEN.finditer(text):
+        dept, number, marker, paren, brk, comma, word = match.groups()
+        if dept:
+            tokens.append(('course', dept + number, concurrent))
+        elif marker:
+            concurrent = True
+        elif paren:
+            tokens.append((paren,))
+        elif comma:
+            tokens.append((',',))
+        elif brk:
+            tokens.append(('break',))
+            concurrent = False
+        else:
+            # Words may be glued to a code ("101orECON 102", "andAGBM 102") but
+            # never to other lower-case letters ("coordinator", "standing")
+            before = text[match.start() - 1] if match.start() else ' '
+            after = text[match.end()] if match.end() < len(text) else ' '
+            if before.islower() or after.islower():
+                continue
+            word = word.lower()
+            if word in ('and', 'or'):
+                tokens.append((word,))
+            else:
+                # A new "Prerequisite" clause ends any concurrent section
+                tokens.append(('break',))
+                concurrent = False
+    return tokens
+
+
+def _resolve_commas(tokens):
+    """Give every comma the connective that closes its list at the same depth."""
+    resolved = []
+    for i, token in enumerate(tokens):
+        if token[0] != ',':
+            resolved.append(token)
+            continue
+        depth = 0
+        connective = 'and'
+        for later in tokens[i + 1:]:
+            kind = later[0]
+            if kind == '(':
+                depth += 1
+            elif kind == ')':
+                if depth == 0: break
+                depth -= 1
+            elif kind == 'break' and depth == 0:
+                break
+            elif kind in ('and', 'or') and depth == 0:
+                connective = kind
+                break
+        # ", or" / ", and": the connective itself follows
+        if i + 1 < len(tokens) and tokens[i + 1][0] in ('and', 'or'):
+            continue
+        resolved.append((connective,))
+    return resolved
+
+
+def _drop_unmatched_parens(tokens):
+    """Remove closing parentheses that close nothing (open ones are closed at the end)."""
+    balanced = []
+    depth = 0
+    for token in tokens:
+        if token[0] == '(':
+            depth += 1
+        elif token[0] == ')':
+            if depth == 0: continue
+            depth -= 1
+        balanced.append(token)
+    return balanced
+
+
+class _Parser:
+    """Recursive descent over the token list: and_expr := or_expr (AND or_expr)*."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def parse(self):
+        return self.parse_and()
+
+    def parse_and(self):
+        children = [self.parse_or()]
+        while self.peek() in ('and', 'break', 'course', '('):
+            if self.peek() in ('and', 'break'):
+                self.pos += 1
+            children.append(self.parse_or())
+        return _make('and', children)
+
+    def parse_or(self):
+        children = [self.parse_primary()]
+        while self.peek() == 'or':
+            self.pos += 1
+            children.append(self.parse_primary())
+        return _make('or', children)
+
+    def parse_primary(self):
+        kind = self.peek()
+        if kind == 'course':
+            _, code, concurrent = self.tokens[self.pos]
+            self.pos += 1
+            return {"course": code, "concurrent": True} if concurrent else {"course": code}
+        if kind == '(':
+            self.pos += 1
+            node = self.parse_and()
+            if self.peek() == ')':
+                self.pos += 1
+            return node
+        if kind is not None and kind != ')':
+            # A connective with nothing before it ("and A"): skip it
+            self.pos += 1
+        return None
+
+
+def _make(op, children):
+    """Build an op node: drops empty children, flattens same-op children and duplicates."""
+    flat = []
+    for child in children:
+        if child is None:
+            continue
+        if op in child:
+            flat.extend(child[op])
+        else:
+            flat.append(child)
+    unique = []
+    for child in flat:
+        if child not in unique:
+            unique.append(child)
+    if not unique:
+        return None
+    if len(unique) == 1:
+        return unique[0]
+    return {op: unique}
+
+
+def _without_course(node, code):
+    """`node` with every leaf naming `code` removed."""
+    if node is None:
+        return None
+    if 'course' in node:
+        return None if canonical_code(node['course']) == code else node
+    op = 'and' if 'and' in node else 'or'
+    return _make(op, [_without_course(child, code) for child in node[op]])
+
+
+def compile_prerequisites(raw_text, course_code=None):
+    """
+    Compile catalog prerequisite text into an AST.
+
+    Args:
+        raw_text: `prerequisites_raw` text of a course (may be empty or None)
+        course_code: Code of the course the text belongs to; mentions of
+            the course itself are not prerequisites
+
+    Returns:
+        dict or None: AST root (see module docstring), None without course prerequisites
+    """
+    if not raw_text or "None" in raw_text:
+        return None
+    text = raw_text.replace("Enforced Prerequisite at Enrollment:", " ")
+    recommended = _RECOMMENDED.search(text)
+    if recommended:
+        text = text[:recommended.start()]
+    text = _NOTE.sub(" ", text)
+    text = _CREDIT_EXCLUSION.sub(" ", text)
+    text = _GRADE_CLAUSE.sub(" ", text)
+    text = _GLUED_CONNECTIVE.sub(lambda m: m.group(0) if len(m.group(0)) <= 5 else f" {m.group(1)} {m.group(2)}", text)
+    text = _CONCURRENT.sub(f" {_CONCURRENT_MARKER} ", text)
+    tokens = _drop_unmatched_parens(_resolve_commas(_tokenize(text)))
+    ast = _Parser(tokens).parse()
+    if course_code:
+        ast = _without_course(ast, canonical_code(course_code))
+    return ast
+
+
+def ast_courses(node):
+    """Every course code named in an AST, in order of appearance."""
+    if node is None:
+        return []
+    if 'course' in node:
+        return [node['course']]
+    codes = []
+    for child in node.get('and') or node.get('or'):
+        codes.extend(code for code in ast_courses(child) if code not in codes)
+    return codes
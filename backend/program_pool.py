@@ -0,0 +1,466 @@
+"""
+Program Pool
+Optional process pool that shards the programs of one /recommend request.
+
+Scoring programs is pure Python, so threads serialize on the GIL. A
+ProgramPool forks its worker processes once, at startup, so every worker
+inherits the catalog through copy-on-write memory instead of receiving it
+pickled. A request only sends the student's courses and the candidate
+positions of each shard. Every worker returns the k best (ranking key,
+position) pairs of its shard (engine.rank_program_keys()), and the parent
+merges them with the same sort key. The result is identical to ranking every
+program in one process.
+
+Each worker is connected to the parent by its own pipe, and a request checks
+out idle workers for its shards; when fewer than two are idle (other requests
+hold them), it ranks in-process instead of queueing. Dispatching costs a pipe
+round trip per shard, so should_use() only sends requests whose estimated
+work reaches the break-even point measured by
+scripts/benchmark_program_pool.py (see break_even()).
+
+Forking is only safe while the process has a single thread: start() is called
+at startup, before any serving or watcher thread exists, and refuses to fork
+otherwise. A reload never forks. load() sends the new catalog state to the
+running workers, one at a time, and a worker serves requests for that state
+once it has unpickled it. Until then, requests for the new state that cannot
+find workers holding it are computed in-process.
+
+The same workers compute whole requests for /recommend/batch: map() sends
+the students in chunks, and each worker runs the per-student function
+against the catalog state it holds.
+
+By default the pool runs one worker per CPU (PROGRAM_POOL_WORKERS=0 turns
+it off). It needs the fork start method (Linux, and macOS when selected);
+elsewhere it stays disabled.
+"""
+
+import heapq
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+from multiprocessing.connection import wait
+
+import recommendation_engine as engine
+
+# Catalog state the worker serves: inherited at the fork, replaced by load()
+_catalog = None
+# True inside a worker process (its copy of the pool must not be used)
+_in_worker = False
+
+# Measured with scripts/benchmark_program_pool.py on the bundled catalog
+# (75 programs, 60 profiles, branch-and-bound ranking, CPython 3.11): one
+# program evaluation costs about 7.1 us, every course of the history adds
+# about 1/270 of that, every extra shard repeats about 20 us of setup (its
+# prerequisite cost evaluator), and sending shards to the workers and merging
+# their results costs about 80 us per request (pipe round trips, pickling the
+# profile and the shard results). Over w workers the sharded request takes
+# DISPATCH_US + (evaluations * EVALUATION_US + (w - 1) * SHARD_US) / w.
+EVALUATION_US = 7.1
+COURSES_PER_EVALUATION = 270
+DISPATCH_US = 80
+SHARD_US = 20
+
+
+def break_even(workers):
+    """Estimated work (program evaluations) above which sharding over `workers` pays off."""
+    if workers < 2:
+        return float('inf')
+    saved = 1 - 1 / workers
+    return (DISPATCH_US + SHARD_US * saved) / (EVALUATION_US * saved)
+
+
+def default_workers():
+    """One worker per CPU where workers can be forked, else 0 (off)."""
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return 0
+    return os.cpu_count() or 1
+
+
+def _rank_shard(shard, k, user_history, major_courses, gen_ed_needs):
+    """
+    Worker: the k best programs of one shard.
+
+    Args:
+        shard: (candidate position, index into catalog.programs) pairs
+        k: Number of programs to keep
+        user_history, major_courses, gen_ed_needs: The StudentProfile inputs
+
+    Returns:
+        list: (ranking_key, candidate position) pairs, best first
+    """
+    catalog = _catalog
+    profile = engine.StudentProfile(user_history, major_courses, gen_ed_needs)
+    programs = [catalog.programs[program_index] for _, program_index in shard]
+    ranked = engine.rank_program_keys(programs, k, profile, catalog.courses,
+                                      catalog.equivalency_map, catalog.prereq_config)
+    return [(key, shard[i][0]) for key, i in ranked]
+
+
+def _map_chunk(fn, items):
+    """Worker: fn(catalog, item) for every item of a chunk."""
+    return [fn(_catalog, item) for item in items]
+
+
+def _load(payload):
+    """Worker: serve the pickled catalog state from now on."""
+    global _catalog
+    _catalog = pickle.loads(payload)
+
+
+_TASKS = {'rank': _rank_shard, 'map': _map_chunk, 'load': _load}
+
+
+def _serve(conn, inherited):
+    """
+    Worker process: run the tasks the parent sends on `conn` until it is
+    closed. Replies are ('ok', result) or ('error', exception).
+    """
+    global _in_worker
+    _in_worker = True
+    # Ctrl+C reaches the whole process group; the parent decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Pipe ends of the parent (ours and the other workers'): closing them
+    # here lets every worker see EOF when the parent exits
+    for other in inherited:
+        other.close()
+    while True:
+        try:
+            task, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = ('ok', _TASKS[task](*args))
+        except Exception as e:
+            reply = ('error', e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            conn.send(('error', RuntimeError(f"{task} result could not be sent: {e}")))
+
+
+class WorkerError(Exception):
+    """A worker process died or its pipe broke."""
+
+
+class _Worker:
+    """Parent side of one worker process."""
+
+    __slots__ = ('process', 'conn', 'catalog')
+
+    def __init__(self, process, conn, catalog):
+        self.process = process
+        self.conn = conn
+        # Catalog state the worker serves
+        self.catalog = catalog
+
+    def send(self, task, *args):
+        try:
+            self.conn.send((task, args))
+        except (OSError, ValueError) as e:
+            raise WorkerError(f"worker {self.process.pid}: {e}")
+
+    def receive(self):
+        """The reply to the task sent last: (ok, result or exception)."""
+        try:
+            status, result = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise WorkerError(f"worker {self.process.pid} exited ({e or 'pipe closed'})")
+        return status == 'ok', result
+
+    def stop(self, timeout=5.0):
+        self.conn.close()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class ProgramPool:
+    """
+    Worker processes forked once with the startup catalog, for ranking the
+    candidate programs of large requests and computing batches in parallel.
+
+    Args:
+        workers: Number of worker processes (0 disables the pool)
+        threshold: Smallest estimated work (see estimated_work()) sent to the
+                   pool (default: break_even(workers))
+    """
+
+    def __init__(self, workers=0, threshold=None):
+        self.workers = workers
+        self.threshold = break_even(workers) if threshold is None else threshold
+        self._workers = []
+        self._idle = []
+        self._lock = threading.Condition()
+        self._stats = {"requests": 0, "shards": 0, "batches": 0, "batch_items": 0, "forks": 0, "loads": 0,
+                       "busy": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Pool configured by PROGRAM_POOL_WORKERS (default: default_workers()) and PROGRAM_POOL_THRESHOLD."""
+        workers = int(os.getenv('PROGRAM_POOL_WORKERS', default_workers()))
+        if workers > 0 and 'fork' not in multiprocessing.get_all_start_methods():
+            print("⚠️  PROGRAM_POOL_WORKERS needs the fork start method, scoring in-process")
+            workers = 0
+        threshold = os.getenv('PROGRAM_POOL_THRESHOLD')
+        return cls(workers, float(threshold) if threshold else None)
+
+    @property
+    def enabled(self):
+        # A worker's inherited copy of the pool is never used: no nested pools
+        return self.workers > 0 and not _in_worker
+
+    @staticmethod
+    def estimated_work(program_count, profile):
+        """Program evaluations a ranking costs, counting the history's courses (see COURSES_PER_EVALUATION)."""
+        return program_count * (1 + len(profile.combined_history) / COURSES_PER_EVALUATION)
+
+    def should_use(self, program_count, profile):
+        """True if ranking `program_count` programs for `profile` is worth sharding."""
+        return self.enabled and program_count > 1 and self.estimated_work(program_count, profile) >= self.threshold
+
+    def start(self, catalog):
+        """
+        Fork the workers with `catalog`. Only call it while this process has
+        a single thread (at startup): a fork copies locks other threads may
+        hold. Later catalogs are sent with load().
+
+        Returns:
+            bool: True if the workers are running
+        """
+        global _catalog
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._workers:
+                return True
+            if threading.active_count() > 1:
+                print(f"⚠️  Program pool not started: {threading.active_count()} threads are running, "
+                      f"forking is only safe before serving starts")
+                return False
+            context = multiprocessing.get_context('fork')
+            _catalog = catalog
+            for _ in range(self.workers):
+                parent_end, child_end = context.Pipe()
+                inherited = [worker.conn for worker in self._workers] + [parent_end]
+                process = context.Process(target=_serve, args=(child_end, inherited), daemon=True)
+                process.start()
+                child_end.close()
+                self._workers.append(_Worker(process, parent_end, catalog))
+            self._idle = list(self._workers)
+            self._stats['forks'] += 1
+        return True
+
+    def load(self, catalog):
+        """
+        Send a newly published catalog state to the running workers (a
+        CatalogHolder listener). Each worker switches to it as soon as it is
+        idle and has unpickled it; nothing is forked.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            pending = [worker for worker in self._workers if worker.catalog is not catalog]
+        if not pending:
+            return
+        try:
+            payload = pickle.dumps(catalog, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"⚠️  Program pool cannot send the new catalog ({e}), computing its requests in-process")
+            return
+        for worker in pending:
+            with self._lock:
+                while worker in self._workers and worker not in self._idle:
+                    self._lock.wait()
+                if worker not in self._workers:
+                    continue
+                self._idle.remove(worker)
+            try:
+                worker.send('load', payload)
+                ok, result = worker.receive()
+            except WorkerError as e:
+                self._remove([worker], e)
+                continue
+            if ok:
+                worker.catalog = catalog
+            else:
+                print(f"⚠️  Program pool worker {worker.process.pid} could not load the catalog: {result}")
+            self._release([worker])
+        with self._lock:
+            self._stats['loads'] += 1
+
+    def _checkout(self, catalog, limit):
+        """Up to `limit` idle workers serving `catalog`, now reserved for the caller."""
+        with self._lock:
+            workers = [worker for worker in self._idle if worker.catalog is catalog][:limit]
+            for worker in workers:
+                self._idle.remove(worker)
+            return workers
+
+    def _release(self, workers):
+        with self._lock:
+            self._idle.extend(worker for worker in workers if worker in self._workers)
+            self._lock.notify_all()
+
+    def _remove(self, workers, error):
+        """Stop workers whose pipe broke; their work is computed in-process."""
+        print(f"⚠️  Program pool failed ({error}), computing in-process")
+        with self._lock:
+            self._stats['failures'] += 1
+            for worker in workers:
+                if worker in self._workers:
+                    self._workers.remove(worker)
+            self._lock.notify_all()
+        for worker in workers:
+            worker.stop(timeout=0)
+
+    def holds(self, catalog):
+        """True if a running worker serves `catalog`."""
+        with self._lock:
+            return any(worker.catalog is catalog for worker in self._workers)
+
+    def _run(self, workers, tasks):
+        """
+        Run `tasks` ((task, args) pairs) on the reserved `workers`, handing
+        the next task to whichever worker finishes first, and release the
+        workers afterwards.
+
+        Returns:
+            list: Results in the order of `tasks`
+
+        Raises:
+            WorkerError: A worker died (it is removed; the others are released)
+            Exception: The first exception a task raised
+        """
+        results = [None] * len(tasks)
+        error = None
+        broken = []
+        running = {}
+        idle = list(workers)
+        queue = iter(enumerate(tasks))
+        while True:
+            while idle and error is None and not broken:
+                item = next(queue, None)
+                if item is None:
+                    break
+                worker = idle.pop()
+                index, (task, args) = item
+                try:
+                    worker.send(task, *args)
+                except WorkerError as e:
+                    broken.append((worker, e))
+                    continue
+                running[worker.conn] = (worker, index)
+            if not running:
+                break
+            # After a failure, only the replies in flight are collected
+            for conn in wait(list(running)):
+                worker, index = running.pop(conn)
+                try:
+                    ok, result = worker.receive()
+                except WorkerError as e:
+                    broken.append((worker, e))
+                    continue
+                if ok:
+                    results[index] = result
+                elif error is None:
+                    error = result
+                idle.append(worker)
+        if broken:
+            self._remove([worker for worker, _ in broken], broken[0][1])
+        self._release(idle)
+        if broken:
+            raise broken[0][1]
+        if error is not None:
+            raise error
+        return results
+
+    def rank(self, catalog, candidates, k, profile, exact_scores=None):
+        """
+        The k best candidate programs, like engine.rank_programs() over
+        [catalog.programs[i] for i in candidates]. Ranked in-process when
+        fewer than two idle workers serve `catalog`.
+
+        Args:
+            catalog: CatalogState the request reads
+            candidates: Indexes into catalog.programs
+            k: Number of programs to return
+            profile: StudentProfile for the request
+            exact_scores: Optional {candidate position: (gap, overlap, optimizations)}
+                          already known; those programs are not evaluated
+
+        Returns:
+            list: Candidate positions, best first
+        """
+        exact_scores = exact_scores or {}
+        pending = [(j, i) for j, i in enumerate(candidates) if j not in exact_scores]
+        pairs = [(engine.ranking_key(*scores), j) for j, scores in exact_scores.items()]
+        workers = self._checkout(catalog, min(self.workers, len(pending))) if self.enabled else []
+        if len(workers) < 2:
+            if workers:
+                self._release(workers)
+                with self._lock:
+                    self._stats['busy'] += 1
+            return engine.rank_programs([catalog.programs[i] for i in candidates], k, profile, catalog.courses,
+                                        catalog.equivalency_map, catalog.prereq_config, exact_scores=exact_scores)
+        shard_count = len(workers)
+        tasks = [('rank', (pending[w::shard_count], k, profile.user_history, profile.major_courses,
+                           profile.gen_ed_needs))
+                 for w in range(shard_count)]
+        try:
+            for shard in self._run(workers, tasks):
+                pairs.extend(shard)
+        except WorkerError:
+            return engine.rank_programs([catalog.programs[i] for i in candidates], k, profile, catalog.courses,
+                                        catalog.equivalency_map, catalog.prereq_config, exact_scores=exact_scores)
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['shards'] += shard_count
+        return [j for _, j in heapq.nsmallest(k, pairs)]
+
+    def map(self, catalog, fn, items):
+        """
+        [fn(catalog, item) for item in items], computed by the idle workers
+        serving `catalog` (in this process when there are none).
+
+        Args:
+            catalog: CatalogState the items are computed against
+            fn: Module-level function (pickled by name), called as fn(catalog, item)
+            items: Picklable arguments, one call each
+
+        Returns:
+            list: The results, in the order of `items`
+        """
+        items = list(items)
+        workers = self._checkout(catalog, self.workers) if self.enabled and len(items) > 1 else []
+        if not workers:
+            return [fn(catalog, item) for item in items]
+        # A few chunks per worker: fewer round trips, still balanced
+        chunk_count = min(len(items), len(workers) * 4)
+        bounds = [len(items) * c // chunk_count for c in range(chunk_count + 1)]
+        tasks = [('map', (fn, items[start:end])) for start, end in zip(bounds, bounds[1:])]
+        try:
+            results = [result for chunk in self._run(workers, tasks) for result in chunk]
+        except WorkerError:
+            return [fn(catalog, item) for item in items]
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['batch_items'] += len(items)
+        return results
+
+    def shutdown(self):
+        """Stop the workers (they finish the task at hand); requests are computed in-process from then on."""
+        with self._lock:
+            while len(self._idle) < len(self._workers):
+                self._lock.wait()
+            workers, self._workers, self._idle = self._workers, [], []
+        for worker in workers:
+            worker.stop()
+
+    def status(self):
+        """Configuration and counters (for the admin endpoint)."""
+        with self._lock:
+            return dict(self._stats, workers=self.workers, threshold=self.threshold,
+                        running=len(self._workers), idle=len(self._idle))
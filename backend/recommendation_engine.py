@@ -1,5 +1,15 @@
+import hashlib
+import heapq
+import itertools
 import json
+import pickle
 import re
+import tempfile
+from bisect import bisect_left
+
+from course_keys import canonical_code, split_code
+from course_store import CourseRecord, compact_courses, patch_courses
+from prerequisite_ast import compile_prerequisites
 
 # --- 1. CONFIGURATION ---
 import os
@@ -9,8 +19,34 @@ DATA_DIR = os.path.join(BASE_DIR, 'data')
 PROGRAMS_FILE = os.path.join(DATA_DIR, 'academic_programs_rules.json')
 WORLD_CAMPUS_MASTER = os.path.join(DATA_DIR, 'world_campus_courses_master.json')
 GENED_SUPPLEMENTARY = os.path.join(DATA_DIR, 'gened_supplementary.json')    
+SATISFIERS_FILE = os.path.join(DATA_DIR, 'prerequisite_satisfiers.json')
+SATISFIERS_FORMAT = 1
+EQUIVALENCIES_FILE = os.path.join(DATA_DIR, 'course_equivalencies.json')
+PREREQ_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'prerequisite_config.json')
+
+# Binary snapshot of the loaded and compiled catalog (CATALOG_SNAPSHOT=off disables it)
+SNAPSHOT_FILE = os.getenv('CATALOG_SNAPSHOT', os.path.join(DATA_DIR, 'catalog_snapshot.pickle'))
+SNAPSHOT_FORMAT = 1
+
+class CourseCatalog(dict):
+    """
+    Courses database (normalized code -> course dict) that also carries the
+    indexes derived from it at load time. Behaves exactly like a plain dict, so
+    callers and tests may keep passing ordinary dicts to the engine.
+    """
+    prereq_graph = None
+    satisfier_index = None
+    # Inverted course -> program index over the programs compiled with this catalog
+    program_index = None
+    # Shared attribute tables and cold text store of the CourseRecord values
+    course_table = None
+    # Distinct for every compiled catalog, so caches can tell a reload happened
+    data_version = 0
+
+_data_versions = itertools.count(1)
 
-def load_data():
+def _load_sources():
+    """Parse the JSON source files and compile the catalog."""
     print("Loading database...")
     try:
         # Load programs (unchanged)
@@ -30,8 +66,7 @@ def load_data():
         
         # Load prerequisite configuration
         try:
-            prereq_config_path = os.path.join(os.path.dirname(__file__), 'config', 'prerequisite_config.json')
-            with open(prereq_config_path, 'r') as f:
+            with open(PREREQ_CONFIG_FILE, 'r') as f:
                 prereq_config = json.load(f)
             print(f"  → Loaded prerequisite config (hierarchy rules: {prereq_config.get('hierarchy_rules', {}).get('enabled', False)})")
         except FileNotFoundError:
@@ -42,17 +77,20 @@ def load_data():
         
         # Load course equivalencies
         try:
-            equivalency_path = os.path.join(DATA_DIR, 'course_equivalencies.json')
-            with open(equivalency_path, 'r') as f:
+            with open(EQUIVALENCIES_FILE, 'r') as f:
                 equivalency_map = json.load(f)
             print(f"  → Loaded {len(equivalency_map)} course equivalencies")
         except FileNotFoundError:
             print(f"  ⚠️  course_equivalencies.json not found, equivalencies disabled")
             equivalency_map = {}
         
+        satisfier_index = load_satisfier_index(equivalency_map, prereq_config)
+        
         print(f"Loaded {len(programs_db)} Programs and {len(courses_db)} Course Definitions.")
         print(f"  → {len(master_courses)} World Campus courses")
         print(f"  → {len(supplementary_courses)} supplementary courses")
+        programs_db, courses_db = compile_catalog(programs_db, courses_db, satisfier_index)
+        print(f"  → Compiled evaluation plans for {len(programs_db)} programs")
         return programs_db, courses_db, equivalency_map, prereq_config
     except FileNotFoundError as e:
         print(f"CRITICAL ERROR: Missing file. {e}")
@@ -60,21 +98,133 @@ def load_data():
 
 # --- 2. PARSING & UTILS ---
 
+def catalog_data_files():
+    """The data and config files a compiled catalog is built from."""
+    return [
+        PROGRAMS_FILE, WORLD_CAMPUS_MASTER, GENED_SUPPLEMENTARY, EQUIVALENCIES_FILE,
+        SATISFIERS_FILE, PREREQ_CONFIG_FILE,
+    ]
+
+def catalog_source_hash():
+    """
+    Content hash of everything a catalog snapshot is derived from: the data
+    files, the prerequisite config and the engine code that compiles them.
+    """
+    digest = hashlib.sha256(f"snapshot-format-{SNAPSHOT_FORMAT}".encode())
+    engine_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = catalog_data_files() + [
+        os.path.join(engine_dir, 'recommendation_engine.py'),
+        os.path.join(engine_dir, 'prerequisite_ast.py'),
+        os.path.join(engine_dir, 'course_keys.py'),
+        os.path.join(engine_dir, 'course_store.py'),
+    ]
+    for path in sources:
+        digest.update(os.path.basename(path).encode())
+        try:
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        except FileNotFoundError:
+            digest.update(b"missing")
+    return digest.hexdigest()
+
+def load_catalog_snapshot(path, source_hash):
+    """
+    Load (programs_db, courses_db, equivalency_map, prereq_config) from a
+    snapshot written by save_catalog_snapshot(), or None when the file is
+    missing, unreadable or was built from different sources.
+
+    Snapshots are pickles: only load files this application wrote itself.
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = pickle.load(f)
+            if header != {"format": SNAPSHOT_FORMAT, "source_hash": source_hash}:
+                print(f"  ⚠️  Catalog snapshot is stale, rebuilding")
+                return None
+            programs_db, courses_db, equivalency_map, prereq_config = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"  ⚠️  Could not read catalog snapshot ({e}), rebuilding")
+        return None
+    # A new load is a new catalog as far as result caches are concerned
+    courses_db.data_version = next(_data_versions)
+    return programs_db, courses_db, equivalency_map, prereq_config
+
+def save_catalog_snapshot(path, source_hash, data):
+    """
+    Write a catalog snapshot atomically: a temporary file in the same
+    directory is renamed over the old snapshot, so concurrent readers see
+    either the old or the new file, never a partial one. Cold course text is
+    written first to a side file (`<snapshot>.cold`) that both this process
+    and later snapshot loads memory-map.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = None
+    try:
+        # Cold course text goes to a memory-mapped side file; the pickle only
+        # references it
+        table = getattr(data[1], 'course_table', None)
+        if table is not None:
+            cold_path = os.path.splitext(path)[0] + '.cold'
+            table.cold.save(cold_path)
+            table.cold.attach(cold_path)
+        with tempfile.NamedTemporaryFile('wb', dir=directory, prefix='.catalog_snapshot.', delete=False) as f:
+            tmp_path = f.name
+            pickle.dump({"format": SNAPSHOT_FORMAT, "source_hash": source_hash}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        print(f"  ⚠️  Could not write catalog snapshot ({e})")
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return False
+
+def load_data(snapshot_path=SNAPSHOT_FILE):
+    """
+    Load the compiled catalog.
+
+    Uses the binary snapshot at `snapshot_path` when it was built from the
+    current sources, otherwise parses the JSON files and writes a new snapshot.
+
+    Args:
+        snapshot_path: Snapshot file, or None / "" / "off" to always parse the sources
+
+    Returns:
+        tuple: (programs_db, courses_db, equivalency_map, prereq_config)
+    """
+    if not snapshot_path or snapshot_path == 'off':
+        return _load_sources()
+
+    source_hash = catalog_source_hash()
+    data = load_catalog_snapshot(snapshot_path, source_hash)
+    if data is not None:
+        print(f"Loaded catalog snapshot: {len(data[0])} Programs and {len(data[1])} Course Definitions.")
+        return data
+
+    data = _load_sources()
+    if data[0] and save_catalog_snapshot(snapshot_path, source_hash, data):
+        print(f"  → Saved catalog snapshot to {os.path.basename(snapshot_path)}")
+    return data
+
 def normalize_code(code):
-    if not code: return ""
-    return code.replace(" ", "").replace("\xa0", "").upper()
+    """Canonical course code: "ENGL 015", "engl15" -> "ENGL15" (see course_keys.py)."""
+    return canonical_code(code)
 
 def parse_course_string(course_code):
-    if not course_code: return None, 0
-    clean = normalize_code(course_code)
-    match = re.match(r"([A-Z]+)(\d+)", clean)
-    if match:
-        return match.group(1), int(match.group(2))
-    return None, 0
+    return split_code(course_code)
 
 def get_course_credits(code, courses_db, default=3.0):
     norm_code = normalize_code(code)
-    if norm_code in courses_db:
+    course = courses_db.get(norm_code)
+    if isinstance(course, CourseRecord):
+        # Parsed once when the record was built
+        return course.credits if course.credits is not None else default
+    if course is not None:
         try:
             val = str(courses_db[norm_code].get('credits', default)).split('-')[0]
             return float(val)
@@ -93,6 +243,163 @@ def get_course_prereqs(code, courses_db):
 def extract_course_codes(text_chunk):
     return re.findall(r"([A-Z]{2,5}\s+\d{1,4}[A-Z]?)", text_chunk)
 
+def equivalency_map_hash(equivalency_map):
+    """Content hash of an equivalency map (matches scripts/generate_equivalencies.py)."""
+    canonical = json.dumps(equivalency_map, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class SatisfierIndex:
+    """
+    Prerequisite closure precomputed by scripts/generate_equivalencies.py.
+
+    Attributes:
+        satisfiers: prerequisite code -> frozenset of catalog courses that satisfy it
+        satisfies: catalog course -> frozenset of prerequisite codes it satisfies
+        catalog_courses: every course code the closure was computed over
+    """
+
+    def __init__(self, artifact):
+        # Keys and members are canonicalized, whatever spelling the artifact was built with
+        self.satisfiers = self._canonical_sets(artifact.get('satisfiers', {}))
+        self.satisfies = self._canonical_sets(artifact.get('satisfies', {}))
+        self.catalog_courses = frozenset(normalize_code(code) for code in artifact.get('catalog_courses', []))
+
+    @staticmethod
+    def _canonical_sets(mapping):
+        merged = {}
+        for code, codes in mapping.items():
+            merged.setdefault(normalize_code(code), set()).update(normalize_code(c) for c in codes)
+        return {code: frozenset(codes) for code, codes in merged.items()}
+
+    def satisfied_by(self, codes):
+        """All prerequisite codes satisfied by any of the given catalog courses."""
+        satisfied = set()
+        for code in codes:
+            satisfied.update(self.satisfies.get(code, ()))
+        return satisfied
+
+def load_satisfier_index(equivalency_map, prereq_config, path=SATISFIERS_FILE):
+    """
+    Load prerequisite_satisfiers.json if it was built from the same equivalency
+    map and hierarchy rules that are loaded now. Returns None otherwise, in which
+    case prerequisite checks use the three tiers directly.
+    """
+    try:
+        with open(path, 'r') as f:
+            artifact = json.load(f)
+    except FileNotFoundError:
+        print(f"  ⚠️  prerequisite_satisfiers.json not found, using tiered prerequisite checks")
+        return None
+
+    if not satisfier_artifact_matches(artifact, equivalency_map, prereq_config):
+        print(f"  ⚠️  prerequisite_satisfiers.json is stale (re-run generate_equivalencies.py), ignoring it")
+        return None
+
+    index = SatisfierIndex(artifact)
+    print(f"  → Loaded satisfier index for {len(index.satisfiers)} prerequisite codes")
+    return index
+
+def satisfier_artifact_matches(artifact, equivalency_map, prereq_config):
+    """True if a satisfier artifact (or its header) was built from this equivalency map and hierarchy rules."""
+    hierarchy_rules = prereq_config.get('hierarchy_rules', {}) if prereq_config else {}
+    expected_rules = {
+        "same_department_higher_level": bool(hierarchy_rules.get('same_department_higher_level', False)),
+        "minimum_level_difference": hierarchy_rules.get('minimum_level_difference', 0)
+    }
+    return (artifact.get('format') == SATISFIERS_FORMAT
+            and artifact.get('hierarchy_rules') == expected_rules
+            and artifact.get('equivalencies_sha256') == equivalency_map_hash(equivalency_map or {}))
+
+class HistoryIndex:
+    """
+    Per-request index of a user's history used for prerequisite checks.
+
+    Built once per request so that every tier of course_satisfies_prerequisite
+    is a set lookup or a binary search instead of a scan over the history:
+
+    Tier 1: `codes` - normalized history set
+    Tier 2: `equivalent_satisfied` - required codes whose listed equivalents were taken
+    Tier 3: `by_department` - department -> sorted course numbers taken
+
+    When a SatisfierIndex is supplied, any prerequisite it covers is answered by
+    a single set intersection with the history; only courses outside the
+    catalog it was built from still go through the hierarchy tier.
+    """
+
+    def __init__(self, user_history, equivalency_map=None, prereq_config=None, satisfier_index=None):
+        self.codes = {normalize_code(c) for c in user_history}
+        self.by_department = self._index_departments(self.codes)
+
+        self.satisfier_index = satisfier_index
+        if satisfier_index is not None:
+            self.off_catalog_departments = self._index_departments(self.codes - satisfier_index.catalog_courses)
+
+        self.equivalent_satisfied = set()
+        if equivalency_map:
+            for required, entry in equivalency_map.items():
+                if any(normalize_code(equiv) in self.codes for equiv in entry.get('equivalents', [])):
+                    self.equivalent_satisfied.add(normalize_code(required))
+
+        hierarchy_rules = prereq_config.get('hierarchy_rules', {}) if prereq_config else {}
+        self.hierarchy_enabled = bool(hierarchy_rules.get('same_department_higher_level', False))
+        self.min_diff = hierarchy_rules.get('minimum_level_difference', 0)
+
+    @staticmethod
+    def _index_departments(codes):
+        by_department = {}
+        for norm_code in codes:
+            dept, number = split_code(norm_code)
+            if dept:
+                by_department.setdefault(dept, []).append(number)
+        for numbers in by_department.values():
+            numbers.sort()
+        return by_department
+
+    def __contains__(self, norm_code):
+        return norm_code in self.codes
+
+    def __iter__(self):
+        return iter(self.codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def satisfies(self, required_code):
+        norm_required = normalize_code(required_code)
+
+        if self.satisfier_index is not None:
+            satisfiers = self.satisfier_index.satisfiers.get(norm_required)
+            if satisfiers is not None:
+                if not satisfiers.isdisjoint(self.codes):
+                    return True
+                return self._higher_level_match(norm_required, self.off_catalog_departments)
+
+        # Tier 1: Exact match
+        if norm_required in self.codes:
+            return True
+
+        # Tier 2: Equivalency map
+        if norm_required in self.equivalent_satisfied:
+            return True
+
+        # Tier 3: Same-department higher-level courses
+        return self._higher_level_match(norm_required, self.by_department)
+
+    def _higher_level_match(self, norm_required, by_department):
+        if not self.hierarchy_enabled:
+            return False
+        req_dept, req_num = split_code(norm_required)
+        numbers = by_department.get(req_dept) if req_dept and req_num > 0 else None
+        if not numbers:
+            return False
+        # Any course in a higher level range (200-level satisfies 100-level) matches.
+        # Within the same level range the number must be strictly greater, or at
+        # least minimum_level_difference greater when that is configured.
+        # Fix Issue 3.2: prevents ECON 104 from satisfying ECON 102 once min_diff is set
+        next_level = (req_num // 100) * 100 + 100
+        same_level_min = req_num + self.min_diff if self.min_diff > 0 else req_num + 1
+        return bisect_left(numbers, min(same_level_min, next_level)) < len(numbers)
+
 def course_satisfies_prerequisite(required_code, user_history, equivalency_map=None, prereq_config=None):
     """
     Intelligent prerequisite checking with three tiers:
@@ -103,60 +410,18 @@ def course_satisfies_prerequisite(required_code, user_history, equivalency_map=N
     
     Args:
         required_code: The prerequisite course code
-        user_history: List of normalized course codes from user's transcript
+        user_history: List of normalized course codes from user's transcript, or a
+                      HistoryIndex built once per request (its own equivalency map
+                      and config are used in that case)
         equivalency_map: Dictionary of course equivalencies
         prereq_config: Configuration dict with hierarchy rules
     
     Returns:
         Boolean indicating if prerequisite is satisfied
     """
-    norm_required = normalize_code(required_code)
-    
-    # Tier 1: Exact match
-    if norm_required in user_history:
-        return True
-    
-    # Tier 2: Check equivalency map
-    if equivalency_map and norm_required in equivalency_map:
-        equivalents = equivalency_map[norm_required].get('equivalents', [])
-        for equiv in equivalents:
-            if normalize_code(equiv) in user_history:
-                return True
-    
-    # Tier 3: Check same-department higher-level courses (if enabled)
-    if prereq_config and prereq_config.get('hierarchy_rules', {}).get('same_department_higher_level', False):
-        req_dept, req_num = parse_course_string(required_code)
-        min_diff = prereq_config.get('hierarchy_rules', {}).get('minimum_level_difference', 0)
-        
-        if req_dept and req_num > 0:
-            # Calculate level range for required course (100-level, 200-level, etc.)
-            req_level_range = (req_num // 100) * 100
-            
-            for user_course in user_history:
-                user_dept, user_num = parse_course_string(user_course)
-                if user_dept == req_dept:
-                    user_level_range = (user_num // 100) * 100
-                    
-                    # Match if in a higher level range (e.g., 200-level satisfies 100-level)
-                    if user_level_range > req_level_range:
-                        return True
-                    # Fix Issue 3.2: For same level range, require course number to be strictly greater
-                    # This prevents ECON 104 from satisfying ECON 102 (104 > 102 but both are 100-level)
-                    # But allows MATH 141 to satisfy MATH 140 (141 > 140, both 100-level)
-                    elif user_level_range == req_level_range:
-                        # If min_diff is set, use it; otherwise require strictly greater
-                        if min_diff > 0:
-                            if user_num >= req_num + min_diff:
-                                return True
-                        else:
-                            # No min_diff specified: require strictly greater course number
-                            # This allows MATH 141 > MATH 140, but prevents ECON 104 > ECON 102
-                            # (Actually both would match, so this might need different logic)
-                            # For now, allow if strictly greater
-                            if user_num > req_num:
-                                return True
-    
-    return False
+    if not isinstance(user_history, HistoryIndex):
+        user_history = HistoryIndex(user_history, equivalency_map, prereq_config)
+    return user_history.satisfies(required_code)
 
 def parse_prerequisites_to_tree(raw_text):
     if not raw_text or "None" in raw_text: return []
@@ -171,39 +436,246 @@ def parse_prerequisites_to_tree(raw_text):
     return logic_tree
 
 # --- 3. COST CALCULATOR ---
+# The prerequisite graph is built once per catalog. Cycles are condensed into
+# strongly connected components so that every node outside a cycle has a cost
+# that depends only on the user's history and can be memoized per request.
 
-def calculate_recursive_cost(code, user_history, courses_db, visited=None, known_credits=None, equivalency_map=None, prereq_config=None):
-    norm_code = normalize_code(code)
-    
-    # Use intelligent prerequisite checking
-    if course_satisfies_prerequisite(code, user_history, equivalency_map, prereq_config):
-        return 0
-    
-    if visited is None: visited = set()
-    if norm_code in visited: return 0
-    visited.add(norm_code)
+def _strongly_connected_components(edges):
+    """Iterative Tarjan over the prerequisite graph. Returns {node: component_id}."""
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    component = {}
+    next_index = 0
+    next_component = 0
 
-    if norm_code in courses_db:
-        own_cost = get_course_credits(norm_code, courses_db)
-    elif known_credits is not None:
-        own_cost = float(known_credits)
-    else:
-        own_cost = 3.0
-    
-    if norm_code not in courses_db: return own_cost 
+    for root in edges:
+        if root in index_of: continue
+        work = [(root, iter([child for child in edges[root] if child in edges]))]
+        index_of[root] = lowlink[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack.add(root)
 
-    raw_prereqs = courses_db[norm_code].get('prerequisites_raw', '')
-    logic_tree = parse_prerequisites_to_tree(raw_prereqs)
-    
-    total_prereq_cost = 0
-    for or_group in logic_tree:
-        group_costs = []
-        for option in or_group:
-            cost = calculate_recursive_cost(option, user_history, courses_db, visited.copy(), None, equivalency_map, prereq_config)
-            group_costs.append(cost)
-        if group_costs: total_prereq_cost += min(group_costs)
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in index_of:
+                    index_of[child] = lowlink[child] = next_index
+                    next_index += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter([grandchild for grandchild in edges[child] if grandchild in edges])))
+                    advanced = True
+                    break
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[child])
+            if advanced: continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component[member] = next_component
+                    if member == node: break
+                next_component += 1
+
+    return component
+
+def _compile_ast(node):
+    """
+    Prerequisite AST (see prerequisite_ast.py) -> evaluation tree: a normalized
+    course code, or (is_and, children) for AND / OR nodes, or None.
+    """
+    if node is None:
+        return None
+    if 'course' in node:
+        return normalize_code(node['course'])
+    is_and = 'and' in node
+    children = tuple(c for c in (_compile_ast(child) for child in node['and' if is_and else 'or']) if c is not None)
+    if not children:
+        return None
+    if len(children) == 1:
+        return children[0]
+    return (is_and, children)
+
+def _tree_courses(tree, codes):
+    if tree is None:
+        return codes
+    if isinstance(tree, str):
+        if tree not in codes: codes.append(tree)
+        return codes
+    for child in tree[1]:
+        _tree_courses(child, codes)
+    return codes
+
+def prerequisite_codes(course):
+    """Normalized codes of the courses named in a course's prerequisites."""
+    return tuple(_tree_courses(_compile_ast(course_prerequisite_ast(course)), []))
+
+def course_prerequisite_ast(course):
+    """
+    A course's prerequisite AST: the `prerequisites_ast` compiled by the data
+    build, or compiled from `prerequisites_raw` for data that predates it.
+    """
+    if 'prerequisites_ast' in course:
+        return course['prerequisites_ast']
+    return compile_prerequisites(course.get('prerequisites_raw', ''), course.get('courseCode'))
+
+class PrerequisiteGraph:
+    """
+    Prerequisite structure for every course in a catalog.
+
+    Attributes:
+        trees: normalized code -> evaluation tree of its prerequisite AST
+               (normalized code, (is_and, children) or None)
+        edges: normalized code -> prerequisite courses named in its tree
+        credits: normalized code -> parsed credit value
+        component: normalized code -> strongly connected component id
+    """
+
+    def __init__(self, courses_db):
+        self.trees = {}
+        self.edges = {}
+        self.credits = {}
+        for norm_code in courses_db:
+            self._add(norm_code, courses_db)
+        self.component = _strongly_connected_components(self.edges)
+
+    def _add(self, norm_code, courses_db):
+        self.credits[norm_code] = get_course_credits(norm_code, courses_db)
+        tree = _compile_ast(course_prerequisite_ast(courses_db[norm_code]))
+        self.trees[norm_code] = tree
+        self.edges[norm_code] = tuple(_tree_courses(tree, []))
+
+    def patched(self, courses_db, norm_codes):
+        """
+        Copy of the graph with the entries of `norm_codes` rebuilt from
+        `courses_db` (codes no longer in it are dropped). Components are only
+        recomputed when the edges changed.
+        """
+        graph = PrerequisiteGraph.__new__(PrerequisiteGraph)
+        graph.trees = dict(self.trees)
+        graph.edges = dict(self.edges)
+        graph.credits = dict(self.credits)
+        for norm_code in norm_codes:
+            if norm_code in courses_db:
+                graph._add(norm_code, courses_db)
+            else:
+                for mapping in (graph.trees, graph.edges, graph.credits):
+                    mapping.pop(norm_code, None)
+        if graph.edges == self.edges:
+            graph.component = self.component
+        else:
+            graph.component = _strongly_connected_components(graph.edges)
+        return graph
+
+    def dependents(self, norm_codes):
+        """`norm_codes` and every course that needs one of them, directly or transitively."""
+        required_by = {}
+        for norm_code, prereqs in self.edges.items():
+            for prereq in prereqs:
+                required_by.setdefault(prereq, []).append(norm_code)
+        found = set(norm_codes)
+        stack = list(found)
+        while stack:
+            for dependent in required_by.get(stack.pop(), ()):
+                if dependent not in found:
+                    found.add(dependent)
+                    stack.append(dependent)
+        return found
+
+def get_prerequisite_graph(courses_db):
+    """Return the graph built at load time, or build one for a plain courses dict."""
+    graph = getattr(courses_db, 'prereq_graph', None)
+    if graph is None:
+        graph = PrerequisiteGraph(courses_db)
+    return graph
+
+class PrerequisiteCostEvaluator:
+    """
+    Minimum credits needed to reach a course, including untaken prerequisites.
+
+    One evaluator is created per request (per user history). Costs of nodes are
+    memoized, so every course is evaluated at most once. Inside a prerequisite
+    cycle the cost depends on the path taken into the cycle, exactly like the
+    original visited-set recursion, so those nodes are evaluated within their
+    component only.
+    """
+
+    def __init__(self, graph, user_history, equivalency_map=None, prereq_config=None):
+        self.graph = graph
+        if not isinstance(user_history, HistoryIndex):
+            user_history = HistoryIndex(user_history, equivalency_map, prereq_config)
+        self.history_index = user_history
+        self._cost = {}
+        self._cycle_cost = {}
+        self._satisfied = {}
+
+    def is_satisfied(self, norm_code):
+        result = self._satisfied.get(norm_code)
+        if result is None:
+            result = self.history_index.satisfies(norm_code)
+            self._satisfied[norm_code] = result
+        return result
+
+    def cost(self, code, known_credits=None):
+        norm_code = normalize_code(code)
+        if norm_code not in self.graph.trees:
+            if self.is_satisfied(norm_code): return 0
+            return float(known_credits) if known_credits is not None else 3.0
+        return self._node_cost(norm_code)
 
-    return own_cost + total_prereq_cost
+    def _node_cost(self, norm_code):
+        cost = self._cost.get(norm_code)
+        if cost is None:
+            cost = self._cost_in_component(norm_code, frozenset())
+            self._cost[norm_code] = cost
+        return cost
+
+    def _cost_in_component(self, norm_code, visited):
+        if self.is_satisfied(norm_code): return 0
+        if norm_code in visited: return 0
+
+        key = (norm_code, visited)
+        if key in self._cycle_cost: return self._cycle_cost[key]
+
+        visited = visited | {norm_code}
+        cost = self.graph.credits[norm_code] + self._tree_cost(self.graph.trees[norm_code], self.graph.component[norm_code], visited)
+        self._cycle_cost[key] = cost
+        return cost
+
+    def _tree_cost(self, tree, component, visited):
+        """AND nodes add up their children, OR nodes take the cheapest child."""
+        if tree is None:
+            return 0
+        if isinstance(tree, str):
+            graph = self.graph
+            if tree not in graph.trees:
+                return 0 if self.is_satisfied(tree) else 3.0
+            if graph.component[tree] == component:
+                return self._cost_in_component(tree, visited)
+            return self._node_cost(tree)
+        is_and, children = tree
+        costs = [self._tree_cost(child, component, visited) for child in children]
+        return sum(costs) if is_and else min(costs)
+
+def make_cost_evaluator(user_history, courses_db, equivalency_map=None, prereq_config=None):
+    """Create the per-request prerequisite cost evaluator for a user history."""
+    history_index = HistoryIndex(user_history, equivalency_map, prereq_config, getattr(courses_db, 'satisfier_index', None))
+    return PrerequisiteCostEvaluator(get_prerequisite_graph(courses_db), history_index)
+
+def calculate_recursive_cost(code, user_history, courses_db, visited=None, known_credits=None, equivalency_map=None, prereq_config=None):
+    evaluator = make_cost_evaluator(user_history, courses_db, equivalency_map, prereq_config)
+    if visited and normalize_code(code) in visited and not evaluator.is_satisfied(normalize_code(code)):
+        return 0
+    return evaluator.cost(code, known_credits)
 
 # --- 4. MAJOR & DYNAMIC LOGIC ---
 
@@ -217,63 +689,449 @@ def get_prescribed_major_courses(major_name, programs_db):
                 major_courses.append(normalize_code(course['code']))
     return major_courses
 
-def calculate_dynamic_gap(rule, user_history, courses_db):
+# --- 5. PROGRAM COMPILATION ---
+# Program rules are static for the lifetime of a loaded catalog, so every
+# normalization and credit lookup that does not depend on the user's history is
+# done once here. The resulting plan is stored on the program under '_compiled'.
+
+def _compile_dynamic_rule(rule):
     constraints = rule.get('constraints', {})
     pool_a = constraints.get('primary_pool', {})
     pool_b = constraints.get('secondary_pool', {})
+    secondary_codes = pool_b.get('courses', [])
+    return {
+        "type": "dynamic_subset",
+        "credits_needed": rule.get('credits_needed', 0),
+        "departments": frozenset(pool_a.get('departments', [])),
+        "department_list": list(pool_a.get('departments', [])),
+        "level_min": pool_a.get('level_min', 0),
+        "level_max": pool_a.get('level_max', 999),
+        "min_credits_needed": pool_a.get('min_credits_needed', 0),
+        "secondary_codes": list(secondary_codes),
+        "secondary": frozenset(normalize_code(c) for c in secondary_codes),
+    }
+
+def compile_program(program, courses_db):
+    """
+    Build the evaluation plan for a single program.
+
+    Args:
+        program: Program dict with rules
+        courses_db: Courses database used to resolve credits and prerequisite text
+
+    Returns:
+        dict: {"rules": [...], "course_codes": (...), "gened_courses": [...]} where
+              every rule carries normalized codes and parsed credits
+    """
+    rules = []
+    course_codes = []
+
+    for rule in program.get('rules', []):
+        rule_type = rule.get('type')
+        for course in rule.get('courses', []):
+            course_codes.append(normalize_code(course['code']))
+
+        if rule_type == 'all':
+            rules.append({
+                "type": "all",
+                "courses": [
+                    (c['code'], normalize_code(c['code']), c.get('credits', 3.0), get_course_prereqs(c['code'], courses_db))
+                    for c in rule.get('courses', [])
+                ]
+            })
+
+        elif rule_type == 'subset':
+            courses = []
+            for c in rule.get('courses', []):
+                code_norm = normalize_code(c['code'])
+                credits = get_course_credits(code_norm, courses_db, default=float(c.get('credits', 3)))
+                courses.append((c['code'], code_norm, credits))
+            rules.append({
+                "type": "subset",
+                "credits_needed": rule.get('credits_needed', 0),
+                "courses": courses
+            })
+
+        elif rule_type == 'dynamic_subset':
+            compiled = _compile_dynamic_rule(rule)
+            course_codes.extend(normalize_code(c) for c in compiled['secondary_codes'])
+            rules.append(compiled)
+
+        elif rule_type == 'group_option':
+            groups = []
+            for group in rule.get('groups', []):
+                group_courses = [(c['code'], normalize_code(c['code']), c.get('credits', 3.0)) for c in group.get('courses', [])]
+                course_codes.extend(code_norm for _, code_norm, _ in group_courses)
+                groups.append(group_courses)
+            rules.append({"type": "group_option", "groups": groups})
+
+    course_codes = tuple(dict.fromkeys(course_codes))
+
+    # Codes that count towards the overlap metric: listed 'all'/'subset' courses,
+    # secondary pools and option groups (dynamic primary pools are matched by range)
+    overlap_codes = set()
+    for rule in rules:
+        if rule['type'] in ('all', 'subset'):
+            overlap_codes.update(course[1] for course in rule['courses'])
+        elif rule['type'] == 'dynamic_subset':
+            overlap_codes.update(rule['secondary'])
+        elif rule['type'] == 'group_option':
+            overlap_codes.update(code_norm for group in rule['groups'] for _, code_norm, _ in group)
+
+    # Courses carrying GenEd attributes are the only triple-dip candidates
+    gened_courses = []
+    for code_norm in course_codes:
+        if code_norm in courses_db:
+            c_data = courses_db[code_norm]
+            attrs = c_data.get('genEdAttributes', [])
+            if attrs:
+                gened_courses.append((code_norm, c_data['courseCode'], c_data.get('title', ''), attrs))
+
+    return {
+        "rules": rules,
+        "course_codes": course_codes,
+        "course_code_set": frozenset(course_codes),
+        "overlap_codes": frozenset(overlap_codes),
+        "gened_courses": gened_courses,
+        "dynamic_rules": [r for r in rules if r['type'] == 'dynamic_subset'],
+        "group_rules": [r for r in rules if r['type'] == 'group_option']
+    }
+
+def compile_programs(programs_db, courses_db):
+    """Attach a compiled plan to every program in place and return the list."""
+    for program in programs_db:
+        program['_compiled'] = compile_program(program, courses_db)
+    return programs_db
+
+class ProgramIndex:
+    """
+    Inverted index from courses to the programs and rules that reference them.
+
+    Attributes:
+        by_code: normalized code -> tuple of (program position, rule position)
+                 for every rule listing the course (including secondary pools
+                 and option groups)
+        by_department: department -> tuple of (level_min, level_max, program
+                       position, rule position) for dynamic_subset primary pools
+        group_programs: positions of programs with group_option rules, whose
+                        prerequisite costs depend on the whole history
+    """
+
+    def __init__(self, programs_db, courses_db=None):
+        by_code = {}
+        by_department = {}
+        group_programs = []
+        for position, program in enumerate(programs_db):
+            plan = get_program_plan(program, courses_db or {})
+            for rule_position, rule in enumerate(plan['rules']):
+                if rule['type'] in ('all', 'subset'):
+                    codes = [course[1] for course in rule['courses']]
+                elif rule['type'] == 'dynamic_subset':
+                    codes = rule['secondary']
+                    for dept in rule['departments']:
+                        by_department.setdefault(dept, []).append(
+                            (rule['level_min'], rule['level_max'], position, rule_position)
+                        )
+                else:
+                    codes = [code_norm for group in rule['groups'] for _, code_norm, _ in group]
+                for code_norm in dict.fromkeys(codes):
+                    by_code.setdefault(code_norm, []).append((position, rule_position))
+            if plan['group_rules']:
+                group_programs.append(position)
+
+        self.by_code = {code: tuple(refs) for code, refs in by_code.items()}
+        self.by_department = {dept: tuple(pools) for dept, pools in by_department.items()}
+        self.group_programs = frozenset(group_programs)
+
+    def references(self, norm_code):
+        """(program position, rule position) pairs whose rules can count `norm_code`."""
+        refs = list(self.by_code.get(norm_code, ()))
+        dept, number = split_code(norm_code)
+        for level_min, level_max, position, rule_position in self.by_department.get(dept, ()):
+            if level_min <= number <= level_max:
+                refs.append((position, rule_position))
+        return list(dict.fromkeys(refs))
+
+    def programs_touched(self, norm_codes):
+        """Positions of the programs with a rule that can count any of `norm_codes`."""
+        touched = set()
+        for norm_code in norm_codes:
+            for position, _ in self.by_code.get(norm_code, ()):
+                touched.add(position)
+            dept, number = split_code(norm_code)
+            pools = self.by_department.get(dept)
+            if pools:
+                for level_min, level_max, position, _ in pools:
+                    if level_min <= number <= level_max:
+                        touched.add(position)
+        return touched
+
+def compile_catalog(programs_db, courses_db, satisfier_index=None, lazy_columns=None):
+    """
+    Compile everything derived from the loaded catalog.
+
+    Args:
+        programs_db: List of program dicts
+        courses_db: Courses database
+        satisfier_index: Optional SatisfierIndex from load_satisfier_index()
+        lazy_columns: Optional source of course fields left out of the load
+                      (see course_store.compact_courses)
+
+    Returns:
+        tuple: (programs_list with compiled plans, CourseCatalog of compact
+               CourseRecords with prerequisite and course -> program indexes)
+    """
+    courses_db = courses_db if isinstance(courses_db, CourseCatalog) else CourseCatalog(courses_db)
+    canonicalize_catalog_keys(courses_db)
+    courses_db.course_table = compact_courses(courses_db, lazy_columns)
+    courses_db.prereq_graph = PrerequisiteGraph(courses_db)
+    courses_db.satisfier_index = satisfier_index
+    courses_db.data_version = next(_data_versions)
+    compile_programs(programs_db, courses_db)
+    courses_db.program_index = ProgramIndex(programs_db, courses_db)
+    return programs_db, courses_db
+
+class CatalogPatch:
+    """
+    What patch_catalog() changed, for the structures built on top of a catalog
+    (e.g. the per-major baselines) to refresh only what depends on it.
+
+    Attributes:
+        base: The CourseCatalog that was patched (left unchanged)
+        programs: ids of changed or added programs
+        removed_programs: ids of removed programs
+        courses: normalized codes of changed or added courses
+        removed_courses: normalized codes of removed courses
+        affected: ids of the programs whose evaluation may differ from the
+                  base catalog's, or None when any program's may (new
+                  equivalencies or prerequisite config)
+    """
+
+    def __init__(self, base, programs, removed_programs, courses, removed_courses, affected):
+        self.base = base
+        self.programs = frozenset(programs)
+        self.removed_programs = frozenset(removed_programs)
+        self.courses = frozenset(courses)
+        self.removed_courses = frozenset(removed_courses)
+        self.affected = None if affected is None else frozenset(affected)
+
+    def __bool__(self):
+        return bool(self.programs or self.removed_programs or self.courses or self.removed_courses
+                    or self.affected is None)
+
+def patch_catalog(programs_db, courses_db, programs=(), removed_programs=(), courses=None, removed_courses=(),
+                  satisfier_index=None, equivalencies_changed=False):
+    """
+    Apply changed rows to a compiled catalog, recompiling only what depends on them.
+
+    The given catalog is not modified, so requests can keep reading it: a new
+    program list and CourseCatalog are returned that share every unchanged
+    course record, prerequisite tree and program plan with it. Changed courses
+    are recompiled into the prerequisite graph; the programs that list a changed
+    course, and changed programs, get new plans. The course -> program index is
+    rebuilt only when programs changed.
+
+    Args:
+        programs_db: Compiled program list (compile_catalog() / patch_catalog())
+        courses_db: Its CourseCatalog
+        programs: Changed or added program dicts, matched by id like the
+                  database's primary key (a changed program replaces every
+                  program with its id)
+        removed_programs: ids of deleted programs
+        courses: normalized code -> changed or added course dict
+        removed_courses: Codes of deleted courses
+        satisfier_index: SatisfierIndex for new equivalencies / prerequisite config
+        equivalencies_changed: Use `satisfier_index` instead of the catalog's
+                               (every program counts as affected)
+
+    Returns:
+        tuple: (programs_list, CourseCatalog, CatalogPatch)
+    """
+    courses = {normalize_code(code): course for code, course in (courses or {}).items()}
+    removed_courses = {normalize_code(code) for code in removed_courses if normalize_code(code) not in courses}
+    removed_courses &= set(courses_db)
+    changed_programs = {program['id']: program for program in programs}
+    removed_programs = set(removed_programs) - set(changed_programs)
+
+    new_courses = CourseCatalog(courses_db)
+    for norm_code in removed_courses:
+        del new_courses[norm_code]
+    if courses:
+        patch_courses(new_courses, courses, courses_db.course_table)
+    new_courses.course_table = courses_db.course_table
+    new_courses.satisfier_index = satisfier_index if equivalencies_changed else courses_db.satisfier_index
+
+    changed_codes = set(courses) | removed_courses
+    old_graph = get_prerequisite_graph(courses_db)
+    new_courses.prereq_graph = old_graph.patched(new_courses, changed_codes) if changed_codes else old_graph
+    # Courses whose prerequisite cost can change with the changed ones
+    dependent_codes = new_courses.prereq_graph.dependents(changed_codes)
+
+    # Plans read the credits, prerequisites and GenEd attributes of the courses they list
+    old_index = courses_db.program_index or ProgramIndex(programs_db, courses_db)
+    stale = {position for code in changed_codes for position, _ in old_index.by_code.get(code, ())}
+    new_programs = []
+    seen = set()
+    for position, program in enumerate(programs_db):
+        program_id = program['id']
+        if program_id in removed_programs:
+            continue
+        if program_id in changed_programs:
+            if program_id in seen:
+                continue
+            program = dict(changed_programs[program_id])
+        elif position in stale:
+            program = {key: value for key, value in program.items() if key != '_compiled'}
+        else:
+            new_programs.append(program)
+            continue
+        seen.add(program_id)
+        program['_compiled'] = compile_program(program, new_courses)
+        new_programs.append(program)
+    for program_id, program in changed_programs.items():
+        if program_id not in seen:
+            program = dict(program)
+            program['_compiled'] = compile_program(program, new_courses)
+            new_programs.append(program)
+
+    programs_changed = bool(changed_programs or removed_programs)
+    new_courses.program_index = ProgramIndex(new_programs, new_courses) if programs_changed else old_index
+    new_courses.data_version = next(_data_versions)
+
+    if equivalencies_changed:
+        affected = None
+    else:
+        affected = {new_programs[position]['id'] for position in new_courses.program_index.programs_touched(dependent_codes)}
+        affected |= set(changed_programs)
+    patch = CatalogPatch(courses_db, changed_programs, removed_programs, courses, removed_courses, affected)
+    return new_programs, new_courses, patch
+
+def canonicalize_catalog_keys(courses_db):
+    """
+    Re-key a courses dict by canonical code, in place. Sources spell some codes
+    differently ("SOC30" / "SOC030"); when two spellings meet, the later entry
+    wins (at the position of the first), like the master-over-supplementary
+    merge of _load_sources().
+    """
+    canonical = {}
+    for code, course in courses_db.items():
+        canonical[normalize_code(code)] = course
+    if list(canonical) != list(courses_db):
+        courses_db.clear()
+        courses_db.update(canonical)
+    return courses_db
+
+def get_program_plan(program, courses_db):
+    """Return the program's compiled plan, compiling on the fly for raw program dicts."""
+    plan = program.get('_compiled')
+    if plan is None:
+        plan = compile_program(program, courses_db)
+    return plan
+
+def _in_dynamic_pool(rule, norm_code):
+    dept, number = split_code(norm_code)
+    return bool(dept) and dept in rule['departments'] and rule['level_min'] <= number <= rule['level_max']
+
+def _dynamic_gap_credits(rule, user_history, courses_db):
+    """Return (gap, missing_primary) credits for a compiled dynamic_subset rule."""
     credits_in_a = 0
     credits_in_b = 0
-    
+
     for norm_code in user_history:
-        dept, number = parse_course_string(norm_code)
+        dept, number = split_code(norm_code)
         if not dept: continue
 
-        if dept in pool_a.get('departments', []) and pool_a.get('level_min', 0) <= number <= pool_a.get('level_max', 999):
+        if dept in rule['departments'] and rule['level_min'] <= number <= rule['level_max']:
             credits_in_a += get_course_credits(norm_code, courses_db)
             continue
-        
-        pool_b_norm = [normalize_code(c) for c in pool_b.get('courses', [])]
-        if norm_code in pool_b_norm:
+
+        if norm_code in rule['secondary']:
             credits_in_b += get_course_credits(norm_code, courses_db)
 
-    total_target = rule.get('credits_needed', 0)
-    target_a = pool_a.get('min_credits_needed', 0)
+    return _dynamic_rule_gap(rule, credits_in_a, credits_in_b)
+
+def _dynamic_rule_gap(rule, credits_in_a, credits_in_b):
+    total_target = rule['credits_needed']
+    target_a = rule['min_credits_needed']
     missing_a = max(0, target_a - credits_in_a)
     total_have = credits_in_a + credits_in_b
     gap = missing_a + max(0, total_target - total_have - missing_a)
-    
+    return gap, missing_a
+
+def _dynamic_gap(rule, user_history, courses_db):
+    gap, missing_a = _dynamic_gap_credits(rule, user_history, courses_db)
+    return gap, _dynamic_missing(rule, gap, missing_a)
+
+def _dynamic_missing(rule, gap, missing_a):
     missing_desc = []
     if missing_a > 0:
-        depts = ", ".join(pool_a.get('departments', [])[:3]) 
-        missing_desc.append(f"Need {int(missing_a)} cr: {pool_a['level_min']}-level {depts}...")
+        depts = ", ".join(rule['department_list'][:3])
+        missing_desc.append(f"Need {int(missing_a)} cr: {rule['level_min']}-level {depts}...")
     if (gap - missing_a) > 0:
         missing_desc.append(f"Need {int(gap - missing_a)} cr: Any options from list")
-    return gap, missing_desc
+    return missing_desc
+
+def _group_option_gap(rule, history_set, major_set, cost_evaluator):
+    """Cheapest group of a group_option rule, including untaken prerequisites."""
+    best_gap = 999
+    best_option_text = ""
+    
+    for group in rule['groups']:
+        group_gap = 0
+        group_text = []
+        for code_display, code_norm, rule_credits in group:
+            if code_norm not in history_set and code_norm not in major_set:
+                group_gap += cost_evaluator.cost(code_display, known_credits=rule_credits)
+                group_text.append(code_display)
+        
+        if group_gap < best_gap:
+            best_gap = group_gap
+            if group_gap == 0: best_option_text = "Completed"
+            else: best_option_text = " + ".join(group_text)
 
-# --- 5. MAIN CALCULATOR ---
+    return best_gap, best_option_text
 
-def calculate_program_gap(program, user_history, courses_db, major_courses=[], equivalency_map=None, prereq_config=None):
+# --- 6. MAIN CALCULATOR ---
+
+def calculate_dynamic_gap(rule, user_history, courses_db):
+    return _dynamic_gap(_compile_dynamic_rule(rule), user_history, courses_db)
+
+def calculate_program_gap(program, user_history, courses_db, major_courses=[], equivalency_map=None, prereq_config=None, cost_evaluator=None):
+    """
+    Calculate the credits still needed to complete a program.
+
+    Args:
+        program: Program dict with rules (compiled plan is used when present)
+        user_history: Normalized course codes completed, including major courses
+        courses_db: Courses database
+        major_courses: Normalized course codes prescribed by the user's major
+        equivalency_map: Dictionary of course equivalencies
+        prereq_config: Configuration dict with hierarchy rules
+        cost_evaluator: Optional PrerequisiteCostEvaluator shared across programs
+                        in the same request so prerequisite costs are memoized
+
+    Returns:
+        tuple: (gap_credits, missing_courses_list)
+    """
+    plan = get_program_plan(program, courses_db)
+    history_set = set(user_history)
+    major_set = set(major_courses)
     total_gap_credits = 0
     missing_courses = []
     
-    for rule in program.get('rules', []):
+    for rule in plan['rules']:
         
-        if rule.get('type') == 'all':
-            for course in rule.get('courses', []):
-                code_display = course['code']
-                code_norm = normalize_code(code_display)
-                rule_credits = course.get('credits', 3.0)
-
+        if rule['type'] == 'all':
+            for code_display, code_norm, rule_credits, prereqs in rule['courses']:
                 # For REQUIRED courses, check EXACT match only (no equivalency/hierarchy)
                 # Equivalency and hierarchy rules should only apply to PREREQUISITES
-                if code_norm in user_history: continue 
-                if code_norm in major_courses:
+                if code_norm in history_set: continue 
+                if code_norm in major_set:
                     missing_courses.append({"text": f"{code_display} (Covered by Major)", "status": "major_covered"})
                     continue 
                 
                 # Course is missing - add to gap (just the course itself, no prerequisites)
                 total_gap_credits += rule_credits
-                prereqs = get_course_prereqs(code_display, courses_db)
                 missing_courses.append({
                     "text": code_display, 
                     "status": "missing",
@@ -281,17 +1139,12 @@ def calculate_program_gap(program, user_history, courses_db, major_courses=[], e
                     "credits": rule_credits
                 })
         
-        elif rule.get('type') == 'subset':
-            credits_needed = rule.get('credits_needed', 0)
+        elif rule['type'] == 'subset':
+            credits_needed = rule['credits_needed']
             credits_earned = 0
             potential_options = []
-            for course in rule.get('courses', []):
-                code_display = course['code']
-                code_norm = normalize_code(code_display)
-                c_credits = get_course_credits(code_norm, courses_db, default=float(course.get('credits', 3)))
-                
-                if code_norm in user_history: credits_earned += c_credits
-                elif code_norm in major_courses: credits_earned += c_credits
+            for code_display, code_norm, c_credits in rule['courses']:
+                if code_norm in history_set or code_norm in major_set: credits_earned += c_credits
                 else: potential_options.append(code_display)
 
             remaining = max(0, credits_needed - credits_earned)
@@ -301,34 +1154,16 @@ def calculate_program_gap(program, user_history, courses_db, major_courses=[], e
                 if len(potential_options) > 3: options_str += "..."
                 missing_courses.append({"text": f"Select {int(remaining)} credits from: {options_str}", "status": "subset_missing"})
 
-        elif rule.get('type') == 'dynamic_subset':
-            d_gap, d_missing = calculate_dynamic_gap(rule, user_history, courses_db)
+        elif rule['type'] == 'dynamic_subset':
+            d_gap, d_missing = _dynamic_gap(rule, user_history, courses_db)
             total_gap_credits += d_gap
             for msg in d_missing:
                 missing_courses.append({"text": msg, "status": "missing"})
                 
-        elif rule.get('type') == 'group_option':
-            best_gap = 999
-            best_option_text = ""
-            
-            for group in rule.get('groups', []):
-                group_gap = 0
-                group_text = []
-                for course in group.get('courses', []):
-                    code_display = course['code']
-                    code_norm = normalize_code(code_display)
-                    rule_credits = course.get('credits', 3.0)
-                    
-                    if code_norm not in user_history and code_norm not in major_courses:
-                        cost = calculate_recursive_cost(code_display, user_history, courses_db, known_credits=rule_credits, equivalency_map=equivalency_map, prereq_config=prereq_config)
-                        group_gap += cost
-                        group_text.append(code_display)
-                
-                if group_gap < best_gap:
-                    best_gap = group_gap
-                    if group_gap == 0: best_option_text = "Completed"
-                    else: best_option_text = " + ".join(group_text)
-
+        elif rule['type'] == 'group_option':
+            if cost_evaluator is None:
+                cost_evaluator = make_cost_evaluator(user_history, courses_db, equivalency_map, prereq_config)
+            best_gap, best_option_text = _group_option_gap(rule, history_set, major_set, cost_evaluator)
             if best_gap > 0:
                 total_gap_credits += best_gap
                 missing_courses.append({"text": f"Take: {best_option_text}", "status": "missing"})
@@ -346,44 +1181,31 @@ def find_triple_dips(program, user_needs, courses_db, user_history=None):
         user_history: Optional list of normalized course codes from user's transcript
                      Used to check primary pool courses in dynamic_subset rules
     """
+    plan = get_program_plan(program, courses_db)
     opportunities = []
-    all_program_courses = []
-    for rule in program.get('rules', []):
-        for c in rule.get('courses', []):
-            all_program_courses.append(normalize_code(c['code']))
-        if rule.get('type') == 'dynamic_subset':
-            # Add secondary pool courses
-            secondary = rule.get('constraints', {}).get('secondary_pool', {}).get('courses', [])
-            all_program_courses.extend([normalize_code(c) for c in secondary])
-            
-            # FIX Issue 2.3: Also check primary pool courses from user's history
-            if user_history:
-                primary_pool = rule.get('constraints', {}).get('primary_pool', {})
-                departments = primary_pool.get('departments', [])
-                level_min = primary_pool.get('level_min', 0)
-                level_max = primary_pool.get('level_max', 999)
-                
-                for norm_code in user_history:
-                    dept, number = parse_course_string(norm_code)
-                    if dept and dept in departments:
-                        if level_min <= number <= level_max:
-                            if norm_code not in all_program_courses:
-                                all_program_courses.append(norm_code)
-        if rule.get('type') == 'group_option':
-             for g in rule.get('groups', []):
-                 for c in g.get('courses', []):
-                     all_program_courses.append(normalize_code(c['code']))
-            
-    for norm_code in set(all_program_courses):
-        if norm_code in courses_db:
-            c_data = courses_db[norm_code]
-            attrs = c_data.get('genEdAttributes', [])
-            matches = [req for req in user_needs if req in attrs]
-            if matches:
-                opportunities.append({"course": c_data['courseCode'], "matches": matches, "title": c_data.get('title', '')})
+    if not user_needs:
+        return opportunities
+
+    for code_norm, course_code, title, attrs in plan['gened_courses']:
+        matches = [req for req in user_needs if req in attrs]
+        if matches:
+            opportunities.append({"course": course_code, "matches": matches, "title": title})
+
+    # FIX Issue 2.3: Also check primary pool courses from user's history
+    if user_history and plan['dynamic_rules']:
+        seen = set(plan['course_code_set'])
+        for norm_code in user_history:
+            if norm_code in seen or norm_code not in courses_db: continue
+            if any(_in_dynamic_pool(rule, norm_code) for rule in plan['dynamic_rules']):
+                seen.add(norm_code)
+                c_data = courses_db[norm_code]
+                attrs = c_data.get('genEdAttributes', [])
+                matches = [req for req in user_needs if req in attrs]
+                if matches:
+                    opportunities.append({"course": c_data['courseCode'], "matches": matches, "title": c_data.get('title', '')})
     return opportunities
 
-def calculate_overlap_count(program, user_history, major_courses):
+def calculate_overlap_count(program, user_history, major_courses, courses_db=None):
     """
     Calculate how many courses from user's history overlap with program requirements.
     
@@ -394,75 +1216,484 @@ def calculate_overlap_count(program, user_history, major_courses):
         program: Program dict with rules
         user_history: List of normalized course codes from user's transcript
         major_courses: List of normalized course codes from user's major
+        courses_db: Optional courses database, only needed to compile raw program dicts
     
     Returns:
         tuple: (overlap_count, overlapping_courses_list)
     """
+    plan = get_program_plan(program, courses_db or {})
     combined_history = set(user_history + major_courses)
     overlapping_courses = []
+    # Normalized codes already reported, so each course is listed once
+    seen = set()
+
+    def add(code_display, code_norm):
+        if code_norm not in seen:
+            seen.add(code_norm)
+            overlapping_courses.append(code_display)
+
+    original_codes = None
     
-    for rule in program.get('rules', []):
-        if rule.get('type') == 'all':
-            for course in rule.get('courses', []):
-                code_norm = normalize_code(course['code'])
-                if code_norm in combined_history:
-                    overlapping_courses.append(course['code'])
-        
-        elif rule.get('type') == 'subset':
-            for course in rule.get('courses', []):
-                code_norm = normalize_code(course['code'])
-                if code_norm in combined_history:
-                    overlapping_courses.append(course['code'])
+    for rule in plan['rules']:
+        if rule['type'] in ('all', 'subset'):
+            for course in rule['courses']:
+                if course[1] in combined_history:
+                    add(course[0], course[1])
         
-        elif rule.get('type') == 'dynamic_subset':
+        elif rule['type'] == 'dynamic_subset':
             # Check primary pool (department-level matches)
-            constraints = rule.get('constraints', {})
-            primary_pool = constraints.get('primary_pool', {})
-            departments = primary_pool.get('departments', [])
-            level_min = primary_pool.get('level_min', 0)
-            level_max = primary_pool.get('level_max', 999)
-            
-            # Fix Issue 1.1: Pre-compute normalized set for O(n) lookup instead of O(n²)
-            normalized_overlapping = {normalize_code(c) for c in overlapping_courses}
-            
+            if original_codes is None:
+                # Map each normalized code back to the first original spelling
+                original_codes = {}
+                for orig_code in user_history + major_courses:
+                    original_codes.setdefault(normalize_code(orig_code), orig_code)
+
             for norm_code in combined_history:
-                dept, number = parse_course_string(norm_code)
-                if dept and dept in departments:
-                    if level_min <= number <= level_max:
-                        # Check if already in overlapping (using pre-computed set)
-                        if norm_code not in normalized_overlapping:
-                            # Get the original course code format from user_history
-                            for orig_code in user_history + major_courses:
-                                if normalize_code(orig_code) == norm_code:
-                                    overlapping_courses.append(orig_code)
-                                    normalized_overlapping.add(norm_code)  # Update set
-                                    break
+                if norm_code not in seen and _in_dynamic_pool(rule, norm_code):
+                    orig_code = original_codes.get(norm_code)
+                    if orig_code is not None:
+                        add(orig_code, norm_code)
             
             # Check secondary pool courses (specific courses)
-            secondary = rule.get('constraints', {}).get('secondary_pool', {}).get('courses', [])
-            for course_code in secondary:
+            for course_code in rule['secondary_codes']:
                 code_norm = normalize_code(course_code)
                 if code_norm in combined_history:
-                    # Check normalized codes to avoid duplicates (using pre-computed set)
-                    if code_norm not in normalized_overlapping:
-                        overlapping_courses.append(course_code)
-                        normalized_overlapping.add(code_norm)  # Update set
+                    add(course_code, code_norm)
         
-        elif rule.get('type') == 'group_option':
+        elif rule['type'] == 'group_option':
             # Check all courses in all groups
-            for group in rule.get('groups', []):
-                for course in group.get('courses', []):
-                    code_norm = normalize_code(course['code'])
+            for group in rule['groups']:
+                for code_display, code_norm, _ in group:
                     if code_norm in combined_history:
-                        overlapping_courses.append(course['code'])
-    
-    # Remove duplicates while preserving order (normalize before comparing)
-    seen = set()
-    unique_overlapping = []
-    for c in overlapping_courses:
-        normalized = normalize_code(c)
-        if normalized not in seen:
-            seen.add(normalized)
-            unique_overlapping.append(c)
+                        add(code_display, code_norm)
     
-    return len(unique_overlapping), unique_overlapping
\ No newline at end of file
+    return len(overlapping_courses), overlapping_courses
+
+# --- 7. RANKING & EXPLANATION ---
+# A request ranks every program of the selected type but only returns the best
+# few, so ranking uses numeric keys alone and the human-readable breakdown
+# (missing course text, triple-dip and overlap lists) is built for the returned
+# programs only, or on demand through explain_program().
+
+class StudentProfile:
+    """
+    Per-request view of a student's courses.
+
+    Every program evaluated in a request reads the same history, so the sets
+    and the department index are built here once instead of once per program.
+
+    Args:
+        user_history: Normalized codes from the transcript
+        major_courses: Normalized codes prescribed by the user's major
+        gen_ed_needs: GenEd attributes the user still needs
+    """
+
+    def __init__(self, user_history, major_courses=(), gen_ed_needs=()):
+        self.user_history = list(user_history)
+        self.major_courses = list(major_courses)
+        self.gen_ed_needs = list(gen_ed_needs)
+        # Transcript first, then major courses, each code once
+        self.combined_history = list(dict.fromkeys(self.user_history + self.major_courses))
+        self.history_set = set(self.combined_history)
+        self.major_set = set(self.major_courses)
+        self._position = {norm_code: i for i, norm_code in enumerate(self.combined_history)}
+
+        self.by_department = {}
+        for norm_code in self.combined_history:
+            dept, number = split_code(norm_code)
+            if dept:
+                self.by_department.setdefault(dept, []).append((number, norm_code))
+
+    def pool_members(self, rule):
+        """History codes in a compiled dynamic_subset rule's primary pool, in history order."""
+        departments = rule['departments']
+        if len(departments) < len(self.by_department):
+            entries = [self.by_department[d] for d in departments if d in self.by_department]
+        else:
+            entries = [courses for d, courses in self.by_department.items() if d in departments]
+
+        members = [
+            norm_code for courses in entries for number, norm_code in courses
+            if rule['level_min'] <= number <= rule['level_max']
+        ]
+        members.sort(key=self._position.__getitem__)
+        return members
+
+def _program_pools(plan, profile):
+    """Primary pool members of each dynamic_subset rule of a plan, keyed by rule id."""
+    return {id(rule): profile.pool_members(rule) for rule in plan['dynamic_rules']}
+
+def _pool_gap(rule, members, profile, courses_db):
+    """(gap, missing_primary) of a dynamic_subset rule from its precomputed pool members."""
+    credits_in_a = sum(get_course_credits(norm_code, courses_db) for norm_code in members)
+    credits_in_b = 0
+    if rule['secondary']:
+        member_set = set(members)
+        for norm_code in rule['secondary']:
+            if norm_code in profile.history_set and norm_code not in member_set and split_code(norm_code)[0]:
+                credits_in_b += get_course_credits(norm_code, courses_db)
+    return _dynamic_rule_gap(rule, credits_in_a, credits_in_b)
+
+def _fixed_gap_credits(plan, profile, pools, courses_db):
+    """Gap from every rule except group_option, which needs prerequisite costs."""
+    history_set = profile.history_set
+    major_set = profile.major_set
+    total_gap_credits = 0
+
+    for rule in plan['rules']:
+        if rule['type'] == 'all':
+            for _, code_norm, rule_credits, _ in rule['courses']:
+                if code_norm not in history_set and code_norm not in major_set:
+                    total_gap_credits += rule_credits
+
+        elif rule['type'] == 'subset':
+            credits_earned = 0
+            for _, code_norm, c_credits in rule['courses']:
+                if code_norm in history_set or code_norm in major_set: credits_earned += c_credits
+            total_gap_credits += max(0, rule['credits_needed'] - credits_earned)
+
+        elif rule['type'] == 'dynamic_subset':
+            total_gap_credits += _pool_gap(rule, pools[id(rule)], profile, courses_db)[0]
+
+    return total_gap_credits
+
+def _group_gap_credits(plan, profile, courses_db, equivalency_map, prereq_config, cost_evaluator):
+    total_gap_credits = 0
+    for rule in plan['group_rules']:
+        if cost_evaluator is None:
+            cost_evaluator = make_cost_evaluator(profile.combined_history, courses_db, equivalency_map, prereq_config)
+        best_gap = _group_option_gap(rule, profile.history_set, profile.major_set, cost_evaluator)[0]
+        if best_gap > 0:
+            total_gap_credits += best_gap
+    return total_gap_credits
+
+def _overlap_and_triple_dip_counts(plan, profile, pools, courses_db):
+    overlap_codes = plan['overlap_codes']
+    overlap = len(profile.history_set & overlap_codes)
+    in_pool = set()
+    for members in pools.values():
+        in_pool.update(members)
+    overlap += len(in_pool - overlap_codes)
+
+    optimizations = 0
+    needs = profile.gen_ed_needs
+    if needs:
+        optimizations = sum(1 for _, _, _, attrs in plan['gened_courses'] if any(req in attrs for req in needs))
+        if in_pool:
+            seen = set(plan['course_code_set'])
+            for norm_code in profile.user_history:
+                if norm_code in seen or norm_code not in in_pool or norm_code not in courses_db: continue
+                seen.add(norm_code)
+                attrs = courses_db[norm_code].get('genEdAttributes', [])
+                if any(req in attrs for req in needs):
+                    optimizations += 1
+    return overlap, optimizations
+
+def calculate_program_gap_credits(program, user_history, courses_db, major_courses=[], equivalency_map=None, prereq_config=None, cost_evaluator=None):
+    """
+    Same gap as calculate_program_gap() without building the missing-course list.
+
+    Returns:
+        float: gap_credits
+    """
+    plan = get_program_plan(program, courses_db)
+    profile = StudentProfile(user_history, major_courses)
+    pools = _program_pools(plan, profile)
+    return _fixed_gap_credits(plan, profile, pools, courses_db) + \
+        _group_gap_credits(plan, profile, courses_db, equivalency_map, prereq_config, cost_evaluator)
+
+def program_gap_lower_bound(program, user_history, courses_db, major_courses=[]):
+    """
+    Cheap lower bound on calculate_program_gap_credits().
+
+    'all', 'subset' and 'dynamic_subset' rules are counted exactly; group_option
+    rules, whose cost includes recursive prerequisites, contribute at least 0.
+    The bound is exact for programs without group_option rules.
+    """
+    plan = get_program_plan(program, courses_db)
+    profile = StudentProfile(user_history, major_courses)
+    return _fixed_gap_credits(plan, profile, _program_pools(plan, profile), courses_db)
+
+def count_triple_dips(program, user_needs, courses_db, user_history=None):
+    """Same count as len(find_triple_dips(...)) without building the list."""
+    plan = get_program_plan(program, courses_db)
+    profile = StudentProfile(user_history or [], gen_ed_needs=user_needs)
+    return _overlap_and_triple_dip_counts(plan, profile, _program_pools(plan, profile), courses_db)[1]
+
+def count_overlap(program, user_history, major_courses, courses_db=None):
+    """Same count as calculate_overlap_count(...)[0] without building the list."""
+    plan = get_program_plan(program, courses_db or {})
+    profile = StudentProfile(user_history, major_courses)
+    return _overlap_and_triple_dip_counts(plan, profile, _program_pools(plan, profile), courses_db or {})[0]
+
+def score_program(program, profile, courses_db, equivalency_map=None, prereq_config=None, cost_evaluator=None):
+    """
+    Numeric ranking key inputs for one program.
+
+    Args:
+        program: Program dict with rules
+        profile: StudentProfile for the request
+        courses_db: Courses database
+        equivalency_map: Dictionary of course equivalencies
+        prereq_config: Configuration dict with hierarchy rules
+        cost_evaluator: Optional shared PrerequisiteCostEvaluator
+
+    Returns:
+        tuple: (gap_credits, overlap_count, optimization_count)
+    """
+    plan = get_program_plan(program, courses_db)
+    pools = _program_pools(plan, profile)
+    gap = _fixed_gap_credits(plan, profile, pools, courses_db) + \
+        _group_gap_credits(plan, profile, courses_db, equivalency_map, prereq_config, cost_evaluator)
+    overlap, optimizations = _overlap_and_triple_dip_counts(plan, profile, pools, courses_db)
+    return gap, overlap, optimizations
+
+def ranking_key(gap, overlap, optimizations):
+    """Sort key for recommendations: lowest gap, then most overlap, then most GenEd optimizations."""
+    return (gap, -overlap, -optimizations)
+
+def select_top_programs(keys, k):
+    """
+    Indexes of the k best entries of `keys` (tuples from ranking_key()).
+
+    Ties keep their input order, so the result equals sorting everything by
+    the key and slicing, without sorting the programs that are not returned.
+    """
+    return heapq.nsmallest(k, range(len(keys)), key=keys.__getitem__)
+
+def rank_programs(programs, k, profile, courses_db, equivalency_map=None, prereq_config=None, cost_evaluator=None, exact_scores=None):
+    """
+    Branch-and-bound selection of the k best programs (see rank_program_keys()).
+
+    Returns:
+        list: Indexes into `programs`, best first
+    """
+    return [i for _, i in rank_program_keys(programs, k, profile, courses_db, equivalency_map, prereq_config,
+                                            cost_evaluator, exact_scores)]
+
+def rank_program_keys(programs, k, profile, courses_db, equivalency_map=None, prereq_config=None, cost_evaluator=None, exact_scores=None):
+    """
+    Branch-and-bound selection of the k best programs, with their keys.
+
+    Every program gets a cheap ranking key from its gap lower bound (see
+    program_gap_lower_bound()) and its exact overlap and optimization counts.
+    Programs are then visited in bound order while a heap holds the k best
+    exact keys found so far; once a program's bound ranks after the current
+    k-th best, it and every program after it are skipped without evaluating
+    their group_option rules.
+
+    The result is identical to sorting all programs by their exact
+    ranking_key() (ties in input order) and keeping the first k.
+
+    Args:
+        exact_scores: Optional {index: (gap, overlap, optimizations)} already
+                      known for some programs (e.g. from a baseline); those
+                      programs are not evaluated at all
+
+    Returns:
+        list: (ranking_key, index into `programs`) pairs, best first. The
+            pairs of several disjoint shards merge into the ranking of all
+            their programs by sorting them together.
+    """
+    if k <= 0:
+        return []
+
+    exact_scores = exact_scores or {}
+    bounds = []
+    for i, program in enumerate(programs):
+        if i in exact_scores:
+            gap, overlap, optimizations = exact_scores[i]
+            bounds.append((ranking_key(gap, overlap, optimizations), i, None, overlap, optimizations))
+            continue
+        plan = get_program_plan(program, courses_db)
+        pools = _program_pools(plan, profile)
+        fixed_gap = _fixed_gap_credits(plan, profile, pools, courses_db)
+        overlap, optimizations = _overlap_and_triple_dip_counts(plan, profile, pools, courses_db)
+        bounds.append((ranking_key(fixed_gap, overlap, optimizations), i, fixed_gap, overlap, optimizations))
+    bounds.sort()
+
+    # Max-heap of the best (key, index) pairs so far, stored negated
+    best = []
+    for bound_key, i, fixed_gap, overlap, optimizations in bounds:
+        if len(best) == k and (bound_key, i) > _negate_rank(best[0]):
+            break
+
+        if fixed_gap is None:
+            entry = _negate_rank((bound_key, i))
+        else:
+            plan = get_program_plan(programs[i], courses_db)
+            if plan['group_rules'] and cost_evaluator is None:
+                cost_evaluator = make_cost_evaluator(profile.combined_history, courses_db, equivalency_map, prereq_config)
+            gap = fixed_gap + _group_gap_credits(plan, profile, courses_db, equivalency_map, prereq_config, cost_evaluator)
+            entry = _negate_rank((ranking_key(gap, overlap, optimizations), i))
+
+        if len(best) < k:
+            heapq.heappush(best, entry)
+        elif entry > best[0]:
+            heapq.heapreplace(best, entry)
+
+    return sorted(_negate_rank(entry) for entry in best)
+
+def _negate_rank(entry):
+    """Map (key, index) to a tuple whose order is reversed, and back."""
+    key, i = entry
+    return tuple(-x for x in key), -i
+
+def evaluate_program(program, profile, courses_db, equivalency_map=None, prereq_config=None, cost_evaluator=None):
+    """
+    Gap, missing courses, triple dips and overlap for one program in a single walk.
+
+    Produces the same values as calculate_program_gap(), find_triple_dips() and
+    calculate_overlap_count() called back to back, but walks the program's
+    rules once, reads the history sets from the shared StudentProfile, and
+    matches the dynamic primary pools once for the gap, overlap and triple-dip
+    results. Primary pool courses are listed in history order.
+
+    Args:
+        program: Program dict with rules (compiled plan is used when present)
+        profile: StudentProfile for the request
+        courses_db: Courses database
+        equivalency_map: Dictionary of course equivalencies
+        prereq_config: Configuration dict with hierarchy rules
+        cost_evaluator: Optional shared PrerequisiteCostEvaluator
+
+    Returns:
+        tuple: (gap_credits, missing_courses, triple_dips, overlap_courses)
+    """
+    plan = get_program_plan(program, courses_db)
+    pools = _program_pools(plan, profile)
+    history_set = profile.history_set
+    major_set = profile.major_set
+    total_gap_credits = 0
+    missing_courses = []
+    overlap_courses = []
+    overlap_seen = set()
+
+    for rule in plan['rules']:
+
+        if rule['type'] == 'all':
+            for code_display, code_norm, rule_credits, prereqs in rule['courses']:
+                if code_norm in history_set:
+                    if code_norm not in overlap_seen:
+                        overlap_seen.add(code_norm)
+                        overlap_courses.append(code_display)
+                    continue
+                total_gap_credits += rule_credits
+                missing_courses.append({
+                    "text": code_display,
+                    "status": "missing",
+                    "prereqs": prereqs,
+                    "credits": rule_credits
+                })
+
+        elif rule['type'] == 'subset':
+            credits_earned = 0
+            potential_options = []
+            for code_display, code_norm, c_credits in rule['courses']:
+                if code_norm in history_set:
+                    credits_earned += c_credits
+                    if code_norm not in overlap_seen:
+                        overlap_seen.add(code_norm)
+                        overlap_courses.append(code_display)
+                else: potential_options.append(code_display)
+
+            remaining = max(0, rule['credits_needed'] - credits_earned)
+            if remaining > 0:
+                total_gap_credits += remaining
+                options_str = ", ".join(potential_options[:3])
+                if len(potential_options) > 3: options_str += "..."
+                missing_courses.append({"text": f"Select {int(remaining)} credits from: {options_str}", "status": "subset_missing"})
+
+        elif rule['type'] == 'dynamic_subset':
+            members = pools[id(rule)]
+            d_gap, missing_a = _pool_gap(rule, members, profile, courses_db)
+            total_gap_credits += d_gap
+            for msg in _dynamic_missing(rule, d_gap, missing_a):
+                missing_courses.append({"text": msg, "status": "missing"})
+
+            for norm_code in members:
+                if norm_code not in overlap_seen:
+                    overlap_seen.add(norm_code)
+                    overlap_courses.append(norm_code)
+            for course_code in rule['secondary_codes']:
+                code_norm = normalize_code(course_code)
+                if code_norm in history_set and code_norm not in overlap_seen:
+                    overlap_seen.add(code_norm)
+                    overlap_courses.append(course_code)
+
+        elif rule['type'] == 'group_option':
+            for group in rule['groups']:
+                for code_display, code_norm, _ in group:
+                    if code_norm in history_set and code_norm not in overlap_seen:
+                        overlap_seen.add(code_norm)
+                        overlap_courses.append(code_display)
+
+            if cost_evaluator is None:
+                cost_evaluator = make_cost_evaluator(profile.combined_history, courses_db, equivalency_map, prereq_config)
+            best_gap, best_option_text = _group_option_gap(rule, history_set, major_set, cost_evaluator)
+            if best_gap > 0:
+                total_gap_credits += best_gap
+                missing_courses.append({"text": f"Take: {best_option_text}", "status": "missing"})
+
+    needs = profile.gen_ed_needs
+    triple_dips = gened_triple_dips(plan, needs)
+    if needs:
+        if pools:
+            in_pool = set()
+            for members in pools.values():
+                in_pool.update(members)
+            seen = set(plan['course_code_set'])
+            for norm_code in profile.user_history:
+                if norm_code in seen or norm_code not in in_pool or norm_code not in courses_db: continue
+                seen.add(norm_code)
+                c_data = courses_db[norm_code]
+                attrs = c_data.get('genEdAttributes', [])
+                matches = [req for req in needs if req in attrs]
+                if matches:
+                    triple_dips.append({"course": c_data['courseCode'], "matches": matches, "title": c_data.get('title', '')})
+
+    return total_gap_credits, missing_courses, triple_dips, overlap_courses
+
+def gened_triple_dips(plan, gen_ed_needs):
+    """Triple dips from a plan's own GenEd-carrying courses (independent of the history)."""
+    triple_dips = []
+    if gen_ed_needs:
+        for _, course_code, title, attrs in plan['gened_courses']:
+            matches = [req for req in gen_ed_needs if req in attrs]
+            if matches:
+                triple_dips.append({"course": course_code, "matches": matches, "title": title})
+    return triple_dips
+
+def program_summary(program, gap, missing, triple_dips, overlap_courses):
+    """The /recommend entry for a program from its evaluated parts."""
+    return {
+        "id": program['id'],
+        "program_name": program['id'],
+        "program_type": program['type'],
+        "program_url": program.get('url', '#'),
+        "gap_credits": gap,
+        "missing_courses": missing,
+        "optimizations": triple_dips,
+        "optimization_count": len(triple_dips),
+        "overlap_count": len(overlap_courses),
+        "overlap_courses": overlap_courses
+    }
+
+def explain_program(program, profile, courses_db, equivalency_map=None, prereq_config=None, cost_evaluator=None):
+    """
+    Full recommendation entry for one program, as returned by /recommend.
+
+    Args:
+        program: Program dict with rules
+        profile: StudentProfile for the request
+        courses_db: Courses database
+        equivalency_map: Dictionary of course equivalencies
+        prereq_config: Configuration dict with hierarchy rules
+        cost_evaluator: Optional shared PrerequisiteCostEvaluator
+
+    Returns:
+        dict: Program summary with gap, missing courses, optimizations and overlap
+    """
+    return program_summary(program, *evaluate_program(
+        program, profile, courses_db, equivalency_map, prereq_config, cost_evaluator
+    ))
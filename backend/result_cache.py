@@ -0,0 +1,198 @@
+"""
+Recommendation Result Cache
+In-process LRU + TTL cache for /recommend responses.
+
+Students and advisors often submit the same transcript, major and filter
+several times in a row. Responses are cached under a canonical fingerprint of
+the request (see recommendation_fingerprint) together with the data version of
+the catalog that produced them, so a reload of the catalog (for example
+database.reload_cache()) invalidates every entry automatically. Data versions
+only grow: around a hot reload, requests still running on the old catalog
+bypass the cache instead of wiping the entries of the new one.
+
+Configuration (environment variables):
+    RESULT_CACHE_SIZE   maximum number of cached responses (default 256, 0 disables)
+    RESULT_CACHE_TTL    seconds an entry stays valid (default 600, 0 = no expiry)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import recommendation_engine as engine
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CACHE_TTL = 600
+
+
+def recommendation_fingerprint(history, major, gen_ed_needs, interest_filter):
+    """
+    Canonical, hashable form of a /recommend request.
+
+    Two requests that only differ in course spelling, duplicates, ordering of
+    the history or GenEd needs, or letter case of the major and filter map to
+    the same fingerprint. The sorted GenEd needs are only part of the key:
+    responses are computed from the order of the request (see
+    order_gen_ed_matches).
+
+    Returns:
+        tuple: (sorted normalized history, major, sorted GenEd needs, interest filter)
+    """
+    return (
+        tuple(sorted({engine.normalize_code(c) for c in history})),
+        (major or '').strip().lower(),
+        tuple(sorted(set(gen_ed_needs))),
+        (interest_filter or '').lower(),
+    )
+
+
+def order_gen_ed_matches(response, gen_ed_needs):
+    """
+    A /recommend response with the GenEd `matches` of every optimization
+    listed in the order of `gen_ed_needs`.
+
+    The engine lists matches in the order the request gave its GenEd needs,
+    while the fingerprint sorts them. A response computed for one ordering
+    is rewritten for another; the cached response itself is never modified.
+
+    Returns:
+        dict: `response` itself when no list changes, otherwise a copy
+    """
+    needs = list(gen_ed_needs)
+    recommendations = None
+    for i, rec in enumerate(response.get('recommendations', ())):
+        optimizations = None
+        for j, dip in enumerate(rec['optimizations']):
+            matched = set(dip['matches'])
+            matches = [req for req in needs if req in matched]
+            if matches != dip['matches']:
+                if optimizations is None:
+                    optimizations = list(rec['optimizations'])
+                optimizations[j] = dict(dip, matches=matches)
+        if optimizations is not None:
+            if recommendations is None:
+                recommendations = list(response['recommendations'])
+            recommendations[i] = dict(rec, optimizations=optimizations)
+    if recommendations is None:
+        return response
+    return dict(response, recommendations=recommendations)
+
+
+class ResultCache:
+    """
+    Bounded LRU cache whose entries expire after a TTL and are dropped when
+    a newer catalog data version shows up.
+
+    Args:
+        max_size: Maximum number of entries kept (0 disables the cache)
+        ttl_seconds: Lifetime of an entry in seconds (0 or None = no expiry)
+        clock: Monotonic time source, injectable for tests
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, ttl_seconds=DEFAULT_CACHE_TTL, clock=time.monotonic):
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = ttl_seconds or None
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._data_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured from RESULT_CACHE_SIZE / RESULT_CACHE_TTL."""
+        return cls(
+            max_size=int(os.getenv('RESULT_CACHE_SIZE', DEFAULT_CACHE_SIZE)),
+            ttl_seconds=float(os.getenv('RESULT_CACHE_TTL', DEFAULT_CACHE_TTL)),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def _check_version(self, data_version):
+        """
+        Whether entries of `data_version` can be read and stored. A newer
+        version clears the cache; an older one (a request still on the
+        previous catalog) is served without it. Caller holds the lock.
+        """
+        if self._data_version is None or data_version > self._data_version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._data_version = data_version
+        elif data_version < self._data_version:
+            self.stale += 1
+            return False
+        return True
+
+    def get(self, key, data_version):
+        """
+        Cached value for `key` computed under `data_version`, or None.
+
+        Counts a hit or a miss; expired entries count as misses.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if not self._check_version(data_version):
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is not None and self._clock() >= expires_at:
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key, value, data_version):
+        """Store `value` for `key`, evicting the least recently used entry when full."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if not self._check_version(data_version):
+                return
+            expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters for monitoring, as a JSON-serializable dict."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "data_version": self._data_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale": self.stale,
+            }
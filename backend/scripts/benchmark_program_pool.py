@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Program Pool Benchmark
+Measures the constants behind program_pool's sharding threshold on the real
+catalog in data/.
+
+Usage:
+    python3 benchmark_program_pool.py [--profiles 100] [--repeat 5] [--workers 2,4] [--seed 411]
+
+Measures:
+    - evaluation cost: in-process ranking of every program for random
+      profiles, fitted as programs * (EVALUATION_US + history courses * slope);
+      COURSES_PER_EVALUATION is EVALUATION_US / slope
+    - shard cost: ranking the shards of every program one after another,
+      in-process, minus ranking them at once, per extra shard (work every
+      shard repeats, such as its prerequisite cost evaluator)
+    - dispatch cost: ProgramPool.rank() minus in-process ranking for two
+      programs and an empty history, where the shards do almost no work
+    - end to end: ProgramPool.rank() over every program against the
+      in-process ranking. Only meaningful with as many idle CPUs as workers;
+      on fewer CPUs the workers take turns and the pool is slower.
+
+and prints the break-even work (program_pool.break_even()) for each worker
+count. Rankings are checked for equality before timing.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import catalog_state
+import program_pool
+import recommendation_engine as engine
+from benchmark_recommendations import make_profiles
+
+K = 15
+
+
+def in_process(catalog, candidates, profile):
+    return engine.rank_programs([catalog.programs[i] for i in candidates], K, profile, catalog.courses,
+                                catalog.equivalency_map, catalog.prereq_config)
+
+
+def median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def fit_evaluation_cost(catalog, profiles, repeat):
+    """
+    Least squares fit of time = programs * (cost + courses * slope).
+
+    Returns:
+        tuple: (cost per evaluation in us, extra cost per history course in us)
+    """
+    candidates = list(range(len(catalog.programs)))
+    xs, ys = [], []
+    for profile in profiles:
+        seconds = median_time(lambda: in_process(catalog, candidates, profile), repeat)
+        xs.append(len(profile.combined_history))
+        ys.append(seconds * 1e6 / len(candidates))
+    slope = statistics.covariance(xs, ys) / statistics.variance(xs)
+    return statistics.mean(ys) - slope * statistics.mean(xs), slope
+
+
+def rank_keys(catalog, programs, profile):
+    return engine.rank_program_keys(programs, K, profile, catalog.courses, catalog.equivalency_map,
+                                    catalog.prereq_config)
+
+
+def shard_cost(catalog, profiles, workers, repeat):
+    """Mean extra in-process time (us) of every shard beyond the first."""
+    programs = catalog.programs
+    extra = []
+    for profile in profiles:
+        whole = median_time(lambda: rank_keys(catalog, programs, profile), repeat)
+        shards = sum(median_time(lambda: rank_keys(catalog, programs[w::workers], profile), repeat)
+                     for w in range(workers))
+        extra.append((shards - whole) * 1e6 / (workers - 1))
+    return statistics.mean(extra)
+
+
+def dispatch_cost(catalog, pool, repeat):
+    """Median extra time (us) of ranking two programs through the pool."""
+    profile = engine.StudentProfile([])
+    candidates = [0, 1]
+    assert pool.rank(catalog, candidates, K, profile) == in_process(catalog, candidates, profile)
+    pooled = median_time(lambda: pool.rank(catalog, candidates, K, profile), repeat * 200)
+    local = median_time(lambda: in_process(catalog, candidates, profile), repeat * 200)
+    return (pooled - local) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the program pool's sharding break-even point")
+    parser.add_argument('--profiles', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', default='2,4', help="comma-separated worker counts")
+    parser.add_argument('--seed', type=int, default=411)
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        catalog = catalog_state.build_state(*engine.load_data(None), source='json')
+    profiles = [engine.StudentProfile(user_history, major_courses, needs)
+                for user_history, major_courses, _, needs in
+                make_profiles(catalog.programs, catalog.courses, args.profiles, args.seed)]
+
+    print(f"Catalog: {len(catalog.programs)} programs, {len(catalog.courses)} courses; "
+          f"{len(profiles)} profiles, {os.cpu_count()} CPUs")
+    evaluation_us, slope = fit_evaluation_cost(catalog, profiles, args.repeat)
+    print(f"EVALUATION_US           {evaluation_us:.2f}")
+    print(f"COURSES_PER_EVALUATION  {evaluation_us / slope:.0f}")
+
+    candidates = list(range(len(catalog.programs)))
+    for workers in [int(w) for w in args.workers.split(',')]:
+        pool = program_pool.ProgramPool(workers, threshold=0)
+        if not pool.start(catalog):
+            print(f"{workers} workers: the pool cannot start here")
+            continue
+        try:
+            dispatch_us = dispatch_cost(catalog, pool, args.repeat)
+            pooled = local = 0.0
+            for profile in profiles:
+                assert pool.rank(catalog, candidates, K, profile) == in_process(catalog, candidates, profile)
+                pooled += median_time(lambda: pool.rank(catalog, candidates, K, profile), args.repeat)
+                local += median_time(lambda: in_process(catalog, candidates, profile), args.repeat)
+        finally:
+            pool.shutdown()
+        shard_us = shard_cost(catalog, profiles, workers, args.repeat)
+        program_pool.EVALUATION_US, program_pool.DISPATCH_US, program_pool.SHARD_US = evaluation_us, dispatch_us, shard_us
+        print(f"{workers} workers: DISPATCH_US {dispatch_us:.0f}, SHARD_US {shard_us:.0f}, "
+              f"break-even {program_pool.break_even(workers):.0f} evaluations; every program: "
+              f"{local / len(profiles) * 1e3:.3f} ms in-process, {pooled / len(profiles) * 1e3:.3f} ms pooled")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Recommendation Benchmark
+Times program evaluation on the real catalog in data/.
+
+Usage:
+    python3 benchmark_recommendations.py [--profiles 200] [--repeat 5] [--seed 411]
+
+Compares, for every program and a fixed set of random student profiles:
+    - separate: calculate_program_gap + find_triple_dips + calculate_overlap_count
+    - fused:    evaluate_program (one walk over each program's rules)
+
+Both paths share one prerequisite cost evaluator per profile, exactly like
+/recommend, and the fused path builds one StudentProfile per profile. Outputs
+are checked for equality before timing.
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import from backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import recommendation_engine as engine
+
+GEN_ED_ATTRIBUTES = ['GA', 'GH', 'GN', 'GQ', 'GS', 'GWS', 'US', 'IL']
+
+
+def make_profiles(programs, courses, count, seed):
+    """Random transcripts of varying length, each paired with a major and GenEd needs."""
+    rng = random.Random(seed)
+    codes = sorted(courses)
+    majors = sorted({p['id'] for p in programs if p['type'] == 'Majors'})
+    profiles = []
+    for _ in range(count):
+        user_history = rng.sample(codes, rng.choice([0, 5, 15, 30, 60]))
+        major_courses = engine.get_prescribed_major_courses(rng.choice(majors), programs)
+        needs = rng.sample(GEN_ED_ATTRIBUTES, rng.randint(0, 3))
+        profiles.append((user_history, major_courses, list(set(user_history + major_courses)), needs))
+    return profiles
+
+
+def run_separate(programs, courses, equiv_map, prereq_config, profiles):
+    results = []
+    for user_history, major_courses, combined, needs in profiles:
+        evaluator = engine.make_cost_evaluator(combined, courses, equiv_map, prereq_config)
+        for prog in programs:
+            gap, missing = engine.calculate_program_gap(prog, combined, courses, major_courses, equiv_map, prereq_config, evaluator)
+            triple_dips = engine.find_triple_dips(prog, needs, courses, user_history)
+            _, overlap_courses = engine.calculate_overlap_count(prog, user_history, major_courses, courses)
+            results.append((gap, missing, triple_dips, overlap_courses))
+    return results
+
+
+def run_fused(programs, courses, equiv_map, prereq_config, profiles):
+    results = []
+    for user_history, major_courses, combined, needs in profiles:
+        profile = engine.StudentProfile(user_history, major_courses, needs)
+        evaluator = engine.make_cost_evaluator(profile.combined_history, courses, equiv_map, prereq_config)
+        for prog in programs:
+            results.append(engine.evaluate_program(prog, profile, courses, equiv_map, prereq_config, evaluator))
+    return results
+
+
+def comparable(results):
+    """Overlap lists follow set iteration order in the separate path, so compare them sorted."""
+    return [(gap, missing, triple_dips, sorted(overlap)) for gap, missing, triple_dips, overlap in results]
+
+
+def best_time(fn, repeat, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', type=int, default=200, help='number of random student profiles')
+    parser.add_argument('--repeat', type=int, default=5, help='timing runs per path (best is reported)')
+    parser.add_argument('--seed', type=int, default=411)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        programs, courses, equiv_map, prereq_config = engine.load_data()
+    profiles = make_profiles(programs, courses, args.profiles, args.seed)
+    data = (programs, courses, equiv_map, prereq_config, profiles)
+
+    if comparable(run_separate(*data)) != comparable(run_fused(*data)):
+        print("❌ Fused results differ from the separate calculators")
+        sys.exit(1)
+
+    separate = best_time(run_separate, args.repeat, *data)
+    fused = best_time(run_fused, args.repeat, *data)
+    evaluations = len(programs) * len(profiles)
+
+    print(f"📊 {len(programs)} programs x {len(profiles)} profiles = {evaluations} evaluations")
+    print(f"   separate: {separate * 1000:8.1f} ms  ({separate / len(profiles) * 1000:.3f} ms/profile)")
+    print(f"   fused:    {fused * 1000:8.1f} ms  ({fused / len(profiles) * 1000:.3f} ms/profile)")
+    print(f"✓ Speedup: {separate / fused:.2f}x (results identical)")
+
+
+if __name__ == '__main__':
+    main()
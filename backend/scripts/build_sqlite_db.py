@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Build the local SQLite catalog from the JSON data files.
+
+Usage:
+    python3 build_sqlite_db.py [path]
+
+The file (default: $CATALOG_SQLITE_DB, or data/catalog.sqlite3) gets the
+schema of create_schema_sqlite.sql, every program, course, equivalency and
+the prerequisite config, plus the precompiled prerequisite and satisfier
+tables. Start the server with CATALOG_SQLITE_DB pointing at it to load the
+catalog from the file instead of Supabase or the JSON files.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import from backend
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import recommendation_engine as engine
+import sqlite_store
+
+DEFAULT_PATH = os.path.join(engine.DATA_DIR, 'catalog.sqlite3')
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else (sqlite_store.DB_FILE or DEFAULT_PATH)
+    print(f"🗄️  Building SQLite catalog at {path}...")
+    counts = sqlite_store.build_from_json(path)
+    for table, count in counts.items():
+        print(f"   {table}: {count} rows")
+    print("✅ SQLite catalog built")
+    print(f"\nStart the server with: CATALOG_SQLITE_DB={path} python app.py")
+
+
+if __name__ == "__main__":
+    main()
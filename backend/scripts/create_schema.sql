@@ -35,6 +35,7 @@ CREATE TABLE IF NOT EXISTS courses (
     description TEXT,
     prerequisites_list TEXT[] DEFAULT ARRAY[]::TEXT[],
     prerequisites_raw TEXT,
+    prerequisites_ast JSONB,
     gen_ed_attributes TEXT[] DEFAULT ARRAY[]::TEXT[],
     cultural_attributes TEXT[] DEFAULT ARRAY[]::TEXT[],
     inter_domain BOOLEAN DEFAULT FALSE,
@@ -43,6 +44,10 @@ CREATE TABLE IF NOT EXISTS courses (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Prerequisite AND/OR tree compiled by scripts/generate_optimized_data.py
+-- (added after the first release; no-op on new databases)
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS prerequisites_ast JSONB;
+
 -- Index for fast search by course code
 CREATE INDEX IF NOT EXISTS idx_courses_code ON courses(course_code);
 
@@ -120,6 +125,44 @@ CREATE TRIGGER update_prereq_config_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================================================
+-- Batch Updates
+-- Applies partial updates to many rows of programs or courses in one
+-- transaction (called by database.update_programs() / update_courses()).
+-- updates: [{"key": <primary key>, "values": {<column>: <value>, ...}}, ...]
+-- Fails, changing nothing, if any key has no row.
+-- ============================================================================
+CREATE OR REPLACE FUNCTION update_rows(target TEXT, key_column TEXT, updates JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    item JSONB;
+    assignments TEXT;
+    changed INTEGER;
+    total INTEGER := 0;
+BEGIN
+    IF (target, key_column) NOT IN (('programs', 'id'), ('courses', 'course_code_normalized')) THEN
+        RAISE EXCEPTION 'update_rows: unsupported table %', target USING ERRCODE = '22023';
+    END IF;
+    FOR item IN SELECT * FROM jsonb_array_elements(updates) LOOP
+        SELECT string_agg(format('%I = r.%I', col, col), ', ') INTO assignments
+        FROM jsonb_object_keys(item->'values') AS col;
+        IF assignments IS NULL THEN
+            CONTINUE;
+        END IF;
+        EXECUTE format('UPDATE %I t SET %s FROM jsonb_populate_record(NULL::%I, $1) r WHERE t.%I = $2',
+                       target, assignments, target, key_column)
+        USING item->'values', item->>'key';
+        GET DIAGNOSTICS changed = ROW_COUNT;
+        IF changed = 0 THEN
+            RAISE EXCEPTION 'update_rows: no % row with % = %', target, key_column, item->>'key'
+                USING ERRCODE = 'P0002';
+        END IF;
+        total := total + changed;
+    END LOOP;
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
 -- ============================================================================
 -- Row Level Security (RLS) Policies
 -- For production: Enable RLS and create appropriate policies
@@ -0,0 +1,183 @@
+-- Penn State Course Recommendation System - SQLite Schema
+-- Local counterpart of create_schema.sql, used by backend/sqlite_store.py
+--
+-- Same tables, columns and indexes as the Supabase schema, with SQLite types:
+--   JSONB and TEXT[] columns hold JSON text
+--   BOOLEAN columns hold 0 / 1
+--   timestamps are ISO 8601 text in UTC ("2025-01-01T00:00:00.000+00:00"),
+--   which sorts like the time it stands for
+-- plus precompiled tables (marked SQLite only) that the Supabase loader
+-- computes in memory instead.
+
+PRAGMA journal_mode = WAL;
+
+-- ============================================================================
+-- Table 1: Programs
+-- Stores all academic programs (Majors, Minors, Certificates)
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS programs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL CHECK (type IN ('Majors', 'Minors', 'Certificates', 'General Education')),
+    url TEXT,
+    rules TEXT NOT NULL DEFAULT '[]',
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- Index for fast filtering by program type
+CREATE INDEX IF NOT EXISTS idx_programs_type ON programs(type);
+
+-- ============================================================================
+-- Table 2: Courses
+-- Stores all course information including prerequisites and GenEd attributes
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS courses (
+    course_code_normalized TEXT PRIMARY KEY,
+    course_code TEXT NOT NULL,
+    title TEXT,
+    credits REAL DEFAULT 3.0,
+    description TEXT,
+    prerequisites_list TEXT DEFAULT '[]',
+    prerequisites_raw TEXT,
+    prerequisites_ast TEXT,
+    gen_ed_attributes TEXT DEFAULT '[]',
+    cultural_attributes TEXT DEFAULT '[]',
+    inter_domain INTEGER DEFAULT 0,
+    source_program TEXT,
+    -- SQLite only: course_keys.course_key() of the code (NULL for codes
+    -- without one), so department/level pools are index range scans
+    course_key INTEGER,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- Index for fast search by course code
+CREATE INDEX IF NOT EXISTS idx_courses_code ON courses(course_code);
+
+-- Index for inter-domain courses
+CREATE INDEX IF NOT EXISTS idx_courses_inter_domain ON courses(inter_domain) WHERE inter_domain = 1;
+
+-- Index for department/level range scans
+CREATE INDEX IF NOT EXISTS idx_courses_key ON courses(course_key);
+
+-- ============================================================================
+-- Table 3: Course Equivalencies
+-- Stores course equivalency mappings for prerequisite checking
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS course_equivalencies (
+    course_code TEXT PRIMARY KEY,
+    equivalents TEXT DEFAULT '[]',
+    reason TEXT,
+    auto_generated INTEGER DEFAULT 0,
+    type TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- ============================================================================
+-- Table 4: Prerequisite Configuration
+-- Stores system configuration for prerequisite matching rules
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS prerequisite_config (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    config_name TEXT UNIQUE NOT NULL,
+    config_value TEXT NOT NULL,
+    description TEXT,
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- Index for fast config lookup
+CREATE INDEX IF NOT EXISTS idx_prereq_config_name ON prerequisite_config(config_name);
+
+-- ============================================================================
+-- Precompiled tables (SQLite only)
+-- Rebuilt by sqlite_store.py whenever the rows they derive from are written
+-- ============================================================================
+
+-- Prerequisite edges: every course named in a course's prerequisites_ast
+CREATE TABLE IF NOT EXISTS course_prerequisites (
+    course_code_normalized TEXT NOT NULL,
+    prerequisite_code TEXT NOT NULL,
+    PRIMARY KEY (course_code_normalized, prerequisite_code)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_course_prerequisites_prerequisite ON course_prerequisites(prerequisite_code);
+
+-- Prerequisite closure of data/prerequisite_satisfiers.json: the catalog
+-- courses that satisfy each prerequisite code
+CREATE TABLE IF NOT EXISTS prerequisite_satisfiers (
+    prerequisite_code TEXT NOT NULL,
+    satisfier_code TEXT NOT NULL,
+    PRIMARY KEY (prerequisite_code, satisfier_code)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_prerequisite_satisfiers_satisfier ON prerequisite_satisfiers(satisfier_code);
+
+-- Courses listed by each program's rules (secondary pools and option groups included)
+CREATE TABLE IF NOT EXISTS program_courses (
+    program_id TEXT NOT NULL,
+    course_code_normalized TEXT NOT NULL,
+    PRIMARY KEY (program_id, course_code_normalized)
+) WITHOUT ROWID;
+
+-- Course key ranges of each program's dynamic_subset primary pools
+CREATE TABLE IF NOT EXISTS program_pools (
+    program_id TEXT NOT NULL,
+    key_min INTEGER NOT NULL,
+    key_max INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_program_pools_program ON program_pools(program_id);
+
+-- Header of the satisfier closure (format, hierarchy_rules,
+-- equivalencies_sha256, catalog_courses), as JSON values
+CREATE TABLE IF NOT EXISTS catalog_metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+-- ============================================================================
+-- Update Timestamp Triggers
+-- Set updated_at on every update that does not set it itself. The new value
+-- is at least 1 ms past the old one, so back-to-back updates within one
+-- millisecond still move a row past the delta sync watermark.
+-- ============================================================================
+CREATE TRIGGER IF NOT EXISTS update_programs_updated_at
+    AFTER UPDATE ON programs
+    FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE programs SET updated_at = max(
+        strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'),
+        strftime('%Y-%m-%dT%H:%M:%f+00:00', julianday(OLD.updated_at) + 0.0015 / 86400)
+    ) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_courses_updated_at
+    AFTER UPDATE ON courses
+    FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE courses SET updated_at = max(
+        strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'),
+        strftime('%Y-%m-%dT%H:%M:%f+00:00', julianday(OLD.updated_at) + 0.0015 / 86400)
+    ) WHERE course_code_normalized = NEW.course_code_normalized;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_equivalencies_updated_at
+    AFTER UPDATE ON course_equivalencies
+    FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE course_equivalencies SET updated_at = max(
+        strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'),
+        strftime('%Y-%m-%dT%H:%M:%f+00:00', julianday(OLD.updated_at) + 0.0015 / 86400)
+    ) WHERE course_code = NEW.course_code;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_prereq_config_updated_at
+    AFTER UPDATE ON prerequisite_config
+    FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE prerequisite_config SET updated_at = max(
+        strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'),
+        strftime('%Y-%m-%dT%H:%M:%f+00:00', julianday(OLD.updated_at) + 0.0015 / 86400)
+    ) WHERE id = NEW.id;
+END;
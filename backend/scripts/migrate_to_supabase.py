@@ -6,58 +6,50 @@ Migrates all JSON data files to Supabase PostgreSQL database.
 Usage:
     1. Ensure you've created a Supabase project and executed create_schema.sql
     2. Update backend/.env with your Supabase credentials
-    3. Run: python3 migrate_to_supabase.py
+    3. Run: python3 migrate_to_supabase.py [--restart] [--verify-only] [--canonicalize-keys]
 
 This script will:
     - Migrate academic_programs_rules.json to programs table
     - Migrate world_campus_courses_master.json to courses table
     - Migrate course_equivalencies.json to course_equivalencies table
     - Migrate prerequisite_config.json to prerequisite_config table
+    - Verify row counts and content hashes of every table
+
+Every table is sent as batched upserts, several batches at a time, each
+retried with exponential backoff on transient errors. Finished batches are
+recorded in a checkpoint file, so a rerun after a failure only sends the
+batches that did not make it (--restart ignores the checkpoint). The
+checkpoint is removed once a migration has completed and verified.
+
+Databases migrated before course_keys.py keyed courses by the zero-padded
+code of the master file ("SOC030"), while the backend now reads and writes
+the canonical code ("SOC30"). --canonicalize-keys renames those rows once
+(see canonicalize_course_keys), before the migration runs.
 """
 
+import argparse
+import hashlib
 import json
 import os
+import random
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
 
 # Add parent directory to path to import from backend
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-try:
-    from supabase import create_client, Client
-except ImportError:
-    print("❌ Error: supabase package not installed")
-    print("   Run: pip install supabase")
-    sys.exit(1)
+import catalog_rows
+import database
+from course_keys import canonical_code
 
 # Load environment variables from backend/.env
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(env_path)
 
-# Get Supabase credentials
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("❌ Error: Supabase credentials not found")
-    print("   Please update backend/.env with your Supabase URL and service_role key")
-    print(f"   Looking for .env at: {env_path.absolute()}")
-    sys.exit(1)
-
-if "your-project-id" in SUPABASE_URL or "your_service_role_key" in SUPABASE_KEY:
-    print("❌ Error: Please update backend/.env with your actual Supabase credentials")
-    print("   Current values appear to be placeholders")
-    sys.exit(1)
-
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✓ Connected to Supabase")
-except Exception as e:
-    print(f"❌ Error connecting to Supabase: {e}")
-    sys.exit(1)
-
 # Data file paths
 BASE_DIR = Path(__file__).parent.parent.parent
 DATA_DIR = BASE_DIR / 'data'
@@ -68,213 +60,381 @@ COURSES_FILE = DATA_DIR / 'world_campus_courses_master.json'
 EQUIVALENCIES_FILE = DATA_DIR / 'course_equivalencies.json'
 PREREQ_CONFIG_FILE = CONFIG_DIR / 'prerequisite_config.json'
 
+# Progress of an interrupted migration
+CHECKPOINT_FILE = Path(__file__).parent / '.migration_checkpoint.json'
 
-def migrate_programs():
-    """Migrate academic_programs_rules.json to programs table"""
-    print("\n📚 Migrating programs...")
-    
-    if not PROGRAMS_FILE.exists():
-        print(f"   ⚠️  File not found: {PROGRAMS_FILE}")
-        return False
-    
+# Rows per upsert request
+BATCH_SIZE = int(os.getenv('MIGRATE_BATCH_SIZE', '500'))
+# Upsert requests in flight at once
+WORKERS = int(os.getenv('MIGRATE_WORKERS', '4'))
+# Attempts per batch, and the first delay between them (doubled every retry)
+ATTEMPTS = int(os.getenv('MIGRATE_ATTEMPTS', '5'))
+BACKOFF = float(os.getenv('MIGRATE_BACKOFF', '0.5'))
+
+# SQLSTATE classes of errors that a retry cannot fix: cardinality violation,
+# data exception, integrity constraint violation, syntax error or undefined object
+PERMANENT_ERROR_CLASSES = ('21', '22', '23', '42')
+
+
+class MigrationTable:
+    """
+    One table to migrate.
+
+    Args:
+        table: Table name
+        key: Conflict column of the upserts (primary or unique key)
+        rows: Row dicts to upsert, one per key
+        merged: Source records that shared a key with a later one
+    """
+
+    def __init__(self, table, key, rows, merged=0):
+        self.table = table
+        self.key = key
+        self.rows = rows
+        self.merged = merged
+
+
+def _unique_rows(rows, key):
+    """Rows with distinct keys; a later row replaces an earlier one, like sequential upserts."""
+    unique = {}
+    for row in rows:
+        unique[row[key]] = row
+    return list(unique.values()), len(rows) - len(unique)
+
+
+def load_tables():
+    """
+    Read the JSON data files into the rows of every table.
+
+    PostgreSQL rejects an upsert that names the same key twice, so duplicate
+    program ids and course codes are merged first (the last one wins, as
+    when they were upserted one at a time).
+
+    Returns:
+        list: MigrationTable per table, in migration order
+    """
     with open(PROGRAMS_FILE, 'r', encoding='utf-8') as f:
         programs = json.load(f)
-    
-    print(f"   Found {len(programs)} programs to migrate")
-    
-    # Insert one at a time to avoid duplicate conflicts within same batch
-    # The upsert will update if a duplicate key exists
-    total_inserted = 0
-    errors = 0
-    
-    for p in programs:
-        try:
-            result = supabase.table('programs').upsert({
-                "id": p['id'],
-                "type": p['type'],
-                "url": p.get('url', ''),
-                "rules": p.get('rules', [])
-            }).execute()
-            total_inserted += 1
-            if total_inserted % 10 == 0:
-                print(f"   ✓ Inserted {total_inserted}/{len(programs)}...")
-        except Exception as e:
-            errors += 1
-            if errors <= 5:  # Only print first 5 errors
-                print(f"   ⚠️  Warning for '{p['id']}' ({p['type']}): {str(e)[:100]}")
-    
-    if errors > 5:
-        print(f"   ⚠️  {errors - 5} more warnings suppressed")
-    
-    print(f"   ✅ Total programs processed: {total_inserted} (some may be duplicates that were merged)")
-    return True
-
-
-def migrate_courses():
-    """Migrate world_campus_courses_master.json to courses table"""
-    print("\n📖 Migrating courses...")
-    
-    if not COURSES_FILE.exists():
-        print(f"   ⚠️  File not found: {COURSES_FILE}")
-        return False
-    
     with open(COURSES_FILE, 'r', encoding='utf-8') as f:
         courses = json.load(f)
-    
-    print(f"   Found {len(courses)} courses to migrate")
-    
-    # Convert dict to list of records
-    course_list = []
-    for norm_code, course_data in courses.items():
-        course_list.append({
-            "course_code_normalized": norm_code,
-            "course_code": course_data.get('courseCode', ''),
-            "title": course_data.get('title', ''),
-            "credits": float(course_data.get('credits', 3)),
-            "description": course_data.get('description', ''),
-            "prerequisites_list": course_data.get('prerequisites_list', []),
-            "prerequisites_raw": course_data.get('prerequisites_raw', ''),
-            "gen_ed_attributes": course_data.get('genEdAttributes', []),
-            "cultural_attributes": course_data.get('culturalAttributes', []),
-            "inter_domain": course_data.get('interDomain', False),
-            "source_program": course_data.get('source_program', '')
-        })
-    
-    # Batch insert
-    batch_size = 500
-    total_inserted = 0
-    
-    for i in range(0, len(course_list), batch_size):
-        batch = course_list[i:i+batch_size]
-        
-        try:
-            result = supabase.table('courses').upsert(batch).execute()
-            total_inserted += len(batch)
-            print(f"   ✓ Inserted batch {i//batch_size + 1}: {len(batch)} courses")
-        except Exception as e:
-            print(f"   ❌ Error inserting batch {i//batch_size + 1}: {e}")
-            return False
-    
-    print(f"   ✅ Total courses migrated: {total_inserted}")
-    return True
-
-
-def migrate_equivalencies():
-    """Migrate course_equivalencies.json to course_equivalencies table"""
-    print("\n🔄 Migrating course equivalencies...")
-    
-    if not EQUIVALENCIES_FILE.exists():
-        print(f"   ⚠️  File not found: {EQUIVALENCIES_FILE}")
-        return False
-    
     with open(EQUIVALENCIES_FILE, 'r', encoding='utf-8') as f:
         equivalencies = json.load(f)
-    
-    print(f"   Found {len(equivalencies)} equivalency mappings to migrate")
-    
-    # Convert dict to list of records
-    equiv_list = []
-    for course_code, equiv_data in equivalencies.items():
-        equiv_list.append({
-            "course_code": course_code,
-            "equivalents": equiv_data.get('equivalents', []),
-            "reason": equiv_data.get('reason', ''),
-            "auto_generated": equiv_data.get('auto_generated', False),
-            "type": equiv_data.get('type', '')
-        })
-    
-    try:
-        result = supabase.table('course_equivalencies').upsert(equiv_list).execute()
-        print(f"   ✅ Total equivalencies migrated: {len(equiv_list)}")
-        return True
-    except Exception as e:
-        print(f"   ❌ Error inserting equivalencies: {e}")
-        return False
-
-
-def migrate_prerequisite_config():
-    """Migrate prerequisite_config.json to prerequisite_config table"""
-    print("\n⚙️  Migrating prerequisite configuration...")
-    
-    if not PREREQ_CONFIG_FILE.exists():
-        print(f"   ⚠️  File not found: {PREREQ_CONFIG_FILE}")
-        return False
-    
     with open(PREREQ_CONFIG_FILE, 'r', encoding='utf-8') as f:
         config = json.load(f)
-    
-    try:
-        result = supabase.table('prerequisite_config').upsert([{
+
+    program_rows, merged_programs = _unique_rows(
+        [dict(catalog_rows.program_to_row(p), url=p.get('url', '')) for p in programs], 'id')
+    course_rows, merged_courses = _unique_rows(
+        [catalog_rows.course_to_row(code, course) for code, course in courses.items()], 'course_code_normalized')
+    return [
+        MigrationTable('programs', 'id', program_rows, merged_programs),
+        MigrationTable('courses', 'course_code_normalized', course_rows, merged_courses),
+        MigrationTable('course_equivalencies', 'course_code',
+                       [catalog_rows.equivalency_to_row(code, e) for code, e in equivalencies.items()]),
+        MigrationTable('prerequisite_config', 'config_name', [{
             "config_name": "hierarchy_rules",
             "config_value": config,
             "description": "Prerequisite matching hierarchy rules and settings"
-        }]).execute()
-        print(f"   ✅ Prerequisite config migrated")
-        return True
-    except Exception as e:
-        print(f"   ❌ Error inserting config: {e}")
-        return False
+        }]),
+    ]
+
+
+def _canonical(row):
+    """Row as comparable JSON text (NUMERIC columns come back as floats)."""
+    return json.dumps({column: float(value) if isinstance(value, int) and not isinstance(value, bool) else value
+                       for column, value in row.items()}, sort_keys=True)
+
+
+def rows_hash(rows):
+    """Content hash of a set of rows, independent of their order."""
+    digest = hashlib.sha256()
+    for text in sorted(_canonical(row) for row in rows):
+        digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def make_batches(table, batch_size):
+    """(content hash, rows) batches of a table, in key order so reruns cut the same batches."""
+    rows = sorted(table.rows, key=lambda r: str(r[table.key]))
+    batches = []
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        batches.append((rows_hash(batch), batch))
+    return batches
+
+
+class Checkpoint:
+    """
+    Content hashes of the batches already upserted, per table, kept in a
+    JSON file. A batch whose rows change gets a new hash and is sent again.
+
+    Args:
+        path: Checkpoint file (None keeps progress in memory only)
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self._done = {}
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            with open(self.path, 'r') as f:
+                self._done = {table: set(hashes) for table, hashes in json.load(f).items()}
+
+    def done(self, table, batch_hash):
+        return batch_hash in self._done.get(table, ())
+
+    def count(self, table):
+        return len(self._done.get(table, ()))
+
+    def mark(self, table, batch_hash):
+        with self._lock:
+            self._done.setdefault(table, set()).add(batch_hash)
+            if self.path:
+                # Written to a temporary file and renamed, so a crash never leaves half a checkpoint
+                tmp = self.path.with_suffix('.tmp')
+                with open(tmp, 'w') as f:
+                    json.dump({table: sorted(hashes) for table, hashes in self._done.items()}, f)
+                os.replace(tmp, self.path)
 
+    def clear(self):
+        with self._lock:
+            self._done = {}
+            if self.path and self.path.exists():
+                self.path.unlink()
 
-def verify_migration():
-    """Verify that all data was migrated successfully"""
+
+def is_transient(error):
+    """False for errors a retry cannot fix (see PERMANENT_ERROR_CLASSES)."""
+    code = getattr(error, 'code', None)
+    return not (isinstance(code, str) and len(code) == 5 and code[:2] in PERMANENT_ERROR_CLASSES)
+
+
+def upsert_batch(client, table, key, rows, attempts=None, backoff=None, sleep=time.sleep):
+    """
+    Upsert one batch, retrying transient failures with exponential backoff and jitter.
+
+    Returns:
+        int: Attempts used
+
+    Raises:
+        Exception: The last error, once attempts run out or on a permanent error
+    """
+    attempts = attempts or ATTEMPTS
+    backoff = BACKOFF if backoff is None else backoff
+    for attempt in range(1, attempts + 1):
+        try:
+            client.table(table).upsert(rows, on_conflict=key, returning='minimal').execute()
+            return attempt
+        except Exception as e:
+            if attempt == attempts or not is_transient(e):
+                raise
+            sleep(backoff * 2 ** (attempt - 1) * (0.5 + random.random()))
+
+
+def migrate(client, tables=None, checkpoint=None, batch_size=None, workers=None, attempts=None, backoff=None):
+    """
+    Upsert every table in batches, concurrently, skipping batches the
+    checkpoint has already seen.
+
+    Args:
+        client: Supabase client
+        tables: MigrationTables (default load_tables())
+        checkpoint: Checkpoint (default: in memory only)
+        batch_size: Rows per upsert (default MIGRATE_BATCH_SIZE)
+        workers: Concurrent upserts (default MIGRATE_WORKERS)
+        attempts: Attempts per batch (default MIGRATE_ATTEMPTS)
+        backoff: First retry delay in seconds (default MIGRATE_BACKOFF)
+
+    Returns:
+        dict: table -> {"sent", "skipped", "failed", "retries"} batch counts
+    """
+    tables = load_tables() if tables is None else tables
+    checkpoint = checkpoint or Checkpoint()
+    batch_size = batch_size or BATCH_SIZE
+    stats = {t.table: {"sent": 0, "skipped": 0, "failed": 0, "retries": 0} for t in tables}
+
+    with ThreadPoolExecutor(max_workers=workers or WORKERS) as pool:
+        futures = {}
+        for t in tables:
+            batches = make_batches(t, batch_size)
+            merged = f", {t.merged} duplicate keys merged" if t.merged else ""
+            print(f"\n📦 {t.table}: {len(t.rows)} rows in {len(batches)} batches{merged}")
+            for batch_hash, rows in batches:
+                if checkpoint.done(t.table, batch_hash):
+                    stats[t.table]["skipped"] += 1
+                    continue
+                future = pool.submit(upsert_batch, client, t.table, t.key, rows, attempts, backoff)
+                futures[future] = (t.table, batch_hash, len(rows))
+
+        for future in as_completed(futures):
+            table, batch_hash, size = futures[future]
+            try:
+                used = future.result()
+            except Exception as e:
+                stats[table]["failed"] += 1
+                print(f"   ❌ {table}: batch of {size} rows failed: {str(e)[:200]}")
+                continue
+            checkpoint.mark(table, batch_hash)
+            stats[table]["sent"] += 1
+            stats[table]["retries"] += used - 1
+
+    for table, counts in stats.items():
+        skipped = f", {counts['skipped']} already done" if counts['skipped'] else ""
+        retries = f", {counts['retries']} retries" if counts['retries'] else ""
+        icon = "❌" if counts['failed'] else "✅"
+        print(f"   {icon} {table}: {counts['sent']} batches sent{skipped}{retries}, {counts['failed']} failed")
+    return stats
+
+
+def verify_migration(client, tables=None):
+    """
+    Verify that every table holds exactly the migrated rows: the row count and
+    a content hash over the migrated columns of every row.
+
+    Returns:
+        bool: True if all tables match
+    """
     print("\n🔍 Verifying migration...")
-    
+    tables = load_tables() if tables is None else tables
+    queries = {}
+    for t in tables:
+        columns = tuple(dict.fromkeys(column for row in t.rows for column in row))
+        queries[t.table] = database.TableQuery(t.table, columns, t.key)
     try:
-        # Count rows in each table
-        programs_count = supabase.table('programs').select('id', count='exact').execute()
-        courses_count = supabase.table('courses').select('course_code_normalized', count='exact').execute()
-        equiv_count = supabase.table('course_equivalencies').select('course_code', count='exact').execute()
-        config_count = supabase.table('prerequisite_config').select('id', count='exact').execute()
-        
-        print(f"   Programs: {programs_count.count} rows")
-        print(f"   Courses: {courses_count.count} rows")
-        print(f"   Equivalencies: {equiv_count.count} rows")
-        print(f"   Configs: {config_count.count} rows")
-        
-        return True
+        fetched = database.fetch_tables(client, queries)
     except Exception as e:
         print(f"   ❌ Error verifying: {e}")
         return False
 
+    ok = True
+    for t in tables:
+        rows = fetched[t.table]
+        expected = {str(row[t.key]): _canonical(row) for row in t.rows}
+        actual = {str(row[t.key]): _canonical(row) for row in rows}
+        matches = len(rows) == len(t.rows) and rows_hash(rows) == rows_hash(t.rows)
+        print(f"   {'✓' if matches else '❌'} {t.table}: {len(rows)} rows (expected {len(t.rows)})")
+        if not matches:
+            ok = False
+            differing = sorted(k for k in expected if actual.get(k) != expected[k])
+            extra = sorted(set(actual) - set(expected))
+            if differing:
+                print(f"      missing or different: {', '.join(differing[:5])}{' ...' if len(differing) > 5 else ''}")
+            if extra:
+                print(f"      not in the data files: {', '.join(extra[:5])}{' ...' if len(extra) > 5 else ''}")
+    return ok
+
+
+def canonicalize_course_keys(client):
+    """
+    Rename course rows whose key is not the canonical code ("SOC030" ->
+    "SOC30"), so update_courses() and delta syncs find them. A padded row
+    whose canonical key already has a row is removed instead; the migration
+    rewrites the canonical row from the data files.
+
+    Returns:
+        tuple: (renamed, removed) row counts
+    """
+    query = database.TableQuery('courses', ('course_code_normalized',), 'course_code_normalized')
+    keys = {row['course_code_normalized'] for row in database.fetch_tables(client, {'courses': query})['courses']}
+    renamed = removed = 0
+    for key in sorted(keys):
+        canonical = canonical_code(key)
+        if canonical == key:
+            continue
+        courses = client.table('courses')
+        if canonical in keys:
+            courses.delete().eq('course_code_normalized', key).execute()
+            removed += 1
+        else:
+            courses.update({'course_code_normalized': canonical}).eq('course_code_normalized', key).execute()
+            keys.add(canonical)
+            renamed += 1
+    print(f"   ✓ courses: {renamed} keys renamed to their canonical code, {removed} duplicate rows removed")
+    return renamed, removed
+
+
+def connect():
+    """Supabase client from backend/.env (exits with instructions when it is not configured)."""
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
 
-def main():
+    if not supabase_url or not supabase_key:
+        print("❌ Error: Supabase credentials not found")
+        print("   Please update backend/.env with your Supabase URL and service_role key")
+        print(f"   Looking for .env at: {env_path.absolute()}")
+        sys.exit(1)
+
+    if "your-project-id" in supabase_url or "your_service_role_key" in supabase_key:
+        print("❌ Error: Please update backend/.env with your actual Supabase credentials")
+        print("   Current values appear to be placeholders")
+        sys.exit(1)
+
+    try:
+        from supabase import create_client
+    except ImportError:
+        print("❌ Error: supabase package not installed")
+        print("   Run: pip install supabase")
+        sys.exit(1)
+
+    try:
+        client = create_client(supabase_url, supabase_key)
+        print("✓ Connected to Supabase")
+        return client
+    except Exception as e:
+        print(f"❌ Error connecting to Supabase: {e}")
+        sys.exit(1)
+
+
+def main(argv=None):
     """Main migration process"""
+    parser = argparse.ArgumentParser(description="Migrate the JSON data files to Supabase")
+    parser.add_argument('--restart', action='store_true', help="ignore the checkpoint and send every batch")
+    parser.add_argument('--verify-only', action='store_true', help="only compare the tables with the data files")
+    parser.add_argument('--canonicalize-keys', action='store_true',
+                        help="first rename zero-padded course keys (SOC030 -> SOC30) of an earlier migration")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    args = parser.parse_args(argv)
+
     print("=" * 60)
     print("Penn State Course Recommender - Data Migration to Supabase")
     print("=" * 60)
-    
+
     # Check that all required files exist
     missing_files = []
     for file_path in [PROGRAMS_FILE, COURSES_FILE, EQUIVALENCIES_FILE, PREREQ_CONFIG_FILE]:
         if not file_path.exists():
             missing_files.append(str(file_path))
-    
+
     if missing_files:
         print("\n❌ Missing required data files:")
         for f in missing_files:
             print(f"   - {f}")
         sys.exit(1)
-    
-    # Run migrations
-    success = True
-    
-    if not migrate_programs():
-        success = False
-    
-    if not migrate_courses():
-        success = False
-    
-    if not migrate_equivalencies():
-        success = False
-    
-    if not migrate_prerequisite_config():
-        success = False
-    
-    # Verify
+
+    client = connect()
+    tables = load_tables()
+
+    if args.verify_only:
+        sys.exit(0 if verify_migration(client, tables) else 1)
+
+    if args.canonicalize_keys:
+        print("\n🔑 Canonicalizing course keys...")
+        canonicalize_course_keys(client)
+
+    checkpoint = Checkpoint(CHECKPOINT_FILE)
+    if args.restart:
+        checkpoint.clear()
+    elif any(checkpoint.count(t.table) for t in tables):
+        print(f"\n↩️  Resuming from {CHECKPOINT_FILE.name}")
+
+    stats = migrate(client, tables, checkpoint, args.batch_size, args.workers)
+    success = not any(counts['failed'] for counts in stats.values())
     if success:
-        verify_migration()
-    
+        success = verify_migration(client, tables)
+        if success:
+            checkpoint.clear()
+
     # Summary
     print("\n" + "=" * 60)
     if success:
@@ -285,10 +445,10 @@ def main():
         print("3. Update backend/app.py to use the new database layer")
     else:
         print("❌ Migration completed with errors")
-        print("   Please check the error messages above and try again")
+        print("   Run the script again to resume; finished batches are not sent twice")
     print("=" * 60)
+    sys.exit(0 if success else 1)
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Production Server
+Pre-forking entry point for the Flask app in app.py.
+
+Usage:
+    python3 serve.py [--host HOST] [--port PORT] [--workers N]
+
+The master process imports app.py once, which loads and compiles the
+catalog (programs, course records, baselines, score matrix). It then binds
+the listening socket and forks N workers that accept connections on it.
+Every worker starts with the master's memory, so the compiled catalog
+exists once in RAM, no matter how many workers serve it.
+
+Copy-on-write pages only stay shared while nobody writes to them. Reading
+an object still writes its reference count, and every collection of the
+cyclic garbage collector writes the GC header of every tracked object it
+visits. main() therefore disables the collector before importing the app
+(so no freed holes get scattered across the catalog's pages), and the
+master calls gc.freeze() right before forking. The frozen objects move to a
+permanent generation that no collector visits, so the master and the
+workers collect normally again from then on. Reference count writes
+still unshare the pages of objects a request touches, which the memory
+report shows as each worker's unique memory.
+
+The master restarts workers that exit, and stops them all on SIGTERM or
+SIGINT. SIGUSR1 prints the memory report: per worker, the resident memory
+still shared with the master and the memory unique to that worker (Linux
+only, from /proc/<pid>/smaps_rollup).
+
+Each worker serves requests on threads (werkzeug's WSGI server, which Flask
+already depends on) and runs its own catalog watcher if one is configured
+(CATALOG_WATCH_INTERVAL / CATALOG_SYNC_INTERVAL) and program pool
+(PROGRAM_POOL_WORKERS, by default the CPUs divided among the workers), since
+threads and process pools do not survive a fork. Reloads replace a worker's catalog with private memory,
+except for the arrays of the vectorized score matrix: the server publishes
+them as a shared catalog segment (catalog_segment.py) named after the
+master's pid, so workers that reload the same data map one segment
+generation. The master removes the
+segments when it stops. Set CATALOG_SEGMENT_NAMESPACE to an empty string
+to keep the arrays in process memory.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Seconds between memory reports in the log (0: only on SIGUSR1 and at startup)
+MEMORY_REPORT_INTERVAL = float(os.getenv('SERVER_MEMORY_REPORT_INTERVAL', '0'))
+
+
+def parse_smaps_rollup(text):
+    """
+    Memory counters of /proc/<pid>/smaps_rollup.
+
+    Returns:
+        dict: rss, pss, shared and unique (private) memory in bytes
+    """
+    fields = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(':')
+        parts = value.split()
+        if len(parts) == 2 and parts[1] == 'kB':
+            fields[name] = int(parts[0]) * 1024
+    return {
+        "rss": fields.get('Rss', 0),
+        "pss": fields.get('Pss', 0),
+        "shared": fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        "unique": fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def memory_usage(pid):
+    """parse_smaps_rollup() of a process, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            return parse_smaps_rollup(f.read())
+    except OSError:
+        return None
+
+
+def memory_report(master_pid, worker_pids):
+    """
+    Lines describing how much memory each worker shares with the master.
+
+    The total is the master's PSS plus every worker's PSS: the memory the
+    whole server actually occupies, with shared pages counted once.
+    """
+    def mb(value):
+        return f"{value / 2 ** 20:.1f} MB"
+
+    lines = []
+    total = 0
+    for label, pid in [("master", master_pid)] + [("worker", pid) for pid in worker_pids]:
+        usage = memory_usage(pid)
+        if usage is None:
+            return ["   (memory report needs /proc/<pid>/smaps_rollup)"]
+        total += usage['pss']
+        lines.append(f"   {label} {pid}: {mb(usage['rss'])} resident, {mb(usage['shared'])} shared, "
+                     f"{mb(usage['unique'])} unique")
+    lines.append(f"   total (PSS): {mb(total)} for {len(worker_pids)} workers")
+    return lines
+
+
+def bind(host, port):
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(application, sock):
+    """Body of a forked worker: serve requests on `sock` until terminated."""
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Ctrl+C reaches the whole process group; the master stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # `pkill -USR1 -f serve.py` asks for a report, and reaches the workers too
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+    # Fork this worker's program pool before it starts any thread
+    application.PROGRAM_POOL.start(application.CATALOG.current())
+    application.CATALOG_WATCHER = application.start_catalog_watcher()
+    server = make_server(sock.getsockname()[0], sock.getsockname()[1], application.app,
+                         threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+class Master:
+    """
+    Forks and supervises the workers.
+
+    Args:
+        application: The imported app module
+        sock: Listening socket shared by the workers
+        workers: Number of worker processes
+    """
+
+    def __init__(self, application, sock, workers):
+        self.application = application
+        self.sock = sock
+        self.workers = workers
+        self.pids = set()
+        self.stopping = False
+        self.report_requested = False
+
+    def spawn(self):
+        # Buffered output would be written again by every worker
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.application, self.sock)
+            finally:
+                os._exit(0)
+        self.pids.add(pid)
+        return pid
+
+    def report(self):
+        print(f"📊 Memory ({len(self.pids)} workers):")
+        for line in memory_report(os.getpid(), sorted(self.pids)):
+            print(line)
+        segment = self.application.CATALOG.current().segment
+        if segment is not None:
+            print(f"   catalog segment: {len(segment) / 2 ** 20:.1f} MB mapped by every process ({segment.path})")
+        sys.stdout.flush()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def _request_report(self, signum, frame):
+        self.report_requested = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGUSR1, self._request_report)
+
+        # Threads do not survive a fork: stop the master's background work,
+        # each worker starts its own
+        if self.application.CATALOG_WATCHER is not None:
+            self.application.CATALOG_WATCHER.stop()
+            self.application.CATALOG_WATCHER = None
+        self.application.PROGRAM_POOL.shutdown()
+
+        # Everything allocated so far (the compiled catalog) is shared with
+        # the workers: keep their collectors from touching it
+        gc.collect()
+        gc.freeze()
+        print(f"🧊 Froze {gc.get_freeze_count()} objects before forking")
+        # Collections no longer reach the frozen catalog
+        gc.enable()
+
+        for _ in range(self.workers):
+            self.spawn()
+        host, port = self.sock.getsockname()[:2]
+        print(f"✅ Serving on http://{host}:{port} with {self.workers} workers (master {os.getpid()})")
+        self.report_requested = True
+
+        next_report = time.monotonic() + MEMORY_REPORT_INTERVAL
+        while not self.stopping:
+            self._reap()
+            if self.report_requested or (MEMORY_REPORT_INTERVAL > 0 and time.monotonic() >= next_report):
+                self.report_requested = False
+                next_report = time.monotonic() + MEMORY_REPORT_INTERVAL
+                self.report()
+            time.sleep(0.2)
+        self.shutdown()
+
+    def _reap(self):
+        while self.pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            self.pids.discard(pid)
+            if not self.stopping:
+                print(f"⚠️  Worker {pid} exited ({os.waitstatus_to_exitcode(status)}), starting a new one")
+                self.spawn()
+
+    def shutdown(self, timeout=10.0):
+        print(f"🛑 Stopping {len(self.pids)} workers")
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        while self.pids and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.pids.discard(pid)
+            else:
+                time.sleep(0.05)
+        for pid in self.pids:
+            os.kill(pid, signal.SIGKILL)
+        self.sock.close()
+        namespace = self.application.CATALOG_SEGMENT_NAMESPACE
+        if namespace:
+            import catalog_segment
+            catalog_segment.remove_namespace(namespace)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-forking production server for the recommendation API")
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVER_PORT', os.getenv('PORT', '5001'))))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', str(os.cpu_count() or 2))))
+    args = parser.parse_args(argv)
+
+    # Segments of this server are named after the master (see catalog_segment.py)
+    os.environ.setdefault('CATALOG_SEGMENT_NAMESPACE', str(os.getpid()))
+    # Every worker runs its own program pool: split the CPUs between them
+    workers = max(args.workers, 1)
+    os.environ.setdefault('PROGRAM_POOL_WORKERS', str(max((os.cpu_count() or 1) // workers, 1)))
+
+    # Loads and compiles the catalog in the master, without collections
+    # (see the module docstring); Master.run() enables them again
+    gc.disable()
+    try:
+        import app as application
+    except BaseException:
+        gc.enable()
+        raise
+    if application.DATA_SOURCE is None:
+        gc.enable()
+        print("❌ No catalog loaded, not starting workers")
+        return 1
+
+    Master(application, bind(args.host, args.port), workers).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,669 @@
+"""
+Local SQLite Storage Backend
+Drop-in replacement for database.py on machines without network access.
+
+Stores the catalog in a SQLite file with the tables of create_schema.sql
+(see scripts/create_schema_sqlite.sql) and offers the same interface as
+database.py: load_all_data(), get_cached_data(), reload_cache(), sync_cache(),
+update_course(), update_courses() and their program counterparts, over an
+in-memory cache with the same characteristics.
+
+The file also holds tables precompiled from the catalog: prerequisite edges,
+the prerequisite satisfier closure and the courses and course key ranges each
+program reads. They let load_programs() load just the courses a few programs
+need (their listed courses, dynamic pools and prerequisite closure) without
+materializing the whole catalog.
+
+Build the file from the JSON data with scripts/build_sqlite_db.py and point
+CATALOG_SQLITE_DB at it.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import catalog_rows
+import recommendation_engine as engine
+from course_keys import course_key, department_key_range
+
+SCHEMA_FILE = Path(__file__).parent / 'scripts' / 'create_schema_sqlite.sql'
+# SQLite catalog file; the backend is disabled without one
+DB_FILE = os.getenv('CATALOG_SQLITE_DB')
+SQLITE_CONFIGURED = bool(DB_FILE)
+
+# cache name -> (table, columns loaded at startup, key column)
+TABLES = {
+    'programs': ('programs', ('id', 'type', 'url', 'rules', 'updated_at'), 'id'),
+    'courses': ('courses', ('course_code_normalized', 'course_code', 'title', 'credits', 'prerequisites_raw',
+                            'prerequisites_ast', 'gen_ed_attributes', 'cultural_attributes', 'inter_domain',
+                            'updated_at'), 'course_code_normalized'),
+    'equivalencies': ('course_equivalencies', ('course_code', 'equivalents', 'reason', 'auto_generated', 'type',
+                                               'updated_at'), 'course_code'),
+    'config': ('prerequisite_config', ('id', 'config_value', 'updated_at'), 'id'),
+}
+# Only the hierarchy_rules row of prerequisite_config is the engine's config
+CONFIG_FILTER = "config_name = 'hierarchy_rules'"
+
+# Columns stored as JSON text and as 0 / 1
+JSON_COLUMNS = {'rules', 'prerequisites_list', 'prerequisites_ast', 'gen_ed_attributes', 'cultural_attributes',
+                'equivalents', 'config_value'}
+BOOLEAN_COLUMNS = {'inter_domain', 'auto_generated'}
+
+# Course columns fetched on first use instead of at startup (see LazyCourseColumns)
+LAZY_COURSE_COLUMNS = catalog_rows.COURSE_TEXT_COLUMNS
+
+# In-memory cache, replaced as a whole like database.py's
+_cache = {
+    "programs": None,
+    "courses": None,
+    "equivalencies": None,
+    "prereq_config": None,
+    "versions": None,
+    "patch": None,
+    "path": None,
+}
+_sync_lock = threading.Lock()
+_sync_stats = {"syncs": 0, "changed_rows": 0, "full_reloads": 0, "last_sync": None, "last_sync_seconds": None}
+
+
+def connect(path=None, create=False):
+    """
+    Connection to a catalog file.
+
+    Args:
+        path: SQLite file (default CATALOG_SQLITE_DB)
+        create: Create the file and its schema if missing
+    """
+    path = path or DB_FILE
+    if not path:
+        raise Exception("SQLite catalog not configured. Set CATALOG_SQLITE_DB to the file "
+                        "built by backend/scripts/build_sqlite_db.py")
+    if not create and not os.path.exists(path):
+        raise Exception(f"SQLite catalog {path} not found. Run backend/scripts/build_sqlite_db.py")
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    if create:
+        with open(SCHEMA_FILE, 'r') as f:
+            conn.executescript(f.read())
+    return conn
+
+
+def _encode(column, value):
+    if column in JSON_COLUMNS:
+        return None if value is None else json.dumps(value)
+    if column in BOOLEAN_COLUMNS:
+        return None if value is None else int(bool(value))
+    return value
+
+
+def _decode(row):
+    decoded = {}
+    for column in row.keys():
+        value = row[column]
+        if value is not None and column in JSON_COLUMNS:
+            value = json.loads(value)
+        elif value is not None and column in BOOLEAN_COLUMNS:
+            value = bool(value)
+        decoded[column] = value
+    return decoded
+
+
+def _select(conn, name, where=None, params=(), extra_columns=()):
+    """Decoded rows of a catalog table, in key order."""
+    table, columns, key = TABLES[name]
+    conditions = [CONFIG_FILTER] if name == 'config' else []
+    if where:
+        conditions.append(where)
+    sql = f"SELECT {', '.join(columns + tuple(extra_columns))} FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return [_decode(row) for row in conn.execute(f"{sql} ORDER BY {key}", params)]
+
+
+def _insert(conn, table, rows, replace=True):
+    """Insert row dicts (all with the same columns); later rows replace earlier ones with the same key."""
+    rows = list(rows)
+    if not rows:
+        return
+    columns = list(rows[0])
+    verb = "INSERT OR REPLACE" if replace else "INSERT"
+    conn.executemany(
+        f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+        [[_encode(column, row[column]) for column in columns] for row in rows],
+    )
+
+
+def _table_columns(conn, table):
+    return {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _refresh_course_tables(conn, codes):
+    """Rebuild the prerequisite edges of the given courses from their rows."""
+    codes = list(codes)
+    conn.executemany("DELETE FROM course_prerequisites WHERE course_code_normalized = ?", [(c,) for c in codes])
+    edges = []
+    for code in codes:
+        row = conn.execute("SELECT prerequisites_raw, prerequisites_ast FROM courses WHERE course_code_normalized = ?",
+                           (code,)).fetchone()
+        if row is not None:
+            # Same prerequisites the engine compiles from the loaded row
+            edges.extend((code, prereq) for prereq in engine.prerequisite_codes(_decode(row)))
+    conn.executemany("INSERT OR IGNORE INTO course_prerequisites VALUES (?, ?)", edges)
+
+
+def _refresh_program_tables(conn, program_ids):
+    """Rebuild the listed courses and pool key ranges of the given programs from their rows."""
+    program_ids = list(program_ids)
+    for table in ('program_courses', 'program_pools'):
+        conn.executemany(f"DELETE FROM {table} WHERE program_id = ?", [(p,) for p in program_ids])
+    marks = ', '.join('?' for _ in program_ids)
+    for row in conn.execute(f"SELECT id, rules FROM programs WHERE id IN ({marks})", program_ids).fetchall():
+        plan = engine.compile_program({'rules': json.loads(row['rules'])}, {})
+        conn.executemany("INSERT OR IGNORE INTO program_courses VALUES (?, ?)",
+                         [(row['id'], code) for code in plan['course_codes']])
+        ranges = []
+        for rule in plan['dynamic_rules']:
+            for dept in rule['department_list']:
+                key_range = department_key_range(dept, rule['level_min'], rule['level_max'])
+                if key_range is not None:
+                    ranges.append((row['id'],) + key_range)
+        conn.executemany("INSERT INTO program_pools VALUES (?, ?, ?)", ranges)
+
+
+def _store_satisfiers(conn, artifact):
+    """Replace the precompiled satisfier closure with a prerequisite_satisfiers.json artifact (or clear it)."""
+    conn.execute("DELETE FROM prerequisite_satisfiers")
+    conn.execute("DELETE FROM catalog_metadata")
+    if artifact is None:
+        return
+    index = engine.SatisfierIndex(artifact)
+    conn.executemany("INSERT INTO prerequisite_satisfiers VALUES (?, ?)",
+                     [(required, satisfier) for required, codes in index.satisfiers.items() for satisfier in codes])
+    header = {key: artifact.get(key) for key in ('format', 'hierarchy_rules', 'equivalencies_sha256')}
+    header['catalog_courses'] = sorted(index.catalog_courses)
+    conn.executemany("INSERT INTO catalog_metadata VALUES (?, ?)",
+                     [(key, json.dumps(value)) for key, value in header.items()])
+
+
+def build_database(path, programs, courses, equivalencies, prereq_config, satisfier_artifact=None):
+    """
+    Write a catalog into a SQLite file, replacing what it held.
+
+    Programs are keyed by id and courses by canonical code like the Supabase
+    tables: a later duplicate replaces an earlier one.
+
+    Args:
+        path: SQLite file (created if missing)
+        programs: List of program dicts
+        courses: normalized code -> course dict (JSON file format)
+        equivalencies: Equivalency map
+        prereq_config: Prerequisite config
+        satisfier_artifact: Contents of prerequisite_satisfiers.json; stored
+                            only if it was built from `equivalencies` and
+                            `prereq_config`
+
+    Returns:
+        dict: table -> row count
+    """
+    if satisfier_artifact is not None and not engine.satisfier_artifact_matches(satisfier_artifact, equivalencies, prereq_config):
+        print("   ⚠️  prerequisite_satisfiers.json is stale (re-run generate_equivalencies.py), not storing it")
+        satisfier_artifact = None
+
+    conn = connect(path, create=True)
+    try:
+        with conn:
+            for table in ('programs', 'courses', 'course_equivalencies', 'prerequisite_config', 'course_prerequisites',
+                          'program_courses', 'program_pools'):
+                conn.execute(f"DELETE FROM {table}")
+            _insert(conn, 'programs', (catalog_rows.program_to_row(p) for p in programs))
+            _insert(conn, 'courses', (dict(row, course_key=course_key(row['course_code_normalized']))
+                                      for row in (catalog_rows.course_to_row(code, c) for code, c in courses.items())))
+            _insert(conn, 'course_equivalencies', (catalog_rows.equivalency_to_row(code, e) for code, e in equivalencies.items()))
+            _insert(conn, 'prerequisite_config', [{
+                "config_name": "hierarchy_rules",
+                "config_value": prereq_config,
+                "description": "Prerequisite matching hierarchy rules and settings",
+            }])
+            _refresh_course_tables(conn, [row[0] for row in conn.execute("SELECT course_code_normalized FROM courses")])
+            _refresh_program_tables(conn, [row[0] for row in conn.execute("SELECT id FROM programs")])
+            _store_satisfiers(conn, satisfier_artifact)
+        counts = {}
+        for table in ('programs', 'courses', 'course_equivalencies', 'prerequisite_config', 'course_prerequisites',
+                      'prerequisite_satisfiers', 'program_courses', 'program_pools'):
+            counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return counts
+    finally:
+        conn.close()
+
+
+def build_from_json(path):
+    """
+    Build a SQLite catalog from the JSON data files the engine loads
+    (supplementary GenEd courses merged under the World Campus master list).
+
+    Returns:
+        dict: table -> row count
+    """
+    def read(file_path, default=None):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            if default is None:
+                raise
+            print(f"   ⚠️  {os.path.basename(file_path)} not found")
+            return default
+
+    courses = {**read(engine.GENED_SUPPLEMENTARY), **read(engine.WORLD_CAMPUS_MASTER)}
+    return build_database(
+        path,
+        read(engine.PROGRAMS_FILE),
+        courses,
+        read(engine.EQUIVALENCIES_FILE, {}),
+        read(engine.PREREQ_CONFIG_FILE, catalog_rows.DEFAULT_PREREQ_CONFIG),
+        read(engine.SATISFIERS_FILE, False) or None,
+    )
+
+
+def _load_satisfier_index(conn, equivalency_map, prereq_config, codes_table=None):
+    """
+    SatisfierIndex from the precompiled tables, or from the data file when
+    they were built from other equivalencies or hierarchy rules.
+
+    Args:
+        codes_table: Optional table of codes (column `code`); only the
+                     closures of those prerequisite codes are loaded
+    """
+    header = {row['key']: json.loads(row['value']) for row in conn.execute("SELECT key, value FROM catalog_metadata")}
+    if not header or not engine.satisfier_artifact_matches(header, equivalency_map, prereq_config):
+        return engine.load_satisfier_index(equivalency_map, prereq_config)
+
+    sql = "SELECT prerequisite_code, satisfier_code FROM prerequisite_satisfiers"
+    if codes_table:
+        sql += f" WHERE prerequisite_code IN (SELECT code FROM {codes_table})"
+    satisfiers = {}
+    satisfies = {}
+    for required, satisfier in conn.execute(sql):
+        satisfiers.setdefault(required, []).append(satisfier)
+        satisfies.setdefault(satisfier, []).append(required)
+    index = engine.SatisfierIndex({'satisfiers': satisfiers, 'satisfies': satisfies,
+                                   'catalog_courses': header.get('catalog_courses', [])})
+    print(f"  → Loaded satisfier index for {len(index.satisfiers)} prerequisite codes")
+    return index
+
+
+def _prereq_config(rows):
+    if rows:
+        return rows[0]['config_value']
+    print("   ⚠️  Using default prerequisite config (not found in database)")
+    return catalog_rows.DEFAULT_PREREQ_CONFIG
+
+
+class LazyCourseColumns(catalog_rows.LazyCourseColumns):
+    """
+    Long course text read from the SQLite file on first use.
+
+    Args:
+        path: SQLite file
+        fields: Column names (same as the course dict keys)
+    """
+
+    def __init__(self, path, fields=LAZY_COURSE_COLUMNS):
+        super().__init__(fields)
+        self._path = path
+
+    def _fetch(self):
+        conn = connect(self._path)
+        try:
+            rows = conn.execute(f"SELECT course_code_normalized, {', '.join(self.fields)} FROM courses").fetchall()
+            return [_decode(row) for row in rows]
+        finally:
+            conn.close()
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._path = None
+
+
+def load_all_data(path=None):
+    """
+    Load all data from the SQLite file into memory.
+
+    Args:
+        path: SQLite file (default CATALOG_SQLITE_DB)
+
+    Returns:
+        tuple: (programs_list, courses_dict, equivalencies_dict, prereq_config_dict)
+
+    Raises:
+        Exception: If no file is configured or it cannot be read
+    """
+    global _cache
+    path = path or DB_FILE
+    conn = connect(path)
+    print(f"📥 Loading data from {os.path.basename(path)}...")
+    try:
+        # One read transaction: every table from the same snapshot
+        conn.execute("BEGIN")
+        tables = {name: _select(conn, name) for name in TABLES}
+        programs = [catalog_rows.program_from_row(row) for row in tables['programs']]
+        courses_dict = {row['course_code_normalized']: catalog_rows.course_from_row(row) for row in tables['courses']}
+        equiv_dict = {row['course_code']: catalog_rows.equivalency_from_row(row) for row in tables['equivalencies']}
+        prereq_config = _prereq_config(tables['config'])
+        satisfier_index = _load_satisfier_index(conn, equiv_dict, prereq_config)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    print(f"   ✓ Loaded {len(programs)} programs, {len(courses_dict)} courses, {len(equiv_dict)} equivalency mappings")
+    programs, courses_dict = engine.compile_catalog(
+        programs, courses_dict, satisfier_index, lazy_columns=LazyCourseColumns(path)
+    )
+    print(f"✅ SQLite load complete: {len(programs)} programs, {len(courses_dict)} courses")
+
+    _cache = {
+        "programs": programs,
+        "courses": courses_dict,
+        "equivalencies": equiv_dict,
+        "prereq_config": prereq_config,
+        "versions": {name: catalog_rows.row_versions(name, rows) for name, rows in tables.items()},
+        "patch": None,
+        "path": path,
+    }
+    return programs, courses_dict, equiv_dict, prereq_config
+
+
+def load_programs(program_ids, path=None):
+    """
+    Load only the given programs and the courses they can need: the courses
+    their rules list, the courses in their dynamic pools and, transitively,
+    every prerequisite of those. The cache is not touched.
+
+    Scores computed on the result match the full catalog's for these programs.
+
+    Args:
+        program_ids: Program ids
+        path: SQLite file (default CATALOG_SQLITE_DB)
+
+    Returns:
+        tuple: (programs_list, courses_dict, equivalencies_dict, prereq_config_dict)
+    """
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN")
+        conn.execute("CREATE TEMP TABLE selected_programs (id TEXT PRIMARY KEY)")
+        conn.executemany("INSERT OR IGNORE INTO selected_programs VALUES (?)", [(p,) for p in program_ids])
+        conn.execute("CREATE TEMP TABLE selected_courses (code TEXT PRIMARY KEY)")
+        conn.execute("""
+            INSERT OR IGNORE INTO selected_courses
+            SELECT course_code_normalized FROM program_courses
+            WHERE program_id IN (SELECT id FROM selected_programs)
+            UNION
+            SELECT c.course_code_normalized FROM program_pools p
+            JOIN courses c ON c.course_key BETWEEN p.key_min AND p.key_max
+            WHERE p.program_id IN (SELECT id FROM selected_programs)
+        """)
+        conn.execute("""
+            INSERT OR IGNORE INTO selected_courses
+            WITH RECURSIVE closure(code) AS (
+                SELECT code FROM selected_courses
+                UNION
+                SELECT e.prerequisite_code FROM course_prerequisites e JOIN closure ON e.course_code_normalized = closure.code
+            )
+            SELECT code FROM closure
+        """)
+
+        programs = [catalog_rows.program_from_row(row)
+                    for row in _select(conn, 'programs', "id IN (SELECT id FROM selected_programs)")]
+        courses_dict = {
+            row['course_code_normalized']: catalog_rows.course_from_row(row)
+            for row in _select(conn, 'courses', "course_code_normalized IN (SELECT code FROM selected_courses)",
+                               extra_columns=LAZY_COURSE_COLUMNS)
+        }
+        equiv_dict = {row['course_code']: catalog_rows.equivalency_from_row(row) for row in _select(conn, 'equivalencies')}
+        prereq_config = _prereq_config(_select(conn, 'config'))
+        satisfier_index = _load_satisfier_index(conn, equiv_dict, prereq_config, codes_table='selected_courses')
+        conn.rollback()
+    finally:
+        conn.close()
+
+    print(f"📥 Loaded {len(programs)} programs with {len(courses_dict)} courses from SQLite")
+    programs, courses_dict = engine.compile_catalog(programs, courses_dict, satisfier_index)
+    return programs, courses_dict, equiv_dict, prereq_config
+
+
+def get_cached_data():
+    """
+    Return cached data without reloading from the file.
+
+    Returns:
+        tuple: (programs_list, courses_dict, equivalencies_dict, prereq_config_dict)
+    """
+    cache = _cache
+    if cache['programs'] is None:
+        return load_all_data()
+    return cache['programs'], cache['courses'], cache['equivalencies'], cache['prereq_config']
+
+
+def reload_cache():
+    """Force a full reload from the file (the previous data stays cached until it completes)."""
+    print("🔄 Reloading data from SQLite...")
+    return load_all_data(_cache['path'])
+
+
+def is_cache_loaded():
+    return _cache['programs'] is not None
+
+
+def sync_cache(path=None, load_if_empty=True):
+    """
+    Apply the rows changed in the file since the last load or sync to the
+    cached catalog, like database.sync_cache(): rows with updated_at at or
+    past each table's watermark are patched in (catalog_rows.apply_changes),
+    row counts reveal deletions, and rows that appeared with an older
+    updated_at are patched in too.
+
+    Args:
+        path: Database file (default: the one the cache was loaded from)
+        load_if_empty: Load the catalog when nothing is cached yet (see
+            database.sync_cache)
+
+    Returns:
+        engine.CatalogPatch: What changed, or None if nothing did (or the
+            cache was loaded for the first time instead)
+    """
+    global _cache
+    with _sync_lock:
+        cache = _cache
+        if cache['programs'] is None or cache['versions'] is None:
+            if load_if_empty:
+                load_all_data(path)
+                _sync_stats['full_reloads'] += 1
+            return None
+        path = path or cache['path']
+        started = time.perf_counter()
+        versions = cache['versions']
+
+        conn = connect(path)
+        try:
+            conn.execute("BEGIN")
+            changed = {}
+            removed = {}
+            new_versions = {}
+            for name, (table, _, key) in TABLES.items():
+                since = catalog_rows.watermark(versions[name])
+                where, params = (None, ()) if since is None else ("julianday(updated_at) >= julianday(?)", (since.isoformat(),))
+                # Changed courses are rebuilt complete, with their lazy text
+                extra = LAZY_COURSE_COLUMNS if name == 'courses' else ()
+                known = dict(versions[name])
+                changed[name] = catalog_rows.new_rows(name, known, _select(conn, name, where, params, extra))
+                removed[name] = set()
+                filter_sql = f" WHERE {CONFIG_FILTER}" if name == 'config' else ""
+                if conn.execute(f"SELECT COUNT(*) FROM {table}{filter_sql}").fetchone()[0] != len(known):
+                    keys = {row[0] for row in conn.execute(f"SELECT {key} FROM {table}{filter_sql}")}
+                    unexplained = keys - set(known)
+                    if unexplained:
+                        print(f"🔄 {table}: {len(unexplained)} rows appeared without a newer updated_at, fetching them")
+                        rows = _select(conn, name, extra_columns=extra)
+                        changed[name] += catalog_rows.new_rows(name, known, [r for r in rows if r[key] in unexplained])
+                    removed[name] = set(known) - keys
+                    for stale in removed[name]:
+                        del known[stale]
+                new_versions[name] = known
+
+            changed_rows = sum(len(rows) + len(removed[name]) for name, rows in changed.items())
+            _sync_stats['syncs'] += 1
+            _sync_stats['last_sync'] = time.time()
+            if not changed_rows:
+                _sync_stats['last_sync_seconds'] = time.perf_counter() - started
+                return None
+
+            _cache, patch = catalog_rows.apply_changes(
+                cache, changed, removed, new_versions,
+                load_satisfiers=lambda equiv, config: _load_satisfier_index(conn, equiv, config),
+            )
+            conn.rollback()
+        finally:
+            conn.close()
+
+        _sync_stats['changed_rows'] += changed_rows
+        _sync_stats['last_sync_seconds'] = time.perf_counter() - started
+        summary = ', '.join(f"{len(rows)} changed / {len(removed[name])} removed {name}"
+                            for name, rows in changed.items() if rows or removed[name])
+        print(f"🔄 Synced {summary} in {_sync_stats['last_sync_seconds']:.2f}s")
+        return patch
+
+
+def cached_patch(courses_db):
+    """The engine.CatalogPatch that produced `courses_db` in the last sync (see database.cached_patch)."""
+    cache = _cache
+    return cache['patch'] if cache['courses'] is courses_db else None
+
+
+def sync_status():
+    """Delta sync counters and per-table watermarks (for the admin endpoint)."""
+    watermarks = {}
+    for name, table_versions in (_cache['versions'] or {}).items():
+        latest = catalog_rows.watermark(table_versions)
+        watermarks[name] = latest.isoformat() if latest else None
+    return dict(_sync_stats, watermarks=watermarks, path=_cache['path'])
+
+
+def _update_rows(table, key_column, updates, refresh):
+    """
+    Apply partial updates to many rows in one transaction, rebuild the
+    precompiled tables derived from them and patch the cache with one sync.
+
+    Args:
+        table: 'programs' or 'courses'
+        key_column: The table's primary key
+        updates: key -> {column: new value}
+        refresh: (connection, keys) -> None, rebuilds the derived tables
+    """
+    path = _cache['path'] or DB_FILE
+    if not path:
+        return False
+    try:
+        conn = connect(path)
+        try:
+            columns = _table_columns(conn, table)
+            unknown = {column for values in updates.values() for column in values} - columns
+            if unknown:
+                raise ValueError(f"unknown {table} columns: {', '.join(sorted(unknown))}")
+            keys = set(updates)
+            with conn:
+                for key, values in updates.items():
+                    if not values:
+                        continue
+                    names = list(values)
+                    cursor = conn.execute(
+                        f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in names)} WHERE {key_column} = ?",
+                        [_encode(c, values[c]) for c in names] + [key],
+                    )
+                    if cursor.rowcount == 0:
+                        # Leaving the block rolls the whole batch back
+                        raise KeyError(key)
+                    keys.add(values.get(key_column, key))
+                refresh(conn, keys)
+        finally:
+            conn.close()
+        sync_cache(path, load_if_empty=False)
+        return True
+    except Exception as e:
+        print(f"Error updating {table}: {e!r}")
+        return False
+
+
+def update_programs(updates):
+    """
+    Update many program rows in one transaction and apply the changes to the
+    cache with a single sync: only the changed plans and what depends on
+    them are rebuilt, never the whole catalog.
+
+    Args:
+        updates (dict): Program ID -> {column: new value}
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return _update_rows('programs', 'id', updates, _refresh_program_tables)
+
+
+def update_courses(updates):
+    """
+    Update many course rows in one transaction and apply the changes to the
+    cache with a single sync: only the changed courses, the plans that list
+    them and the indexes over them are rebuilt, never the whole catalog.
+
+    A new prerequisites_raw without a prerequisites_ast recompiles the AST,
+    so the stored prerequisite edges follow the text.
+
+    Args:
+        updates (dict): Course code (any spelling) -> {column: new value}
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    by_code = {}
+    for code, updated_data in updates.items():
+        norm_code = engine.normalize_code(code)
+        values = by_code.setdefault(norm_code, {})
+        values.update(updated_data)
+        if 'prerequisites_raw' in updated_data and 'prerequisites_ast' not in updated_data:
+            # With the course's code, as at build time, so it is not its own prerequisite
+            values['prerequisites_ast'] = engine.course_prerequisite_ast(
+                {'courseCode': norm_code, 'prerequisites_raw': updated_data['prerequisites_raw']})
+        if 'course_code_normalized' in updated_data:
+            values['course_key'] = course_key(updated_data['course_code_normalized'])
+    return _update_rows('courses', 'course_code_normalized', by_code, _refresh_course_tables)
+
+
+def update_program(program_id, updated_data):
+    """
+    Update a program row and apply the change to the cache (see update_programs).
+
+    Args:
+        program_id (str): Program ID
+        updated_data (dict): Column -> new value
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return update_programs({program_id: updated_data})
+
+
+def update_course(course_code, updated_data):
+    """
+    Update a course row and apply the change to the cache (see update_courses).
+
+    Args:
+        course_code (str): Course code (any spelling)
+        updated_data (dict): Column -> new value
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return update_courses({course_code: updated_data})
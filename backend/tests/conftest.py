@@ -156,6 +156,36 @@ def sample_programs_db():
         }
     ]
 
+@pytest.fixture
+def mixed_programs_db(sample_programs_db):
+    """Sample programs plus one with subset and group_option rules."""
+    return sample_programs_db + [
+        {
+            "id": "Statistics",
+            "type": "Certificates",
+            "rules": [
+                {
+                    "name": "Core (select 6 credits)",
+                    "type": "subset",
+                    "credits_needed": 6,
+                    "courses": [
+                        {"code": "STAT 200", "credits": 3},
+                        {"code": "ECON 102", "credits": 3},
+                        {"code": "MATH 140", "credits": 4}
+                    ]
+                },
+                {
+                    "name": "Option",
+                    "type": "group_option",
+                    "groups": [
+                        {"name": "Option A", "courses": [{"code": "ECON 302", "credits": 3}, {"code": "ECON 304", "credits": 3}]},
+                        {"name": "Option B", "courses": [{"code": "MGMT 301", "credits": 3}]}
+                    ]
+                }
+            ]
+        }
+    ]
+
 @pytest.fixture
 def sample_equivalency_map():
     """Sample equivalency map for testing."""
@@ -0,0 +1,310 @@
+"""
+Local PostgREST-compatible stand-in server for database.py tests.
+
+Serves in-memory tables under /rest/v1/<table> with the subset of the
+PostgREST API the Supabase client uses: `select` projection, `order`,
+`offset`/`limit` and Range-header pagination, `Prefer: count=exact`,
+horizontal filters (eq, neq, gt, gte, lt, lte, in) and a `max_rows` cap
+that truncates responses like PostgREST's db-max-rows setting. POST requests
+are upserts (`on_conflict`, `Prefer: resolution=merge-duplicates`,
+`return=minimal`) that stamp updated_at like the schema's triggers and reject
+a batch that names the same key twice, as PostgreSQL does. PATCH and DELETE
+apply to the rows matching the filters. POST /rpc/update_rows emulates the
+batch update function of create_schema.sql.
+
+Every request is recorded in `requests` so tests can assert on projections,
+page sizes and concurrency; `fail()` makes the next requests to a table fail.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+_OPERATORS = {
+    'eq': lambda a, b: a == b,
+    'neq': lambda a, b: a != b,
+    'gt': lambda a, b: a is not None and a > b,
+    'gte': lambda a, b: a is not None and a >= b,
+    'lt': lambda a, b: a is not None and a < b,
+    'lte': lambda a, b: a is not None and a <= b,
+}
+
+
+class PostgrestServer:
+    """
+    Args:
+        tables: table name -> list of row dicts
+        max_rows: Most rows returned by one request (None = unlimited)
+        delay: Seconds every request is held, to make concurrency observable
+        report_count: Answer `Prefer: count=exact` with a Content-Range total
+        serial: table -> column filled with the next integer for new rows
+                (SERIAL primary keys)
+        functions: Serve the update_rows function (False: a database
+                   created before it existed)
+    """
+
+    def __init__(self, tables=None, max_rows=None, delay=0.0, report_count=True, serial=None, functions=True):
+        self.tables = tables or {}
+        self.max_rows = max_rows
+        self.delay = delay
+        self.report_count = report_count
+        self.serial = dict(serial or {})
+        self.functions = functions
+        self.requests = []
+        self.failures = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def client(self):
+        """A Supabase client pointed at this server."""
+        from supabase import create_client
+        return create_client(self.url, "stand-in-key")
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self, server._select)
+
+            def do_POST(self):
+                server._handle(self, server._rpc if '/rpc/' in self.path else server._upsert)
+
+            def do_PATCH(self):
+                server._handle(self, server._update)
+
+            def do_DELETE(self):
+                server._handle(self, server._delete)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def requests_for(self, table, method=None):
+        return [r for r in self.requests if r['table'] == table and (method is None or r['method'] == method)]
+
+    def fail(self, table, times=1, status=503, code="57P03", message="the database system is starting up"):
+        """Answer the next `times` requests to `table` with an error (times=None: every request)."""
+        self.failures[table] = (times, status, _error(code, message))
+
+    def _failure(self, table):
+        with self._lock:
+            failure = self.failures.get(table)
+            if failure is None:
+                return None
+            times, status, body = failure
+            if times is not None:
+                if times <= 1:
+                    del self.failures[table]
+                else:
+                    self.failures[table] = (times - 1, status, body)
+            return status, {}, body
+
+    def _record(self, handler, method):
+        url = urlsplit(handler.path)
+        table = url.path.rsplit('/', 1)[-1]
+        params = parse_qsl(url.query, keep_blank_values=True)
+        request = {'table': table, 'method': method, 'params': dict(params), 'headers': dict(handler.headers)}
+        with self._lock:
+            self.requests.append(request)
+        return table, params
+
+    def _handle(self, handler, respond):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            status, headers, body = respond(handler)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        payload = b'' if body is None else json.dumps(body).encode('utf-8')
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _body(self, handler):
+        return json.loads(handler.rfile.read(int(handler.headers.get('Content-Length', 0))) or 'null')
+
+    def _rpc(self, handler):
+        name, _ = self._record(handler, 'RPC')
+        args = self._body(handler)
+        failure = self._failure(name)
+        if failure:
+            return failure
+        if name != 'update_rows' or not self.functions:
+            return 404, {}, _error("PGRST202", f"Could not find the function public.{name} in the schema cache")
+        table, key = args['target'], args['key_column']
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            rows = {row.get(key): row for row in self.tables[table]}
+            missing = [item['key'] for item in args['updates'] if item['key'] not in rows]
+            if missing:
+                # The function runs in one transaction: nothing is updated
+                return 404, {}, _error("P0002", f"update_rows: no {table} row with {key} = {missing[0]}")
+            known = set().union(*rows.values())
+            unknown = [c for item in args['updates'] for c in item['values'] if c not in known]
+            if unknown:
+                return 400, {}, _error("42703", f"column {table}.{unknown[0]} does not exist")
+            for item in args['updates']:
+                rows[item['key']].update(item['values'], updated_at=now)
+        return 200, {}, len(args['updates'])
+
+    def _update(self, handler):
+        table, params = self._record(handler, 'PATCH')
+        values = self._body(handler)
+        failure = self._failure(table)
+        if failure:
+            return failure
+        now = datetime.now(timezone.utc).isoformat()
+        filters = [(name, value.partition('.')) for name, value in params if name not in ('select', 'columns')]
+        updated = []
+        with self._lock:
+            for row in self.tables.get(table, []):
+                if all(_OPERATORS[op](_text(row.get(name)), operand) for name, (op, _, operand) in filters):
+                    row.update(values, updated_at=now)
+                    updated.append(dict(row))
+        return 200, {}, updated
+
+    def _delete(self, handler):
+        table, params = self._record(handler, 'DELETE')
+        failure = self._failure(table)
+        if failure:
+            return failure
+        filters = [(name, value.partition('.')) for name, value in params if name not in ('select', 'columns')]
+        with self._lock:
+            rows = self.tables.get(table, [])
+            deleted = [row for row in rows
+                       if all(_OPERATORS[op](_text(row.get(name)), operand) for name, (op, _, operand) in filters)]
+            deleted_ids = {id(row) for row in deleted}
+            self.tables[table] = [row for row in rows if id(row) not in deleted_ids]
+        return 200, {}, deleted
+
+    def _upsert(self, handler):
+        table, params = self._record(handler, 'POST')
+        body = self._body(handler)
+        failure = self._failure(table)
+        if failure:
+            return failure
+        if table not in self.tables:
+            return 404, {}, _error("42P01", f'relation "public.{table}" does not exist')
+        rows = body if isinstance(body, list) else [body]
+        key = dict(params).get('on_conflict') or 'id'
+        keys = [row.get(key) for row in rows]
+        if len(set(map(json.dumps, keys))) != len(keys):
+            return 500, {}, _error("21000", "ON CONFLICT DO UPDATE command cannot affect row a second time")
+
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            existing = {row.get(key): row for row in self.tables[table]}
+            written = []
+            for row in rows:
+                current = existing.get(row.get(key))
+                if current is None:
+                    current = dict(row, created_at=now)
+                    serial = self.serial.get(table)
+                    if serial and current.get(serial) is None:
+                        current[serial] = max((r.get(serial) or 0 for r in self.tables[table]), default=0) + 1
+                    self.tables[table].append(current)
+                    existing[row.get(key)] = current
+                else:
+                    current.update(row)
+                current['updated_at'] = now
+                written.append(dict(current))
+        if 'return=minimal' in handler.headers.get('Prefer', ''):
+            return 201, {}, None
+        return 201, {}, written
+
+    def _select(self, handler):
+        table, params = self._record(handler, 'GET')
+        failure = self._failure(table)
+        if failure:
+            return failure
+        if table not in self.tables:
+            return 404, {}, _error("42P01", f'relation "public.{table}" does not exist')
+
+        rows = list(self.tables[table])
+        known = set().union(*rows) if rows else set()
+        select = ['*']
+        order = []
+        offset, limit = 0, None
+        for name, value in params:
+            if name == 'select':
+                select = value.split(',')
+            elif name == 'order':
+                order = [part.rsplit('.', 1) if '.' in part else (part, 'asc') for part in value.split(',')]
+            elif name == 'offset':
+                offset = int(value)
+            elif name == 'limit':
+                limit = int(value)
+            else:
+                operator, _, operand = value.partition('.')
+                if operator == 'in':
+                    allowed = set(operand.strip('()').split(','))
+                    rows = [r for r in rows if str(r.get(name)) in allowed]
+                else:
+                    rows = [r for r in rows if _OPERATORS[operator](_text(r.get(name)), operand)]
+
+        missing = [c for c in select if c != '*' and rows and c not in known]
+        if missing:
+            return 400, {}, _error("42703", f"column {table}.{missing[0]} does not exist")
+
+        for column, direction in reversed(order):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction == 'desc')
+
+        range_header = handler.headers.get('Range')
+        if range_header:
+            start, _, end = range_header.partition('-')
+            offset, limit = int(start), int(end) - int(start) + 1
+        total = len(rows)
+        if self.max_rows is not None:
+            limit = self.max_rows if limit is None else min(limit, self.max_rows)
+        page = rows[offset:offset + limit] if limit is not None else rows[offset:]
+        if select != ['*']:
+            page = [{c: r.get(c) for c in select} for r in page]
+
+        headers = {}
+        if self.report_count and 'count=exact' in handler.headers.get('Prefer', ''):
+            content_range = f"{offset}-{offset + len(page) - 1}" if page else "*"
+            headers['Content-Range'] = f"{content_range}/{total}"
+        return 200, headers, page
+
+
+def _text(value):
+    """Filter operands arrive as text; compare column values as text too."""
+    if isinstance(value, bool):
+        return str(value).lower()
+    return value if value is None else str(value)
+
+
+def _error(code, message):
+    return {"code": code, "message": message, "details": None, "hint": None}
@@ -0,0 +1,195 @@
+"""
+Unit tests for the shared catalog segment in catalog_segment.py
+"""
+import os
+import pickle
+import pytest
+import recommendation_engine as engine
+
+np = pytest.importorskip("numpy")
+
+import catalog_segment
+import catalog_state
+import vectorized_scoring
+import serve
+from catalog_segment import CatalogSegment, SegmentError
+
+HISTORIES = [
+    ([], [], []),
+    (["ECON102", "ECON442", "CAS404"], ["MGMT301"], ["GS"]),
+    (["MATH140", "STAT200", "ECON302"], [], ["GQ", "GS"]),
+]
+
+
+@pytest.fixture
+def compiled(mixed_programs_db, sample_courses_db):
+    return engine.compile_catalog(mixed_programs_db, sample_courses_db)
+
+
+@pytest.fixture
+def matrix(compiled):
+    return vectorized_scoring.ProgramScoreMatrix(*compiled)
+
+
+@pytest.fixture
+def segment_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_segment, "SEGMENT_DIR", str(tmp_path))
+    return tmp_path
+
+
+class LargeMatrix:
+    """Stands in for a ProgramScoreMatrix of a big catalog (catalog_segment only reads these)."""
+
+    program_count = 64
+
+    def __init__(self, course_count):
+        self.all_credits = np.asfortranarray(np.arange(self.program_count * course_count, dtype=float)
+                                             .reshape(self.program_count, course_count))
+
+    def column_codes(self):
+        return [f"C{c}" for c in range(self.all_credits.shape[1])]
+
+    def shared_arrays(self):
+        return {"all_credits": self.all_credits}
+
+
+class TestLayout:
+    """The file follows the documented layout."""
+
+    def test_header_and_alignment(self, matrix, segment_dir):
+        segment = catalog_segment.publish(matrix, namespace="t")
+        with open(segment.path, "rb") as f:
+            magic, version, index_size, data_offset, digest = catalog_segment.HEADER.unpack(f.read(catalog_segment.HEADER.size))
+        assert (magic, version) == (catalog_segment.MAGIC, catalog_segment.LAYOUT_VERSION)
+        assert digest.hex() == segment.digest and os.path.basename(segment.path).endswith(segment.digest[:24])
+        assert data_offset % 64 == 0 and data_offset >= catalog_segment.HEADER_SIZE + index_size
+        assert all(entry[3] % 64 == 0 and entry[3] >= data_offset for entry in segment._layout.values())
+
+    def test_columns(self, matrix, segment_dir):
+        segment = catalog_segment.publish(matrix, namespace="t")
+        assert segment.codes() == matrix.column_codes()
+        assert segment.meta == {"code_count": len(matrix.course_ids), "program_count": matrix.program_count}
+        assert sorted(segment._layout) == sorted(["codes", "code_offsets"] +
+                                                 [f"matrix_{name}" for name in matrix.shared_arrays()])
+
+    def test_rejects_other_files(self, matrix, segment_dir):
+        segment = catalog_segment.publish(matrix, namespace="t")
+        with pytest.raises(SegmentError):
+            CatalogSegment.attach(segment.path, digest="0" * 64)
+        other = segment_dir / "other"
+        other.write_bytes(b"not a segment" * 10)
+        with pytest.raises(SegmentError):
+            CatalogSegment.attach(str(other))
+
+
+class TestSharing:
+    """Arrays are read-only views of one mapping, shared by every attacher."""
+
+    def test_zero_copy_views(self, matrix, segment_dir):
+        segment = catalog_segment.publish(matrix, namespace="t")
+        credits = segment.array("matrix_all_credits")
+        assert not credits.flags.writeable and not credits.flags.owndata
+        assert np.array_equal(credits, matrix.all_credits)
+        attached = pickle.loads(pickle.dumps(segment))
+        assert attached.path == segment.path
+        assert np.array_equal(attached.array("matrix_all_credits"), credits)
+
+    def test_identical_catalogs_map_one_file(self, compiled, segment_dir):
+        first = catalog_segment.publish(vectorized_scoring.ProgramScoreMatrix(*compiled), namespace="t")
+        second = catalog_segment.publish(vectorized_scoring.ProgramScoreMatrix(*compiled), namespace="t")
+        assert first.path == second.path and len(os.listdir(segment_dir)) == 1
+
+    def test_score_matrix_reads_the_segment(self, compiled, segment_dir, sample_equivalency_map, sample_prereq_config):
+        programs, courses = compiled
+        matrix = vectorized_scoring.ProgramScoreMatrix(programs, courses)
+        expected = [matrix.score(list(set(h + m)), h, m, n, sample_equivalency_map, sample_prereq_config)
+                    for h, m, n in HISTORIES]
+        segment = catalog_segment.publish(matrix, namespace="t")
+        assert matrix.share(segment) == len(matrix.shared_arrays())
+        assert np.shares_memory(matrix.all_credits, segment.array("matrix_all_credits"))
+        assert matrix.all_credits.flags.f_contiguous
+        for (h, m, n), scores in zip(HISTORIES, expected):
+            assert matrix.score(list(set(h + m)), h, m, n, sample_equivalency_map, sample_prereq_config) == scores
+
+
+class TestGenerations:
+    """A reload publishes a new segment and retires the old file name."""
+
+    def test_publish_retires_previous_segment(self, mixed_programs_db, sample_courses_db, sample_equivalency_map,
+                                              sample_prereq_config, segment_dir):
+        def build(courses):
+            programs, catalog = engine.compile_catalog(mixed_programs_db, dict(courses))
+            return catalog_state.build_state(programs, catalog, sample_equivalency_map, sample_prereq_config,
+                                             source='json', vectorized=True, segment_namespace="t")
+
+        holder = catalog_state.CatalogHolder()
+        holder.publish(build(sample_courses_db))
+        old = holder.current()
+        assert holder.status()["segment"]["path"] == old.segment.path
+        old_arrays = {name: old.segment.array(name).copy() for name in old.segment._layout}
+
+        changed = dict(sample_courses_db, ECON102=dict(sample_courses_db["ECON102"], credits=4))
+        holder.publish(build(changed))
+        new = holder.current()
+        assert new.segment.path != old.segment.path
+        assert os.listdir(segment_dir) == [os.path.basename(new.segment.path)]
+        # The old mapping stays readable for requests still using it
+        assert all(np.array_equal(old.segment.array(name), array) for name, array in old_arrays.items())
+        assert not all(np.array_equal(new.segment.array(name), array) for name, array in old_arrays.items())
+
+        assert catalog_segment.remove_namespace("t") == 1
+        assert os.listdir(segment_dir) == []
+
+
+@pytest.mark.skipif(not hasattr(os, "fork") or serve.memory_usage(os.getpid()) is None,
+                    reason="needs fork and /proc/<pid>/smaps_rollup")
+class TestWorkerMemory:
+    """Workers reading the whole segment split its pages instead of each paying for them."""
+
+    WORKERS = 4
+
+    def test_workers_share_the_pages(self, segment_dir):
+        # 64 programs x 65536 courses of float64: 32 MB
+        segment = catalog_segment.publish(LargeMatrix(65536), namespace="t")
+        size = segment.array("matrix_all_credits").nbytes
+        workers = []
+        try:
+            for _ in range(self.WORKERS):
+                ready_r, ready_w = os.pipe()
+                go_r, go_w = os.pipe()
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        # Like a worker after a reload: map the file by name
+                        attached = CatalogSegment.attach(segment.path, segment.digest)
+                        os.write(ready_w, b"a")
+                        os.read(go_r, 1)
+                        float(attached.array("matrix_all_credits").sum())
+                        os.write(ready_w, b"r")
+                        os.read(go_r, 1)
+                    finally:
+                        os._exit(0)
+                workers.append((pid, ready_r, go_w))
+
+            def measure():
+                for _, ready_r, _ in workers:
+                    os.read(ready_r, 1)
+                usage = {pid: serve.memory_usage(pid) for pid, _, _ in workers}
+                for _, _, go_w in workers:
+                    os.write(go_w, b"g")
+                return usage
+
+            before = measure()
+            after = measure()
+        finally:
+            for pid, ready_r, go_w in workers:
+                os.close(ready_r)
+                os.close(go_w)
+                os.waitpid(pid, 0)
+
+        for pid, _, _ in workers:
+            # Every worker has the whole segment resident...
+            assert after[pid]["rss"] - before[pid]["rss"] >= 0.9 * size
+            # ...but is charged only its share of the pages
+            assert after[pid]["pss"] - before[pid]["pss"] <= size / self.WORKERS + size / 8
+        assert sum(after[pid]["pss"] - before[pid]["pss"] for pid, _, _ in workers) <= 1.25 * size
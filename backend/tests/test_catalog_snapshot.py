@@ -0,0 +1,76 @@
+"""
+Unit tests for the catalog snapshot in recommendation_engine.py
+"""
+import pickle
+import pytest
+import recommendation_engine as engine
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "catalog_snapshot.pickle")
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def fail_if_sources_parsed():
+    raise AssertionError("sources were parsed although a valid snapshot exists")
+
+
+class TestCatalogSnapshot:
+    """load_data() round trips through the binary snapshot."""
+
+    def test_first_load_writes_snapshot(self, snapshot_path):
+        programs, courses, _, _ = engine.load_data(snapshot_path)
+        header = read_header(snapshot_path)
+        assert header == {"format": engine.SNAPSHOT_FORMAT, "source_hash": engine.catalog_source_hash()}
+        assert programs and courses
+
+    def test_snapshot_matches_sources(self, snapshot_path, monkeypatch):
+        fresh = engine.load_data(None)
+        engine.load_data(snapshot_path)
+        monkeypatch.setattr(engine, "_load_sources", fail_if_sources_parsed)
+        programs, courses, equivalency_map, prereq_config = engine.load_data(snapshot_path)
+
+        assert isinstance(courses, engine.CourseCatalog)
+        assert dict(courses) == dict(fresh[1])
+        assert [p['_compiled'] for p in programs] == [p['_compiled'] for p in fresh[0]]
+        assert (equivalency_map, prereq_config) == (fresh[2], fresh[3])
+        assert courses.prereq_graph.trees == fresh[1].prereq_graph.trees
+        assert courses.program_index.by_code == fresh[1].program_index.by_code
+        assert courses.satisfier_index.satisfiers == fresh[1].satisfier_index.satisfiers
+
+    def test_each_load_gets_new_data_version(self, snapshot_path):
+        first = engine.load_data(snapshot_path)[1].data_version
+        second = engine.load_data(snapshot_path)[1].data_version
+        assert first != second
+
+    def test_stale_snapshot_is_rebuilt(self, snapshot_path, monkeypatch):
+        engine.load_data(snapshot_path)
+        monkeypatch.setattr(engine, "catalog_source_hash", lambda: "changed")
+        assert engine.load_catalog_snapshot(snapshot_path, "changed") is None
+        engine.load_data(snapshot_path)
+        assert read_header(snapshot_path)["source_hash"] == "changed"
+
+    def test_corrupt_snapshot_is_rebuilt(self, snapshot_path):
+        with open(snapshot_path, 'wb') as f:
+            f.write(b"not a pickle")
+        programs, _, _, _ = engine.load_data(snapshot_path)
+        assert programs
+        assert engine.load_catalog_snapshot(snapshot_path, engine.catalog_source_hash()) is not None
+
+    def test_disabled(self, tmp_path):
+        programs, _, _, _ = engine.load_data("off")
+        assert programs
+        assert list(tmp_path.iterdir()) == []
+
+    def test_source_hash_tracks_file_contents(self, tmp_path, monkeypatch):
+        config = tmp_path / "prerequisite_config.json"
+        config.write_text('{"hierarchy_rules": {}}')
+        monkeypatch.setattr(engine, "PREREQ_CONFIG_FILE", str(config))
+        before = engine.catalog_source_hash()
+        config.write_text('{"hierarchy_rules": {"minimum_level_difference": 1}}')
+        assert engine.catalog_source_hash() != before
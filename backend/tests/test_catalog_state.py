@@ -0,0 +1,153 @@
+"""
+Unit tests for catalog_state.py
+"""
+import threading
+import pytest
+import recommendation_engine as engine
+import catalog_state
+from catalog_state import CatalogHolder, CatalogPoller, CatalogState, CatalogWatcher
+
+
+def make_state(tag):
+    return CatalogState([{"id": tag, "type": "Majors"}], {}, {}, {}, source=tag)
+
+
+class TestCatalogState:
+    """Tests for CatalogState and build_state()."""
+
+    def test_immutable(self):
+        state = make_state("a")
+        with pytest.raises(AttributeError):
+            state.programs = []
+        assert state.major_list == ("a",)
+
+    def test_build_state(self, mixed_programs_db, sample_courses_db, sample_equivalency_map, sample_prereq_config):
+        programs, courses = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        state = catalog_state.build_state(programs, courses, sample_equivalency_map, sample_prereq_config, source='json')
+        assert state.baselines is not None and state.score_matrix is None
+        assert state.data_version == courses.data_version
+        assert state.courses is courses
+
+    def test_build_patched_state(self, mixed_programs_db, sample_courses_db, sample_equivalency_map, sample_prereq_config):
+        programs, courses = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        state = catalog_state.build_state(programs, courses, sample_equivalency_map, sample_prereq_config, source='database')
+        changed = {"MATH140": dict(sample_courses_db["MATH140"], credits=3.0)}
+        new_programs, new_courses, patch = engine.patch_catalog(programs, courses, courses=changed)
+
+        patched = catalog_state.build_state(new_programs, new_courses, sample_equivalency_map, sample_prereq_config,
+                                            source='database', previous=state, patch=patch)
+        assert patched.baselines.reused_evaluations > 0
+        assert patched.data_version == new_courses.data_version != state.data_version
+
+
+class TestCatalogHolder:
+    """Publication and background reloads."""
+
+    def test_publish(self):
+        holder = CatalogHolder()
+        assert holder.current().programs == []
+        state = make_state("a")
+        holder.publish(state)
+        assert holder.current() is state
+        assert holder.generation == 1
+
+    def test_listeners_see_published_states(self):
+        holder = CatalogHolder()
+        seen = []
+
+        def broken(state):
+            raise RuntimeError("listener failed")
+
+        holder.listeners.extend([broken, seen.append])
+        state = make_state("a")
+        assert holder.reload(lambda: state) is state
+        assert seen == [state] and holder.current() is state
+
+    def test_failed_reload_keeps_current_state(self):
+        state = make_state("a")
+        holder = CatalogHolder(state)
+
+        def broken():
+            raise ValueError("bad data")
+
+        assert holder.reload(broken) is None
+        assert holder.current() is state
+        assert holder.failures == 1
+        assert holder.status()["last_error"] == "ValueError: bad data"
+
+    def test_background_reload_serves_old_state_until_swap(self):
+        old, new = make_state("old"), make_state("new")
+        holder = CatalogHolder(old)
+        release = threading.Event()
+
+        def build():
+            release.wait(5)
+            return new
+
+        assert holder.reload_async(build)
+        # A request starting now still gets the complete old state
+        assert holder.current() is old
+        assert holder.reloading
+        release.set()
+        assert holder.wait(5)
+        assert holder.current() is new
+        assert not holder.reloading
+
+    def test_reload_requests_during_a_rebuild_coalesce(self):
+        holder = CatalogHolder(make_state("old"))
+        release = threading.Event()
+        builds = []
+
+        def build():
+            builds.append(len(builds))
+            release.wait(5)
+            return make_state(f"build {len(builds)}")
+
+        assert holder.reload_async(build)
+        assert not holder.reload_async(build)
+        assert not holder.reload_async(build)
+        release.set()
+        assert holder.wait(5)
+        assert len(builds) == 2
+        assert holder.current().source == "build 2"
+        assert holder.reloads == 2
+
+
+class TestCatalogPoller:
+    """Tests for CatalogPoller.check()."""
+
+    def test_calls_on_change_when_poll_reports_changes(self):
+        results = [None, "patch", None]
+        calls = []
+        poller = CatalogPoller(lambda: results.pop(0), lambda: calls.append(1))
+        assert [poller.check() for _ in range(3)] == [False, True, False]
+        assert len(calls) == 1
+
+
+class TestCatalogWatcher:
+    """Tests for CatalogWatcher.check()."""
+
+    def test_detects_changes(self, tmp_path):
+        data_file = tmp_path / "courses.json"
+        data_file.write_text("{}")
+        calls = []
+        watcher = CatalogWatcher([str(data_file), str(tmp_path / "missing.json")], lambda: calls.append(1))
+
+        assert not watcher.check()
+        data_file.write_text('{"ECON102": {}}')
+        assert watcher.check()
+        assert not watcher.check()
+        (tmp_path / "missing.json").write_text("{}")
+        assert watcher.check()
+        assert len(calls) == 2
+
+    def test_polling_thread(self, tmp_path):
+        data_file = tmp_path / "courses.json"
+        data_file.write_text("{}")
+        changed = threading.Event()
+        watcher = CatalogWatcher([str(data_file)], changed.set, interval=0.01).start()
+        try:
+            data_file.write_text('{"ECON102": {}}')
+            assert changed.wait(5)
+        finally:
+            watcher.stop()
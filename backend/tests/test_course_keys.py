@@ -0,0 +1,120 @@
+"""
+Unit tests for course_keys.py and canonical course codes in the engine
+"""
+import pytest
+import recommendation_engine as engine
+from course_keys import (canonical_code, course_key, department_key_range, display_code, key_code,
+                         key_department, key_number, key_suffix, split_code)
+
+
+class TestCourseKey:
+    """Tests for course_key() and its decoders."""
+
+    @pytest.mark.parametrize("spelling", ["ENGL 15", "ENGL 015", "ENGL15", "engl 0015", "ENGL\xa015"])
+    def test_spellings_share_one_key(self, spelling):
+        assert course_key(spelling) == course_key("ENGL 15")
+        assert canonical_code(spelling) == "ENGL15"
+
+    def test_fields(self):
+        key = course_key("ENGL 202D")
+        assert (key_department(key), key_number(key), key_suffix(key)) == ("ENGL", 202, "D")
+        assert key_code(key) == "ENGL202D"
+        assert display_code("engl202d") == "ENGL 202D"
+
+    @pytest.mark.parametrize("code", ["", None, "ECON-102", "ABC", "123"])
+    def test_codes_without_key(self, code):
+        assert course_key(code) is None
+        assert split_code(code) == (None, 0)
+
+    @pytest.mark.parametrize("code, split", [("BBH 440(U.S.;IL)", ("BBH", 440)), ("ABCDEFGH 100", ("ABCDEFGH", 100)),
+                                             ("MATH 140ABCD", ("MATH", 140)), ("ECON 16384", ("ECON", 16384))])
+    def test_codes_without_key_split_on_their_prefix(self, code, split):
+        assert course_key(code) is None
+        assert split_code(code) == split
+
+    def test_canonical_code_without_key(self):
+        assert canonical_code("econ-102") == "ECON-102"
+        assert canonical_code(None) == ""
+
+    def test_keys_sort_like_the_catalog(self):
+        codes = ["ACCTG 201", "ACCTG 211", "ECON 14", "ECON 102", "ENGL 202", "ENGL 202C", "ENGL 202D", "ENGLX 1"]
+        assert sorted(codes, key=course_key) == codes
+
+    def test_keys_fit_64_bits(self):
+        assert course_key("ZZZZZZZ 16383ZZZ") < 2 ** 63
+        assert course_key("ECON 16384") is None
+
+    def test_department_key_range(self):
+        low, high = department_key_range("ENGL", 100, 299)
+        inside = ["ENGL 100", "ENGL 202D", "ENGL 299ZZZ"]
+        outside = ["ENGL 15", "ENGL 300", "ENG 250", "ENGLX 200", "EN 250"]
+        assert all(low <= course_key(code) <= high for code in inside)
+        assert not any(low <= course_key(code) <= high for code in outside)
+        assert department_key_range("ENGL", 300, 200) is None
+        assert department_key_range("ENGL-X") is None
+
+    def test_catalog_round_trip(self, sample_courses_db):
+        for code in sample_courses_db:
+            assert key_code(course_key(code)) == code
+
+
+class TestCanonicalLookups:
+    """Zero-padded and unpadded spellings reach the same course in the engine."""
+
+    def test_catalog_keys_canonicalized(self):
+        courses = {
+            "SOC30": {"courseCode": "SOC 30", "credits": 3.0},
+            "ECON102": {"courseCode": "ECON 102", "credits": 3.0},
+            "SOC030": {"courseCode": "SOC 030", "credits": 4.0},
+        }
+        _, catalog = engine.compile_catalog([], courses)
+        assert list(catalog) == ["SOC30", "ECON102"]
+        # The later spelling wins, as in the master-over-supplementary merge
+        assert catalog["SOC30"]["courseCode"] == "SOC 030"
+        assert engine.get_course_credits("SOC 030", catalog) == 4.0
+
+    def test_equivalency_map_spelling(self):
+        equivalency_map = {"ENGL015": {"equivalents": ["ENGL30"]}}
+        assert engine.course_satisfies_prerequisite("ENGL 15", ["ENGL 030"], equivalency_map, {})
+
+    def test_satisfier_index_spelling(self):
+        index = engine.SatisfierIndex({
+            "satisfiers": {"MATH021": ["MATH21", "MATH022"]},
+            "satisfies": {"MATH022": ["MATH021"]},
+            "catalog_courses": ["MATH021", "MATH022"],
+        })
+        assert index.satisfiers == {"MATH21": frozenset({"MATH21", "MATH22"})}
+        assert index.satisfied_by(["MATH22"]) == {"MATH21"}
+
+    def test_prerequisite_ast_spelling(self):
+        courses = {
+            "MATH21": {"courseCode": "MATH 21", "credits": 3.0, "prerequisites_ast": {"course": "MATH4"}},
+            "ACCTG211": {"courseCode": "ACCTG 211", "credits": 4.0, "prerequisites_ast": {"course": "MATH021"}},
+        }
+        _, catalog = engine.compile_catalog([], courses)
+        # MATH 021 resolves to the catalog's MATH 21 and its own prerequisite
+        assert engine.make_cost_evaluator([], catalog).cost("ACCTG 211") == 10.0
+        assert engine.make_cost_evaluator(["MATH 004"], catalog).cost("ACCTG 211") == 7.0
+
+
+
+@pytest.fixture(scope="module")
+def enrich_data():
+    """scripts/enrich_data.py at the repository root (not a package)."""
+    import importlib.util, os
+    path = os.path.join(os.path.dirname(__file__), '..', '..', 'scripts', 'enrich_data.py')
+    spec = importlib.util.spec_from_file_location("enrich_data", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestEnrichDataCodes:
+    """scripts/enrich_data.py matches rule codes to the golden record in any spelling."""
+
+    @pytest.mark.parametrize("spelling", ["ECON 102", "ECON-102", "econ\xa0102", "ECON\xa0-\xa0102", "ECON 0102"])
+    def test_normalize_code(self, enrich_data, spelling):
+        assert enrich_data.normalize_code(spelling) == "ECON102"
+
+    def test_normalize_code_empty(self, enrich_data):
+        assert enrich_data.normalize_code(None) == "" and enrich_data.normalize_code("-") == ""
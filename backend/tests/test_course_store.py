@@ -0,0 +1,148 @@
+"""
+Unit tests for course_store.py
+"""
+import copy
+import json
+import pickle
+import pytest
+import recommendation_engine as engine
+from course_store import ColdStoreError, CourseRecord, compact_courses, plain_courses
+
+
+@pytest.fixture
+def compact_db(sample_courses_db):
+    courses = copy.deepcopy(sample_courses_db)
+    courses["RANGE100"] = {"courseCode": "RANGE 100", "credits": "1-3", "genEdAttributes": ["GH", "GA"],
+                           "description": "Variable credit, ünïcode text"}
+    courses["ODD100"] = {"courseCode": "ODD 100", "credits": "Varies"}
+    table = compact_courses(courses)
+    return courses, table
+
+
+def plain(course):
+    """Course dict with attribute lists compared as sets (records use table order)."""
+    return {key: sorted(value) if key in ('genEdAttributes', 'culturalAttributes') else value
+            for key, value in dict(course).items()}
+
+
+class TestCourseRecord:
+    """CourseRecord is a read-only view equal to the original course dict."""
+
+    def test_view_matches_original(self, sample_courses_db, compact_db):
+        courses, _ = compact_db
+        for code, original in sample_courses_db.items():
+            record = courses[code]
+            assert isinstance(record, CourseRecord)
+            assert list(record) == list(original)
+            assert plain(record) == plain(original)
+            assert plain(record.to_dict()) == plain(original)
+
+    def test_mapping_access(self, compact_db):
+        courses, _ = compact_db
+        record = courses["RANGE100"]
+        assert record["description"] == "Variable credit, ünïcode text"
+        assert record.get("title", "none") == "none"
+        assert "courseCode" in record and "title" not in record
+        assert len(record) == 4
+        with pytest.raises(KeyError):
+            record["title"]
+        with pytest.raises(TypeError):
+            record["title"] = "x"
+
+    def test_hot_fields(self, compact_db):
+        courses, table = compact_db
+        record = courses["RANGE100"]
+        assert (record.credits, record.credits_max) == (1.0, 3.0)
+        assert sorted(table.gened_names_of(record.gened_mask)) == ["GA", "GH"]
+        assert courses["ODD100"].credits is None
+
+    def test_get_course_credits(self, sample_courses_db, compact_db):
+        courses, _ = compact_db
+        for code in sample_courses_db:
+            assert engine.get_course_credits(code, courses) == engine.get_course_credits(code, sample_courses_db)
+        assert engine.get_course_credits("RANGE 100", courses) == 1.0
+        assert engine.get_course_credits("ODD 100", courses, default=4.0) == 4.0
+
+    def test_plain_courses_serialize(self, sample_courses_db, compact_db):
+        courses, _ = compact_db
+        plain = plain_courses(courses)
+        assert all(type(course) is dict for course in plain.values())
+        assert json.loads(json.dumps(plain))["ECON102"] == json.loads(json.dumps(sample_courses_db["ECON102"]))
+
+    def test_cold_blob_decoded_once(self, compact_db):
+        courses, table = compact_db
+        record = courses["RANGE100"]
+        table.cold.read.cache_clear()
+        assert record["description"] and record["credits"] == "1-3" and record.to_dict()
+        info = table.cold.read.cache_info()
+        assert (info.misses, info.hits) == (1, 2)
+
+    def test_compile_catalog_compacts(self, sample_programs_db, sample_courses_db):
+        _, courses = engine.compile_catalog(sample_programs_db, copy.deepcopy(sample_courses_db))
+        assert all(isinstance(c, CourseRecord) for c in courses.values())
+        assert courses.course_table is not None
+
+
+class TestColdSideFile:
+    """Cold text served from a memory-mapped side file."""
+
+    def test_attach_and_pickle(self, compact_db, tmp_path):
+        courses, table = compact_db
+        path = str(tmp_path / "courses.cold")
+        table.cold.save(path)
+        table.cold.attach(path)
+        assert courses["RANGE100"]["description"] == "Variable credit, ünïcode text"
+
+        restored = pickle.loads(pickle.dumps(courses))
+        assert restored["RANGE100"]["description"] == "Variable credit, ünïcode text"
+        # Only the path is pickled, not the text
+        assert b"Variable credit" not in pickle.dumps(table.cold)
+
+    def test_in_memory_store_pickles_text(self, compact_db):
+        courses, _ = compact_db
+        assert pickle.loads(pickle.dumps(courses))["ECON102"].to_dict() == courses["ECON102"].to_dict()
+
+    def test_mismatched_side_file(self, compact_db, tmp_path):
+        _, table = compact_db
+        path = str(tmp_path / "courses.cold")
+        table.cold.save(path)
+        table.cold.attach(path)
+        state = pickle.dumps(table.cold)
+        with open(path, 'r+b') as f:
+            f.seek(10)
+            f.write(b"0000")
+        with pytest.raises(ColdStoreError):
+            pickle.loads(state)
+
+    def test_snapshot_writes_side_file(self, tmp_path):
+        snapshot = str(tmp_path / "catalog.pickle")
+        fresh = engine.load_data(None)
+        engine.load_data(snapshot)
+        assert (tmp_path / "catalog.cold").exists()
+        _, courses, _, _ = engine.load_data(snapshot)
+        assert courses.course_table.cold.path == str(tmp_path / "catalog.cold")
+        code = next(iter(fresh[1]))
+        assert courses[code].to_dict() == fresh[1][code].to_dict()
+
+
+class TestCoursesEndpoint:
+    """GET /courses serializes the catalog once per data version."""
+
+    def test_body_built_once_per_catalog(self, monkeypatch):
+        import app as server
+        client = server.app.test_client()
+        calls = []
+        monkeypatch.setattr(server, "plain_courses", lambda courses: calls.append(1) or plain_courses(courses))
+        monkeypatch.setattr(server, "_COURSES_BODY", (None, None))
+
+        first = client.get('/courses')
+        assert first.status_code == 200 and first.content_type == "application/json"
+        body = first.get_json()
+        assert body["status"] == "success" and len(body["courses"]) == len(server.CATALOG.current().courses)
+        assert client.get('/courses').data == first.data
+        assert len(calls) == 1
+
+        # A new catalog version rebuilds it
+        monkeypatch.setattr(server, "_COURSES_BODY", (-1, first.data))
+        assert client.get('/courses').data == first.data
+        assert len(calls) == 2
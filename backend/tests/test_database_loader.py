@@ -0,0 +1,293 @@
+"""
+Unit tests for the paginated Supabase loader in database.py, run against a
+local PostgREST stand-in server
+"""
+import json
+import os
+import pytest
+import recommendation_engine as engine
+import database
+from .postgrest_server import PostgrestServer
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+LOADED_AT = "2025-01-01T00:00:00+00:00"
+
+
+def course_row(code, course):
+    return {
+        "course_code_normalized": code,
+        "course_code": course.get("courseCode"),
+        "title": course.get("title"),
+        "credits": course.get("credits"),
+        "description": course.get("description", f"About {code}"),
+        "prerequisites_list": course.get("prerequisites_list", []),
+        "prerequisites_raw": course.get("prerequisites_raw", ""),
+        "prerequisites_ast": engine.course_prerequisite_ast(course),
+        "gen_ed_attributes": course.get("genEdAttributes", []),
+        "cultural_attributes": course.get("culturalAttributes", []),
+        "inter_domain": course.get("interDomain", False),
+        "source_program": course.get("source_program"),
+        "created_at": LOADED_AT,
+        "updated_at": LOADED_AT,
+    }
+
+
+def make_tables(programs, courses, equivalencies, prereq_config):
+    return {
+        "programs": [dict(program, created_at=LOADED_AT, updated_at=LOADED_AT) for program in programs],
+        "courses": [course_row(code, course) for code, course in courses.items()],
+        "course_equivalencies": [
+            {"course_code": code, "equivalents": entry.get("equivalents", []), "reason": entry.get("reason"),
+             "auto_generated": entry.get("auto_generated", True), "type": entry.get("type"),
+             "updated_at": LOADED_AT}
+            for code, entry in equivalencies.items()
+        ],
+        "prerequisite_config": [{"id": 1, "config_name": "hierarchy_rules", "config_value": prereq_config,
+                                 "updated_at": LOADED_AT}],
+    }
+
+
+@pytest.fixture
+def tables(sample_programs_db, sample_courses_db, sample_equivalency_map, sample_prereq_config):
+    return make_tables(sample_programs_db, sample_courses_db, sample_equivalency_map, sample_prereq_config)
+
+
+class TestFetchTables:
+    """Pagination, projection and concurrency of fetch_tables()."""
+
+    def test_pages_past_the_server_row_cap(self, tables):
+        with PostgrestServer(tables, max_rows=2) as server:
+            rows = database.fetch_tables(server.client(), {"courses": database.COURSES_QUERY}, page_size=5)["courses"]
+            offsets = sorted(int(r["params"]["offset"]) for r in server.requests_for("courses"))
+        assert sorted(r["course_code_normalized"] for r in rows) == sorted(c["course_code_normalized"] for c in tables["courses"])
+        # The cap (2 rows) sets the step, not the requested page size
+        assert offsets == list(range(0, len(tables["courses"]), 2))
+
+    def test_without_row_count(self, tables):
+        with PostgrestServer(tables, max_rows=3, report_count=False) as server:
+            rows = database.fetch_tables(server.client(), {"courses": database.COURSES_QUERY})["courses"]
+        assert len(rows) == len(tables["courses"])
+
+    def test_projects_engine_columns_only(self, tables):
+        with PostgrestServer(tables) as server:
+            database.load_all_data(server.client())
+            selects = {r["table"]: r["params"]["select"] for r in server.requests}
+        assert "*" not in selects.values()
+        assert "description" not in selects["courses"].split(",")
+        assert selects["programs"] == "id,type,url,rules,updated_at"
+
+    def test_tables_load_concurrently(self, tables):
+        with PostgrestServer(tables, max_rows=2, delay=0.05) as server:
+            database.load_all_data(server.client())
+            assert server.max_in_flight > 1
+
+    def test_missing_optional_column(self, tables):
+        for row in tables["courses"]:
+            del row["prerequisites_ast"]
+        with PostgrestServer(tables) as server:
+            _, courses, _, _ = database.load_all_data(server.client())
+        assert "prerequisites_ast" not in courses["ECON302"]
+        assert courses.prereq_graph.trees["ECON302"] == "ECON102"
+
+
+class TestLazyColumns:
+    """Long course text is fetched on first use."""
+
+    def test_fetched_once_on_first_access(self, tables):
+        with PostgrestServer(tables, max_rows=3) as server:
+            _, courses, _, _ = database.load_all_data(server.client())
+            lazy = courses.course_table.lazy
+            assert not lazy.loaded
+            assert "description" in courses["ECON102"]
+            assert not lazy.loaded
+
+            before = len(server.requests)
+            assert courses["ECON102"]["description"] == "About ECON102"
+            lazy_requests = server.requests[before:]
+            assert courses["ECON104"].get("description") == "About ECON104"
+            assert len(server.requests) == before + len(lazy_requests)
+        assert {r["params"]["select"] for r in lazy_requests} == {"course_code_normalized,description,prerequisites_list,source_program"}
+
+    def test_to_dict_includes_lazy_columns(self, tables):
+        with PostgrestServer(tables) as server:
+            _, courses, _, _ = database.load_all_data(server.client())
+            course = courses["ECON302"].to_dict()
+        assert course["description"] == "About ECON302"
+        assert course["courseCode"] == "ECON 302"
+
+
+class TestCatalogParity:
+    """The database load produces the same recommendations as the JSON files."""
+
+    def test_full_catalog(self):
+        def read(name):
+            with open(os.path.join(DATA_DIR, name)) as f:
+                return json.load(f)
+
+        courses = {**read('gened_supplementary.json'), **read('world_campus_courses_master.json')}
+        with open(engine.PREREQ_CONFIG_FILE) as f:
+            prereq_config = json.load(f)
+        data_tables = make_tables(read('academic_programs_rules.json'), courses, read('course_equivalencies.json'), prereq_config)
+
+        expected = engine.load_data(None)
+        with PostgrestServer(data_tables, max_rows=1000) as server:
+            loaded = database.load_all_data(server.client())
+
+        programs, db_courses, equivalency_map, config = loaded
+        assert len(db_courses) == len(expected[1])
+        for history in ([], ["ENGL 15", "ECON 102", "MATH 021"], ["ACCTG 211", "MGMT 301", "PSYCH 100"]):
+            profile = engine.StudentProfile(history)
+            assert {p['id']: engine.score_program(p, profile, db_courses, equivalency_map, config) for p in programs} == \
+                {p['id']: engine.score_program(p, profile, expected[1], expected[2], expected[3]) for p in expected[0]}
+
+
+class TestDeltaSync:
+    """sync_cache() applies only the rows changed since the last load."""
+
+    LATER = "2025-01-02T00:00:00+00:00"
+
+    def row(self, tables, table, key_column, key):
+        return next(r for r in tables[table] if r[key_column] == key)
+
+    def test_nothing_changed(self, tables):
+        with PostgrestServer(tables) as server:
+            programs, courses, _, _ = database.load_all_data(server.client())
+            assert database.sync_cache() is None
+            assert database.get_cached_data()[1] is courses
+
+    def test_changed_course(self, tables):
+        with PostgrestServer(tables) as server:
+            database.load_all_data(server.client())
+            row = self.row(tables, "courses", "course_code_normalized", "ECON102")
+            row.update(credits=4.0, description="Updated", updated_at=self.LATER)
+            before = len(server.requests)
+            patch = database.sync_cache()
+            delta_selects = [r for r in server.requests[before:] if "updated_at" in r["params"]]
+
+            assert patch.courses == {"ECON102"}
+            assert patch.affected == {"Business", "Economics"}
+            _, courses, _, _ = database.get_cached_data()
+            assert courses["ECON102"]["credits"] == 4.0
+            assert courses["ECON102"]["description"] == "Updated"
+            assert database.cached_patch(courses) is patch
+            # Every table is asked for rows past its watermark only
+            assert {r["table"] for r in delta_selects} == {"programs", "courses", "course_equivalencies", "prerequisite_config"}
+            assert all(r["params"]["updated_at"].startswith("gt.") for r in delta_selects)
+
+            # Rows inside the overlap window are not applied twice
+            assert database.sync_cache() is None
+
+    def test_changed_and_deleted_program(self, tables):
+        with PostgrestServer(tables) as server:
+            database.load_all_data(server.client())
+            row = self.row(tables, "programs", "id", "Economics")
+            row.update(rules=row["rules"][:1], updated_at=self.LATER)
+            tables["programs"] = [r for r in tables["programs"] if r["id"] != "Business"]
+            server.tables = tables
+            patch = database.sync_cache()
+
+        assert patch.programs == {"Economics"} and patch.removed_programs == {"Business"}
+        programs = database.get_cached_data()[0]
+        assert [p["id"] for p in programs] == ["Economics"]
+        assert len(programs[0]["_compiled"]["rules"]) == 1
+        assert database.sync_status()["watermarks"]["programs"] == self.LATER
+
+    def test_changed_equivalencies_affect_every_program(self, tables):
+        with PostgrestServer(tables) as server:
+            database.load_all_data(server.client())
+            row = self.row(tables, "course_equivalencies", "course_code", "MATH140")
+            row.update(equivalents=["MATH 140A"], updated_at=self.LATER)
+            patch = database.sync_cache()
+
+        assert patch.affected is None
+        assert database.get_cached_data()[2]["MATH140"]["equivalents"] == ["MATH 140A"]
+
+    def test_unexplained_rows_are_patched_in(self, tables):
+        with PostgrestServer(tables) as server:
+            database.load_all_data(server.client())
+            reloads = database.sync_status()["full_reloads"]
+            # Imported with an updated_at from long before the watermark
+            tables["courses"].append(dict(course_row("ECON999", {"courseCode": "ECON 999", "credits": 3.0}),
+                                          updated_at="2024-06-01T00:00:00+00:00"))
+            patch = database.sync_cache()
+            _, courses, _, _ = database.get_cached_data()
+            assert patch.courses == {"ECON999"} and "ECON999" in courses
+            assert courses["ECON999"]["description"] == "About ECON999"
+            assert database.sync_status()["full_reloads"] == reloads
+            assert database.sync_cache() is None
+
+
+class TestBatchUpdates:
+    """update_courses() / update_programs() write once and patch the cache once."""
+
+    def test_update_courses(self, tables):
+        with PostgrestServer(tables) as server:
+            _, courses, _, _ = database.load_all_data(server.client())
+            reloads = database.sync_status()["full_reloads"]
+            before = len(server.requests)
+            assert database.update_courses({"ECON 102": {"credits": 4.0}, "ECON302": {"title": "Intermediate Micro"},
+                                            "econ 102": {"title": "Micro"}})
+            rpcs = server.requests_for("update_rows", "RPC")
+            assert len(rpcs) == 1 and len(server.requests[before:]) < 12
+
+            _, new_courses, _, _ = database.get_cached_data()
+            assert new_courses["ECON102"]["credits"] == 4.0 and new_courses["ECON102"]["title"] == "Micro"
+            assert new_courses["ECON302"]["title"] == "Intermediate Micro"
+            patch = database.cached_patch(new_courses)
+            assert patch.base is courses and patch.courses == {"ECON102", "ECON302"}
+            assert database.sync_status()["full_reloads"] == reloads
+
+    def test_new_prerequisite_text_recompiles_the_ast(self, tables):
+        with PostgrestServer(tables) as server:
+            database.load_all_data(server.client())
+            assert database.update_course("ECON 471", {"prerequisites_raw": "Prerequisite ECON 102 and ECON 471"})
+            row = next(r for r in tables["courses"] if r["course_code_normalized"] == "ECON471")
+            # The course's own code is dropped, as at build time
+            assert row["prerequisites_ast"] == engine.compile_prerequisites("Prerequisite ECON 102")
+            courses = database.get_cached_data()[1]
+            assert engine.get_prerequisite_graph(courses).edges["ECON471"] == ("ECON102",)
+
+    def test_new_prerequisite_text_without_the_ast_column(self, tables):
+        for row in tables["courses"]:
+            del row["prerequisites_ast"]
+        with PostgrestServer(tables) as server:
+            database.load_all_data(server.client())
+            assert database.update_course("ECON471", {"prerequisites_raw": "Prerequisite ECON 102"})
+            assert len(server.requests_for("update_rows", "RPC")) == 2
+            courses = database.get_cached_data()[1]
+            assert engine.get_prerequisite_graph(courses).edges["ECON471"] == ("ECON102",)
+
+    def test_update_programs(self, tables):
+        with PostgrestServer(tables) as server:
+            database.load_all_data(server.client())
+            economics = next(r for r in tables["programs"] if r["id"] == "Economics")
+            assert database.update_programs({"Economics": {"rules": economics["rules"][:1]}})
+            programs = database.get_cached_data()[0]
+            assert len(next(p for p in programs if p["id"] == "Economics")["_compiled"]["rules"]) == 1
+            assert database.cached_patch(database.get_cached_data()[1]).programs == {"Economics"}
+
+    def test_nothing_cached_is_not_reloaded(self, tables, monkeypatch):
+        monkeypatch.setattr(database, "_cache", dict(database._cache, programs=None, courses=None, versions=None, patch=None))
+        with PostgrestServer(tables) as server:
+            reloads = database.sync_status()["full_reloads"]
+            assert database.update_courses({"ECON102": {"credits": 4.0}}, client=server.client())
+            assert len(server.requests_for("update_rows", "RPC")) == 1
+            # The write is not followed by a full load of every table
+            assert not server.requests_for("courses", "GET") and not server.requests_for("programs", "GET")
+            assert database.sync_status()["full_reloads"] == reloads
+            assert database._cache["programs"] is None
+
+    def test_missing_key_updates_nothing(self, tables):
+        with PostgrestServer(tables) as server:
+            _, courses, _, _ = database.load_all_data(server.client())
+            assert not database.update_courses({"ECON102": {"credits": 4.0}, "ECON999": {"credits": 1.0}})
+            assert next(r for r in tables["courses"] if r["course_code_normalized"] == "ECON102")["credits"] != 4.0
+            assert database.get_cached_data()[1] is courses
+
+    def test_row_by_row_without_the_function(self, tables):
+        with PostgrestServer(tables, functions=False) as server:
+            database.load_all_data(server.client())
+            assert database.update_courses({"ECON102": {"credits": 4.0}, "ECON302": {"credits": 2.0}})
+            assert len(server.requests_for("courses", "PATCH")) == 2
+            _, courses, _, _ = database.get_cached_data()
+            assert courses["ECON102"]["credits"] == 4.0 and courses["ECON302"]["credits"] == 2.0
@@ -0,0 +1,209 @@
+"""
+Unit tests for major_baselines.py
+"""
+import copy
+import pytest
+import recommendation_engine as engine
+from major_baselines import MajorBaselineTable
+
+PROFILES = [
+    ([], "Business", ["GS"]),
+    (["ECON102", "ECON442"], "Business", ["GS"]),
+    (["ART100"], "Economics", ["GH"]),
+    (["MATH140", "STAT200"], "Unknown Major", []),
+    (["ECON102", "ECON104", "ECON302", "ECON471"], "Economics", ["GS", "GQ"]),
+]
+
+
+@pytest.fixture
+def table(mixed_programs_db, sample_courses_db, sample_equivalency_map, sample_prereq_config):
+    # A Business major next to the Business minor, so baselines differ per major
+    business_major = dict(mixed_programs_db[0], type="Majors")
+    programs, courses = engine.compile_catalog(mixed_programs_db + [business_major], sample_courses_db)
+    return MajorBaselineTable(programs, courses, sample_equivalency_map, sample_prereq_config)
+
+
+class TestProgramIndex:
+    """Inverted course -> program index built by compile_catalog()."""
+
+    def test_attached_to_catalog(self, mixed_programs_db, sample_courses_db):
+        _, courses = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        assert isinstance(courses.program_index, engine.ProgramIndex)
+        assert courses.program_index.group_programs == {2}
+
+    def test_listed_and_pool_references(self, mixed_programs_db, sample_courses_db):
+        programs, _ = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        index = engine.ProgramIndex(programs)
+        # Listed in Economics' core and Statistics' subset rule
+        assert index.references("ECON102") == [(1, 0), (2, 0)]
+        # Listed in Statistics' option groups only
+        assert index.references("MGMT301") == [(0, 0), (2, 1)]
+        # Economics secondary pool and ECON 400-499 range, Business 400+ range
+        assert sorted(index.references("ECON471")) == [(0, 1), (1, 1)]
+        assert index.references("ECON599") == [(0, 1)]
+        assert index.references("ART100") == []
+
+    def test_programs_touched(self, mixed_programs_db, sample_courses_db):
+        programs, _ = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        index = engine.ProgramIndex(programs)
+        assert index.programs_touched([]) == set()
+        assert index.programs_touched(["ART100", "ECON499"]) == {0, 1}
+        assert index.programs_touched(["STAT200"]) == {2}
+
+
+class TestMajorCourses:
+    """Lookup of prescribed major courses."""
+
+    def test_matches_linear_scan(self, table):
+        assert len(table) == 1
+        assert table.major_courses("Business")
+        for program in table.programs:
+            if program['type'] == 'Majors':
+                assert table.major_courses(program['id']) == \
+                    engine.get_prescribed_major_courses(program['id'], table.programs)
+                assert table.major_courses(program['id'].upper()) == table.major_courses(program['id'])
+
+    def test_unknown_major(self, table):
+        assert table.major_courses("No Such Major") == []
+        assert table.major_courses(None) == []
+        assert table.baseline("No Such Major") is table.baseline(None)
+
+
+class TestIsAffected:
+    """Programs are re-evaluated only when the transcript can change them."""
+
+    def test_empty_transcript(self, table):
+        baseline = table.baseline("Business")
+        profile = engine.StudentProfile([], baseline.major_courses)
+        assert not any(table.is_affected(i, profile, baseline) for i in range(len(table.programs)))
+
+    def test_listed_course(self, table):
+        baseline = table.baseline(None)
+        business = next(i for i, p in enumerate(table.programs) if p['id'] == "Business")
+        profile = engine.StudentProfile(["MGMT301"])
+        assert table.is_affected(business, profile, baseline)
+
+    def test_dynamic_pool_course(self, table):
+        baseline = table.baseline(None)
+        economics = next(i for i, p in enumerate(table.programs) if p['id'] == "Economics")
+        profile = engine.StudentProfile(["ECON499"])
+        assert table.is_affected(economics, profile, baseline)
+        assert not table.is_affected(economics, engine.StudentProfile(["ART100"]), baseline)
+
+    def test_group_rules_depend_on_whole_history(self, table):
+        baseline = table.baseline(None)
+        grouped = next(i for i, plan in enumerate(table.plans) if plan['group_rules'])
+        assert table.is_affected(grouped, engine.StudentProfile(["ART100"]), baseline)
+
+
+class TestBaselineScores:
+    """Baseline scores and entries must equal a full evaluation."""
+
+    @pytest.mark.parametrize("user_history, major, needs", PROFILES)
+    def test_scores_and_explain_match_full_evaluation(self, table, user_history, major, needs):
+        baseline = table.baseline(major)
+        profile = engine.StudentProfile(user_history, table.major_courses(major), needs)
+        indexes = list(range(len(table.programs)))
+        scores = table.scores(indexes, profile, baseline)
+        for position, score in scores.items():
+            program = table.programs[indexes[position]]
+            assert score == engine.score_program(
+                program, profile, table.courses_db, table.equivalency_map, table.prereq_config
+            )
+            assert table.explain(indexes[position], profile, baseline) == engine.explain_program(
+                program, profile, table.courses_db, table.equivalency_map, table.prereq_config
+            )
+
+    @pytest.mark.parametrize("user_history, major, needs", PROFILES)
+    def test_rank_with_exact_scores_equals_full_sort(self, table, user_history, major, needs):
+        baseline = table.baseline(major)
+        profile = engine.StudentProfile(user_history, table.major_courses(major), needs)
+        programs = table.programs
+        keys = [
+            engine.ranking_key(*engine.score_program(
+                program, profile, table.courses_db, table.equivalency_map, table.prereq_config
+            ))
+            for program in programs
+        ]
+        expected = sorted(range(len(programs)), key=keys.__getitem__)
+        exact = table.scores(list(range(len(programs))), profile, baseline)
+        for k in range(len(programs) + 1):
+            assert engine.rank_programs(
+                programs, k, profile, table.courses_db, table.equivalency_map,
+                table.prereq_config, exact_scores=exact
+            ) == expected[:k]
+
+
+class TestPatchedCatalog:
+    """patch_catalog() and baselines taken over from the catalog it patched."""
+
+    @pytest.fixture
+    def catalog(self, mixed_programs_db, sample_courses_db):
+        return engine.compile_catalog(copy.deepcopy(mixed_programs_db), dict(sample_courses_db))
+
+    def patched_and_rebuilt(self, catalog, mixed_programs_db, sample_courses_db, programs=(), removed_programs=(),
+                            courses=None, removed_courses=()):
+        patched = engine.patch_catalog(*catalog, programs, removed_programs, courses, removed_courses)
+        changed_ids = {program['id']: program for program in programs}
+        full_programs = [copy.deepcopy(changed_ids.pop(p['id'], p)) for p in mixed_programs_db if p['id'] not in removed_programs]
+        full_programs += list(changed_ids.values())
+        full_courses = {code: course for code, course in sample_courses_db.items() if code not in removed_courses}
+        full_courses.update(courses or {})
+        return patched, engine.compile_catalog(full_programs, full_courses)
+
+    def test_course_change_matches_full_compile(self, catalog, mixed_programs_db, sample_courses_db):
+        changed = {"ECON102": dict(sample_courses_db["ECON102"], credits=4.0),
+                   "ECON999": {"courseCode": "ECON 999", "credits": 3.0, "prerequisites_raw": "ECON 302",
+                               "genEdAttributes": ["GS"]}}
+        (programs, courses, patch), (full_programs, full_courses) = self.patched_and_rebuilt(
+            catalog, mixed_programs_db, sample_courses_db, courses=changed, removed_courses=["MGMT301"])
+
+        assert list(courses) == list(full_courses)
+        assert all(courses[code].to_dict() == full_courses[code].to_dict() for code in full_courses)
+        assert courses.prereq_graph.trees == full_courses.prereq_graph.trees
+        assert [p['_compiled'] for p in programs] == [p['_compiled'] for p in full_programs]
+        assert courses.data_version != catalog[1].data_version
+        # ECON 102 is required for ECON 302, listed by every program
+        assert patch.affected == {"Business", "Economics", "Statistics"}
+        # The patched catalog is a copy
+        assert catalog[1]["ECON102"]["credits"] == 3.0 and "ECON999" not in catalog[1]
+        assert "MGMT301" in catalog[1]
+
+    def test_only_dependent_programs_are_affected(self, catalog, mixed_programs_db, sample_courses_db):
+        changed = {"MATH140": dict(sample_courses_db["MATH140"], credits=3.0)}
+        programs, courses, patch = engine.patch_catalog(*catalog, courses=changed)
+        assert patch.affected == {"Statistics"}
+        # Unaffected plans are shared with the previous catalog
+        assert programs[0] is catalog[0][0]
+        assert courses.program_index is catalog[1].program_index
+
+    def test_program_change_matches_full_compile(self, catalog, mixed_programs_db, sample_courses_db):
+        economics = copy.deepcopy(mixed_programs_db[1])
+        economics['rules'] = economics['rules'][:1]
+        added = {"id": "Accounting", "type": "Minors",
+                 "rules": [{"type": "all", "courses": [{"code": "ECON 104", "credits": 3}]}]}
+        (programs, courses, patch), (full_programs, full_courses) = self.patched_and_rebuilt(
+            catalog, mixed_programs_db, sample_courses_db, programs=[economics, added], removed_programs=["Statistics"])
+
+        assert [p['id'] for p in programs] == ["Business", "Economics", "Accounting"]
+        assert [p['_compiled'] for p in programs] == [p['_compiled'] for p in full_programs]
+        assert courses.program_index.by_code == full_courses.program_index.by_code
+        assert patch.affected == {"Economics", "Accounting"}
+
+    def test_patched_baselines_match_full_build(self, catalog, mixed_programs_db, sample_courses_db,
+                                                sample_equivalency_map, sample_prereq_config):
+        business_major = {"id": "Finance", "type": "Majors",
+                          "rules": [{"type": "all", "courses": [{"code": "ECON 102", "credits": 3}]}]}
+        programs, courses = engine.compile_catalog(copy.deepcopy(mixed_programs_db) + [business_major], dict(sample_courses_db))
+        previous = MajorBaselineTable(programs, courses, sample_equivalency_map, sample_prereq_config)
+
+        changed = {"MATH140": dict(sample_courses_db["MATH140"], credits=3.0)}
+        new_programs, new_courses, patch = engine.patch_catalog(programs, courses, courses=changed)
+        patched = MajorBaselineTable(new_programs, new_courses, sample_equivalency_map, sample_prereq_config,
+                                     previous=previous, affected=patch.affected)
+        full = MajorBaselineTable(new_programs, new_courses, sample_equivalency_map, sample_prereq_config)
+
+        # Only Statistics is evaluated again, for the empty baseline and each major
+        assert patched.reused_evaluations == (len(new_programs) - 1) * (len(full) + 1)
+        for major in ("Economics", "Finance", "Unknown Major"):
+            assert patched.baseline(major).evaluations == full.baseline(major).evaluations
@@ -0,0 +1,131 @@
+"""
+Unit tests for scripts/migrate_to_supabase.py, run against the local
+PostgREST stand-in server
+"""
+import json
+import pytest
+import database
+from scripts import migrate_to_supabase as migration
+from .postgrest_server import PostgrestServer
+
+BATCH_SIZE = 200
+
+
+@pytest.fixture(scope="module")
+def source_tables():
+    return migration.load_tables()
+
+
+@pytest.fixture
+def server(source_tables):
+    with PostgrestServer({t.table: [] for t in source_tables}, serial={"prerequisite_config": "id"}) as server:
+        yield server
+
+
+def batch_count(table):
+    return -(-len(table.rows) // BATCH_SIZE)
+
+
+def run(server, tables, checkpoint=None, **kwargs):
+    return migration.migrate(server.client(), tables, checkpoint, batch_size=BATCH_SIZE, workers=4, backoff=0, **kwargs)
+
+
+class TestMigrate:
+    """Batched, concurrent upserts with retries."""
+
+    def test_every_table_in_batches(self, server, source_tables):
+        stats = run(server, source_tables)
+        for t in source_tables:
+            assert stats[t.table] == {"sent": batch_count(t), "skipped": 0, "failed": 0, "retries": 0}
+            posts = server.requests_for(t.table, "POST")
+            assert len(posts) == batch_count(t)
+            assert all(r["params"]["on_conflict"] == t.key for r in posts)
+        assert migration.verify_migration(server.client(), source_tables)
+
+        # The migrated tables load like any Supabase project
+        programs, courses, _, config = database.load_all_data(server.client())
+        assert len(courses) == len(next(t for t in source_tables if t.table == "courses").rows)
+        assert config["hierarchy_rules"]["enabled"]
+
+    def test_duplicate_keys_are_merged_before_batching(self, source_tables):
+        programs = next(t for t in source_tables if t.table == "programs")
+        ids = [row["id"] for row in programs.rows]
+        assert len(ids) == len(set(ids)) and programs.merged > 0
+
+    def test_transient_errors_are_retried(self, server, source_tables):
+        server.fail("courses", times=2)
+        stats = run(server, source_tables)
+        assert stats["courses"]["failed"] == 0 and stats["courses"]["retries"] == 2
+        assert migration.verify_migration(server.client(), source_tables)
+
+    def test_permanent_errors_are_not_retried(self, server, source_tables):
+        server.fail("courses", times=None, status=400, code="22P02", message="invalid input syntax")
+        stats = run(server, source_tables, attempts=5)
+        courses = next(t for t in source_tables if t.table == "courses")
+        assert stats["courses"]["failed"] == batch_count(courses)
+        assert len(server.requests_for("courses", "POST")) == batch_count(courses)
+
+
+class TestCheckpoint:
+    """A rerun after a failure only sends the missing batches."""
+
+    def test_resume(self, server, source_tables, tmp_path):
+        path = tmp_path / "checkpoint.json"
+        server.fail("courses", times=None)
+        first = run(server, source_tables, migration.Checkpoint(path), attempts=2)
+        assert first["courses"]["sent"] == 0 and first["programs"]["sent"] == 1
+        assert set(json.loads(path.read_text())) == {"programs", "course_equivalencies", "prerequisite_config"}
+
+        server.failures.clear()
+        before = len(server.requests)
+        second = run(server, source_tables, migration.Checkpoint(path))
+        resent = {r["table"] for r in server.requests[before:] if r["method"] == "POST"}
+        assert resent == {"courses"}
+        assert second["programs"] == {"sent": 0, "skipped": 1, "failed": 0, "retries": 0}
+        assert migration.verify_migration(server.client(), source_tables)
+
+    def test_changed_rows_are_sent_again(self, source_tables):
+        courses = next(t for t in source_tables if t.table == "courses")
+        checkpoint = migration.Checkpoint()
+        for batch_hash, _ in migration.make_batches(courses, BATCH_SIZE):
+            checkpoint.mark("courses", batch_hash)
+        changed = migration.MigrationTable("courses", courses.key,
+                                           [dict(courses.rows[0], title="Changed")] + courses.rows[1:])
+        pending = [h for h, _ in migration.make_batches(changed, BATCH_SIZE) if not checkpoint.done("courses", h)]
+        assert len(pending) == 1
+
+
+class TestVerify:
+    """verify_migration() compares row counts and content hashes."""
+
+    def test_detects_changed_and_missing_rows(self, server, source_tables):
+        run(server, source_tables)
+        server.tables["courses"][0]["title"] = "Edited in the dashboard"
+        assert not migration.verify_migration(server.client(), source_tables)
+        server.tables["courses"].pop(0)
+        assert not migration.verify_migration(server.client(), source_tables)
+
+
+class TestCanonicalizeKeys:
+    """Course keys of migrations from before canonical codes are renamed once."""
+
+    def test_padded_keys(self, server, source_tables):
+        run(server, source_tables)
+        rows = server.tables["courses"]
+        padded = [row for row in rows if row["course_code_normalized"] in ("SOC30", "ENGL15")]
+        assert len(padded) == 2
+        for row in padded:
+            dept = row["course_code_normalized"].rstrip("0123456789")
+            row["course_code_normalized"] = f"{dept}0{row['course_code_normalized'][len(dept):]}"
+        # An earlier run that also wrote the canonical row
+        rows.append(dict(next(row for row in rows if row["course_code_normalized"] == "ENGL015"),
+                         course_code_normalized="ENGL15"))
+        assert not migration.verify_migration(server.client(), source_tables)
+
+        assert migration.canonicalize_course_keys(server.client()) == (1, 1)
+        assert migration.canonicalize_course_keys(server.client()) == (0, 0)
+        assert migration.verify_migration(server.client(), source_tables)
+
+        database.load_all_data(server.client())
+        assert database.update_course("SOC 030", {"title": "Renamed"})
+        assert database.get_cached_data()[1]["SOC30"]["title"] == "Renamed"
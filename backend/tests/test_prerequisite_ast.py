@@ -0,0 +1,150 @@
+"""
+Unit tests for prerequisite_ast.py and the engine's use of compiled prerequisite trees
+"""
+import pytest
+import recommendation_engine as engine
+from prerequisite_ast import compile_prerequisites, ast_courses
+
+
+def course(code, concurrent=False):
+    return {"course": code, "concurrent": True} if concurrent else {"course": code}
+
+
+class TestCompilePrerequisites:
+    """Tests for compile_prerequisites()."""
+
+    @pytest.mark.parametrize("raw", [None, "", "None", "Fifth semester standing or higher",
+                                     "GS and US The credits earned in this course may be applied"])
+    def test_no_course_prerequisites(self, raw):
+        assert compile_prerequisites(raw) is None
+
+    def test_single_course(self):
+        assert compile_prerequisites("Prerequisite ECON 102") == course("ECON102")
+
+    def test_parenthesized_grouping(self):
+        raw = "Prerequisite (ECON 102 or ECON 104) and MATH 140"
+        assert compile_prerequisites(raw) == {"and": [{"or": [course("ECON102"), course("ECON104")]}, course("MATH140")]}
+
+    def test_nested_and_inside_or(self):
+        raw = "Prerequisite ECON 102 or (MATH 140 and MATH 141)"
+        assert compile_prerequisites(raw) == {"or": [course("ECON102"), {"and": [course("MATH140"), course("MATH141")]}]}
+
+    def test_or_binds_tighter_than_and(self):
+        raw = "Prerequisite ECON 102 or ECON 104 and MATH 140"
+        assert compile_prerequisites(raw) == {"and": [{"or": [course("ECON102"), course("ECON104")]}, course("MATH140")]}
+
+    def test_connectives_glued_to_codes(self):
+        raw = "Prerequisite (AGBM 101orECON 102) andAGBM 102andPSYCH100"
+        assert compile_prerequisites(raw) == {"and": [
+            {"or": [course("AGBM101"), course("ECON102")]}, course("AGBM102"), course("PSYCH100")
+        ]}
+
+    def test_comma_list_takes_closing_connective(self):
+        assert compile_prerequisites("Prerequisite ECON 102, ECON 104, or ECON 106") == \
+            {"or": [course("ECON102"), course("ECON104"), course("ECON106")]}
+        assert compile_prerequisites("Prerequisite ECON 102, ECON 104 and MATH 140") == \
+            {"and": [course("ECON102"), course("ECON104"), course("MATH140")]}
+
+    def test_recommended_preparation_stripped(self):
+        assert compile_prerequisites("Prerequisite ECON 102. Recommended Preparation: MATH 140") == course("ECON102")
+        assert compile_prerequisites("Prerequisite TURF 235 Recommended preparation SOILS 101") == course("TURF235")
+
+    def test_recommend_spelling_stripped(self):
+        raw = ("Prerequisite TURF 235 Recommend preparation MATH 21andSOILS 101 "
+               "Note PLANT 217may not be substituted for TURF 307 for prescribed course credit.")
+        assert compile_prerequisites(raw, "TURF 307") == course("TURF235")
+
+    def test_note_clause_stripped(self):
+        assert compile_prerequisites("Prerequisite (BBH 310orHPA 311) and STAT 200 Note This course is typically offered asBBH 440") == \
+            {"and": [{"or": [course("BBH310"), course("HPA311")]}, course("STAT200")]}
+        # A note ends at the next clause
+        assert compile_prerequisites("Note not currently offered online. Prerequisite ECON 102") == course("ECON102")
+        assert compile_prerequisites("Prerequisite MGMT 301,FIN 301 Note BA 422Wcan be substituted for this course C or better") == \
+            {"and": [course("MGMT301"), course("FIN301")]}
+
+    def test_credit_exclusions_are_not_prerequisites(self):
+        raw = "Note A student may not receive credit toward graduation for bothBLAW 243andBA 243."
+        assert compile_prerequisites(raw, "BA 243") is None
+        raw = "Meet NAUI standards and/or by permission of the instructor. and Students may only earn credit in either KINES 45 or KINES 45A."
+        assert compile_prerequisites(raw, "KINES 45") is None
+
+    def test_course_never_requires_itself(self):
+        assert compile_prerequisites("COMM 180", "COMM 180") is None
+        assert compile_prerequisites("SRA 111 and (CMPSC 101 or IST 140...", "SRA 111") == \
+            {"or": [course("CMPSC101"), course("IST140")]}
+        assert compile_prerequisites("or concurrent: ASTRO 1 or ASTRO 10", "ASTRO 1") == course("ASTRO10", concurrent=True)
+        # Any spelling of the own code; without a code nothing is dropped
+        assert compile_prerequisites("Prerequisite ENGL 015 and ENGL 030", "ENGL 15") == course("ENGL030")
+        assert compile_prerequisites("COMM 180") == course("COMM180")
+
+    def test_grade_clause_ignored(self):
+        raw = "Prerequisite STAT 200 C or better A student enrolled in this course must receive a grade of C or better."
+        assert compile_prerequisites(raw) == course("STAT200")
+
+    def test_concurrent_markers_kept(self):
+        assert compile_prerequisites("Prerequisite PHYS 212 Concurrent MATH 250") == \
+            {"and": [course("PHYS212"), course("MATH250", concurrent=True)]}
+        assert compile_prerequisites("Prerequisite MATH 110or prerequisite or concurrentMATH 140") == \
+            {"or": [course("MATH110"), course("MATH140", concurrent=True)]}
+        assert compile_prerequisites("Enforced Prerequisite at Enrollment: MATH 140 Enforced Concurrent at Enrollment: PHYS 211") == \
+            {"and": [course("MATH140"), course("PHYS211", concurrent=True)]}
+
+    def test_sentence_break_ends_concurrent_section(self):
+        raw = "Prerequisite or concurrent HDFS 411. Prerequisite HDFS 312W"
+        assert compile_prerequisites(raw) == {"and": [course("HDFS411", concurrent=True), course("HDFS312W")]}
+
+    def test_words_containing_connectives_are_not_connectives(self):
+        raw = "Prerequisite HDFS 312W; approval by internship coordinator. Prerequisite ECON 102"
+        assert compile_prerequisites(raw) == {"and": [course("HDFS312W"), course("ECON102")]}
+
+    def test_unbalanced_parentheses(self):
+        assert compile_prerequisites("Prerequisite ECON 102) or ECON 104") == {"or": [course("ECON102"), course("ECON104")]}
+        assert compile_prerequisites("Prerequisite (ECON 102 or (ECON 104") == {"or": [course("ECON102"), course("ECON104")]}
+
+    def test_ast_courses(self):
+        ast = compile_prerequisites("Prerequisite (ECON 102 or ECON 104) and (MATH 140 or ECON 102)")
+        assert ast_courses(ast) == ["ECON102", "ECON104", "MATH140"]
+        assert ast_courses(None) == []
+
+
+class TestEngineUsesAst:
+    """The engine evaluates the stored AST instead of parsing prerequisite text."""
+
+    def test_stored_ast_wins_over_raw_text(self):
+        courses_db = {
+            "TOP101": {"courseCode": "TOP 101", "credits": 3.0, "prerequisites_raw": "Prerequisite LOW 100",
+                       "prerequisites_ast": None},
+        }
+        assert engine.make_cost_evaluator([], courses_db).cost("TOP 101") == 3.0
+
+    def test_missing_ast_compiled_from_raw(self):
+        courses_db = {"TOP101": {"courseCode": "TOP 101", "credits": 3.0, "prerequisites_raw": "Prerequisite LOW 100"}}
+        graph = engine.PrerequisiteGraph(courses_db)
+        assert graph.trees["TOP101"] == "LOW100"
+        assert engine.make_cost_evaluator([], courses_db).cost("TOP 101") == 6.0
+
+    def test_or_of_and_takes_cheapest_branch(self):
+        courses_db = {
+            "TOP101": {"courseCode": "TOP 101", "credits": 3.0,
+                       "prerequisites_ast": {"or": [{"and": [course("A100"), course("B100")]}, course("C100")]}},
+            "C100": {"courseCode": "C 100", "credits": 4.0,
+                     "prerequisites_ast": {"and": [course("D100"), course("E100", concurrent=True)]}},
+        }
+        evaluator = engine.make_cost_evaluator([], courses_db)
+        # min(A + B, C + D + E) = min(6, 10)
+        assert evaluator.cost("TOP 101") == 9.0
+        # With A taken the first branch only needs B
+        assert engine.make_cost_evaluator(["A100"], courses_db).cost("TOP 101") == 6.0
+
+    def test_real_catalog_files_carry_ast(self):
+        import contextlib, io
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, courses, _, _ = engine.load_data()
+        assert courses and all('prerequisites_ast' in c for c in courses.values())
+        # Parenthesized groups survive: some AND node has an OR child
+        assert any(
+            isinstance(tree, tuple) and tree[0] and any(isinstance(child, tuple) and not child[0] for child in tree[1])
+            for tree in courses.prereq_graph.trees.values()
+        )
+        # No course lists itself as a prerequisite
+        assert not [code for code, edges in courses.prereq_graph.edges.items() if code in edges]
@@ -66,6 +66,89 @@ class TestCourseSatisfiesPrerequisite:
         assert result is False or result is True  # Depends on hierarchy rules
 
 
+class TestHistoryIndex:
+    """Tests for the per-request HistoryIndex."""
+
+    def test_departments_sorted(self, sample_equivalency_map, sample_prereq_config):
+        index = engine.HistoryIndex(["MATH 230", "MATH140", "ECON102"], sample_equivalency_map, sample_prereq_config)
+        assert index.by_department == {"MATH": [140, 230], "ECON": [102]}
+        assert "MATH230" in index
+
+    def test_equivalency_inverted(self, sample_equivalency_map, sample_prereq_config):
+        index = engine.HistoryIndex(["MATH140B"], sample_equivalency_map, sample_prereq_config)
+        assert index.equivalent_satisfied == {"MATH140"}
+        assert index.satisfies("MATH 140")
+
+    def test_higher_level_range(self, sample_prereq_config):
+        index = engine.HistoryIndex(["ECON302"], None, sample_prereq_config)
+        assert index.satisfies("ECON 104")
+        assert not index.satisfies("ECON 400")
+
+    def test_minimum_level_difference(self):
+        config = {"hierarchy_rules": {"same_department_higher_level": True, "minimum_level_difference": 5}}
+        index = engine.HistoryIndex(["ECON104"], None, config)
+        assert not index.satisfies("ECON 102")
+        assert index.satisfies("ECON 099")
+
+    def test_hierarchy_disabled(self):
+        config = {"hierarchy_rules": {"same_department_higher_level": False}}
+        index = engine.HistoryIndex(["MATH141"], None, config)
+        assert not index.satisfies("MATH 140")
+
+    def test_index_accepted_as_history(self, sample_equivalency_map, sample_prereq_config):
+        index = engine.HistoryIndex(["MATH141"], sample_equivalency_map, sample_prereq_config)
+        assert engine.course_satisfies_prerequisite("MATH 140", index) is True
+
+
+class TestSatisfierIndex:
+    """Tests for the precomputed SatisfierIndex."""
+
+    def _index(self):
+        return engine.SatisfierIndex({
+            "satisfiers": {"MATH140": ["MATH140", "MATH140A", "MATH141"]},
+            "satisfies": {"MATH140": ["MATH140"], "MATH140A": ["MATH140"], "MATH141": ["MATH140"]},
+            "catalog_courses": ["MATH140", "MATH140A", "MATH141", "MATH230"]
+        })
+
+    def test_single_intersection(self, sample_equivalency_map, sample_prereq_config):
+        index = engine.HistoryIndex(["MATH140A"], sample_equivalency_map, sample_prereq_config, self._index())
+        assert index.satisfies("MATH 140")
+
+    def test_off_catalog_history_uses_hierarchy(self, sample_equivalency_map, sample_prereq_config):
+        index = engine.HistoryIndex(["MATH199"], sample_equivalency_map, sample_prereq_config, self._index())
+        assert index.satisfies("MATH 140")
+
+    def test_catalog_course_not_listed_does_not_satisfy(self, sample_equivalency_map, sample_prereq_config):
+        index = engine.HistoryIndex(["MATH230"], sample_equivalency_map, sample_prereq_config, self._index())
+        assert not index.satisfies("MATH 140")
+
+    def test_inverse_index(self):
+        assert self._index().satisfied_by(["MATH141", "MATH230"]) == {"MATH140"}
+
+    def test_stale_artifact_ignored(self, tmp_path, sample_equivalency_map, sample_prereq_config):
+        import json
+        path = tmp_path / "prerequisite_satisfiers.json"
+        path.write_text(json.dumps({
+            "format": engine.SATISFIERS_FORMAT,
+            "hierarchy_rules": {"same_department_higher_level": True, "minimum_level_difference": 0},
+            "equivalencies_sha256": "not-the-current-map",
+            "satisfiers": {}, "satisfies": {}, "catalog_courses": []
+        }))
+        assert engine.load_satisfier_index(sample_equivalency_map, sample_prereq_config, str(path)) is None
+
+    def test_current_artifact_loaded(self, tmp_path, sample_equivalency_map, sample_prereq_config):
+        import json
+        path = tmp_path / "prerequisite_satisfiers.json"
+        path.write_text(json.dumps({
+            "format": engine.SATISFIERS_FORMAT,
+            "hierarchy_rules": {"same_department_higher_level": True, "minimum_level_difference": 0},
+            "equivalencies_sha256": engine.equivalency_map_hash(sample_equivalency_map),
+            "satisfiers": {"MATH140": ["MATH140"]}, "satisfies": {"MATH140": ["MATH140"]}, "catalog_courses": ["MATH140"]
+        }))
+        index = engine.load_satisfier_index(sample_equivalency_map, sample_prereq_config, str(path))
+        assert index.satisfiers["MATH140"] == frozenset({"MATH140"})
+
+
 class TestParsePrerequisitesToTree:
     """Tests for parse_prerequisites_to_tree() function."""
     
@@ -177,3 +260,52 @@ class TestCalculateRecursiveCost:
         assert cost >= 0
         assert cost < 100  # Reasonable upper bound
 
+
+
+class TestPrerequisiteCostEvaluator:
+    """Tests for the memoized PrerequisiteCostEvaluator."""
+
+    def _or_chain_db(self, depth):
+        # Each level may be reached through either of two courses on the next level
+        courses_db = {}
+        for level in range(depth):
+            prereq = f"Prerequisite LVL {level + 1}0 or LVL {level + 1}1" if level + 1 < depth else ""
+            for suffix in ("0", "1"):
+                code = f"LVL {level}{suffix}"
+                courses_db[engine.normalize_code(code)] = {"courseCode": code, "credits": 3.0, "prerequisites_raw": prereq}
+        return courses_db
+
+    def test_matches_recursive_cost(self, sample_courses_db, sample_equivalency_map, sample_prereq_config):
+        evaluator = engine.make_cost_evaluator([], sample_courses_db, sample_equivalency_map, sample_prereq_config)
+        for code in ["ECON 102", "ECON 302", "ECON 442", "CMPSC 465", "XYZ 999"]:
+            assert evaluator.cost(code) == engine.calculate_recursive_cost(
+                code, [], sample_courses_db,
+                equivalency_map=sample_equivalency_map, prereq_config=sample_prereq_config
+            )
+
+    def test_known_credits_for_unknown_course(self, sample_courses_db):
+        evaluator = engine.make_cost_evaluator([], sample_courses_db)
+        assert evaluator.cost("ACCTG 211", known_credits=4) == 4.0
+
+    def test_deep_or_chain_is_linear(self):
+        import time
+        courses_db = self._or_chain_db(40)
+        evaluator = engine.make_cost_evaluator([], courses_db)
+        start = time.time()
+        cost = evaluator.cost("LVL 00")
+        elapsed = time.time() - start
+        assert cost == 40 * 3.0
+        assert elapsed < 0.5, f"OR chain took {elapsed:.2f} seconds"
+        # Every reachable course (all but the sibling LVL 01) is computed exactly once
+        assert len(evaluator._cost) == 2 * 40 - 1
+
+    def test_cycle_is_condensed(self, sample_prereq_config):
+        courses_db = {
+            "CYC101": {"courseCode": "CYC 101", "credits": 3.0, "prerequisites_raw": "Prerequisite CYC 102"},
+            "CYC102": {"courseCode": "CYC 102", "credits": 3.0, "prerequisites_raw": "Prerequisite CYC 103"},
+            "CYC103": {"courseCode": "CYC 103", "credits": 3.0, "prerequisites_raw": "Prerequisite CYC 101"},
+        }
+        graph = engine.PrerequisiteGraph(courses_db)
+        assert len({graph.component[c] for c in courses_db}) == 1
+        evaluator = engine.PrerequisiteCostEvaluator(graph, [])
+        assert evaluator.cost("CYC 101") == 9.0
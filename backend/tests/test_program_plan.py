@@ -0,0 +1,53 @@
+"""
+Unit tests for compiled program plans in recommendation_engine.py
+"""
+import copy
+import pytest
+import recommendation_engine as engine
+
+class TestCompileProgram:
+    """Tests for compile_program() / compile_programs()."""
+
+    def test_codes_are_normalized(self, sample_programs_db, sample_courses_db):
+        plan = engine.compile_program(sample_programs_db[1], sample_courses_db)
+        assert "ECON102" in plan["course_code_set"]
+        assert "ECON 102" not in plan["course_code_set"]
+
+    def test_subset_credits_parsed_from_catalog(self, sample_courses_db):
+        sample_courses_db["TEST100"] = {"credits": "3-4", "courseCode": "TEST 100"}
+        program = {"rules": [{"type": "subset", "credits_needed": 3, "courses": [{"code": "TEST 100", "credits": 4}]}]}
+        plan = engine.compile_program(program, sample_courses_db)
+        assert plan["rules"][0]["courses"] == [("TEST 100", "TEST100", 3.0)]
+
+    def test_dynamic_subset_pools(self, sample_programs_db, sample_courses_db):
+        plan = engine.compile_program(sample_programs_db[0], sample_courses_db)
+        dynamic = plan["dynamic_rules"][0]
+        assert "ECON" in dynamic["departments"]
+        assert dynamic["secondary"] == frozenset({"CAS404", "ENGL419"})
+
+    def test_compile_programs_attaches_plan(self, sample_programs_db, sample_courses_db):
+        programs = engine.compile_programs(sample_programs_db, sample_courses_db)
+        assert all("_compiled" in p for p in programs)
+
+    def test_compiled_matches_raw(self, sample_programs_db, sample_courses_db, sample_equivalency_map, sample_prereq_config):
+        raw = copy.deepcopy(sample_programs_db)
+        compiled = engine.compile_programs(sample_programs_db, sample_courses_db)
+        user_history = ["ECON102", "ECON442", "CAS404"]
+        major_courses = ["MGMT301"]
+        for raw_prog, prog in zip(raw, compiled):
+            assert engine.calculate_program_gap(
+                raw_prog, user_history + major_courses, sample_courses_db, major_courses,
+                sample_equivalency_map, sample_prereq_config
+            ) == engine.calculate_program_gap(
+                prog, user_history + major_courses, sample_courses_db, major_courses,
+                sample_equivalency_map, sample_prereq_config
+            )
+            assert engine.calculate_overlap_count(raw_prog, user_history, major_courses) == \
+                engine.calculate_overlap_count(prog, user_history, major_courses)
+
+    def test_plan_is_reused(self, sample_programs_db, sample_courses_db):
+        program = engine.compile_programs(sample_programs_db, sample_courses_db)[1]
+        # Raw rules are no longer consulted once the plan exists
+        program["rules"] = []
+        count, _ = engine.calculate_overlap_count(program, ["ECON102"], [])
+        assert count == 1
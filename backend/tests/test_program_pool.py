@@ -0,0 +1,239 @@
+"""
+Unit tests for program_pool.py
+"""
+import os
+import threading
+import time
+import pytest
+import recommendation_engine as engine
+import catalog_state
+import program_pool
+from program_pool import ProgramPool
+
+HISTORIES = [
+    ([], []),
+    (["ENGL15", "ECON102", "MATH021"], ["GS"]),
+    (["ACCTG211", "MGMT301", "PSYCH100", "ECON104", "STAT200"], ["GN", "GH"]),
+]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return catalog_state.build_state(*engine.load_data(None), source='json')
+
+
+@pytest.fixture(scope="module")
+def pool(catalog):
+    pool = ProgramPool(workers=2, threshold=0)
+    assert pool.start(catalog)
+    yield pool
+    pool.shutdown()
+
+
+def in_process(catalog, candidates, profile, exact_scores=None):
+    return engine.rank_programs([catalog.programs[i] for i in candidates], 15, profile, catalog.courses,
+                                catalog.equivalency_map, catalog.prereq_config, exact_scores=exact_scores)
+
+
+class TestRank:
+    """Merged shard results equal ranking every program in one process."""
+
+    def test_matches_in_process_ranking(self, catalog, pool):
+        for program_type in ("minor", "major", "certificate"):
+            candidates = [i for i, p in enumerate(catalog.programs) if program_type in p['type'].lower()]
+            for history, needs in HISTORIES:
+                profile = engine.StudentProfile(history, [], needs)
+                assert pool.rank(catalog, candidates, 15, profile) == in_process(catalog, candidates, profile)
+
+    def test_exact_scores_are_merged_without_evaluation(self, catalog, pool):
+        candidates = list(range(len(catalog.programs)))
+        major = catalog.major_list[0]
+        profile = engine.StudentProfile(["ECON102"], catalog.baselines.major_courses(major), ["GS"])
+        exact = catalog.baselines.scores(candidates, profile, catalog.baselines.baseline(major))
+        assert exact
+        assert pool.rank(catalog, candidates, 15, profile, exact) == in_process(catalog, candidates, profile, exact)
+
+    def test_requests_never_fork(self, catalog):
+        pool = ProgramPool(workers=2, threshold=0)
+        profile = engine.StudentProfile(["ECON102"])
+        # Not started: ranked in-process
+        assert pool.rank(catalog, [0, 1, 2], 2, profile) == in_process(catalog, [0, 1, 2], profile)[:2]
+        assert pool.status()["forks"] == 0 and pool.status()["requests"] == 0
+
+    def test_start_refuses_with_other_threads(self, catalog):
+        pool = ProgramPool(workers=2, threshold=0)
+        release = threading.Event()
+        thread = threading.Thread(target=release.wait)
+        thread.start()
+        try:
+            assert not pool.start(catalog)
+        finally:
+            release.set()
+            thread.join()
+        assert pool.status()["forks"] == 0 and not pool.holds(catalog)
+
+    def test_published_catalog_is_sent_to_the_workers(self, catalog):
+        pool = ProgramPool(workers=2, threshold=0)
+        holder = catalog_state.CatalogHolder(catalog)
+        holder.listeners.append(pool.load)
+        assert pool.start(catalog)
+        try:
+            pids = {worker.process.pid for worker in pool._workers}
+            profile = engine.StudentProfile(["ECON102"])
+            reloaded = catalog_state.build_state(list(catalog.programs[:3]), catalog.courses, catalog.equivalency_map,
+                                                 catalog.prereq_config, source='json')
+            # Not published yet: the workers hold the old state
+            assert pool.rank(reloaded, [0, 1, 2], 2, profile) == in_process(reloaded, [0, 1, 2], profile)[:2]
+            assert pool.status()["requests"] == 0
+
+            # Published from another thread, like the catalog watcher
+            thread = threading.Thread(target=holder.publish, args=(reloaded,))
+            thread.start()
+            thread.join()
+            assert pool.holds(reloaded) and not pool.holds(catalog)
+            assert pool.rank(reloaded, [0, 1, 2], 2, profile) == in_process(reloaded, [0, 1, 2], profile)[:2]
+            assert pool.status()["requests"] == 1
+            assert pool.status()["forks"] == 1 and pool.status()["loads"] == 1
+            assert {worker.process.pid for worker in pool._workers} == pids
+        finally:
+            pool.shutdown()
+
+    def test_busy_workers_rank_in_process(self, catalog, pool):
+        profile = engine.StudentProfile(["ECON102"])
+        held = pool._checkout(catalog, 1)
+        try:
+            before = pool.status()
+            assert pool.rank(catalog, [0, 1, 2], 2, profile) == in_process(catalog, [0, 1, 2], profile)[:2]
+            assert pool.status()["busy"] == before["busy"] + 1
+            assert pool.status()["requests"] == before["requests"]
+        finally:
+            pool._release(held)
+
+
+class TestFailures:
+    """A task error reaches the caller; a dead worker is replaced by in-process work."""
+
+    def test_task_error_is_raised_and_the_pool_stays_usable(self, catalog, pool):
+        with pytest.raises(ValueError, match="item 3"):
+            pool.map(catalog, fail_on_three, list(range(8)))
+        assert pool.map(catalog, program_count, [0, 1])[1][:2] == (1, len(catalog.programs))
+        assert pool.status()["failures"] == 0
+
+    def test_dead_worker_falls_back_in_process(self, catalog):
+        pool = ProgramPool(workers=2, threshold=0)
+        assert pool.start(catalog)
+        try:
+            victim = pool._workers[0].process
+            victim.kill()
+            victim.join()
+            profile = engine.StudentProfile(["ECON102"])
+            candidates = list(range(10))
+            assert pool.rank(catalog, candidates, 5, profile) == in_process(catalog, candidates, profile)[:5]
+            assert pool.status()["failures"] == 1
+            assert pool.status()["running"] == 1
+            # One worker left: later requests stay in-process
+            assert pool.rank(catalog, candidates, 5, profile) == in_process(catalog, candidates, profile)[:5]
+            assert pool.status()["requests"] == 0
+        finally:
+            pool.shutdown()
+
+
+def fail_on_three(catalog, item):
+    if item == 3:
+        raise ValueError(f"item {item}")
+    return item
+
+
+def program_count(catalog, item):
+    """Mapped function: runs in the workers against the inherited catalog."""
+    return item, len(catalog.programs), program_pool._in_worker, os.getpid()
+
+
+class TestMap:
+    """map() computes items in the workers, in input order."""
+
+    def test_results_in_order_from_the_workers(self, catalog, pool):
+        results = pool.map(catalog, program_count, list(range(20)))
+        assert [r[:3] for r in results] == [(i, len(catalog.programs), True) for i in range(20)]
+        assert os.getpid() not in {r[3] for r in results}
+        assert pool.status()["batch_items"] >= 20
+
+    def test_in_process_without_workers(self, catalog):
+        results = ProgramPool(workers=0).map(catalog, program_count, [1, 2])
+        assert [r[:3] for r in results] == [(1, len(catalog.programs), False), (2, len(catalog.programs), False)]
+
+    def test_workers_do_not_nest_pools(self, catalog, pool):
+        assert pool.map(catalog, nested_pool_enabled, [0, 1]) == [False, False]
+
+
+def nested_pool_enabled(catalog, item):
+    return ProgramPool(workers=2, threshold=0).enabled
+
+
+class TestThreshold:
+    """Only requests with enough work are sent to the pool."""
+
+    def test_should_use(self):
+        profile = engine.StudentProfile(["ECON102", "ECON104"], ["MATH140"])
+        work = 100 * (1 + 3 / program_pool.COURSES_PER_EVALUATION)
+        assert ProgramPool.estimated_work(100, profile) == pytest.approx(work)
+        assert ProgramPool(workers=2, threshold=work - 0.5).should_use(100, profile)
+        assert not ProgramPool(workers=2, threshold=work + 0.5).should_use(100, profile)
+        assert not ProgramPool(workers=0, threshold=0).should_use(100, profile)
+        assert not ProgramPool(workers=2, threshold=0).should_use(1, profile)
+
+    def test_break_even(self):
+        # Sharding saves evaluations * EVALUATION_US * (1 - 1/w) and costs the dispatch plus the extra shards
+        for workers in (2, 4, 8):
+            n = program_pool.break_even(workers)
+            pooled = (program_pool.DISPATCH_US
+                      + (n * program_pool.EVALUATION_US + (workers - 1) * program_pool.SHARD_US) / workers)
+            assert pooled == pytest.approx(n * program_pool.EVALUATION_US)
+        assert program_pool.break_even(1) == float('inf')
+        assert program_pool.break_even(2) > program_pool.break_even(4) > program_pool.break_even(8)
+
+    def test_default_threshold(self):
+        # A /recommend request over the bundled catalog (75 programs) is sharded once
+        # there are several workers; one worker never shards
+        profile = engine.StudentProfile(["ECON102"])
+        assert ProgramPool(workers=2).threshold == program_pool.break_even(2)
+        assert ProgramPool(workers=4).should_use(75, profile)
+        assert not ProgramPool(workers=4).should_use(5, profile)
+        assert not ProgramPool(workers=1).should_use(75, profile)
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv('PROGRAM_POOL_WORKERS', '3')
+        monkeypatch.setenv('PROGRAM_POOL_THRESHOLD', '10')
+        pool = ProgramPool.from_env()
+        assert (pool.workers, pool.threshold, pool.enabled) == (3, 10, True)
+        monkeypatch.setenv('PROGRAM_POOL_WORKERS', '0')
+        assert not ProgramPool.from_env().enabled
+
+    def test_default_workers(self, monkeypatch):
+        monkeypatch.delenv('PROGRAM_POOL_WORKERS', raising=False)
+        monkeypatch.setattr(os, "cpu_count", lambda: 3)
+        assert ProgramPool.from_env().workers == program_pool.default_workers() == 3
+        monkeypatch.setattr(program_pool.multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+        assert not ProgramPool.from_env().enabled
+
+
+class TestDefaultConfiguration:
+    """Without any configuration, map() spreads the work over several processes."""
+
+    def test_spreads_the_items(self, catalog, monkeypatch):
+        monkeypatch.delenv('PROGRAM_POOL_WORKERS', raising=False)
+        monkeypatch.setattr(os, "cpu_count", lambda: 2)
+        pool = ProgramPool.from_env()
+        assert pool.start(catalog)
+        try:
+            results = pool.map(catalog, slow_program_count, list(range(8)))
+        finally:
+            pool.shutdown()
+        assert [r[0] for r in results] == list(range(8))
+        assert len({r[3] for r in results}) == 2 and os.getpid() not in {r[3] for r in results}
+
+
+def slow_program_count(catalog, item):
+    # Long enough that one worker cannot take every chunk before the other starts
+    time.sleep(0.05)
+    return program_count(catalog, item)
@@ -0,0 +1,153 @@
+"""
+Unit tests for numeric ranking and on-demand explanation in recommendation_engine.py
+"""
+import pytest
+import recommendation_engine as engine
+
+PROFILES = [
+    ([], [], []),
+    (["ECON102", "ECON442", "CAS404"], ["MGMT301"], ["GS"]),
+    (["MATH140", "STAT200", "ECON302"], [], ["GQ", "GS"]),
+    (["ECON102", "ECON104", "ECON302", "ECON304", "ECON402", "ECON471"], ["ECON102"], ["GS"]),
+]
+
+
+class TestStudentProfile:
+    """Tests for the per-request StudentProfile."""
+
+    def test_combined_history_keeps_order_without_duplicates(self):
+        profile = engine.StudentProfile(["ECON102", "MATH140", "ECON102"], ["MGMT301", "MATH140"])
+        assert profile.combined_history == ["ECON102", "MATH140", "MGMT301"]
+        assert profile.major_set == {"MGMT301", "MATH140"}
+
+    def test_pool_members(self, sample_programs_db, sample_courses_db):
+        plan = engine.compile_program(sample_programs_db[1], sample_courses_db)
+        rule = plan["dynamic_rules"][0]  # ECON 400-499
+        profile = engine.StudentProfile(["ECON471", "ECON102", "MGMT401", "ECON442"])
+        assert profile.pool_members(rule) == ["ECON471", "ECON442"]
+
+
+class TestEvaluateProgram:
+    """evaluate_program() must agree with the three separate calculators."""
+
+    @pytest.mark.parametrize("user_history, major_courses, needs", PROFILES)
+    def test_matches_separate_calculators(self, mixed_programs_db, sample_courses_db,
+                                          sample_equivalency_map, sample_prereq_config,
+                                          user_history, major_courses, needs):
+        programs, courses = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        profile = engine.StudentProfile(user_history, major_courses, needs)
+        for program in programs:
+            gap, missing, triple_dips, overlap = engine.evaluate_program(
+                program, profile, courses, sample_equivalency_map, sample_prereq_config
+            )
+            assert (gap, missing) == engine.calculate_program_gap(
+                program, profile.combined_history, courses, major_courses,
+                sample_equivalency_map, sample_prereq_config
+            )
+            assert triple_dips == engine.find_triple_dips(program, needs, courses, user_history)
+            _, expected_overlap = engine.calculate_overlap_count(program, user_history, major_courses, courses)
+            assert sorted(overlap) == sorted(expected_overlap)
+
+    def test_raw_program(self, sample_programs_db, sample_courses_db):
+        # Programs without a compiled plan are compiled on the fly
+        profile = engine.StudentProfile(["ECON102"])
+        gap, _, _, overlap = engine.evaluate_program(sample_programs_db[1], profile, sample_courses_db)
+        assert gap == engine.calculate_program_gap(sample_programs_db[1], ["ECON102"], sample_courses_db)[0]
+        assert overlap == ["ECON 102"]
+
+
+class TestScoreProgram:
+    """score_program() must agree with the detailed calculators."""
+
+    @pytest.mark.parametrize("user_history, major_courses, needs", PROFILES)
+    def test_matches_explain_program(self, mixed_programs_db, sample_courses_db,
+                                     sample_equivalency_map, sample_prereq_config,
+                                     user_history, major_courses, needs):
+        programs, courses = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        profile = engine.StudentProfile(user_history, major_courses, needs)
+        for program in programs:
+            gap, overlap, optimizations = engine.score_program(
+                program, profile, courses, sample_equivalency_map, sample_prereq_config
+            )
+            detail = engine.explain_program(
+                program, profile, courses, sample_equivalency_map, sample_prereq_config
+            )
+            assert gap == detail["gap_credits"]
+            assert overlap == detail["overlap_count"]
+            assert optimizations == detail["optimization_count"]
+            assert overlap == engine.count_overlap(program, user_history, major_courses, courses)
+            assert optimizations == engine.count_triple_dips(program, needs, courses, user_history)
+
+    def test_raw_program(self, sample_programs_db, sample_courses_db):
+        program = sample_programs_db[1]
+        assert engine.calculate_program_gap_credits(program, ["ECON102"], sample_courses_db) == \
+            engine.calculate_program_gap(program, ["ECON102"], sample_courses_db)[0]
+
+
+class TestSelectTopPrograms:
+    """select_top_programs() must equal a full stable sort."""
+
+    def test_equals_sorted_slice(self):
+        keys = [engine.ranking_key(g, o, t) for g, o, t in
+                [(6, 1, 0), (3, 0, 0), (6, 2, 0), (3, 0, 0), (0, 0, 1), (6, 1, 0), (3, 1, 2)]]
+        expected = sorted(range(len(keys)), key=keys.__getitem__)
+        for k in range(len(keys) + 2):
+            assert engine.select_top_programs(keys, k) == expected[:k]
+
+    def test_ranking_key_order(self):
+        # Lower gap first, then higher overlap, then more optimizations
+        assert engine.ranking_key(3, 0, 0) < engine.ranking_key(6, 5, 5)
+        assert engine.ranking_key(3, 2, 0) < engine.ranking_key(3, 1, 9)
+        assert engine.ranking_key(3, 1, 2) < engine.ranking_key(3, 1, 1)
+
+
+class TestRankPrograms:
+    """Branch-and-bound rank_programs() must equal the full sort."""
+
+    @pytest.mark.parametrize("user_history, major_courses, needs", PROFILES)
+    def test_equals_full_sort(self, mixed_programs_db, sample_courses_db,
+                              sample_equivalency_map, sample_prereq_config,
+                              user_history, major_courses, needs):
+        programs, courses = engine.compile_catalog(mixed_programs_db * 3, sample_courses_db)
+        profile = engine.StudentProfile(user_history, major_courses, needs)
+        keys = [
+            engine.ranking_key(*engine.score_program(
+                program, profile, courses, sample_equivalency_map, sample_prereq_config
+            ))
+            for program in programs
+        ]
+        expected = sorted(range(len(programs)), key=keys.__getitem__)
+        for k in range(len(programs) + 1):
+            assert engine.rank_programs(
+                programs, k, profile, courses, sample_equivalency_map, sample_prereq_config
+            ) == expected[:k]
+
+    def test_lower_bound_never_exceeds_gap(self, mixed_programs_db, sample_courses_db):
+        programs, courses = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        for user_history, major_courses, _ in PROFILES:
+            combined = list(set(user_history + major_courses))
+            for program in programs:
+                assert engine.program_gap_lower_bound(program, combined, courses, major_courses) <= \
+                    engine.calculate_program_gap_credits(program, combined, courses, major_courses)
+
+    def test_prunes_programs_that_cannot_rank(self, mixed_programs_db, sample_courses_db, sample_prereq_config):
+        programs, courses = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        # Business is complete; Statistics (the only group_option program) is
+        # bounded below by its 6-credit subset rule, so its options are never costed
+        profile = engine.StudentProfile(["MGMT301", "MKTG301W", "ECON442", "ECON471"])
+        evaluator = engine.make_cost_evaluator(profile.combined_history, courses, None, sample_prereq_config)
+        assert engine.rank_programs(programs, 1, profile, courses, cost_evaluator=evaluator) == [0]
+        assert evaluator._cost == {} and evaluator._satisfied == {}
+
+
+class TestExplainProgram:
+    """explain_program() builds the /recommend entry for a single program."""
+
+    def test_fields(self, sample_programs_db, sample_courses_db):
+        programs, courses = engine.compile_catalog(sample_programs_db, sample_courses_db)
+        profile = engine.StudentProfile(["ECON102"], [], ["GS"])
+        detail = engine.explain_program(programs[1], profile, courses)
+        assert detail["program_name"] == "Economics"
+        assert detail["program_url"] == "https://example.com/economics"
+        assert detail["overlap_courses"] == ["ECON 102"]
+        assert {"text": "ECON 104", "status": "missing"}.items() <= detail["missing_courses"][0].items()
@@ -0,0 +1,90 @@
+"""
+Unit tests for the /recommend/batch endpoint in app.py
+"""
+import pytest
+import app as server
+from program_pool import ProgramPool
+
+
+@pytest.fixture(scope="module")
+def client():
+    return server.app.test_client()
+
+
+STUDENTS = [
+    {"history": ["ENGL 15", "ECON 102", "MATH 021"], "major": "", "interest_filter": "Minor"},
+    {"history": ["ACCTG 211", "MGMT 301", "PSYCH 100"], "major": "", "gen_ed_needs": ["GN"], "interest_filter": "Minor"},
+    {"history": ["CMPSC 131", "MATH 140"], "major": "", "interest_filter": "Certificate"},
+]
+
+
+class TestBatch:
+    """Per-student results match /recommend, in input order."""
+
+    def test_matches_single_requests(self, client):
+        response = client.post('/recommend/batch', json={"students": STUDENTS})
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body["status"] == "success" and body["count"] == 3 and body["failed"] == 0
+        for index, (student, result) in enumerate(zip(STUDENTS, body["results"])):
+            single = client.post('/recommend', json=student).get_json()
+            assert result == dict(single, index=index)
+
+    def test_partial_failure(self, client):
+        students = [STUDENTS[0], {}, {"id": "s3", "history": 5}, dict(STUDENTS[1], id="s4")]
+        body = client.post('/recommend/batch', json={"students": students}).get_json()
+        assert body["status"] == "partial" and body["failed"] == 2
+        assert [r["status"] for r in body["results"]] == ["success", "error", "error", "success"]
+        assert [r["index"] for r in body["results"]] == [0, 1, 2, 3]
+        assert body["results"][2]["id"] == "s3" and body["results"][3]["id"] == "s4"
+
+    def test_identical_students_are_computed_once(self, client, monkeypatch):
+        calls = []
+        recommend = server._recommend
+        monkeypatch.setattr(server, "_recommend",
+                            lambda data, catalog, use_cache=True: calls.append(data) or recommend(data, catalog, use_cache))
+        server.RESULT_CACHE.clear()
+        same = dict(STUDENTS[0], history=list(reversed(STUDENTS[0]["history"])))
+        body = client.post('/recommend/batch', json={"students": [STUDENTS[0], same, STUDENTS[1]]}).get_json()
+        assert len(calls) == 2
+        assert body["results"][0]["recommendations"] == body["results"][1]["recommendations"]
+
+    def test_invalid_batches(self, client, monkeypatch):
+        assert client.post('/recommend/batch', json={"students": []}).status_code == 400
+        assert client.post('/recommend/batch', json=[STUDENTS[0]]).status_code == 400
+        monkeypatch.setattr(server, "RECOMMEND_BATCH_MAX", 2)
+        assert client.post('/recommend/batch', json={"students": STUDENTS}).status_code == 413
+
+
+class TestBatchOnProgramPool:
+    """With a program pool, students are computed by its worker processes."""
+
+    @pytest.fixture
+    def pool(self, monkeypatch):
+        pool = ProgramPool(workers=2, threshold=10 ** 9)
+        assert pool.start(server.CATALOG.current())
+        monkeypatch.setattr(server, "PROGRAM_POOL", pool)
+        yield pool
+        pool.shutdown()
+
+    def test_matches_single_requests(self, client, pool):
+        students = STUDENTS + [dict(STUDENTS[1], gen_ed_needs=["GH", "GS"]), {}, dict(STUDENTS[0], id="again")]
+        server.RESULT_CACHE.clear()
+        body = client.post('/recommend/batch', json={"students": students}).get_json()
+        status = pool.status()
+        assert status["batches"] == 1 and status["batch_items"] == 5 and status["failures"] == 0
+        assert body["failed"] == 1 and body["results"][4]["status"] == "error"
+
+        server.RESULT_CACHE.clear()
+        for index, (student, result) in enumerate(zip(students, body["results"])):
+            if not student:
+                continue
+            single = client.post('/recommend', json=student).get_json()
+            expected = dict(single, index=index, **({"id": student["id"]} if "id" in student else {}))
+            assert result == expected
+
+    def test_cached_students_are_not_sent(self, client, pool):
+        server.RESULT_CACHE.clear()
+        client.post('/recommend', json=STUDENTS[0])
+        client.post('/recommend/batch', json={"students": STUDENTS})
+        assert pool.status()["batch_items"] == 2
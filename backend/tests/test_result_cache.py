@@ -0,0 +1,144 @@
+"""
+Unit tests for result_cache.py
+"""
+import pytest
+import recommendation_engine as engine
+import app as server
+from result_cache import ResultCache, order_gen_ed_matches, recommendation_fingerprint
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRecommendationFingerprint:
+    """Tests for recommendation_fingerprint()."""
+
+    def test_canonical_history_and_needs(self):
+        a = recommendation_fingerprint(["MATH 140", "econ102", "ECON 102"], "Business", ["GS", "GH"], "Minor")
+        b = recommendation_fingerprint(["ECON102", "MATH140"], "BUSINESS", ["GH", "GS", "GS"], "minor")
+        assert a == b
+        assert a == (("ECON102", "MATH140"), "business", ("GH", "GS"), "minor")
+
+    def test_filter_and_major_are_part_of_key(self):
+        base = recommendation_fingerprint(["ECON102"], "Business", [], "Minor")
+        assert base != recommendation_fingerprint(["ECON102"], "Business", [], "Major")
+        assert base != recommendation_fingerprint(["ECON102"], "Economics", [], "Minor")
+
+    def test_hashable(self):
+        cache = {recommendation_fingerprint([], None, [], None): 1}
+        assert cache[((), "", (), "")] == 1
+
+
+class TestOrderGenEdMatches:
+    """Tests for order_gen_ed_matches()."""
+
+    RESPONSE = {"status": "success", "recommendations": [
+        {"id": "A", "optimizations": [{"course": "ART 10", "matches": ["GA", "GH"]}]},
+        {"id": "B", "optimizations": [{"course": "ECON 14", "matches": ["GS"]}]},
+    ]}
+
+    def test_reorders_a_copy(self):
+        reordered = order_gen_ed_matches(self.RESPONSE, ["GH", "GS", "GA"])
+        assert reordered["recommendations"][0]["optimizations"][0]["matches"] == ["GH", "GA"]
+        assert self.RESPONSE["recommendations"][0]["optimizations"][0]["matches"] == ["GA", "GH"]
+        assert reordered["recommendations"][1] is self.RESPONSE["recommendations"][1]
+
+    def test_same_order_returns_response(self):
+        assert order_gen_ed_matches(self.RESPONSE, ["GA", "GH", "GS"]) is self.RESPONSE
+        assert order_gen_ed_matches({"status": "error", "error": "x"}, ["GA"]) == {"status": "error", "error": "x"}
+
+    def test_requested_order_survives_the_cache(self):
+        client = server.app.test_client()
+        body = {"history": [], "major": "", "interest_filter": "Certificate"}
+
+        def matches(needs):
+            response = client.post('/recommend', json=dict(body, gen_ed_needs=needs)).get_json()
+            return [dip["matches"] for rec in response["recommendations"] for dip in rec["optimizations"]
+                    if set(dip["matches"]) == {"GA", "GH"}]
+
+        server.RESULT_CACHE.clear()
+        assert matches(["GH", "GA"]) == [["GH", "GA"]]
+        # Same fingerprint: served from the cache, in this request's order
+        assert matches(["GA", "GH"]) == [["GA", "GH"]]
+        server.RESULT_CACHE.clear()
+        assert matches(["GA", "GH"]) == [["GA", "GH"]]
+
+
+class TestResultCache:
+    """Tests for the LRU + TTL ResultCache."""
+
+    def test_hit_and_miss_counters(self):
+        cache = ResultCache(max_size=4, ttl_seconds=0)
+        assert cache.get("a", 1) is None
+        cache.put("a", {"x": 1}, 1)
+        assert cache.get("a", 1) == {"x": 1}
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_size=2, ttl_seconds=0)
+        cache.put("a", 1, 1)
+        cache.put("b", 2, 1)
+        cache.get("a", 1)  # "b" is now least recently used
+        cache.put("c", 3, 1)
+        assert cache.get("b", 1) is None
+        assert cache.get("a", 1) == 1 and cache.get("c", 1) == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = ResultCache(max_size=4, ttl_seconds=10, clock=clock)
+        cache.put("a", 1, 1)
+        clock.now = 9.9
+        assert cache.get("a", 1) == 1
+        clock.now = 10.0
+        assert cache.get("a", 1) is None
+        assert cache.stats()["expirations"] == 1
+        assert len(cache) == 0
+
+    def test_data_version_change_invalidates(self):
+        cache = ResultCache(max_size=4, ttl_seconds=0)
+        cache.put("a", 1, 1)
+        cache.put("b", 2, 1)
+        assert cache.get("a", 2) is None
+        assert len(cache) == 0
+        assert cache.stats()["invalidations"] == 1
+        assert cache.stats()["data_version"] == 2
+
+    def test_older_version_skips_the_cache(self):
+        cache = ResultCache(max_size=4, ttl_seconds=0)
+        cache.put("a", 1, 2)
+        # A request still holding the previous catalog, during a hot reload
+        assert cache.get("a", 1) is None
+        cache.put("b", 2, 1)
+        assert cache.get("a", 2) == 1 and cache.get("b", 2) is None
+        stats = cache.stats()
+        assert (stats["data_version"], stats["invalidations"], stats["stale"], stats["size"]) == (2, 0, 2, 1)
+
+    def test_disabled(self):
+        cache = ResultCache(max_size=0)
+        cache.put("a", 1, 1)
+        assert cache.get("a", 1) is None
+        assert cache.stats()["misses"] == 0 and not cache.stats()["enabled"]
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("RESULT_CACHE_SIZE", "8")
+        monkeypatch.setenv("RESULT_CACHE_TTL", "30")
+        cache = ResultCache.from_env()
+        assert cache.max_size == 8 and cache.ttl_seconds == 30
+
+
+class TestDataVersion:
+    """Each compiled catalog gets its own data version."""
+
+    def test_compile_catalog_bumps_version(self, sample_programs_db, sample_courses_db):
+        _, first = engine.compile_catalog(sample_programs_db, dict(sample_courses_db))
+        _, second = engine.compile_catalog(sample_programs_db, dict(sample_courses_db))
+        assert first.data_version > 0
+        assert second.data_version != first.data_version
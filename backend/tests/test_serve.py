@@ -0,0 +1,158 @@
+"""
+Unit tests for the pre-forking production server in serve.py
+"""
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+import pytest
+import serve
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SMAPS_ROLLUP = """\
+55d0c0000000-7ffd00000000 ---p 00000000 00:00 0                          [rollup]
+Rss:               57140 kB
+Pss:               18012 kB
+Shared_Clean:       4100 kB
+Shared_Dirty:      49000 kB
+Private_Clean:        40 kB
+Private_Dirty:      4000 kB
+Swap:                  0 kB
+"""
+
+
+class TestImport:
+    """Importing serve.py changes nothing in the importing process; main() does the setup."""
+
+    def test_import_has_no_side_effects(self):
+        env = dict(os.environ)
+        env.pop("CATALOG_SEGMENT_NAMESPACE", None)
+        code = "import gc, os, serve; print(gc.isenabled(), 'CATALOG_SEGMENT_NAMESPACE' in os.environ)"
+        result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, timeout=60)
+        assert result.stdout.split() == ["True", "False"]
+
+
+class TestMemoryReport:
+    """smaps_rollup parsing and the per-worker report."""
+
+    def test_parse_smaps_rollup(self):
+        assert serve.parse_smaps_rollup(SMAPS_ROLLUP) == {
+            "rss": 57140 * 1024, "pss": 18012 * 1024, "shared": 53100 * 1024, "unique": 4040 * 1024,
+        }
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs /proc/<pid>/smaps_rollup")
+    def test_report_lines(self):
+        lines = serve.memory_report(os.getpid(), [os.getpid()])
+        assert lines[0].startswith(f"   master {os.getpid()}:") and "shared" in lines[1]
+        assert lines[-1].startswith("   total (PSS):")
+
+
+def read_until(proc, prefix, timeout=60):
+    deadline = time.monotonic() + timeout
+    lines = []
+    while time.monotonic() < deadline:
+        line = proc.stdout.readline()
+        if not line:
+            break
+        lines.append(line)
+        if line.startswith(prefix):
+            return line, lines
+    raise AssertionError(f"no line starting with {prefix!r} in:\n{''.join(lines)}")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork") or not os.path.exists("/proc/self/smaps_rollup"),
+                    reason="needs fork and /proc")
+class TestServer:
+    """Workers share the listening socket; the master reports memory and stops them."""
+
+    def test_serve(self):
+        # The catalog segment holds the vectorized score matrix
+        env = dict(os.environ, PYTHONUNBUFFERED="1", CATALOG_WATCH_INTERVAL="0", CATALOG_SYNC_INTERVAL="0",
+                   RECOMMENDER_MODE="vectorized")
+        env.pop("CATALOG_SEGMENT_NAMESPACE", None)
+        proc = subprocess.Popen([sys.executable, "serve.py", "--host", "127.0.0.1", "--port", "0", "--workers", "2"],
+                                cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        try:
+            line, _ = read_until(proc, "✅ Serving on")
+            url = line.split()[3]
+            master = line.rstrip().rstrip(")").split()[-1]
+            _, lines = read_until(proc, "   total (PSS):")
+            assert sum(1 for l in lines if l.startswith("   worker ")) == 2
+            segment, _ = read_until(proc, "   catalog segment:")
+            assert f"psu-catalog-{master}-" in segment
+
+            body = json.dumps({"history": ["ECON 102"], "interest_filter": "Minor"}).encode()
+            for _ in range(4):
+                request = urllib.request.Request(f"{url}/recommend", body, {"Content-Type": "application/json"})
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    assert json.load(response)["status"] == "success"
+
+            proc.send_signal(signal.SIGUSR1)
+            _, lines = read_until(proc, "   total (PSS):")
+            assert not any("exited" in l for l in lines)
+
+            proc.send_signal(signal.SIGTERM)
+            assert proc.wait(timeout=30) == 0
+            # The master removes its catalog segments
+            assert not os.path.exists(segment.split("(")[-1].rstrip().rstrip(")"))
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+
+
+WORKER_LINE = re.compile(r"   worker \d+: ([\d.]+) MB resident, ([\d.]+) MB shared, ([\d.]+) MB unique")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork") or not os.path.exists("/proc/self/smaps_rollup"),
+                    reason="needs fork and /proc")
+class TestDefaultModeMemory:
+    """
+    In the default (bounded) mode the catalog is Python objects inherited
+    from the master, not a segment: after serving requests each worker still
+    shares most of its memory, and its unique memory does not grow with the
+    number of workers.
+    """
+
+    def worker_memory(self, workers):
+        env = dict(os.environ, PYTHONUNBUFFERED="1", CATALOG_WATCH_INTERVAL="0", CATALOG_SYNC_INTERVAL="0")
+        for name in ("CATALOG_SEGMENT_NAMESPACE", "RECOMMENDER_MODE", "PROGRAM_POOL_WORKERS"):
+            env.pop(name, None)
+        proc = subprocess.Popen([sys.executable, "serve.py", "--host", "127.0.0.1", "--port", "0",
+                                 "--workers", str(workers)],
+                                cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        try:
+            line, _ = read_until(proc, "✅ Serving on")
+            url = line.split()[3]
+            read_until(proc, "   total (PSS):")
+            for history in (["ECON 102"], ["MATH 140", "CMPSC 121", "ENGL 15"], ["PSYCH 100", "STAT 200"]) * (2 * workers):
+                body = json.dumps({"history": history, "interest_filter": "All"}).encode()
+                request = urllib.request.Request(f"{url}/recommend", body, {"Content-Type": "application/json"})
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    assert json.load(response)["status"] == "success"
+            proc.send_signal(signal.SIGUSR1)
+            _, lines = read_until(proc, "   total (PSS):")
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+            proc.stdout.close()
+        usage = [tuple(map(float, m.groups())) for m in map(WORKER_LINE.match, lines) if m]
+        assert len(usage) == workers
+        return usage
+
+    def test_workers_share_the_catalog(self):
+        unique = {}
+        for workers in (2, 4):
+            usage = self.worker_memory(workers)
+            for resident, shared, own in usage:
+                # A worker holding a private catalog (after a reload) measures about 26 MB
+                # unique against 47 MB shared; inherited ones about 9 MB
+                assert own < shared / 3
+            unique[workers] = max(own for _, _, own in usage)
+        assert unique[4] <= unique[2] * 1.25 + 1
@@ -0,0 +1,207 @@
+"""
+Unit tests for the local SQLite storage backend in sqlite_store.py
+"""
+import sqlite3
+import pytest
+import recommendation_engine as engine
+import sqlite_store
+
+
+@pytest.fixture
+def db_path(tmp_path, mixed_programs_db, sample_courses_db, sample_equivalency_map, sample_prereq_config):
+    path = str(tmp_path / "catalog.sqlite3")
+    sqlite_store.build_database(path, mixed_programs_db, sample_courses_db, sample_equivalency_map, sample_prereq_config)
+    return path
+
+
+@pytest.fixture(scope="module")
+def full_db_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("sqlite") / "catalog.sqlite3")
+    sqlite_store.build_from_json(path)
+    return path
+
+
+def scores(programs, courses, equivalency_map, prereq_config, history):
+    profile = engine.StudentProfile(history)
+    return {p['id']: engine.score_program(p, profile, courses, equivalency_map, prereq_config) for p in programs}
+
+
+class TestBuild:
+    """Tests for build_database() and the precompiled tables."""
+
+    def test_tables(self, db_path):
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM courses").fetchone()[0] == 10
+        assert set(conn.execute("SELECT * FROM course_prerequisites WHERE course_code_normalized = 'ECON471'")) == \
+            {("ECON471", "ECON302"), ("ECON471", "ECON304")}
+        listed = {row[0] for row in conn.execute("SELECT course_code_normalized FROM program_courses WHERE program_id = 'Economics'")}
+        assert listed == {"ECON102", "ECON104", "ECON302", "ECON304", "ECON402", "ECON471"}
+        # ECON 400-499 pool: ECON442 and ECON471 have keys inside it
+        pooled = conn.execute("""
+            SELECT c.course_code_normalized FROM program_pools p JOIN courses c ON c.course_key BETWEEN p.key_min AND p.key_max
+            WHERE p.program_id = 'Economics' ORDER BY 1
+        """).fetchall()
+        assert pooled == [("ECON442",), ("ECON471",)]
+
+    def test_stale_satisfier_artifact_is_not_stored(self, tmp_path, sample_programs_db, sample_courses_db, sample_prereq_config):
+        path = str(tmp_path / "catalog.sqlite3")
+        artifact = {"format": engine.SATISFIERS_FORMAT, "hierarchy_rules": {}, "equivalencies_sha256": "old",
+                    "satisfiers": {"ECON102": ["ECON102"]}, "satisfies": {"ECON102": ["ECON102"]}, "catalog_courses": ["ECON102"]}
+        counts = sqlite_store.build_database(path, sample_programs_db, sample_courses_db, {}, sample_prereq_config, artifact)
+        assert counts["prerequisite_satisfiers"] == 0
+
+    def test_update_trigger_moves_updated_at_forward(self, db_path):
+        conn = sqlite3.connect(db_path)
+        before = conn.execute("SELECT updated_at FROM courses WHERE course_code_normalized = 'ECON102'").fetchone()[0]
+        stamps = []
+        for credits in (4.0, 5.0):
+            with conn:
+                conn.execute("UPDATE courses SET credits = ? WHERE course_code_normalized = 'ECON102'", (credits,))
+            stamps.append(conn.execute("SELECT updated_at FROM courses WHERE course_code_normalized = 'ECON102'").fetchone()[0])
+        # Strictly increasing even within one millisecond
+        assert before < stamps[0] < stamps[1]
+
+
+class TestLoad:
+    """load_all_data() and load_programs() match the JSON catalog."""
+
+    def test_load_all_data(self, db_path, mixed_programs_db, sample_courses_db, sample_equivalency_map, sample_prereq_config):
+        programs, courses, equivalency_map, prereq_config = sqlite_store.load_all_data(db_path)
+        expected_programs, expected_courses = engine.compile_catalog(mixed_programs_db, dict(sample_courses_db))
+        assert equivalency_map["MATH140"]["equivalents"] == ["MATH 140A", "MATH 140B"]
+        assert prereq_config == sample_prereq_config
+        for history in ([], ["ECON 102", "ECON 302"], ["CMPSC 131", "MATH 140", "ECON 442"]):
+            assert scores(programs, courses, equivalency_map, prereq_config, history) == \
+                scores(expected_programs, expected_courses, sample_equivalency_map, sample_prereq_config, history)
+        assert sqlite_store.get_cached_data()[1] is courses
+
+    def test_text_columns_load_on_first_use(self, db_path):
+        _, courses, _, _ = sqlite_store.load_all_data(db_path)
+        lazy = courses.course_table.lazy
+        assert not lazy.loaded
+        assert courses["ECON102"]["description"] == ""
+        assert lazy.loaded
+
+    def test_full_catalog(self, full_db_path):
+        programs, courses, equivalency_map, prereq_config = sqlite_store.load_all_data(full_db_path)
+        expected = engine.load_data(None)
+        assert len(courses) == len(expected[1])
+        # Satisfier closure read from the precompiled table
+        assert courses.satisfier_index.satisfiers == expected[1].satisfier_index.satisfiers
+        # Programs are keyed by id like the database tables: compare by id
+        for history in ([], ["ENGL 15", "ECON 102", "MATH 021"], ["ACCTG 211", "MGMT 301", "PSYCH 100"]):
+            assert scores(programs, courses, equivalency_map, prereq_config, history) == \
+                scores(expected[0], expected[1], expected[2], expected[3], history)
+
+    def test_load_programs(self, full_db_path):
+        programs, courses, equivalency_map, prereq_config = sqlite_store.load_all_data(full_db_path)
+        ids = [programs[0]['id'], programs[-1]['id']]
+        partial = sqlite_store.load_programs(ids, full_db_path)
+        assert [p['id'] for p in partial[0]] == sorted(ids)
+        assert len(partial[1]) < len(courses) / 4
+        selected = [p for p in programs if p['id'] in ids]
+        for history in ([], ["ENGL 15", "ECON 102", "MATH 021"], ["ACCTG 211", "MGMT 301", "PSYCH 100"]):
+            assert scores(*partial, history) == scores(selected, courses, equivalency_map, prereq_config, history)
+
+    def test_load_programs_includes_prerequisite_closure(self, db_path):
+        _, courses, _, _ = sqlite_store.load_programs(["Economics"], db_path)
+        # ECON442 is in the 400-level pool and needs ECON302, which needs ECON102
+        assert {"ECON442", "ECON302", "ECON102"} <= set(courses)
+        assert "CMPSC465" not in courses
+        assert courses["ECON102"]["description"] == ""
+
+
+class TestUpdates:
+    """update_course() / update_courses() / update_program() write the file and patch the cache."""
+
+    def test_update_course(self, db_path):
+        _, courses, _, _ = sqlite_store.load_all_data(db_path)
+        assert sqlite_store.update_course("ECON 102", {"credits": 4.0})
+        _, new_courses, _, _ = sqlite_store.get_cached_data()
+        assert new_courses["ECON102"]["credits"] == 4.0
+        patch = sqlite_store.cached_patch(new_courses)
+        assert patch.base is courses and patch.courses == {"ECON102"}
+        assert sqlite_store.sync_cache() is None
+
+    def test_update_courses(self, db_path):
+        _, courses, _, _ = sqlite_store.load_all_data(db_path)
+        reloads = sqlite_store.sync_status()["full_reloads"]
+        assert sqlite_store.update_courses({"ECON 102": {"credits": 4.0}, "MGMT301": {"prerequisites_raw": "Prerequisite ECON 302"}})
+        _, new_courses, _, _ = sqlite_store.get_cached_data()
+        assert new_courses["ECON102"]["credits"] == 4.0
+        assert new_courses.prereq_graph.edges["MGMT301"] == ("ECON302",)
+        patch = sqlite_store.cached_patch(new_courses)
+        assert patch.base is courses and patch.courses == {"ECON102", "MGMT301"}
+        assert sqlite_store.sync_status()["full_reloads"] == reloads
+
+    def test_nothing_cached_is_not_reloaded(self, db_path, monkeypatch):
+        monkeypatch.setattr(sqlite_store, "_cache", dict(sqlite_store._cache, programs=None, courses=None, versions=None,
+                                                          patch=None, path=None))
+        monkeypatch.setattr(sqlite_store, "DB_FILE", db_path)
+        reloads = sqlite_store.sync_status()["full_reloads"]
+        assert sqlite_store.update_courses({"ECON102": {"credits": 4.0}})
+        assert sqlite_store._cache["programs"] is None
+        assert sqlite_store.sync_status()["full_reloads"] == reloads
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT credits FROM courses WHERE course_code_normalized = 'ECON102'").fetchone()[0] == 4.0
+
+    def test_missing_key_rolls_back_the_batch(self, db_path):
+        _, courses, _, _ = sqlite_store.load_all_data(db_path)
+        assert not sqlite_store.update_courses({"ECON102": {"credits": 4.0}, "ECON999": {"credits": 1.0}})
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT credits FROM courses WHERE course_code_normalized = 'ECON102'").fetchone()[0] != 4.0
+        assert sqlite_store.sync_cache() is None
+        assert sqlite_store.get_cached_data()[1] is courses
+
+    def test_update_prerequisites_refreshes_edges(self, db_path):
+        sqlite_store.load_all_data(db_path)
+        assert sqlite_store.update_course("MGMT301", {"prerequisites_raw": "Prerequisite ECON 302"})
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT prerequisite_code FROM course_prerequisites WHERE course_code_normalized = 'MGMT301'").fetchall() == [("ECON302",)]
+        assert sqlite_store.get_cached_data()[1].prereq_graph.edges["MGMT301"] == ("ECON302",)
+
+    def test_update_prerequisites_drops_self_reference(self, db_path):
+        sqlite_store.load_all_data(db_path)
+        assert sqlite_store.update_course("mgmt 301", {"prerequisites_raw": "Prerequisite ECON 302 or MGMT 301"})
+        graph = sqlite_store.get_cached_data()[1].prereq_graph
+        assert graph.edges["MGMT301"] == ("ECON302",)
+        assert graph.component["MGMT301"] != graph.component.get("ECON302")
+
+    def test_update_program(self, db_path):
+        sqlite_store.load_all_data(db_path)
+        rules = [{"name": "Core", "type": "all", "credits_needed": 3, "courses": [{"code": "CMPSC 131", "credits": 3}]}]
+        assert sqlite_store.update_program("Economics", {"rules": rules})
+        programs = sqlite_store.get_cached_data()[0]
+        economics = next(p for p in programs if p["id"] == "Economics")
+        assert economics["_compiled"]["course_codes"] == ("CMPSC131",)
+        _, courses, _, _ = sqlite_store.load_programs(["Economics"], db_path)
+        assert set(courses) == {"CMPSC131"}
+
+    def test_unknown_column(self, db_path):
+        sqlite_store.load_all_data(db_path)
+        assert not sqlite_store.update_course("ECON102", {"no_such_column": 1})
+        assert not sqlite_store.update_course("ECON999", {"credits": 1.0})
+
+    def test_sync_picks_up_other_writers(self, db_path):
+        sqlite_store.load_all_data(db_path)
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("DELETE FROM programs WHERE id = 'Business'")
+            conn.execute("UPDATE courses SET title = 'Micro' WHERE course_code_normalized = 'ECON102'")
+        patch = sqlite_store.sync_cache()
+        assert patch.removed_programs == {"Business"} and patch.courses == {"ECON102"}
+        programs, courses, _, _ = sqlite_store.get_cached_data()
+        assert "Business" not in [p["id"] for p in programs]
+        assert courses["ECON102"]["title"] == "Micro"
+
+    def test_rows_written_with_old_timestamps_are_patched_in(self, db_path):
+        sqlite_store.load_all_data(db_path)
+        reloads = sqlite_store.sync_status()["full_reloads"]
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("INSERT INTO courses (course_code_normalized, course_code, title, updated_at) "
+                         "VALUES ('ECON999', 'ECON 999', 'Imported', '2020-01-01T00:00:00.000+00:00')")
+        patch = sqlite_store.sync_cache()
+        assert patch.courses == {"ECON999"}
+        assert sqlite_store.get_cached_data()[1]["ECON999"]["title"] == "Imported"
+        assert sqlite_store.sync_status()["full_reloads"] == reloads
@@ -0,0 +1,49 @@
+"""
+Unit tests for vectorized_scoring.py
+"""
+import pytest
+import recommendation_engine as engine
+
+pytest.importorskip("numpy")
+
+import vectorized_scoring
+
+
+class TestProgramScoreMatrix:
+    """Vectorized scores must equal the per-program engine results."""
+
+    @pytest.mark.parametrize("user_history, major_courses, needs", [
+        ([], [], []),
+        (["ECON102", "ECON442", "CAS404"], ["MGMT301"], ["GS"]),
+        (["MATH140", "STAT200", "ECON302"], [], ["GQ", "GS"]),
+        (["ECON102", "ECON104", "ECON302", "ECON304", "ECON402", "ECON471"], ["ECON102"], ["GS"]),
+    ])
+    def test_matches_engine(self, mixed_programs_db, sample_courses_db,
+                            sample_equivalency_map, sample_prereq_config,
+                            user_history, major_courses, needs):
+        programs, courses = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        matrix = vectorized_scoring.ProgramScoreMatrix(programs, courses)
+        combined = list(set(user_history + major_courses))
+
+        gaps, overlaps, optimizations = matrix.score(
+            combined, user_history, major_courses, needs,
+            sample_equivalency_map, sample_prereq_config
+        )
+
+        for i, program in enumerate(programs):
+            gap, _ = engine.calculate_program_gap(
+                program, combined, courses, major_courses,
+                sample_equivalency_map, sample_prereq_config
+            )
+            overlap, _ = engine.calculate_overlap_count(program, user_history, major_courses, courses)
+            triple_dips = engine.find_triple_dips(program, needs, courses, user_history)
+            assert gaps[i] == gap
+            assert overlaps[i] == overlap
+            assert optimizations[i] == len(triple_dips)
+
+    def test_unknown_history_codes_are_ignored(self, mixed_programs_db, sample_courses_db):
+        programs, courses = engine.compile_catalog(mixed_programs_db, sample_courses_db)
+        matrix = vectorized_scoring.ProgramScoreMatrix(programs, courses)
+        empty = matrix.score([], [], [], [])
+        unknown = matrix.score(["ZZZ999"], ["ZZZ999"], [], [])
+        assert empty == unknown
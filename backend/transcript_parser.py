@@ -1,6 +1,8 @@
 import re
 from pypdf import PdfReader
 
+from course_keys import display_code
+
 def parse_transcript_pdf(pdf_path):
     """
     Parses a Penn State transcript PDF to extract completed course codes.
@@ -43,7 +45,8 @@ def parse_transcript_pdf(pdf_path):
                 
             dept = code_match.group(1)
             num = code_match.group(2)
-            full_code = f"{dept} {num}"
+            # Canonical spelling, so "ENGL 015" and "ENGL 15" are one course
+            full_code = display_code(f"{dept} {num}")
             
             # 2. Check for Valid Grade
             # We look for typical passing grades at the end or middle of line
@@ -0,0 +1,224 @@
+"""
+Vectorized Program Scoring (NumPy)
+
+Scores every program in one batch instead of walking each program's rules.
+Every course referenced by a program rule is mapped to an integer column, and
+the catalog is stored as credit-weighted incidence matrices:
+
+    all_credits[p, c]     credits program p requires from course c ('all' rules)
+    subset_credits[r, c]  credits course c contributes to 'subset' rule r
+    overlap[p, c]         1 if course c appears anywhere in program p
+
+A user's history becomes a boolean vector h over the same columns, so
+
+    all gap      = all_total - all_credits @ h
+    subset gap   = sum over rules of max(0, credits_needed - subset_credits @ h)
+    overlap      = overlap @ h
+
+Because h is sparse, the products are taken as column sums over the history's
+columns. Only `dynamic_subset` and `group_option` rules fall back to the
+per-rule code in recommendation_engine.
+
+Enable with RECOMMENDER_MODE=vectorized. Results are identical to the standard
+path; numpy is optional and the app falls back when it is not installed.
+"""
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+import recommendation_engine as engine
+
+
+class ProgramScoreMatrix:
+    """
+    Incidence matrices for a loaded catalog, built once at startup.
+
+    Args:
+        programs_db: List of program dicts (compiled plans are used when present)
+        courses_db: Courses database
+    """
+
+    def __init__(self, programs_db, courses_db):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for vectorized scoring (pip install numpy)")
+
+        self.programs = list(programs_db)
+        self.courses_db = courses_db
+        plans = [engine.get_program_plan(p, courses_db) for p in self.programs]
+        program_count = len(plans)
+
+        self.course_ids = {}
+        all_entries = []
+        subset_entries = []
+        subset_needed = []
+        subset_program = []
+        overlap_entries = set()
+        attribute_bits = {}
+        gened_masks = []
+        gened_program = []
+        # Per program: rules that need the per-rule fallback, and programs whose
+        # overlap / triple-dip counts depend on dynamic_subset primary pools
+        self.fallback_rules = [[] for _ in plans]
+        self.dynamic_programs = []
+
+        def course_id(code_norm):
+            return self.course_ids.setdefault(code_norm, len(self.course_ids))
+
+        for p, plan in enumerate(plans):
+            for rule in plan['rules']:
+                if rule['type'] == 'all':
+                    for _, code_norm, credits, _ in rule['courses']:
+                        all_entries.append((p, course_id(code_norm), credits))
+                        overlap_entries.add((p, course_id(code_norm)))
+                elif rule['type'] == 'subset':
+                    r = len(subset_needed)
+                    subset_needed.append(rule['credits_needed'])
+                    subset_program.append(p)
+                    for _, code_norm, credits in rule['courses']:
+                        subset_entries.append((r, course_id(code_norm), credits))
+                        overlap_entries.add((p, course_id(code_norm)))
+                elif rule['type'] == 'dynamic_subset':
+                    self.fallback_rules[p].append(rule)
+                    for code in rule['secondary_codes']:
+                        overlap_entries.add((p, course_id(engine.normalize_code(code))))
+                elif rule['type'] == 'group_option':
+                    self.fallback_rules[p].append(rule)
+                    for group in rule['groups']:
+                        for _, code_norm, _ in group:
+                            overlap_entries.add((p, course_id(code_norm)))
+
+            if plan['dynamic_rules']:
+                self.dynamic_programs.append(p)
+
+            for _, _, _, attrs in plan['gened_courses']:
+                mask = 0
+                for attr in attrs:
+                    mask |= 1 << attribute_bits.setdefault(attr, len(attribute_bits))
+                gened_masks.append(mask)
+                gened_program.append(p)
+
+        course_count = len(self.course_ids)
+        self.program_count = program_count
+        self.attribute_bits = attribute_bits
+
+        # Column-major so gathering the history's columns reads contiguous memory
+        self.all_credits = np.zeros((program_count, course_count), order='F')
+        for p, c, credits in all_entries:
+            self.all_credits[p, c] += credits
+        self.all_total = self.all_credits.sum(axis=1)
+
+        self.subset_credits = np.zeros((len(subset_needed), course_count), order='F')
+        for r, c, credits in subset_entries:
+            self.subset_credits[r, c] += credits
+        self.subset_needed = np.array(subset_needed, dtype=float)
+        self.subset_program = np.array(subset_program, dtype=np.intp)
+
+        self.overlap = np.zeros((program_count, course_count), dtype=np.int32, order='F')
+        for p, c in overlap_entries:
+            self.overlap[p, c] = 1
+
+        self.gened_masks = np.array(gened_masks, dtype=object if len(attribute_bits) > 62 else np.int64)
+        self.gened_program = np.array(gened_program, dtype=np.intp)
+
+    # Arrays that can live in a shared catalog segment (see catalog_segment.py)
+    SHARED_ARRAYS = ('all_credits', 'all_total', 'subset_credits', 'subset_needed', 'subset_program',
+                     'overlap', 'gened_masks', 'gened_program')
+
+    def column_codes(self):
+        """Normalized course code of every matrix column, by column index."""
+        codes = [None] * len(self.course_ids)
+        for code_norm, c in self.course_ids.items():
+            codes[c] = code_norm
+        return codes
+
+    def shared_arrays(self):
+        """The numeric arrays of SHARED_ARRAYS (object-typed GenEd masks stay private)."""
+        arrays = {name: getattr(self, name) for name in self.SHARED_ARRAYS}
+        if arrays['gened_masks'].dtype == object:
+            del arrays['gened_masks']
+        return arrays
+
+    def share(self, segment):
+        """
+        Replace the arrays with zero-copy views into a catalog segment
+        written from this matrix, so the private copies can be freed.
+
+        Returns:
+            int: Number of arrays now read from the segment
+        """
+        if segment.codes() != self.column_codes():
+            raise ValueError("catalog segment was not written from this score matrix")
+        shared = 0
+        for name, array in self.shared_arrays().items():
+            view = segment.array(f'matrix_{name}')
+            if view.shape != array.shape or view.dtype != array.dtype:
+                raise ValueError(f"catalog segment array matrix_{name} does not match")
+            setattr(self, name, view)
+            shared += 1
+        return shared
+
+    def _columns(self, codes):
+        return [self.course_ids[c] for c in codes if c in self.course_ids]
+
+    def score(self, combined_history, user_history, major_courses, gen_ed_needs,
+              equivalency_map=None, prereq_config=None, cost_evaluator=None):
+        """
+        Ranking keys for every program at once.
+
+        Args:
+            combined_history: Normalized codes from the transcript plus major courses
+            user_history: Normalized codes from the transcript only
+            major_courses: Normalized codes prescribed by the user's major
+            gen_ed_needs: GenEd attributes the user still needs
+            equivalency_map: Dictionary of course equivalencies
+            prereq_config: Configuration dict with hierarchy rules
+            cost_evaluator: Optional shared PrerequisiteCostEvaluator
+
+        Returns:
+            tuple: (gap_credits, overlap_counts, optimization_counts) as lists
+                   aligned with the programs the matrix was built from
+        """
+        combined_set = set(combined_history)
+        major_set = set(major_courses)
+        gap_columns = self._columns(combined_set)
+
+        gaps = self.all_total - self.all_credits[:, gap_columns].sum(axis=1)
+        earned = self.subset_credits[:, gap_columns].sum(axis=1)
+        remaining = np.maximum(0, self.subset_needed - earned)
+        gaps += np.bincount(self.subset_program, weights=remaining, minlength=self.program_count)
+        gaps = gaps.tolist()
+
+        for p, rules in enumerate(self.fallback_rules):
+            for rule in rules:
+                if rule['type'] == 'dynamic_subset':
+                    gaps[p] += engine._dynamic_gap(rule, combined_history, self.courses_db)[0]
+                else:
+                    if cost_evaluator is None:
+                        cost_evaluator = engine.make_cost_evaluator(combined_history, self.courses_db, equivalency_map, prereq_config)
+                    gaps[p] += engine._group_option_gap(rule, combined_set, major_set, cost_evaluator)[0]
+
+        overlap_columns = self._columns(set(user_history + major_courses))
+        overlaps = self.overlap[:, overlap_columns].sum(axis=1).tolist()
+
+        need_mask = 0
+        for need in gen_ed_needs:
+            if need in self.attribute_bits:
+                need_mask |= 1 << self.attribute_bits[need]
+        if need_mask and len(self.gened_masks):
+            hits = (self.gened_masks & need_mask) != 0
+            optimizations = np.bincount(self.gened_program, weights=hits.astype(float), minlength=self.program_count)
+            optimizations = [int(n) for n in optimizations]
+        else:
+            optimizations = [0] * self.program_count
+
+        # Primary pools match on department and level, so these few programs are
+        # counted with the standard per-program code
+        for p in self.dynamic_programs:
+            program = self.programs[p]
+            overlaps[p] = engine.calculate_overlap_count(program, user_history, major_courses, self.courses_db)[0]
+            optimizations[p] = len(engine.find_triple_dips(program, gen_ed_needs, self.courses_db, user_history))
+
+        return gaps, overlaps, optimizations
@@ -2,6 +2,7 @@ import axios, { AxiosInstance } from 'axios';
 import { 
   RecommendationRequest, 
   RecommendationResponse, 
+  ExplainProgramResponse,
   UploadTranscriptResponse,
   CoursesResponse 
 } from '@/types';
@@ -53,6 +54,19 @@ export const getRecommendations = async (data: RecommendationRequest): Promise<R
   }
 };
 
+export const explainProgram = async (
+  programId: string,
+  data: RecommendationRequest & { program_type?: string }
+): Promise<ExplainProgramResponse> => {
+  try {
+    const response = await api.post<ExplainProgramResponse>(`/recommend/explain/${encodeURIComponent(programId)}`, data);
+    return response.data;
+  } catch (error) {
+    console.error('Error explaining program:', error);
+    throw error;
+  }
+};
+
 export const getCourses = async (): Promise<CoursesResponse> => {
   try {
     const response = await api.get<CoursesResponse>('/courses');
@@ -66,6 +66,12 @@ export interface RecommendationResponse {
   recommendations: Program[];
 }
 
+export interface ExplainProgramResponse {
+  status: string;
+  count: number;
+  programs: Program[];
+}
+
 export interface CoursesResponse {
   status: string;
   courses: CoursesData;
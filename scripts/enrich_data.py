@@ -1,6 +1,12 @@
 import json
+import os
+import sys
 import unicodedata
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from course_keys import canonical_code
+
 # --- CONFIGURATION ---
 RULES_FILE = 'academic_programs_rules.json'          # Your Main Structure
 METADATA_FILE = 'gened_courses_golden_record.json'   # Your Data Source
@@ -10,11 +16,12 @@ MISSING_FILE = 'courses_missing_metadata.json'       # The Log of what we missed
 def normalize_code(code):
     """
     Standardizes course codes to ensure matching works.
-    Example: "ACCTG 201" -> "ACCTG201"
+    Example: "ACCTG 201" -> "ACCTG201", "ENGL 015" -> "ENGL15", "ECON-102" -> "ECON102"
     """
     if not code: return ""
-    # Remove spaces and non-breaking spaces, convert to UPPER
-    return "".join(ch for ch in code if ch.isalnum()).upper()
+    # Drop punctuation and any whitespace (NBSP too), then use the same
+    # canonical form the engine uses (backend/course_keys.py)
+    return canonical_code("".join(ch for ch in code if ch.isalnum()))
 
 def load_json(filename):
     try:
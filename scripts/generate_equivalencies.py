@@ -11,27 +11,30 @@ and generate course equivalencies based on:
 No hardcoding - all generated from data analysis.
 """
 
+import hashlib
 import json
+import os
 import re
+import sys
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from course_keys import canonical_code, split_code
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PREREQ_CONFIG_FILE = os.path.join(SCRIPT_DIR, '..', 'backend', 'config', 'prerequisite_config.json')
+SATISFIERS_FORMAT = 1
+
 
 def normalize_code(code):
-    """Normalize course codes."""
-    if not code:
-        return ""
-    return code.replace(" ", "").replace("\xa0", "").upper()
+    """Canonical course code, as the engine keys it ("ENGL 015" -> "ENGL15")."""
+    return canonical_code(code)
 
 
 def parse_course_string(course_code):
     """Parse course code into department and number."""
-    if not course_code:
-        return None, 0
-    clean = normalize_code(course_code)
-    match = re.match(r"([A-Z]+)(\d+)", clean)
-    if match:
-        return match.group(1), int(match.group(2))
-    return None, 0
+    return split_code(course_code)
 
 
 def extract_course_codes(text):
@@ -39,6 +42,21 @@ def extract_course_codes(text):
     return re.findall(r"([A-Z]{2,5}\s+\d{1,4}[A-Z]?)", text)
 
 
+def ast_course_codes(node):
+    """All course codes in a prerequisite AST (see backend/prerequisite_ast.py)."""
+    if not node:
+        return []
+    if 'course' in node:
+        return [node['course']]
+    return [code for child in node.get('and') or node.get('or') for code in ast_course_codes(child)]
+
+
+def equivalency_map_hash(equivalency_map):
+    """Content hash the engine uses to detect a stale satisfier index."""
+    canonical = json.dumps(equivalency_map, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
 def analyze_or_patterns(programs_data):
     """
     Find courses that appear as alternatives to each other ('A or B').
@@ -213,6 +231,95 @@ def generate_equivalency_map(programs_data, courses_master):
     return equivalency_map
 
 
+def collect_prerequisite_targets(programs_data, courses):
+    """
+    Every course code the engine may check as a prerequisite: codes named in
+    prerequisite text plus the program courses whose cost is evaluated.
+    """
+    targets = set()
+    for course in courses.values():
+        if 'prerequisites_ast' in course:
+            # Compiled by generate_optimized_data.py; recommended preparation is excluded
+            targets.update(ast_course_codes(course['prerequisites_ast']))
+            continue
+        for code in extract_course_codes(course.get('prerequisites_raw') or ''):
+            targets.add(normalize_code(code))
+    for program in programs_data:
+        for rule in program.get('rules', []):
+            rule_courses = list(rule.get('courses', []))
+            for group in rule.get('groups', []):
+                rule_courses.extend(group.get('courses', []))
+            for course in rule_courses:
+                targets.add(normalize_code(course.get('code', '')))
+                for code in extract_course_codes(course.get('prerequisites_text') or ''):
+                    targets.add(normalize_code(code))
+    targets.discard("")
+    return targets
+
+
+def build_satisfier_index(programs_data, courses, equivalency_map, prereq_config):
+    """
+    Precompute, for every prerequisite code, the complete set of courses that
+    satisfy it on their own, applying the same three tiers as the engine:
+
+    1. the course itself
+    2. its equivalents in the equivalency map (OR-patterns and hierarchies)
+    3. same-department courses at a higher level, per the configured level rules
+
+    Level rules are transitive by construction, so a single pass yields the
+    closure. Courses outside the catalog are not listed; the engine falls back
+    to the hierarchy rule for those.
+
+    Returns:
+        dict: artifact with forward ("satisfiers") and inverse ("satisfies") indexes
+    """
+    hierarchy = prereq_config.get('hierarchy_rules', {})
+    same_dept = bool(hierarchy.get('same_department_higher_level', False))
+    min_diff = hierarchy.get('minimum_level_difference', 0)
+
+    universe = {normalize_code(code) for code in courses}
+    for code, entry in equivalency_map.items():
+        universe.add(code)
+        universe.update(normalize_code(e) for e in entry.get('equivalents', []))
+    universe.discard("")
+
+    by_department = defaultdict(list)
+    for code in universe:
+        dept, num = parse_course_string(code)
+        if dept:
+            by_department[dept].append((num, code))
+
+    satisfiers = {}
+    for target in sorted(collect_prerequisite_targets(programs_data, courses)):
+        found = {target}
+        if target in equivalency_map:
+            found.update(normalize_code(e) for e in equivalency_map[target].get('equivalents', []))
+        req_dept, req_num = parse_course_string(target)
+        if same_dept and req_dept and req_num > 0:
+            next_level = (req_num // 100) * 100 + 100
+            same_level_min = req_num + min_diff if min_diff > 0 else req_num + 1
+            threshold = min(same_level_min, next_level)
+            found.update(code for num, code in by_department.get(req_dept, []) if num >= threshold)
+        satisfiers[target] = sorted(found)
+
+    satisfies = defaultdict(set)
+    for target, codes in satisfiers.items():
+        for code in codes:
+            satisfies[code].add(target)
+
+    return {
+        "format": SATISFIERS_FORMAT,
+        "hierarchy_rules": {
+            "same_department_higher_level": same_dept,
+            "minimum_level_difference": min_diff
+        },
+        "equivalencies_sha256": equivalency_map_hash(equivalency_map),
+        "catalog_courses": sorted(universe),
+        "satisfiers": satisfiers,
+        "satisfies": {code: sorted(targets) for code, targets in sorted(satisfies.items())}
+    }
+
+
 def main():
     """Main execution."""
     print("\n📂 Loading source data...")
@@ -225,6 +332,13 @@ def main():
         with open('world_campus_courses_master.json', 'r', encoding='utf-8') as f:
             courses_master = json.load(f)
         print(f"   ✓ Loaded {len(courses_master)} courses")
+        
+        with open('gened_supplementary.json', 'r', encoding='utf-8') as f:
+            courses_supplementary = json.load(f)
+        print(f"   ✓ Loaded {len(courses_supplementary)} supplementary courses")
+        
+        with open(PREREQ_CONFIG_FILE, 'r', encoding='utf-8') as f:
+            prereq_config = json.load(f)
     except FileNotFoundError as e:
         print(f"❌ ERROR: {e}")
         return
@@ -259,6 +373,15 @@ def main():
         print(f"     Reason: {data['reason'][:60]}...")
         sample_count += 1
     
+    # Satisfier closure over the full catalog (same merge order as the engine)
+    print("\n💾 Saving prerequisite_satisfiers.json...")
+    all_courses = {**courses_supplementary, **courses_master}
+    satisfier_index = build_satisfier_index(programs_data, all_courses, equivalency_map, prereq_config)
+    with open('prerequisite_satisfiers.json', 'w', encoding='utf-8') as f:
+        json.dump(satisfier_index, f, separators=(',', ':'), ensure_ascii=False)
+    pair_count = sum(len(v) for v in satisfier_index['satisfiers'].values())
+    print(f"   ✓ {len(satisfier_index['satisfiers'])} prerequisite codes, {pair_count} satisfier pairs")
+    
     print("\n✅ Equivalency map generated successfully!")
     print("=" * 60)
 
@@ -6,20 +6,33 @@ This script generates optimized data files by:
 1. Extracting all courses from academic_programs_rules.json
 2. Deduplicating courses with conflict detection
 3. Enriching with GenEd attributes from gened_courses_golden_record.json
-4. Creating world_campus_courses_master.json (primary lookup)
-5. Creating gened_supplementary.json (fallback for non-WC courses)
+4. Compiling prerequisite text into an AND/OR tree (prerequisites_ast)
+5. Creating world_campus_courses_master.json (primary lookup)
+6. Creating gened_supplementary.json (fallback for non-WC courses)
+
+Usage:
+    python3 generate_optimized_data.py              # full rebuild
+    python3 generate_optimized_data.py --ast-only   # only recompile prerequisites_ast
+                                                    # in the existing output files
 """
 
+import argparse
 import json
+import os
 import re
+import sys
 from collections import defaultdict
 
+# The prerequisite compiler and course keys live with the backend that consumes the output
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from course_keys import canonical_code
+from prerequisite_ast import compile_prerequisites
+
 
 def normalize_code(code):
-    """Normalize course codes by removing spaces and special characters."""
-    if not code:
-        return ""
-    return code.replace(" ", "").replace("\xa0", "").upper()
+    """Canonical course code, as the engine keys it ("ENGL 015" -> "ENGL15")."""
+    return canonical_code(code)
 
 
 def extract_courses_from_programs(programs_data):
@@ -164,6 +177,44 @@ def create_supplementary_file(world_campus_courses, gened_courses):
     return supplementary
 
 
+def compile_prerequisite_asts(courses):
+    """
+    Compile every course's prerequisites_raw into prerequisites_ast (in place),
+    so the engine never parses prerequisite text at request time.
+    """
+    with_prereqs = 0
+    for code, course in courses.items():
+        course['prerequisites_ast'] = compile_prerequisites(course.get('prerequisites_raw', ''), course.get('courseCode', code))
+        if course['prerequisites_ast'] is not None:
+            with_prereqs += 1
+    return with_prereqs
+
+
+def save_courses(courses, path):
+    """Save a course file sorted by course code for readability."""
+    sorted_courses = dict(sorted(courses.items()))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(sorted_courses, f, indent=2, ensure_ascii=False)
+    return len(sorted_courses)
+
+
+def compile_existing_files(data_dir):
+    """--ast-only: add prerequisites_ast to the current output files without rebuilding them."""
+    print("\n🌳 Compiling prerequisite ASTs in existing data files...")
+    for filename in ('world_campus_courses_master.json', 'gened_supplementary.json'):
+        path = os.path.join(data_dir, filename)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                courses = json.load(f)
+        except FileNotFoundError:
+            print(f"❌ ERROR: Could not find {filename}, run a full rebuild first")
+            return
+        with_prereqs = compile_prerequisite_asts(courses)
+        save_courses(courses, path)
+        print(f"   ✓ {filename}: {with_prereqs} of {len(courses)} courses have course prerequisites")
+    print("\n✅ Prerequisite ASTs updated!")
+
+
 def save_conflicts(conflicts, filename='duplicate_conflicts.json'):
     """Save conflict report to JSON file."""
     if conflicts:
@@ -188,16 +239,24 @@ def save_conflicts(conflicts, filename='duplicate_conflicts.json'):
 
 def main():
     """Main execution function."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ast-only', action='store_true',
+                        help='only recompile prerequisites_ast in the existing output files')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("🚀 World Campus Data Optimization Script")
     print("=" * 60)
     
     # Setup paths
-    import os
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
     data_dir = os.path.join(project_root, 'data')
     
+    if args.ast_only:
+        compile_existing_files(data_dir)
+        return
+    
     # Load source data
     print("\n📂 Loading source data files...")
     try:
@@ -227,20 +286,20 @@ def main():
     # Phase 4: Create supplementary file
     supplementary_courses = create_supplementary_file(world_campus_courses, gened_courses)
     
-    # Phase 5: Save master file
+    # Phase 5: Compile prerequisite text
+    print("\n🌳 Compiling prerequisite ASTs...")
+    with_prereqs = compile_prerequisite_asts(world_campus_courses) + compile_prerequisite_asts(supplementary_courses)
+    print(f"✅ Compiled {with_prereqs} prerequisite trees")
+    
+    # Phase 6: Save master file
     print("\n💾 Saving world_campus_courses_master.json...")
-    # Sort by course code for readability
-    sorted_master = dict(sorted(world_campus_courses.items()))
-    with open(os.path.join(data_dir, 'world_campus_courses_master.json'), 'w', encoding='utf-8') as f:
-        json.dump(sorted_master, f, indent=2, ensure_ascii=False)
-    print(f"   ✓ Saved {len(sorted_master)} World Campus courses")
+    saved = save_courses(world_campus_courses, os.path.join(data_dir, 'world_campus_courses_master.json'))
+    print(f"   ✓ Saved {saved} World Campus courses")
     
-    # Phase 6: Save supplementary file
+    # Phase 7: Save supplementary file
     print("\n💾 Saving gened_supplementary.json...")
-    sorted_supplementary = dict(sorted(supplementary_courses.items()))
-    with open(os.path.join(data_dir, 'gened_supplementary.json'), 'w', encoding='utf-8') as f:
-        json.dump(sorted_supplementary, f, indent=2, ensure_ascii=False)
-    print(f"   ✓ Saved {len(sorted_supplementary)} supplementary courses")
+    saved = save_courses(supplementary_courses, os.path.join(data_dir, 'gened_supplementary.json'))
+    print(f"   ✓ Saved {saved} supplementary courses")
     
     # Summary statistics
     print("\n" + "=" * 60)
@@ -19,8 +19,15 @@ fi
 # Navigate to backend
 cd backend
 
-# Start Flask server
-echo "✓ Starting Flask server on http://localhost:5001"
-echo ""
-python3 app.py
+# Start the server: the pre-forking production server by default, the Flask
+# development server (auto-reload, debugger) with --dev
+if [ "$1" == "--dev" ]; then
+    echo "✓ Starting Flask development server on http://localhost:5001"
+    echo ""
+    python3 app.py
+else
+    echo "✓ Starting production server on http://localhost:5001"
+    echo ""
+    python3 serve.py --port 5001
+fi
 